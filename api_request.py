@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口请求的公共部分
+读取抓包得到的 .hcy 请求模板和签名文件（x-request-timestamp.txt / x-request-sign.txt），
+识别签名失效的响应（405 + errCode SIG.FAIL）。work_queue.py、order_listing.py 以及 http_req_v1/v2.py、express.py 共用
+"""
+
+import json
+import os
+import urllib.error
+
+# 签名文件：抓包工具更新签名后覆盖写入
+SIGNATURE_FILES = (
+    ('x-request-timestamp', 'x-request-timestamp.txt'),
+    ('x-request-sign', 'x-request-sign.txt'),
+)
+
+
+class SignatureExpired(RuntimeError):
+    """接口返回签名失效，需要更新签名文件后重试"""
+
+
+def parse_http_file(http_file):
+    """
+    解析 .hcy 请求模板（抓包得到的原始HTTP报文）
+
+    host 以 api. 开头或端口为443时用https，否则用http（本地模拟接口）；各脚本和 load_request_template 共用
+
+    Returns:
+        (method, url, headers, body)，body 为去掉换行的请求体文本，headers 保留模板中的全部请求头
+    """
+    with open(http_file, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    method, path, _ = lines[0].split()
+    headers = {}
+    host = None
+    body = ''
+    is_body = False
+    for line in lines[1:]:
+        if line.strip() == '':
+            is_body = True
+            continue
+        if is_body:
+            body += line.strip()
+        elif ':' in line:
+            key, value = line.split(':', 1)
+            key = key.strip()
+            value = value.strip()
+            if key.lower() == 'host':
+                host = value
+            headers[key] = value
+    if not host:
+        raise ValueError('host 头缺失')
+    scheme = 'https' if host.startswith('api.') or host.endswith(':443') else 'http'
+    return method, f"{scheme}://{host}{path}", headers, body
+
+
+def load_request_template(http_file):
+    """
+    解析 .hcy 请求模板（见 parse_http_file）
+
+    Returns:
+        (method, url, headers, body)，body 为请求体JSON（没有请求体时为None），headers 不含 content-length
+    """
+    method, url, headers, body = parse_http_file(http_file)
+    headers = {key: value for key, value in headers.items() if key.lower() != 'content-length'}
+    return method, url, headers, json.loads(body) if body else None
+
+
+def read_signature(signature_dir):
+    """读取签名文件，返回要覆盖的请求头（不存在的文件跳过）"""
+    headers = {}
+    for header, file_name in SIGNATURE_FILES:
+        path = os.path.join(signature_dir, file_name)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                headers[header] = f.read().strip()
+    return headers
+
+
+def signature_mtime(signature_dir):
+    """签名文件最后一次更新的时间，用于等待签名更新"""
+    mtimes = [
+        os.path.getmtime(os.path.join(signature_dir, file_name))
+        for _, file_name in SIGNATURE_FILES
+        if os.path.exists(os.path.join(signature_dir, file_name))
+    ]
+    return max(mtimes) if mtimes else 0
+
+
+def is_signature_error(status_code, body):
+    """响应是否为签名失效"""
+    if status_code != 405:
+        return False
+    try:
+        return json.loads(body).get('errCode') == 'SIG.FAIL'
+    except (ValueError, AttributeError):
+        return False
+
+
+def raise_for_signature(error):
+    """urllib 的 HTTPError 是签名失效时转换为 SignatureExpired，否则原样抛出"""
+    if isinstance(error, urllib.error.HTTPError) and is_signature_error(error.code, error.read()):
+        raise SignatureExpired(f"签名失效: {error.url}") from error
+    raise error
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单查看页面的静态数据构建
+在 optimize_orders.py 之后运行，把 optimized_orders.json 按状态和抓取页拆成分片，
+生成带数量和金额汇总的清单（manifest.json）和精简的搜索索引。
+分片和索引文件名带内容哈希，可以长期缓存，并预先生成 .gz（以及安装了brotli时的 .br）压缩文件。
+main.js 先读取清单，再只加载当前过滤条件需要的分片。
+指定 --image-cache 时商品图片改为 image_cache.py 下载的本地缓存和缩略图
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from product_catalog import ProductCatalog, catalog_path_for
+
+DEFAULT_OUTPUT_DIR = 'viewer_data'
+MANIFEST_FILE = 'manifest.json'
+
+# main.js 每页显示的订单数，用于统计首屏需要下载的数据量
+ORDERS_PER_PAGE = 30
+
+
+def _status_dir(status_key):
+    """
+    状态key对应的分片目录名
+
+    key来自接口数据，只保留字母、数字、下划线和连字符；有其他字符时替换掉并加上key的哈希，
+    避免路径穿越（如 ../）以及不同key替换后重名
+    """
+    safe = re.sub(r'[^A-Za-z0-9_-]', '_', status_key)
+    if safe == status_key:
+        return safe
+    return f"{safe}-{hashlib.sha256(status_key.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _write_hashed(output_dir, relative_stem, payload):
+    """
+    写入带内容哈希的文件（{relative_stem}.{hash}.json）及其预压缩版本
+
+    Returns:
+        (内容哈希, 相对路径)
+    """
+    data = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    relative_path = f'{relative_stem}.{digest}.json'
+    path = os.path.join(output_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, 'wb') as f:
+        f.write(data)
+    # mtime=0 保证同样的内容生成同样的压缩文件
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gz_data)
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+    return digest, relative_path
+
+
+def build_viewer_data(json_file='optimized_orders.json', output_dir=DEFAULT_OUTPUT_DIR, image_cache=None):
+    """
+    生成分片、搜索索引和清单
+
+    Args:
+        image_cache: image_cache.ImageCache，商品图片地址改为本地缓存（页面中的路径相对于 index.html 所在目录）
+
+    Returns:
+        清单字典
+    """
+    with open(json_file, 'r', encoding='utf-8') as f:
+        orders_data = json.load(f)
+
+    # 规范化数据先还原商品，分片可以独立使用
+    catalog = ProductCatalog(catalog_path_for(json_file))
+    if image_cache is not None:
+        # 页面（index.html）与 viewer_data 在同一目录，图片路径相对于该目录
+        page_dir = os.path.dirname(os.path.abspath(output_dir))
+        image_base = os.path.relpath(os.path.abspath(image_cache.directory), page_dir).replace(os.sep, '/')
+
+    def resolve_products(products):
+        products = catalog.resolve_products(products)
+        if image_cache is None:
+            return products
+        return [image_cache.rewrite_product(product, image_base) for product in products]
+
+    # (抓取页, 状态key) -> 分片；seq 保存订单在原文件中的位置，用于前端还原顺序
+    shards = {}
+    for seq, order in enumerate(orders_data):
+        order_info = order.get('orderInfo', {})
+        status = order_info.get('status', {})
+        shard_key = (order.get('page', 0), status.get('key', '') or 'UNKNOWN')
+        shard = shards.setdefault(shard_key, {
+            'statusName': status.get('name', ''),
+            'seq': [],
+            'orders': [],
+            'amount': 0,
+        })
+        resolved = dict(order)
+        resolved['products'] = resolve_products(order.get('products', []))
+        shard['seq'].append(seq)
+        shard['orders'].append(resolved)
+        shard['amount'] += order_info.get('paidPrice', 0) or 0
+
+    # 旧的分片文件名哈希不同，重新构建前整体清理
+    shards_dir = os.path.join(output_dir, 'shards')
+    if os.path.exists(shards_dir):
+        shutil.rmtree(shards_dir)
+    for name in os.listdir(output_dir) if os.path.exists(output_dir) else []:
+        if name.startswith('search.'):
+            os.remove(os.path.join(output_dir, name))
+    os.makedirs(output_dir, exist_ok=True)
+
+    # 分片表用紧凑数组 [抓取页, 状态序号, 订单数, 金额, 内容哈希]，清单随分片数增长得尽量慢；
+    # 分片文件路径为 shards/{状态目录}/p{抓取页}.{内容哈希}.json，状态目录见 _status_dir
+    manifest_shards = []
+    search_index = []
+    statuses = {}
+    for shard_id, ((page, status_key), shard) in enumerate(sorted(shards.items())):
+        digest, _ = _write_hashed(
+            output_dir, f'shards/{_status_dir(status_key)}/p{page}',
+            {'seq': shard['seq'], 'orders': shard['orders']},
+        )
+
+        if status_key not in statuses:
+            statuses[status_key] = {
+                'key': status_key,
+                'dir': _status_dir(status_key),
+                'name': shard['statusName'],
+                'orders': 0,
+                'amount': 0,
+            }
+        summary = statuses[status_key]
+        summary['orders'] += len(shard['orders'])
+        summary['amount'] += shard['amount']
+        status_index = list(statuses).index(status_key)
+
+        manifest_shards.append([page, status_index, len(shard['orders']), shard['amount'], digest])
+
+        # 搜索索引: [订单号, 买家, 卖家, 分片id]，与 main.js 的搜索字段一致
+        for order in shard['orders']:
+            order_info = order.get('orderInfo', {})
+            search_index.append([
+                order_info.get('orderId', ''),
+                order_info.get('buyer', {}).get('name', ''),
+                order_info.get('seller', {}).get('name', ''),
+                shard_id,
+            ])
+
+    _, search_file = _write_hashed(output_dir, 'search', search_index)
+
+    manifest = {
+        'generatedAt': int(time.time()),
+        'totalOrders': len(orders_data),
+        'totalAmount': sum(status['amount'] for status in statuses.values()),
+        'statuses': list(statuses.values()),
+        'searchIndex': search_file,
+        'shardFields': ['page', 'status', 'orders', 'amount', 'hash'],
+        'shards': manifest_shards,
+    }
+    # 清单本身不带哈希，每次构建都会变化，只做短期缓存
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+    return manifest
+
+
+def _format_size(size_bytes):
+    return f"{size_bytes / 1024:.1f}KB" if size_bytes < 1024 * 1024 else f"{size_bytes / 1024 / 1024:.1f}MB"
+
+
+def _file_sizes(path):
+    """文件的原始大小和 .gz 大小"""
+    gz_path = path + '.gz'
+    if not os.path.exists(gz_path):
+        with open(path, 'rb') as f:
+            return os.path.getsize(path), len(gzip.compress(f.read(), mtime=0))
+    return os.path.getsize(path), os.path.getsize(gz_path)
+
+
+def report_transfer(json_file, output_dir, manifest):
+    """对比首屏需要下载的数据量：整份 optimized_orders.json 与 清单+首屏分片"""
+    full_size, full_gz_size = _file_sizes(json_file)
+    manifest_size, manifest_gz_size = _file_sizes(os.path.join(output_dir, MANIFEST_FILE))
+
+    # 首屏按抓取页顺序显示，需要覆盖前 ORDERS_PER_PAGE 个订单所在抓取页的全部分片
+    status_dirs = [status['dir'] for status in manifest['statuses']]
+    first_page_bytes = 0
+    first_page_gz_bytes = 0
+    covered = 0
+    last_page = None
+    for page, status_index, order_count, _, digest in manifest['shards']:
+        if covered >= ORDERS_PER_PAGE and page != last_page:
+            break
+        size, gz_size = _file_sizes(os.path.join(output_dir, f'shards/{status_dirs[status_index]}/p{page}.{digest}.json'))
+        first_page_bytes += size
+        first_page_gz_bytes += gz_size
+        covered += order_count
+        last_page = page
+
+    search_size, search_gz_size = _file_sizes(os.path.join(output_dir, manifest['searchIndex']))
+
+    print("\n📊 首屏下载量:")
+    print(f"   整份JSON: {_format_size(full_size)} (gzip {_format_size(full_gz_size)})")
+    print(f"   清单: {_format_size(manifest_size)} (gzip {_format_size(manifest_gz_size)})")
+    print(f"   首屏分片: {_format_size(first_page_bytes)} (gzip {_format_size(first_page_gz_bytes)})")
+    print(f"   首次搜索额外下载索引: {_format_size(search_size)} (gzip {_format_size(search_gz_size)})")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='订单查看页面静态数据构建')
+    parser.add_argument('json_file', nargs='?', default='optimized_orders.json')
+    parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--report', action='store_true', help='统计首屏下载量')
+    parser.add_argument('--image-cache', help='image_cache.py 的缓存目录，商品图片改为本地缓存和缩略图')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.json_file):
+        print(f"❌ 错误: 找不到文件 {args.json_file}")
+        return
+    image_cache = None
+    if args.image_cache:
+        from image_cache import ImageCache
+
+        if not os.path.isdir(args.image_cache):
+            print(f"❌ 错误: 找不到图片缓存目录 {args.image_cache}，请先运行 image_cache.py fetch")
+            return
+        image_cache = ImageCache(args.image_cache)
+
+    start = time.perf_counter()
+    manifest = build_viewer_data(args.json_file, args.output_dir, image_cache)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ 构建完成: {args.output_dir}/{MANIFEST_FILE}")
+    print(f"📊 订单数: {manifest['totalOrders']}, 分片数: {len(manifest['shards'])}, 耗时 {elapsed:.1f} 秒")
+    if brotli is None:
+        print("ℹ️ 未安装brotli，只生成了 .gz 预压缩文件 (pip install brotli)")
+
+    if args.report:
+        report_transfer(args.json_file, args.output_dir, manifest)
+
+
+if __name__ == '__main__':
+    main()
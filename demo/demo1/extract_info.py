@@ -5,15 +5,27 @@
 从原始订单数据中提取关键信息并保存到新的JSON文件中
 """
 
+import argparse
 import json
 import os
+import sys
 from datetime import datetime
 from typing import List, Dict, Any
 
+# 仓库根目录下的公共模块（projection.py 等）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from projection import compile_projection, KEY_ORDER_INFO_SPEC
+
+# 投影规则只在加载时编译一次
+_extract_key_order_info = compile_projection(KEY_ORDER_INFO_SPEC, 'extract_key_order_info')
+
 
 def extract_key_order_info(order_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    提取单个订单的关键信息
+    提取单个订单的关键信息（规则见 projection.KEY_ORDER_INFO_SPEC）
     
     Args:
         order_data: 单个订单的完整数据
@@ -21,94 +33,7 @@ def extract_key_order_info(order_data: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         包含关键信息的字典
     """
-    order_info = order_data.get('orderInfo', {})
-    products = order_data.get('products', [])
-    
-    # 提取基本订单信息
-    key_info = {
-        'orderId': order_info.get('orderId', ''),
-        'status': {
-            'name': order_info.get('status', {}).get('name', ''),
-            'key': order_info.get('status', {}).get('key', '')
-        },
-        'orderType': {
-            'name': order_info.get('orderType', {}).get('name', ''),
-            'key': order_info.get('orderType', {}).get('key', '')
-        },
-        'createdAt': order_info.get('createdAt', ''),
-        'paidAt': order_info.get('paidAt', ''),
-        'deliverPattern': {
-            'name': order_info.get('deliverPattern', {}).get('name', ''),
-            'key': order_info.get('deliverPattern', {}).get('key', '')
-        }
-    }
-    
-    # 买家信息
-    buyer = order_info.get('buyer', {})
-    key_info['buyer'] = {
-        'id': buyer.get('id', ''),
-        'name': buyer.get('name', ''),
-        'phone': buyer.get('phone', '')
-    }
-    
-    # 卖家信息
-    seller = order_info.get('seller', {})
-    key_info['seller'] = {
-        'id': seller.get('id', ''),
-        'name': seller.get('name', ''),
-        'phone': seller.get('phone', '')
-    }
-    
-    # 收货信息
-    key_info['receiver'] = {
-        'name': order_info.get('receiver', ''),
-        'phone': order_info.get('receiverPhone', ''),
-        'address': order_info.get('address', ''),
-        'province': order_info.get('receiverProvince', ''),
-        'city': order_info.get('receiverCity', ''),
-        'district': order_info.get('receiverDistrict', '')
-    }
-    
-    # 价格信息
-    key_info['pricing'] = {
-        'orderPrice': order_info.get('orderPrice', 0),
-        'expressPrice': order_info.get('expressPrice', 0),
-        'paidPrice': order_info.get('paidPrice', 0),
-        'originalPrice': order_info.get('orderOriginalPrice', 0),
-        'afterDiscountPrice': order_info.get('afterDiscountPrice', 0)
-    }
-    
-    # 商品信息
-    key_info['products'] = []
-    for product in products:
-        product_info = {
-            'productId': product.get('productId', ''),
-            'productName': product.get('productName', ''),
-            'unitPrice': product.get('uintPrice', 0),
-            'amount': product.get('amount', 0),
-            'totalPrice': product.get('price', 0),
-            'description': product.get('description', ''),
-            'specValues': product.get('specValues', [])
-        }
-        key_info['products'].append(product_info)
-    
-    # 可执行操作
-    active_actions = order_data.get('activeActions', [])
-    key_info['availableActions'] = [
-        {
-            'action': action.get('action', ''),
-            'actionName': action.get('actionName', '')
-        }
-        for action in active_actions
-    ]
-    
-    # 其他重要字段
-    key_info['productNum'] = order_data.get('productNum', '0')
-    key_info['relatedId'] = order_info.get('relatedId', '')
-    key_info['relatedType'] = order_info.get('relatedType', '')
-    key_info['expiredAt'] = order_info.get('expiredAt', '0')
-    
-    return key_info
+    return _extract_key_order_info(order_data)
 
 
 def process_order_data(input_file: str, output_file: str) -> None:
@@ -180,10 +105,14 @@ def process_order_data(input_file: str, output_file: str) -> None:
         print(f"❌ 错误: {e}")
 
 
-def main():
+def main(argv=None):
     """主函数"""
-    input_file = '1749469724351_body'
-    output_file = 'extracted_orders.json'
+    parser = argparse.ArgumentParser(description='订单关键信息提取')
+    parser.add_argument('input_file', nargs='?', default='1749469724351_body', help='保存的接口响应体')
+    parser.add_argument('-o', '--output', default='extracted_orders.json')
+    args = parser.parse_args(argv)
+    input_file = args.input_file
+    output_file = args.output
     
     print("🔄 开始提取订单关键信息...")
     print(f"📖 输入文件: {input_file}")
@@ -1,39 +1,16 @@
 # 根据测试，当前签名有效期为1min
 
-import requests
 import json
+import os
+import sys
 
-# 读取并解析 http 报文文件
-def parse_http_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.read().splitlines()
+# 仓库根目录下的公共模块（api_request.py、http_cassette.py）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
-    # 解析请求行
-    request_line = lines[0]
-    method, path, _ = request_line.split()
-    headers = {}
-    host = None
-    body = ''
-    is_body = False
-    for line in lines[1:]:
-        if line.strip() == '':
-            is_body = True
-            continue
-        if not is_body:
-            if ':' in line:
-                k, v = line.split(':', 1)
-                k = k.strip()
-                v = v.strip()
-                if k.lower() == 'host':
-                    host = v
-                headers[k] = v
-        else:
-            body += line.strip()
-    if not host:
-        raise ValueError('host 头缺失')
-    scheme = 'https' if host.startswith('api.') or host.endswith(':443') else 'http'
-    url = f"{scheme}://{host}{path}"
-    return method, url, headers, body
+from api_request import parse_http_file
+from http_cassette import default_transport
 
 if __name__ == "__main__":
     file_path = "http_req_think.hcy"
@@ -45,13 +22,8 @@ if __name__ == "__main__":
         headers['x-request-sign'] = f.read().strip()
     # 去掉 content-length，requests 会自动处理
     headers.pop('content-length', None)
-    # 发送请求
-    if method.upper() == 'POST':
-        resp = requests.post(url, headers=headers, data=body.encode('utf-8'))
-    elif method.upper() == 'GET':
-        resp = requests.get(url, headers=headers, params=body)
-    else:
-        raise Exception(f"暂不支持的方法: {method}")
+    # 发送请求（设置 ORDERMGMT_CASSETTE 时录制或回放，见 http_cassette.py）
+    resp = default_transport().request(method, url, headers, body)
     print("状态码:", resp.status_code)
     
     try:
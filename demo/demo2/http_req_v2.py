@@ -3,74 +3,42 @@
 import requests
 import json
 import os
+import sys
+import time
 from datetime import datetime
 
-# 读取并解析 http 报文文件
-def parse_http_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.read().splitlines()
+# 仓库根目录下的公共模块（raw_archive.py 等）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
-    # 解析请求行
-    request_line = lines[0]
-    method, path, _ = request_line.split()
-    headers = {}
-    host = None
-    body = ''
-    is_body = False
-    for line in lines[1:]:
-        if line.strip() == '':
-            is_body = True
-            continue
-        if not is_body:
-            if ':' in line:
-                k, v = line.split(':', 1)
-                k = k.strip()
-                v = v.strip()
-                if k.lower() == 'host':
-                    host = v
-                headers[k] = v
-        else:
-            body += line.strip()
-    if not host:
-        raise ValueError('host 头缺失')
-    scheme = 'https' if host.startswith('api.') or host.endswith(':443') else 'http'
-    url = f"{scheme}://{host}{path}"
-    return method, url, headers, body
+from api_request import parse_http_file
+from http_cassette import default_transport
+from raw_archive import ArchiveWriter, PageSpool, new_run_path
+from order_listing import (
+    DEFAULT_MAX_LIMIT, DEFAULT_TARGET_SECONDS, STREAM_CHUNK_SIZE, PageSizeTuner, RowStreamParser,
+    row_order_id, stream_rows,
+)
 
-def extract_order_ids_from_response(response_data):
-    """
-    从响应JSON中提取所有的orderId
-    返回: (order_ids列表, 数量, 最后一个orderId)
+# 单个请求的超时秒数（连接, 读取），超时后缩小limit重试
+REQUEST_TIMEOUT = (10, 30)
+
+def send_request(method, url, headers, body, stream=False, timeout=None, transport=None):
     """
-    order_ids = []
-    try:
-        if 'data' in response_data and 'rowList' in response_data['data']:
-            for row in response_data['data']['rowList']:
-                if 'orderInfo' in row and 'orderId' in row['orderInfo']:
-                    order_ids.append(row['orderInfo']['orderId'])
-    except Exception as e:
-        print(f"提取orderId时出错: {e}")
-    
-    count = len(order_ids)
-    last_id = order_ids[-1] if order_ids else None
-    return order_ids, count, last_id
+    发送HTTP请求，stream=True 时响应体在读取时才接收
 
-def send_request(method, url, headers, body):
-    """发送HTTP请求"""
-    if method.upper() == 'POST':
-        resp = requests.post(url, headers=headers, data=body.encode('utf-8'))
-    elif method.upper() == 'GET':
-        resp = requests.get(url, headers=headers, params=body)
-    else:
-        raise Exception(f"暂不支持的方法: {method}")
-    return resp
+    请求经过 http_cassette.Transport 发送，可以录制或从 cassette 回放（默认按环境变量 ORDERMGMT_CASSETTE）
+    """
+    transport = transport or default_transport()
+    return transport.request(method, url, headers, body, stream=stream, timeout=timeout)
 
-def save_progress(order_ids, filename='order_progress.json', is_completed=False):
-    """保存当前进度到文件"""
+def save_progress(order_ids, filename='order_progress.json', is_completed=False, next_page=None):
+    """保存当前进度到文件，next_page 为继续时下一次请求的页码（每页limit会变化，不能按订单数推算）"""
     progress_data = {
         "order_ids": order_ids,
         "count": len(order_ids),
         "last_id": order_ids[-1] if order_ids else None,
+        "next_page": next_page,
         "is_completed": is_completed,
         "status": "已完成全部提取" if is_completed else "需要更新签名继续"
     }
@@ -80,20 +48,25 @@ def save_progress(order_ids, filename='order_progress.json', is_completed=False)
     print(f"进度已保存到 {filename}，共 {len(order_ids)} 个OrderID，状态: {status_msg}")
 
 def load_progress(filename='order_progress.json'):
-    """从文件加载进度"""
+    """
+    从文件加载进度
+
+    返回: (order_ids列表, 最后一个orderId, 下一页的页码)，旧的进度文件没有页码时为None
+    """
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             data = json.load(f)
         order_ids = data.get('order_ids', [])
         last_id = data.get('last_id', None)
+        next_page = data.get('next_page')
         print(f"加载进度成功，已有 {len(order_ids)} 个OrderID，最后ID: {last_id}")
-        return order_ids, last_id
+        return order_ids, last_id, next_page
     except FileNotFoundError:
         print(f"进度文件 {filename} 不存在")
-        return [], None
+        return [], None, None
     except Exception as e:
         print(f"加载进度文件失败: {e}")
-        return [], None
+        return [], None, None
 
 def is_signature_error(resp):
     """判断是否为签名错误"""
@@ -105,35 +78,54 @@ def is_signature_error(resp):
             pass
     return False
 
-if __name__ == "__main__":
-    file_path = "http_req_think.hcy"
-    method, url, headers, body = parse_http_file(file_path)
+def crawl(http_file='http_req_think.hcy', output_dir='raw_result', resume=None, signature_dir='.',
+          progress_file='order_progress.json', max_limit=DEFAULT_MAX_LIMIT,
+          target_seconds=DEFAULT_TARGET_SECONDS, transport=None):
+    """
+    分页抓取订单列表，成功的响应逐页写入 output_dir 下的压缩归档
+
+    每页的limit从请求模板中的值开始，按耗时和错误在 max_limit 以内自动调整（见 order_listing.PageSizeTuner）
+
+    Args:
+        http_file: 请求模板
+        output_dir: 归档保存目录
+        resume: True从上次断点继续，False从头开始，None时交互选择
+        signature_dir: x-request-timestamp.txt / x-request-sign.txt 所在目录
+        progress_file: 断点进度文件
+        max_limit: limit 的上限，不大于模板中的limit时不做调整
+        target_seconds: 每页的目标耗时
+        transport: 录制/回放请求的 http_cassette.Transport，None时按环境变量 ORDERMGMT_CASSETTE
+    """
+    transport = transport or default_transport()
+    method, url, headers, body = parse_http_file(http_file)
     
     # 解析原始请求体获取limit
     original_body = json.loads(body)
     limit = original_body.get('limit', 30)
     
-    # 创建保存目录和文件名
-    os.makedirs('raw_result', exist_ok=True)
+    # 创建保存目录和文件名（每页一行的压缩归档，见 raw_archive.py）
+    os.makedirs(output_dir, exist_ok=True)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    json_filename = f'raw_result/http_req_v2_{timestamp}.json'
+    archive_filename = new_run_path(output_dir, timestamp)
     
-    # 存储所有成功的响应
-    all_responses = []
+    # 成功的响应逐页写入归档，不再全部保存在内存中
+    archive_writer = None
     
     # 选择模式
-    print("请选择运行模式:")
-    print("1. 从头开始获取")
-    print("2. 从上次断点继续")
-    choice = input("请输入选择 (1 或 2): ").strip()
+    if resume is None:
+        print("请选择运行模式:")
+        print("1. 从头开始获取")
+        print("2. 从上次断点继续")
+        resume = input("请输入选择 (1 或 2): ").strip() == '2'
     
-    if choice == '2':
+    if resume:
         # 从断点继续
-        all_order_ids, last_id = load_progress()
+        all_order_ids, last_id, next_page = load_progress(progress_file)
         if not all_order_ids:
             print("没有找到有效的进度文件，将从头开始")
             all_order_ids = []
             last_id = None
+            next_page = None
         else:
             print(f"将从 lastId: {last_id} 继续获取")
     else:
@@ -141,101 +133,159 @@ if __name__ == "__main__":
         print("从头开始获取")
         all_order_ids = []
         last_id = None
+        next_page = None
     
-    print(f"开始分页请求，每页limit: {limit}")
-    page = len(all_order_ids) // limit + 1
+    tuner = PageSizeTuner(limit, max_limit, target_seconds)
+    print(f"开始分页请求，每页limit: {limit}" + (f"（自动调整，上限 {tuner.ceiling}）" if tuner.ceiling > limit else ""))
+    # 页码写入归档，合并、优化和网页的页码筛选都用它；旧的进度文件没有页码时按模板limit推算
+    page = next_page or len(all_order_ids) // limit + 1
+    start_count = len(all_order_ids)
+    start_time = time.perf_counter()
+    is_completed = False
     
-    while True:
-        print(f"\n=== 第 {page} 页请求 ===")
+    try:
+        while True:
+            requested = tuner.limit
         
-        # 构造当前请求体
-        current_body = original_body.copy()
-        if last_id:
-            current_body['lastId'] = last_id
+            # 构造当前请求体
+            current_body = original_body.copy()
+            if last_id:
+                current_body['lastId'] = last_id
+            # 回放时按录制时的limit请求：回放没有网络耗时，按耗时调整的limit与录制时不同，
+            # 用它判断返回不满一页会把录制时的短页误判为最后一页
+            if transport.replaying:
+                requested = transport.recorded_limit(method, url, json.dumps(current_body)) or requested
+            current_body['limit'] = requested
+            print(f"\n=== 第 {page} 页请求 (limit: {requested}) ===")
         
-        # 读取最新的签名信息
-        with open('x-request-timestamp.txt', 'r', encoding='utf-8') as f:
-            headers['x-request-timestamp'] = f.read().strip()
-        with open('x-request-sign.txt', 'r', encoding='utf-8') as f:
-            headers['x-request-sign'] = f.read().strip()
+            # 读取最新的签名信息（回放时签名不参与匹配，可以没有签名文件）
+            if not transport.replaying:
+                with open(os.path.join(signature_dir, 'x-request-timestamp.txt'), 'r', encoding='utf-8') as f:
+                    headers['x-request-timestamp'] = f.read().strip()
+                with open(os.path.join(signature_dir, 'x-request-sign.txt'), 'r', encoding='utf-8') as f:
+                    headers['x-request-sign'] = f.read().strip()
         
-        # 去掉 content-length，requests 会自动处理
-        headers.pop('content-length', None)
+            # 去掉 content-length，requests 会自动处理
+            headers.pop('content-length', None)
+        
+            # 发送请求，响应体边接收边解析
+            current_body_str = json.dumps(current_body, separators=(',', ':'))
+            page_start = time.perf_counter()
+            try:
+                resp = send_request(method, url, headers, current_body_str, stream=True, timeout=REQUEST_TIMEOUT,
+                                    transport=transport)
+            except requests.exceptions.RequestException as e:
+                print(f"请求出错: {e}")
+                if tuner.record_error(requested):
+                    print(f"缩小limit为 {tuner.limit} 后重试")
+                    continue
+                save_progress(all_order_ids, progress_file, next_page=page)
+                break
         
-        # 发送请求
-        current_body_str = json.dumps(current_body, separators=(',', ':'))
-        resp = send_request(method, url, headers, current_body_str)
+            print(f"状态码: {resp.status_code}")
         
-        print(f"状态码: {resp.status_code}")
+            # 检查是否为签名错误
+            if is_signature_error(resp):
+                print("检测到签名失效!")
+                resp.close()
+                save_progress(all_order_ids, progress_file, next_page=page)
+                print("请更新签名文件后重新运行，选择模式2继续获取")
+                break
         
-        # 检查是否为签名错误
-        if is_signature_error(resp):
-            print("检测到签名失效!")
-            save_progress(all_order_ids)
-            print("请更新签名文件后重新运行，选择模式2继续获取")
-            break
+            if resp.status_code != 200:
+                print(f"请求失败: {resp.text}")
+                resp.close()
+                # 探测更大的limit时被拒绝：退回已确认可用的大小重试
+                if requested > tuner.accepted and tuner.record_error(requested):
+                    print(f"缩小limit为 {tuner.limit} 后重试")
+                    continue
+                save_progress(all_order_ids, progress_file, next_page=page)
+                break
         
-        if resp.status_code != 200:
-            print(f"请求失败: {resp.text}")
-            save_progress(all_order_ids)
-            break
+            # 订单逐个解析：写入本页的归档缓冲并提取orderId，不保留整页响应
+            parser = RowStreamParser()
+            page_order_ids = []
+            try:
+                with PageSpool() as spool:
+                    def on_row(row):
+                        spool.add_row(row)
+                        order_id = row_order_id(row)
+                        if order_id:
+                            page_order_ids.append(order_id)
+                
+                    response_envelope = stream_rows(resp.iter_content(STREAM_CHUNK_SIZE), parser, on_row)
+                
+                    # 整页解析成功后写入归档
+                    if archive_writer is None:
+                        archive_writer = ArchiveWriter(archive_filename)
+                    archive_writer.write_spooled_page({
+                        "page": page,
+                        "timestamp": datetime.now().isoformat(),
+                        "response": response_envelope
+                    }, spool)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # 超时、连接中断或响应不完整：本页没有写入归档，缩小limit重试
+                print("未解析的响应内容:", parser.excerpt())
+                print(f"响应读取或解析失败: {e}")
+                if tuner.record_error(requested):
+                    print(f"缩小limit为 {tuner.limit} 后重试")
+                    continue
+                save_progress(all_order_ids, progress_file, next_page=page)
+                break
+            finally:
+                resp.close()
         
-        try:
-            response_json = resp.json()
-            
-            # 保存成功的响应到列表
-            all_responses.append({
-                "page": page,
-                "timestamp": datetime.now().isoformat(),
-                "response": response_json
-            })
-            
-            # 提取当前页的orderIds
-            page_order_ids, count, current_last_id = extract_order_ids_from_response(response_json)
-            
+            count = len(page_order_ids)
+            # 判断是否还有下一页：limit变化后，只有服务器确认接受的limit返回不满一页才算结束
+            is_last_page = tuner.record_page(requested, count, time.perf_counter() - page_start)
             if page_order_ids:
                 all_order_ids.extend(page_order_ids)
                 print(f"本页获取到 {count} 个OrderID")
                 for i, order_id in enumerate(page_order_ids, 1):
                     print(f"  {len(all_order_ids) - count + i}. {order_id}")
-                
-                # 判断是否还有下一页
-                if count < limit:
-                    print(f"本页数量({count}) < limit({limit})，已获取完所有数据")
+            
+                if is_last_page:
+                    print(f"本页数量({count}) < limit({requested})，已获取完所有数据")
+                    is_completed = True
                     # 保存完成状态
-                    save_progress(all_order_ids, is_completed=True)
+                    save_progress(all_order_ids, progress_file, is_completed=True, next_page=page + 1)
                     break
                 else:
-                    last_id = current_last_id
+                    if count < requested:
+                        print(f"本页数量({count}) < limit({requested})，服务器可能限制了limit，继续以 {tuner.limit} 请求")
+                    last_id = page_order_ids[-1]
                     page += 1
                     print(f"准备请求下一页，lastId: {last_id}")
             else:
                 print("本页未获取到任何OrderID，结束请求")
+                is_completed = True
                 # 保存完成状态
-                save_progress(all_order_ids, is_completed=True)
+                save_progress(all_order_ids, progress_file, is_completed=True, next_page=page + 1)
                 break
-                
-        except Exception as e:
-            print("响应内容:", resp.text)
-            print(f"JSON解析失败: {e}")
-            save_progress(all_order_ids)
-            break
     
-    # 保存所有成功的响应到JSON文件
-    if all_responses:
-        response_summary = {
-            "summary": {
-                "total_pages": len(all_responses),
+        # 写入汇总信息并关闭归档
+        if archive_writer is not None:
+            archive_writer.close({
+                "total_pages": archive_writer.page_count,
                 "total_order_ids": len(all_order_ids),
                 "timestamp": datetime.now().isoformat(),
-                "is_completed": len(all_order_ids) % limit != 0 if all_order_ids else True
-            },
-            "responses": all_responses
-        }
-        
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump(response_summary, f, ensure_ascii=False, indent=2)
-        print(f"成功响应已保存到 {json_filename}")
+                "is_completed": is_completed
+            })
+            print(f"成功响应已保存到 {archive_filename}")
+    
+    finally:
+        # 未预期的异常或中断：关闭归档补全压缩流的结尾，已写入的页仍能被合并读取
+        if archive_writer is not None:
+            archive_writer.close()
     
     # 输出最终结果
+    elapsed = time.perf_counter() - start_time
+    fetched = len(all_order_ids) - start_count
     print(f"\n=== 最终结果: 共获取到 {len(all_order_ids)} 个 OrderID ===")
+    print(f"本次运行: 请求 {tuner.requests} 次（失败 {tuner.errors} 次），获取 {fetched} 个订单，"
+          f"耗时 {elapsed:.1f} 秒，{fetched / elapsed if elapsed else 0:.1f} 单/秒，最大一页 {tuner.largest_page} 个")
+    if transport.summary():
+        print(transport.summary())
+
+if __name__ == "__main__":
+    crawl()
@@ -1,15 +1,46 @@
-# 从optimized_orders.json中提取订单号和状态信息
+# 从optimized_orders.json（或按时间分区的optimized_orders/目录）中提取订单号和状态信息
+import argparse
 import json
 import os
+import sys
 
-def extract_status_info():
-    """提取订单状态信息"""
+# 仓库根目录下的公共模块（order_partitions.py、order_scan.py）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from order_partitions import in_range, order_files, parse_time_range, resolve_orders_path
+from order_scan import read_file, scan_order_fields
+
+# 只需要 orderInfo 中的这几个字段，其余部分（商品、规格等）不解析
+STATUS_FIELDS = ('orderId', 'status', 'createdAt')
+
+def load_status_rows(input_file, date_from=None, date_to=None):
+    """读取订单文件（或分区）中每个订单的 (orderId, status)，按下单时间过滤"""
+    start, end = parse_time_range(date_from, date_to)
+    rows = []
+    for file_path in order_files(input_file, start, end):
+        for order_id, status, created_at in scan_order_fields(read_file(file_path), STATUS_FIELDS):
+            if start is not None or end is not None:
+                try:
+                    created_at = int(created_at)
+                except (TypeError, ValueError):
+                    created_at = None
+                if not in_range(created_at, start, end):
+                    continue
+            rows.append((order_id, status))
+    return rows
+
+def extract_status_info(input_file="optimized_orders.json", output_file="status_info.json",
+                        date_from=None, date_to=None):
+    """
+    提取订单状态信息
+
+    date_from/date_to 只统计这段时间内下单的订单（如 2025-06-01），输入为分区目录时只读取有交集的分区
+    """
     print("开始提取订单状态信息...")
     
-    # 读取优化后的订单数据
-    input_file = "optimized_orders.json"
-    output_file = "status_info.json"
-    
+    input_file = resolve_orders_path(input_file)
     if not os.path.exists(input_file):
         print(f"文件不存在: {input_file}")
         return
@@ -17,20 +48,17 @@ def extract_status_info():
     print(f"正在读取文件: {input_file}")
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            orders_data = json.load(f)
+        orders_data = load_status_rows(input_file, date_from, date_to)
         
+        if date_from or date_to:
+            print(f"下单时间范围: {date_from or '不限'} ~ {date_to or '不限'}")
         print(f"成功加载 {len(orders_data)} 条订单数据")
         
         # 提取状态信息
         status_info = []
         status_count = {}
         
-        for i, order in enumerate(orders_data):
-            order_info = order.get('orderInfo', {})
-            order_id = order_info.get('orderId')
-            status = order_info.get('status', {})
-            
+        for i, (order_id, status) in enumerate(orders_data):
             if order_id and status:
                 status_name = status.get('name', '未知状态')
                 
@@ -76,4 +104,10 @@ def extract_status_info():
         print(f"处理失败: {e}")
 
 if __name__ == "__main__":
-    extract_status_info()
+    parser = argparse.ArgumentParser(description='提取订单状态信息')
+    parser.add_argument('input_file', nargs='?', default='optimized_orders.json')
+    parser.add_argument('-o', '--output', default='status_info.json')
+    parser.add_argument('--from', dest='date_from', help='下单时间起点，如 2025-06-01')
+    parser.add_argument('--to', dest='date_to', help='下单时间终点（含当天），如 2025-06-07')
+    args = parser.parse_args()
+    extract_status_info(args.input_file, args.output, args.date_from, args.date_to)
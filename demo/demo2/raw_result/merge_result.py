@@ -1,77 +1,193 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
+import contextlib
+import filecmp
+import io
 import json
 import os
-import glob
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def merge_json_files():
+# 仓库根目录下的公共模块（raw_archive.py 等）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from raw_archive import list_run_files, iter_page_records
+
+def format_json_item(item):
+    """把一条记录格式化为 indent=2 的列表元素"""
+    return '  ' + json.dumps(item, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+
+def clean_run_file(file_path):
+    """
+    解析一个运行文件，只保留page和response字段
+
+    在工作进程中执行，直接返回格式化好的JSON文本，避免把大对象传回主进程。
+    解析耗时按进程CPU时间统计，不受其他进程争用CPU的影响
+
+    Returns:
+        (格式化后的记录列表, 订单ID列表, 响应数, 解析耗时秒数, 错误信息)
+    """
+    start_time = time.process_time()
+    items = []
+    order_ids = []
+    response_count = 0
+
+    try:
+        for response in iter_page_records(file_path):
+            cleaned_response = {}
+            if 'page' in response:
+                cleaned_response['page'] = response['page']
+            if 'response' in response:
+                cleaned_response['response'] = response['response']
+
+                # 统计订单ID
+                if 'data' in response['response'] and 'rowList' in response['response']['data']:
+                    for row in response['response']['data']['rowList']:
+                        if 'orderInfo' in row and 'orderId' in row['orderInfo']:
+                            order_ids.append(row['orderInfo']['orderId'])
+
+            if cleaned_response:  # 如果有有效的数据才添加
+                items.append(format_json_item(cleaned_response))
+            response_count += 1
+    except Exception as e:
+        return items, order_ids, response_count, time.process_time() - start_time, str(e)
+
+    return items, order_ids, response_count, time.process_time() - start_time, None
+
+def iter_cleaned_files(json_files, workers):
+    """
+    按文件顺序返回每个文件的解析结果
+
+    workers大于1时在进程池中并行解析，同时最多有 workers*2 个文件在途，
+    结果仍按文件顺序交给写入方，保证输出顺序与串行合并一致
+    """
+    if workers <= 1:
+        for file_path in json_files:
+            yield file_path, clean_run_file(file_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        files = iter(json_files)
+        for file_path in files:
+            pending.append((file_path, executor.submit(clean_run_file, file_path)))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            file_path, future = pending.popleft()
+            yield file_path, future.result()
+            next_file = next(files, None)
+            if next_file is not None:
+                pending.append((next_file, executor.submit(clean_run_file, next_file)))
+
+def merge_json_files(workers=1, directory='.', output_file='merged_orders.json'):
     """
-    合并所有 http_req_v2_*.json 文件到一个完整的JSON文件中
+    合并所有 http_req_v2_* 运行文件（旧的 .json 和压缩归档 .ndjson.zst/.ndjson.gz）到一个完整的JSON文件中
+
+    Args:
+        workers: 并行解析的进程数，1为串行
+        directory: 运行文件所在目录
+        output_file: 合并后的JSON文件
     """
-    
-    # 获取当前目录下所有匹配的JSON文件
-    json_files = sorted(glob.glob("http_req_v2_*.json"))
-    
+
+    # 获取目录下所有匹配的运行文件
+    json_files = list_run_files(directory)
+
     if not json_files:
-        print("未找到任何匹配的JSON文件")
+        print("未找到任何匹配的运行文件")
         return
-    
-    print(f"找到 {len(json_files)} 个JSON文件需要合并")
-    
-    merged_responses = []
+
+    print(f"找到 {len(json_files)} 个运行文件需要合并，并行进程数: {workers}")
+
+    start_time = time.perf_counter()
     total_order_ids = set()  # 用于去重统计订单ID
-    
-    for i, file_path in enumerate(json_files):
-        print(f"正在处理文件 {i+1}/{len(json_files)}: {file_path}")
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # 提取responses数组，只保留page和response字段
-            if 'responses' in data and isinstance(data['responses'], list):
-                for response in data['responses']:
-                    # 只保留page和response字段
-                    cleaned_response = {}
-                    if 'page' in response:
-                        cleaned_response['page'] = response['page']
-                    if 'response' in response:
-                        cleaned_response['response'] = response['response']
-                        
-                        # 统计订单ID
-                        if 'data' in response['response'] and 'rowList' in response['response']['data']:
-                            for row in response['response']['data']['rowList']:
-                                if 'orderInfo' in row and 'orderId' in row['orderInfo']:
-                                    total_order_ids.add(row['orderInfo']['orderId'])
-                    
-                    if cleaned_response:  # 如果有有效的数据才添加
-                        merged_responses.append(cleaned_response)
-                
-                print(f"  - 从 {file_path} 合并了 {len(data['responses'])} 个响应")
-            else:
-                print(f"  - 警告: {file_path} 中没有找到有效的responses数组")
-                
-        except Exception as e:
-            print(f"  - 错误: 处理文件 {file_path} 时出错: {str(e)}")
-            continue
-    
-    # 保存合并后的JSON文件
-    output_file = f"merged_orders.json"
-    
+    response_count = 0
+    total_parse_time = 0.0
+
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(merged_responses, f, ensure_ascii=False, indent=2)
-        
+        with open(output_file, 'w', encoding='utf-8') as out:
+            out.write('[\n')
+
+            for i, (file_path, result) in enumerate(iter_cleaned_files(json_files, workers)):
+                items, order_ids, file_responses, parse_time, error = result
+                total_parse_time += parse_time
+
+                # 出错前已解析的记录仍然写入，与串行逐条处理时一致
+                for item in items:
+                    if response_count:
+                        out.write(',\n')
+                    out.write(item)
+                    response_count += 1
+                total_order_ids.update(order_ids)
+
+                print(f"正在处理文件 {i+1}/{len(json_files)}: {file_path}")
+                if error:
+                    print(f"  - 错误: 处理文件 {file_path} 时出错: {error}")
+                else:
+                    print(f"  - 从 {file_path} 合并了 {file_responses} 个响应，解析耗时 {parse_time:.2f} 秒")
+
+            out.write('\n]\n')
+
+        elapsed = time.perf_counter() - start_time
         print(f"\n✅ 合并完成!")
         print(f"输出文件: {output_file}")
-        print(f"总响应数: {len(merged_responses)}")
+        print(f"总响应数: {response_count}")
         print(f"总订单数: {len(total_order_ids)}")
         print(f"合并文件数: {len(json_files)}")
-        
+        print(f"合并耗时: {elapsed:.2f} 秒（各文件解析耗时合计 {total_parse_time:.2f} 秒）")
+        if workers > 1 and elapsed > 0:
+            # 解析CPU时间合计/总耗时只反映同时在解析的进程数，实际加速比用 --bench 测量
+            print(f"平均并行度（解析CPU时间/总耗时）: {total_parse_time / elapsed:.1f}")
+
     except Exception as e:
         print(f"❌ 保存文件时出错: {str(e)}")
 
+def run_benchmark(workers, directory='.', rounds=3):
+    """
+    同一批运行文件分别用1个进程和workers个进程合并，输出实测的加速比
+
+    两种方式交替运行rounds轮取中位数，合并结果写到临时文件，并检查两者的输出一致
+    """
+    if not list_run_files(directory):
+        print("未找到任何匹配的运行文件")
+        return
+
+    timings = {1: [], workers: []}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        outputs = {count: os.path.join(tmp_dir, f'merged_{count}.json') for count in timings}
+        for _ in range(rounds):
+            for count in timings:
+                start = time.perf_counter()
+                # 合并过程逐文件打印进度，测量时不输出
+                with contextlib.redirect_stdout(io.StringIO()):
+                    merge_json_files(count, directory, outputs[count])
+                timings[count].append(time.perf_counter() - start)
+        same = filecmp.cmp(outputs[1], outputs[workers], shallow=False)
+
+    serial = sorted(timings[1])[rounds // 2]
+    parallel = sorted(timings[workers])[rounds // 2]
+    print(f"📊 合并 {len(list_run_files(directory))} 个运行文件（{rounds} 轮中位数）:")
+    print(f"   1 个进程: {serial:.2f} 秒")
+    print(f"   {workers} 个进程: {parallel:.2f} 秒")
+    print(f"   实测加速比: {serial / parallel:.2f}x，输出{'一致 ✅' if same else '不一致 ❌'}")
+
 if __name__ == "__main__":
-    merge_json_files()
+    parser = argparse.ArgumentParser(description='合并 http_req_v2 运行文件')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='并行解析的进程数，0表示使用全部CPU核心')
+    parser.add_argument('--bench', action='store_true', help='对比1个进程和 --workers 个进程合并的耗时（不写出合并文件）')
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    if args.bench:
+        run_benchmark(max(workers, 2))
+    else:
+        merge_json_files(workers)
@@ -1,14 +1,46 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import json
 import os
+import sys
 from datetime import datetime
 
+# 仓库根目录下的公共模块（product_catalog.py 等）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from projection import (compile_projection, compile_projections, ORDER_INFO_SPEC, PRODUCT_SPEC,
+                        OPTIMIZED_ORDER_SPEC, KEY_ORDER_INFO_SPEC)
+
+# 投影规则只在加载时编译一次
+_extract_order_info = compile_projection(ORDER_INFO_SPEC, 'extract_order_info')
+_extract_product_info = compile_projection(PRODUCT_SPEC, 'extract_product_info')
+_extract_optimized_order = compile_projection(OPTIMIZED_ORDER_SPEC, 'extract_optimized_order')
+# 同时输出关键信息时，两个投影在同一次遍历中完成
+_extract_optimized_and_key = compile_projections(
+    {'optimized': OPTIMIZED_ORDER_SPEC, 'key': KEY_ORDER_INFO_SPEC}, 'extract_optimized_and_key')
+
 def optimize_orders_json(input_file='merged_orders.json', 
-                        output_file='optimized_orders.json'):
+                        output_file='optimized_orders.json',
+                        normalize=False,
+                        partition=None,
+                        history_dir=None,
+                        sketch_dir=None,
+                        db_file=None,
+                        key_info_file=None):
     """
     优化订单JSON文件，只保留网页展示需要的关键信息
+    
+    normalize为True时商品信息写入同目录的product_catalog.json，订单中只保留商品引用、价格和数量
+    partition为'day'或'month'时按下单时间写入分区目录（optimized_orders.json -> optimized_orders/），
+    见 order_partitions.py
+    history_dir不为空时把本次结果记录为历史版本（只保存与上一版本的差异），见 order_history.py
+    sketch_dir不为空时保存本次抓取的统计状态（不同买家、商品排名、价格分位数），见 order_sketches.py
+    db_file不为空时把订单写入（更新）SQLite订单库，见 order_store.py
+    key_info_file不为空时同时输出订单关键信息（与 demo/demo1/extract_info.py 的输出格式相同）
     """
     
     if not os.path.exists(input_file):
@@ -25,6 +57,7 @@ def optimize_orders_json(input_file='merged_orders.json',
         print(f"📏 原始文件大小: {format_file_size(original_size)}")
         
         optimized_data = []
+        key_orders = []
         total_orders = 0
         
         for page_data in original_data:
@@ -44,23 +77,73 @@ def optimize_orders_json(input_file='merged_orders.json',
                 if 'orderInfo' not in order:
                     continue
                 
-                # 提取订单基本信息
-                order_info = order['orderInfo']
-                optimized_order = {
-                    'page': page_num,
-                    'orderInfo': extract_order_info(order_info),
-                    'products': extract_products_info(order.get('products', []))
-                }
+                # 提取订单基本信息和商品信息
+                optimized_order = {'page': page_num}
+                if key_info_file:
+                    views = _extract_optimized_and_key(order)
+                    optimized_order.update(views['optimized'])
+                    key_orders.append(views['key'])
+                else:
+                    optimized_order.update(_extract_optimized_order(order))
                 
                 optimized_data.append(optimized_order)
                 total_orders += 1
         
         # 保存优化后的数据
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(optimized_data, f, ensure_ascii=False, indent=2)
+        if partition:
+            from order_partitions import write_partitions, partition_dir_for, show_manifest
+            
+            output_file = partition_dir_for(output_file)
+            write_partitions(optimized_data, output_file, partition, normalize=normalize)
+            show_manifest(output_file)
+        elif normalize:
+            from product_catalog import write_normalized, catalog_path_for
+            
+            product_count = write_normalized(optimized_data, output_file)
+            catalog_file = catalog_path_for(output_file)
+            print(f"📚 商品目录: {catalog_file} ({product_count} 个不同商品)")
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(optimized_data, f, ensure_ascii=False, indent=2)
+        
+        if key_info_file:
+            with open(key_info_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'extractTime': datetime.now().isoformat(),
+                    'totalOrders': len(key_orders),
+                    'orders': key_orders,
+                }, f, ensure_ascii=False, indent=2)
+            print(f"🔑 订单关键信息: {key_info_file} ({len(key_orders)} 个订单)")
         
-        # 获取优化后文件大小
-        optimized_size = os.path.getsize(output_file)
+        if history_dir:
+            from order_history import OrderHistory
+            
+            entry = OrderHistory(history_dir).record(optimized_data)
+            print(f"📚 已记录历史版本 {entry['version']}（{history_dir}）")
+        
+        if sketch_dir:
+            from order_sketches import save_state, sketch_orders
+            
+            sketch_file = save_state(sketch_dir, sketch_orders(optimized_data), source=input_file)
+            print(f"🧮 已保存统计状态 {sketch_file}")
+        
+        if db_file:
+            from order_store import open_store, upsert_orders
+            
+            conn = open_store(db_file)
+            try:
+                written = upsert_orders(conn, optimized_data)
+            finally:
+                conn.close()
+            print(f"🗄️ 已写入订单库 {db_file}（{written} 条订单）")
+        
+        # 获取优化后文件大小（规范化模式包含商品目录，分区模式为目录中全部文件）
+        if partition:
+            optimized_size = sum(entry.stat().st_size for entry in os.scandir(output_file) if entry.is_file())
+        else:
+            optimized_size = os.path.getsize(output_file)
+        if normalize and not partition:
+            optimized_size += os.path.getsize(catalog_file)
         reduction_percentage = ((original_size - optimized_size) / original_size) * 100
         
         print(f"\n✅ 优化完成!")
@@ -80,72 +163,15 @@ def optimize_orders_json(input_file='merged_orders.json',
 
 def extract_order_info(order_info):
     """
-    提取订单的关键信息
+    提取订单的关键信息（规则见 projection.ORDER_INFO_SPEC）
     """
-    # 提取买家信息
-    buyer = order_info.get('buyer', {})
-    buyer_info = {
-        'name': buyer.get('name', ''),
-        'phone': buyer.get('phone', '')
-    }
-    
-    # 提取卖家信息
-    seller = order_info.get('seller', {})
-    seller_info = {
-        'name': seller.get('name', '')
-    }
-    
-    # 提取状态信息
-    status = order_info.get('status', {})
-    status_info = {
-        'name': status.get('name', ''),
-        'key': status.get('key', '')
-    }
-    
-    return {
-        'orderId': order_info.get('orderId', ''),
-        'status': status_info,
-        'createdAt': order_info.get('createdAt', ''),
-        'buyer': buyer_info,
-        'seller': seller_info,
-        'receiver': order_info.get('receiver', ''),
-        'address': order_info.get('address', ''),
-        'orderPrice': order_info.get('orderPrice', 0),
-        'paidPrice': order_info.get('paidPrice', 0),
-        'expressPrice': order_info.get('expressPrice', 0)
-    }
+    return _extract_order_info(order_info)
 
 def extract_products_info(products):
     """
-    提取商品的关键信息
+    提取商品的关键信息（规则见 projection.PRODUCT_SPEC）
     """
-    optimized_products = []
-    
-    for product in products:
-        # 提取规格信息
-        spec_values = product.get('specValues', [])
-        optimized_specs = []
-        for spec in spec_values:
-            optimized_specs.append({
-                'name': spec.get('name', ''),
-                'value': spec.get('value', ''),
-                'color': spec.get('color', ''),
-                'labelColor': spec.get('labelColor', '')
-            })
-        
-        optimized_product = {
-            'productName': product.get('productName', ''),
-            'cover': product.get('cover', ''),
-            'whiteBgPng': product.get('whiteBgPng', ''),
-            'price': product.get('price', 0),
-            'amount': product.get('amount', 1),
-            'description': product.get('description', ''),
-            'specValues': optimized_specs
-        }
-        
-        optimized_products.append(optimized_product)
-    
-    return optimized_products
+    return [_extract_product_info(product) for product in products]
 
 def format_file_size(size_bytes):
     """
@@ -194,11 +220,21 @@ def compare_files(original_file, optimized_file):
         print(f"❌ 比较文件时出错: {str(e)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='订单数据优化工具')
+    parser.add_argument('--normalize', action='store_true', help='商品信息单独写入product_catalog.json')
+    parser.add_argument('--partition', choices=['day', 'month'], help='按下单时间分区写入optimized_orders/目录')
+    parser.add_argument('--history', help='同时记录为历史版本的目录，如 order_history')
+    parser.add_argument('--sketches', help='同时保存统计状态的目录，如 order_sketches')
+    parser.add_argument('--db', help='同时写入的SQLite订单库，如 orders.db')
+    parser.add_argument('--key-info', help='同时输出订单关键信息的文件，如 extracted_orders.json')
+    args = parser.parse_args()
+    
     print("🚀 订单数据优化工具")
     print("=" * 50)
     
     # 执行优化
-    optimize_orders_json()
+    optimize_orders_json(normalize=args.normalize, partition=args.partition, history_dir=args.history,
+                         sketch_dir=args.sketches, db_file=args.db, key_info_file=args.key_info)
     
     # 比较文件
     compare_files('demo/demo2/raw_result/merged_orders.json', 'demo/demo2/raw_result/optimized_orders.json')
@@ -2,14 +2,44 @@
 # -*- coding: utf-8 -*-
 """
 订单数据导出到Excel工具
-从optimized_orders.json文件中提取订单信息并导出到Excel文件
+从optimized_orders.json文件（或按时间分区的optimized_orders/目录）中提取订单信息并导出到Excel文件
+
+--sort-by/--group-by 时改为流式导出：订单边读边展开成商品行，用外部归并排序（external_sort.py）
+在 --sort-memory 的内存预算内排序，再用openpyxl的write_only模式逐行写入，内存不随订单数增长
 """
 
+import argparse
 import json
-import pandas as pd
 from datetime import datetime
+from operator import itemgetter
 import os
 
+from external_sort import external_sort
+from order_partitions import catalog_orders_file, iter_orders, load_orders, parse_time_range, resolve_orders_path
+from product_catalog import ProductCatalog, catalog_path_for
+
+EXPORT_COLUMNS = ['订单编号', '下单日期', '状态', '快递单号', '快递公司', '商品名称', '数量', '单价', '金额']
+
+# --sort-by 可用的字段 -> 排序值（order_fields 为订单级字段，row 为商品行）
+SORT_FIELDS = {
+    'createdAt': lambda order_fields, row: order_fields['createdAt'],
+    'seller': lambda order_fields, row: order_fields['seller'],
+    'status': lambda order_fields, row: order_fields['status'],
+    'orderId': lambda order_fields, row: order_fields['orderId'],
+    'amount': lambda order_fields, row: row['金额'],
+}
+
+# --group-by 可用的字段 -> 分组名；分组在排序中优先于 --sort-by，每组之后写一行小计
+GROUP_FIELDS = {
+    'status': lambda order_fields, row: order_fields['status'],
+    'seller': lambda order_fields, row: order_fields['seller'],
+    'day': lambda order_fields, row: row['下单日期'][:10],
+    'month': lambda order_fields, row: row['下单日期'][:7],
+}
+
+# Excel单个工作表的最大行数（含表头），超过后续写到新的工作表
+EXCEL_MAX_ROWS = 1048576
+
 def timestamp_to_date(timestamp_str):
     """将时间戳转换为日期格式"""
     try:
@@ -18,27 +48,62 @@ def timestamp_to_date(timestamp_str):
     except:
         return timestamp_str
 
-def export_orders_to_excel(json_file_path, excel_file_path):
+def export_orders_to_excel(json_file_path, excel_file_path, logistics_file='logistics_results.json',
+                           date_from=None, date_to=None):
     """
     将订单数据导出到Excel文件
     
     Args:
-        json_file_path: JSON文件路径
+        json_file_path: JSON文件路径或按时间分区的目录
         excel_file_path: Excel文件输出路径
+        logistics_file: logistics.go生成的物流信息文件
+        date_from, date_to: 只导出这段时间内下单的订单（如 2025-06-01），分区目录只读取有交集的分区
     """
+    # pandas导入较慢，只在真正导出时加载
+    import pandas as pd
+    
     print("正在读取JSON文件...")
     
     # 读取订单JSON文件
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            orders_data = json.load(f)
+        orders_data = load_orders(json_file_path, date_from, date_to)
     except Exception as e:
         print(f"读取订单JSON文件失败: {e}")
         return
+    if date_from or date_to:
+        print(f"下单时间范围: {date_from or '不限'} ~ {date_to or '不限'}，共 {len(orders_data)} 个订单")
+    
+    logistics_data = load_logistics(logistics_file)
+    
+    # 规范化数据中的商品引用，第一次用到时才读取商品目录
+    catalog = ProductCatalog(catalog_path_for(catalog_orders_file(json_file_path)))
+    
+    # 准备数据列表
+    export_data = []
+    
+    print("正在处理订单数据...")
+    
+    # 遍历每个订单
+    for order in orders_data:
+        export_data.extend(order_product_rows(order, logistics_data, catalog))
+    
+    # 创建DataFrame
+    df = pd.DataFrame(export_data)
     
-    # 读取物流信息JSON文件
+    # 导出到Excel
+    try:
+        df.to_excel(excel_file_path, index=False, engine='openpyxl')
+        print(f"数据导出成功！")
+        print(f"输出文件: {excel_file_path}")
+        print(f"共导出 {len(export_data)} 条商品记录")
+        print(f"涉及 {len(set(row['订单编号'] for row in export_data))} 个订单")
+    except Exception as e:
+        print(f"导出Excel文件失败: {e}")
+        print("请确保已安装openpyxl: pip install openpyxl")
+
+def load_logistics(logistics_file):
+    """读取logistics.go生成的物流信息文件，返回 orderId -> {expressNo, companyName}"""
     logistics_data = {}
-    logistics_file = 'logistics_results.json'
     if os.path.exists(logistics_file):
         try:
             print("正在读取物流信息文件...")
@@ -57,78 +122,285 @@ def export_orders_to_excel(json_file_path, excel_file_path):
             print("将继续导出，但不包含物流信息")
     else:
         print(f"未找到物流信息文件 {logistics_file}，将继续导出但不包含物流信息")
+    return logistics_data
+
+def order_product_rows(order, logistics_data, catalog):
+    """把一个订单展开成导出的商品行（列见 EXPORT_COLUMNS）"""
+    rows = []
+    order_info = order.get('orderInfo', {})
+    products = catalog.resolve_products(order.get('products', []))
     
-    # 准备数据列表
-    export_data = []
+    # 获取订单基本信息
+    order_id = order_info.get('orderId', '')
+    created_at = timestamp_to_date(order_info.get('createdAt', ''))
+    status = order_info.get('status', {}).get('name', '')
     
-    print("正在处理订单数据...")
+    # 获取物流信息
+    logistics_info = logistics_data.get(order_id, {})
+    express_no = logistics_info.get('expressNo', '')
+    company_name = logistics_info.get('companyName', '')
     
-    # 遍历每个订单
-    for order in orders_data:
-        order_info = order.get('orderInfo', {})
-        products = order.get('products', [])
+    # 遍历每个商品
+    for product in products:
+        product_name = product.get('productName', '')
+        price = product.get('price', 0)
+        amount = product.get('amount', 0)
         
-        # 获取订单基本信息
-        order_id = order_info.get('orderId', '')
-        created_at = timestamp_to_date(order_info.get('createdAt', ''))
-        status = order_info.get('status', {}).get('name', '')
+        # 计算总金额
+        total_amount = price * amount
         
-        # 获取物流信息
-        logistics_info = logistics_data.get(order_id, {})
-        express_no = logistics_info.get('expressNo', '')
-        company_name = logistics_info.get('companyName', '')
+        # 构建数据行
+        row = {
+            '订单编号': order_id,
+            '下单日期': created_at,
+            '状态': status,
+            '快递单号': express_no,
+            '快递公司': company_name,
+            '商品名称': product_name,
+            '数量': amount,
+            '单价': price,
+            '金额': total_amount
+        }
         
-        # 遍历每个商品
-        for product in products:
-            product_name = product.get('productName', '')
-            price = product.get('price', 0)
-            amount = product.get('amount', 0)
-            
-            # 计算总金额
-            total_amount = price * amount
-            
-            # 构建数据行
-            row = {
-                '订单编号': order_id,
-                '下单日期': created_at,
-                '状态': status,
-                '快递单号': express_no,
-                '快递公司': company_name,
-                '商品名称': product_name,
-                '数量': amount,
-                '单价': price,
-                '金额': total_amount
-            }
-            
+        rows.append(row)
+    return rows
+
+def parse_sort_fields(sort_by):
+    """解析 --sort-by 的逗号分隔字段列表"""
+    fields = [name.strip() for name in (sort_by or '').split(',') if name.strip()]
+    unknown = [name for name in fields if name not in SORT_FIELDS]
+    if unknown:
+        raise ValueError(f"未知的排序字段: {', '.join(unknown)}（可选 {', '.join(SORT_FIELDS)}）")
+    return fields
+
+def _order_fields(order):
+    """排序和分组用到的订单级字段"""
+    order_info = order.get('orderInfo', {})
+    try:
+        created_at = int(order_info.get('createdAt') or 0)
+    except (TypeError, ValueError):
+        created_at = 0
+    return {
+        'createdAt': created_at,
+        'seller': str((order_info.get('seller') or {}).get('name') or ''),
+        'status': str((order_info.get('status') or {}).get('name') or ''),
+        'orderId': str(order_info.get('orderId') or ''),
+    }
+
+def iter_sort_records(orders, logistics_data, catalog, columns, sort_fields, group_by=None, stats=None):
+    """
+    把订单展开成待排序的记录 (排序键, 分组名, 行)
+
+    行是按 columns 排列的元组，比字典小得多，外部排序每批能容纳更多记录。
+    stats 为字典时 stats['orders'] 累计展开出商品行的订单数（排序前同一订单的行相邻，不需要记录订单号）
+    """
+    group_value = GROUP_FIELDS[group_by] if group_by else None
+    sort_values = [SORT_FIELDS[name] for name in sort_fields]
+    for order in orders:
+        order_fields = _order_fields(order)
+        rows = order_product_rows(order, logistics_data, catalog)
+        if stats is not None and rows:
+            stats['orders'] = stats.get('orders', 0) + 1
+        for row in rows:
+            row['卖家'] = order_fields['seller']
+            group = group_value(order_fields, row) if group_value else None
+            key = tuple(value(order_fields, row) for value in sort_values)
+            if group_value:
+                key = (group,) + key
+            yield key, group, tuple(row[column] for column in columns)
+
+def export_sorted_orders_to_excel(json_file_path, excel_file_path, logistics_file='logistics_results.json',
+                                  date_from=None, date_to=None, sort_by=(), group_by=None, descending=False,
+                                  memory_mb=256):
+    """
+    按字段排序/分组导出，内存占用受 memory_mb 限制（外部归并排序）
+    
+    Args:
+        sort_by: 排序字段列表（见 SORT_FIELDS），键相同的行保持文件中的顺序
+        group_by: 分组字段（见 GROUP_FIELDS），每组之后写一行小计，最后写合计
+        descending: 降序（分组顺序也反过来）
+        memory_mb: 排序缓冲区的内存预算
+    
+    其他参数同 export_orders_to_excel
+    """
+    try:
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+    except ImportError:
+        print("导出Excel文件失败: 缺少openpyxl")
+        print("请确保已安装openpyxl: pip install openpyxl")
+        return
+    
+    columns = list(EXPORT_COLUMNS)
+    if 'seller' in sort_by or group_by == 'seller':
+        columns.insert(columns.index('状态') + 1, '卖家')
+    logistics_data = load_logistics(logistics_file)
+    catalog = ProductCatalog(catalog_path_for(catalog_orders_file(json_file_path)))
+    
+    print(f"正在流式读取并排序（排序: {','.join(sort_by) or '无'}，分组: {group_by or '无'}，"
+          f"内存预算 {memory_mb} MB）...")
+    order_stats = {'orders': 0}
+    records = iter_sort_records(iter_orders(json_file_path, date_from, date_to), logistics_data, catalog,
+                                columns, sort_by, group_by, order_stats)
+    stats = {}
+    sorted_records = external_sort(records, key=itemgetter(0), memory_mb=memory_mb, reverse=descending,
+                                   stats=stats)
+    
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+    amount_index = columns.index('数量')
+    total_index = columns.index('金额')
+    sheet = None
+    sheet_rows = EXCEL_MAX_ROWS
+    
+    def append(values, highlight=False):
+        nonlocal sheet, sheet_rows
+        if sheet_rows >= EXCEL_MAX_ROWS:
+            sheet = workbook.create_sheet('订单数据' if sheet is None else f'订单数据{len(workbook.worksheets) + 1}')
+            sheet.append(columns)
+            sheet_rows = 1
+        if highlight:
+            cells = []
+            for value in values:
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.font = bold
+                cells.append(cell)
+            values = cells
+        sheet.append(values)
+        sheet_rows += 1
+    
+    def summary_row(label, count, amount, total):
+        values = [''] * len(columns)
+        values[0] = f"{label}（{count} 条）"
+        values[amount_index] = amount
+        values[total_index] = total
+        return values
+    
+    row_count = 0
+    group = None
+    group_stats = [0, 0, 0]
+    grand_amount = grand_total = 0
+    try:
+        for _, row_group, row in sorted_records:
+            if group_by and row_count and row_group != group:
+                append(summary_row(f"小计: {group}", *group_stats), highlight=True)
+                group_stats = [0, 0, 0]
+            group = row_group
+            append(row)
+            row_count += 1
+            group_stats[0] += 1
+            group_stats[1] += row[amount_index]
+            group_stats[2] += row[total_index]
+            grand_amount += row[amount_index]
+            grand_total += row[total_index]
+        if group_by and row_count:
+            append(summary_row(f"小计: {group}", *group_stats), highlight=True)
+            append(summary_row("合计", row_count, grand_amount, grand_total), highlight=True)
+        if sheet is None:
+            append([])
+        workbook.save(excel_file_path)
+    except Exception as e:
+        print(f"导出失败: {e}")
+        return
+    
+    print("数据导出成功！")
+    print(f"输出文件: {excel_file_path}")
+    print(f"共导出 {row_count} 条商品记录")
+    print(f"涉及 {order_stats['orders']} 个订单")
+    if stats['runs']:
+        print(f"外部排序: 每批 {stats['batch_records']} 行，{stats['runs']} 个临时文件"
+              f"（{stats['spilled_bytes'] / 1024 / 1024:.1f} MB），归并 {stats['merge_passes']} 轮")
+    if len(workbook.worksheets) > 1:
+        print(f"超过Excel单表 {EXCEL_MAX_ROWS} 行的上限，分成了 {len(workbook.worksheets)} 个工作表")
+
+def export_store_to_excel(db_file, excel_file_path, status_name=None, raise_errors=False):
+    """
+    从SQLite订单库导出到Excel文件（订单、商品、物流通过索引关联查询）
+    
+    Args:
+        db_file: order_store.py生成的数据库文件
+        excel_file_path: Excel文件输出路径
+        status_name: 只导出某一状态的订单
+        raise_errors: 写入Excel失败时打印后重新抛出（sync_daemon.py 据此统计导出失败），否则只打印
+    """
+    import pandas as pd
+    from order_store import open_store, iter_export_rows
+    
+    print(f"正在查询订单库 {db_file}...")
+    conn = open_store(db_file)
+    try:
+        export_data = []
+        for row in iter_export_rows(conn, status_name):
+            row['下单日期'] = timestamp_to_date(row['下单日期'])
             export_data.append(row)
+    finally:
+        conn.close()
     
-    # 创建DataFrame
     df = pd.DataFrame(export_data)
     
-    # 导出到Excel
     try:
         df.to_excel(excel_file_path, index=False, engine='openpyxl')
-        print(f"数据导出成功！")
+        print("数据导出成功！")
         print(f"输出文件: {excel_file_path}")
         print(f"共导出 {len(export_data)} 条商品记录")
         print(f"涉及 {len(set(row['订单编号'] for row in export_data))} 个订单")
     except Exception as e:
         print(f"导出Excel文件失败: {e}")
         print("请确保已安装openpyxl: pip install openpyxl")
+        if raise_errors:
+            raise
 
-def main():
+def main(argv=None):
     """主函数"""
+    parser = argparse.ArgumentParser(description='订单数据导出到Excel工具')
+    parser.add_argument('json_file', nargs='?', default='optimized_orders.json')
+    parser.add_argument('-o', '--output', default='订单数据导出.xlsx')
+    parser.add_argument('--logistics', default='logistics_results.json', help='物流信息文件')
+    parser.add_argument('--db', help='从order_store.py生成的SQLite订单库导出')
+    parser.add_argument('--status', help='只导出某一状态的订单（仅--db模式）')
+    parser.add_argument('--from', dest='date_from', help='只导出此时间之后下单的订单，如 2025-06-01')
+    parser.add_argument('--to', dest='date_to', help='只导出此时间之前下单的订单（含当天），如 2025-06-07')
+    parser.add_argument('--sort-by', help=f"按字段排序，逗号分隔（{', '.join(SORT_FIELDS)}），如 seller,createdAt")
+    parser.add_argument('--group-by', choices=list(GROUP_FIELDS), help='按字段分组，每组之后写一行小计')
+    parser.add_argument('--descending', action='store_true', help='降序排列')
+    parser.add_argument('--sort-memory', type=int, default=256, help='排序使用的内存预算（MB），超出部分写入临时文件')
+    args = parser.parse_args(argv)
+    
     # 文件路径设置
-    json_file = 'optimized_orders.json'
-    excel_file = '订单数据导出.xlsx'
+    json_file = resolve_orders_path(args.json_file)
+    excel_file = args.output
+    
+    if args.db:
+        if not os.path.exists(args.db):
+            print(f"错误: 找不到文件 {args.db}")
+            return
+        if args.date_from or args.date_to:
+            print("错误: --from/--to 只用于JSON文件或分区目录")
+            return
+        if args.sort_by or args.group_by:
+            print("错误: --sort-by/--group-by 只用于JSON文件或分区目录")
+            return
+        export_store_to_excel(args.db, excel_file, args.status)
+        return
     
     # 检查输入文件是否存在
     if not os.path.exists(json_file):
         print(f"错误: 找不到文件 {json_file}")
         return
+    try:
+        parse_time_range(args.date_from, args.date_to)
+        sort_fields = parse_sort_fields(args.sort_by)
+    except ValueError as e:
+        print(f"错误: {e}")
+        return
     
     # 执行导出
-    export_orders_to_excel(json_file, excel_file)
+    if sort_fields or args.group_by:
+        export_sorted_orders_to_excel(json_file, excel_file, args.logistics, args.date_from, args.date_to,
+                                      sort_fields, args.group_by, args.descending, args.sort_memory)
+        return
+    export_orders_to_excel(json_file, excel_file, args.logistics, args.date_from, args.date_to)
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
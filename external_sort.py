@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存受限的外部归并排序
+export_to_excel.py --sort-by/--group-by 用它给导出行排序：行数超过内存预算时，
+每攒满一批就在内存中排好序写入临时文件（spill run），最后对所有临时文件做k路归并，
+内存占用只与预算和归并路数有关，与总行数无关。
+
+    for record in external_sort(records, key=itemgetter(0), memory_mb=256):
+        ...
+
+记录需要能被pickle；排序是稳定的（键相同的记录保持输入顺序）。
+
+基准测试（与一次性读入内存排序、pandas sort_values 对比峰值内存和耗时）：
+    python external_sort.py bench --orders 300000 --memory-mb 64
+"""
+
+import argparse
+import heapq
+import importlib.util
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+import zlib
+
+# 一次最多同时归并的临时文件数，超过时先分多轮合并（避免打开过多文件）
+DEFAULT_FAN_IN = 64
+
+# 临时文件中每帧最多的记录数：写入和读取都按帧进行，归并时每个文件只在内存中保留一帧。
+# 实际帧大小取 每批记录数 / fan_in，使 fan_in 个文件同时归并时占用的内存也不超过预算
+FRAME_RECORDS = 1000
+MIN_FRAME_RECORDS = 16
+
+# 归并时每个临时文件的读缓冲区（fan_in 个文件同时打开）
+READ_BUFFER = 64 * 1024
+
+# 估算单条记录内存时抽样的记录数
+SIZE_SAMPLE = 1000
+
+
+def estimate_size(value):
+    """估算一个值（及其包含的元组/列表/字典元素）占用的内存字节数"""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(estimate_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return size
+
+
+def _write_run(records, tmp_dir, frame_records=FRAME_RECORDS):
+    """把已排序的记录按帧写入临时文件，返回文件路径"""
+    fd, path = tempfile.mkstemp(suffix='.run', dir=tmp_dir)
+    with os.fdopen(fd, 'wb', buffering=1024 * 1024) as f:
+        frame = []
+        for record in records:
+            frame.append(record)
+            if len(frame) >= frame_records:
+                pickle.dump(frame, f, pickle.HIGHEST_PROTOCOL)
+                frame = []
+        if frame:
+            pickle.dump(frame, f, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path):
+    """逐帧读取临时文件中的记录"""
+    with open(path, 'rb', buffering=READ_BUFFER) as f:
+        while True:
+            try:
+                frame = pickle.load(f)
+            except EOFError:
+                return
+            yield from frame
+
+
+def external_sort(records, key=None, memory_mb=256, reverse=False, tmp_dir=None, fan_in=DEFAULT_FAN_IN,
+                  stats=None):
+    """
+    排序任意多的记录，返回按顺序产出记录的生成器
+
+    Args:
+        records: 记录的可迭代对象（只遍历一次）
+        key: 排序键函数，与 sorted() 相同
+        memory_mb: 排序缓冲区的内存预算（按抽样估算的记录大小换算成每批记录数）
+        reverse: 降序
+        tmp_dir: 临时文件目录，默认系统临时目录
+        fan_in: 每轮最多归并的临时文件数
+        stats: 传入字典时写入 runs（临时文件数）、merge_passes、spilled_bytes、batch_records
+
+    全部记录都在预算内时直接在内存中排序，不写临时文件
+    """
+    budget = max(memory_mb, 1) * 1024 * 1024
+    stats = stats if stats is not None else {}
+    stats.update(runs=0, merge_passes=0, spilled_bytes=0, batch_records=0)
+
+    work_dir = tempfile.mkdtemp(prefix='external_sort_', dir=tmp_dir)
+    runs = []
+    try:
+        batch = []
+        batch_limit = None
+        frame_records = FRAME_RECORDS
+        for record in records:
+            batch.append(record)
+            if batch_limit is None and len(batch) == SIZE_SAMPLE:
+                batch_limit = _batch_limit(batch, key, budget)
+                frame_records = min(max(batch_limit // fan_in, MIN_FRAME_RECORDS), FRAME_RECORDS)
+                stats['batch_records'] = batch_limit
+            if batch_limit is not None and len(batch) >= batch_limit:
+                batch.sort(key=key, reverse=reverse)
+                runs.append(_write_run(batch, work_dir, frame_records))
+                stats['spilled_bytes'] += os.path.getsize(runs[-1])
+                batch = []
+
+        batch.sort(key=key, reverse=reverse)
+        if not runs:
+            stats['batch_records'] = stats['batch_records'] or len(batch)
+            yield from batch
+            return
+        if batch:
+            runs.append(_write_run(batch, work_dir, frame_records))
+            stats['spilled_bytes'] += os.path.getsize(runs[-1])
+        batch = None
+        stats['runs'] = len(runs)
+
+        # 文件数超过 fan_in 时先合并成较少的大文件
+        while len(runs) > fan_in:
+            stats['merge_passes'] += 1
+            merged = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                merged.append(_write_run(heapq.merge(*map(_read_run, group), key=key, reverse=reverse),
+                                         work_dir, frame_records))
+                stats['spilled_bytes'] += os.path.getsize(merged[-1])
+                for path in group:
+                    os.remove(path)
+            runs = merged
+
+        stats['merge_passes'] += 1
+        yield from heapq.merge(*map(_read_run, runs), key=key, reverse=reverse)
+    finally:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+
+def _batch_limit(sample, key, budget):
+    """按抽样记录（含排序键）的平均大小，计算预算内每批可容纳的记录数"""
+    per_record = sum(estimate_size(record) + (estimate_size(key(record)) if key else 0)
+                     for record in sample) / len(sample)
+    # 列表本身每个元素占一个指针，排序时每条记录还需要一个键
+    per_record += 16
+    return max(int(budget / per_record), SIZE_SAMPLE)
+
+
+# 基准测试按导出的方式排序：按状态分组，组内按卖家、下单时间
+BENCH_SORT_FIELDS = ['seller', 'createdAt']
+BENCH_GROUP_BY = 'status'
+
+
+def _bench_worker(method, orders_file, memory_mb, queue):
+    """在独立进程中执行一种排序方式，返回耗时、峰值内存和结果校验值"""
+    # resource 只在POSIX系统上有，不在模块顶层导入，Windows上也能正常导出
+    import resource
+    from operator import itemgetter
+    from export_to_excel import EXPORT_COLUMNS, iter_sort_records
+    from order_partitions import iter_orders, load_orders
+    from product_catalog import ProductCatalog, catalog_path_for
+
+    catalog = ProductCatalog(catalog_path_for(orders_file))
+    columns = EXPORT_COLUMNS + ['卖家']
+    start = time.perf_counter()
+    stats = {}
+    if method == 'external':
+        records = iter_sort_records(iter_orders(orders_file, verbose=False), {}, catalog, columns,
+                                    BENCH_SORT_FIELDS, BENCH_GROUP_BY)
+        rows = (row for _, _, row in external_sort(records, key=itemgetter(0), memory_mb=memory_mb, stats=stats))
+    elif method == 'memory':
+        records = list(iter_sort_records(load_orders(orders_file, verbose=False), {}, catalog, columns,
+                                         BENCH_SORT_FIELDS, BENCH_GROUP_BY))
+        records.sort(key=itemgetter(0))
+        rows = (row for _, _, row in records)
+    else:
+        import pandas as pd
+        records = iter_sort_records(load_orders(orders_file, verbose=False), {}, catalog, columns,
+                                    BENCH_SORT_FIELDS, BENCH_GROUP_BY)
+        df = pd.DataFrame([row for _, _, row in records], columns=columns)
+        # 下单日期是 YYYY-MM-DD HH:MM:SS 字符串，字典序与 createdAt 一致
+        df = df.sort_values(['状态', '卖家', '下单日期'], kind='stable')
+        rows = df[columns].itertuples(index=False, name=None)
+
+    count = 0
+    order_hash = 0
+    for row in rows:
+        count += 1
+        order_hash = zlib.crc32(row[0].encode(), order_hash)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, peak_kb, count, order_hash, stats))
+
+
+def _run_isolated(method, orders_file, memory_mb):
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_bench_worker, args=(method, orders_file, memory_mb, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run_benchmark(order_count, memory_budgets):
+    """生成 order_count 个订单的 optimized_orders.json，比较各种排序方式的峰值内存（RSS）和耗时"""
+    from sample_data import generate_orders
+
+    with tempfile.TemporaryDirectory() as tmp:
+        orders_file = os.path.join(tmp, 'optimized_orders.json')
+        with open(orders_file, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for index, order in enumerate(generate_orders(order_count)):
+                f.write(',\n' if index else '\n')
+                f.write(json.dumps(order, ensure_ascii=False))
+            f.write('\n]')
+        print(f"📦 {order_count} 个订单，文件 {os.path.getsize(orders_file) / 1024 / 1024:.1f} MB，"
+              f"按 {BENCH_GROUP_BY} 分组、{','.join(BENCH_SORT_FIELDS)} 排序")
+
+        methods = [(f'外部排序 {budget} MB', 'external', budget) for budget in memory_budgets]
+        methods.append(('全部读入内存 list.sort', 'memory', 0))
+        if importlib.util.find_spec('pandas') is not None:
+            methods.append(('pandas sort_values', 'pandas', 0))
+        else:
+            print("⚠️ 未安装pandas，跳过 pandas sort_values（它同样需要先 json.load 全部订单，峰值内存不低于 list.sort）")
+
+        expected = None
+        for label, method, budget in methods:
+            elapsed, peak_kb, count, order_hash, stats = _run_isolated(method, orders_file, budget)
+            if expected is None:
+                expected = (count, order_hash)
+            same = '一致' if (count, order_hash) == expected else '不一致!'
+            spill = (f"，{stats['runs']} 个临时文件 {stats['spilled_bytes'] / 1024 / 1024:.0f} MB"
+                     if stats.get('runs') else '')
+            print(f"  {label:<24} {elapsed:7.1f} 秒  峰值内存 {peak_kb / 1024:7.0f} MB  "
+                  f"{count} 行（顺序{same}）{spill}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='外部归并排序')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bench_parser = subparsers.add_parser('bench', help='与内存排序、pandas对比峰值内存和耗时')
+    bench_parser.add_argument('--orders', type=int, default=300000, help='订单数（每单1~3个商品行）')
+    bench_parser.add_argument('--memory-mb', type=int, nargs='+', default=[16, 64], help='外部排序的内存预算，可指定多个')
+    args = parser.parse_args(argv)
+    run_benchmark(args.orders, args.memory_mb)
+
+
+if __name__ == '__main__':
+    main()
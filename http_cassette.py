@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP 录制/回放（cassette）
+http_req_v1.py、http_req_v2.py 和 express.py 的请求都经过 Transport 发送：
+- live: 直接用 requests 发送（默认）
+- record: 发送请求，同时把请求/响应写入 cassette
+- replay: 不访问网络，从 cassette 中按请求查找响应，以本地磁盘速度返回
+- replay-timed: 同 replay，但按录制时的耗时等待后再返回，用于复现原始的时序
+
+cassette 是一个SQLite文件，每个请求一行，响应体用zlib压缩。单个响应只有一两KB，单独压缩效果有限，
+录制满 DICT_TRAIN_BYTES 后用已录制的响应生成一个预设字典（zdict），之后的响应都用它压缩。
+请求按 方法 + URL路径 + 规范化的请求体 查找：请求体JSON按键排序，去掉 limit；
+签名（x-request-timestamp / x-request-sign）等请求头不参与，签名更新后录制的响应仍能命中。
+同一个请求录制多次时保留最后一次的响应。
+录制时请求的 limit 单独保存（requestLimit），回放时抓取脚本用它代替 PageSizeTuner 算出的limit：
+回放没有网络耗时，按耗时调整的limit与录制时不同，而响应仍是按 lastId 命中的那一页，
+用不同的limit判断“返回不满一页 = 已到最后一页”会提前结束。
+
+脚本通过环境变量启用（ordermgmt crawl 另有 --cassette / --cassette-mode 参数）：
+    ORDERMGMT_CASSETTE=cassette.db ORDERMGMT_CASSETTE_MODE=record python http_req_v2.py
+    ORDERMGMT_CASSETTE=cassette.db ORDERMGMT_CASSETTE_MODE=replay python http_req_v2.py
+
+命令行：
+    python http_cassette.py stats cassette.db
+    python http_cassette.py list cassette.db --grep 875568108466915159
+    python http_cassette.py bench --entries 100000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+# 环境变量：cassette 文件和模式
+CASSETTE_ENV = 'ORDERMGMT_CASSETTE'
+MODE_ENV = 'ORDERMGMT_CASSETTE_MODE'
+
+MODES = ('live', 'record', 'replay', 'replay-timed')
+
+# 设置了 cassette 文件但没有指定模式时使用回放，避免意外覆盖录制
+DEFAULT_MODE = 'replay'
+
+# 不参与查找的请求体字段：每页limit由 PageSizeTuner 调整，回放时按 lastId 命中录制的那一页
+# （录制时的limit保存在 requestLimit 列，见 Transport.recorded_limit）
+IGNORED_BODY_FIELDS = ('limit',)
+
+# 录制时不保存的响应头：保存的是解压后的响应体，这些头已不再准确
+DROPPED_RESPONSE_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection',
+                            'set-cookie')
+
+# 录制的响应体累计达到该大小后生成压缩字典，字典取其中最后 DICT_SIZE 字节（zlib 窗口大小）
+DICT_TRAIN_BYTES = 64 * 1024
+DICT_SIZE = 32 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    method TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    bodySize INTEGER NOT NULL,
+    dictId INTEGER NOT NULL DEFAULT 0,
+    elapsed REAL NOT NULL,
+    recordedAt REAL NOT NULL,
+    requestLimit INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+"""
+
+UPSERT_SQL = """
+INSERT OR REPLACE INTO interactions (id, key, method, url, status, headers, body, bodySize, dictId, elapsed,
+                                     recordedAt, requestLimit)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+try:
+    from requests.exceptions import ConnectionError as _TransportError
+except ImportError:
+    _TransportError = ConnectionError
+
+
+class CassetteMiss(_TransportError):
+    """回放时 cassette 中没有该请求（安装了 requests 时是 requests.exceptions.ConnectionError 的子类）"""
+
+
+def normalize_body(body):
+    """
+    规范化请求体：JSON对象按键排序并去掉 IGNORED_BODY_FIELDS，其他内容原样返回
+
+    Returns:
+        字符串（没有请求体时为空字符串）
+    """
+    if body is None:
+        return ''
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body.strip()
+    if isinstance(data, dict):
+        data = {k: v for k, v in data.items() if k not in IGNORED_BODY_FIELDS}
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def body_limit(body):
+    """请求体JSON中的 limit，没有或不是整数时返回None"""
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', 'replace')
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    limit = data.get('limit') if isinstance(data, dict) else None
+    return limit if isinstance(limit, int) and not isinstance(limit, bool) else None
+
+
+def key_id(key):
+    """键的64位哈希，作为表的 rowid：查找直接走主键B树，不需要再为键文本单独建索引"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def request_key(method, url, body=None):
+    """请求在 cassette 中的键：方法 + URL路径 + 规范化的请求体（不含主机名和请求头）"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return f"{method.upper()} {path} {normalize_body(body)}"
+
+
+class CassetteResponse:
+    """回放的响应，提供抓取脚本用到的 requests.Response 接口"""
+
+    def __init__(self, status_code, headers, content, elapsed=0.0, url='', request_limit=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.elapsed_seconds = elapsed
+        self.url = url
+        # 录制时请求体中的 limit
+        self.request_limit = request_limit
+        self.from_cassette = True
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def encoding(self):
+        content_type = self.headers.get('content-type', '')
+        for part in content_type.split(';'):
+            name, _, value = part.strip().partition('=')
+            if name.lower() == 'charset' and value:
+                return value.strip('"')
+        return 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, 'replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        chunk_size = chunk_size or len(self.content) or 1
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class Cassette:
+    """录制的请求/响应，SQLite中按键索引"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        # 早期录制的 cassette 没有 requestLimit 列
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(interactions)')}
+        if 'requestLimit' not in columns:
+            self.conn.execute('ALTER TABLE interactions ADD COLUMN requestLimit INTEGER')
+        self.lock = threading.Lock()
+        # 字典id -> 字典内容；最新的字典用于压缩，id 0 表示不用字典
+        self.dictionaries = {0: b''}
+        self.dictionaries.update(self.conn.execute('SELECT id, data FROM dictionaries'))
+        self.dict_id = max(self.dictionaries)
+        # 还没有字典时，之前（可能是其他进程）录制的响应也作为样本，express.py 每次运行只录制一个请求
+        self._samples = []
+        self._sample_bytes = 0
+        if not self.dict_id:
+            for (body,) in self.conn.execute('SELECT body FROM interactions WHERE dictId = 0'):
+                self._samples.append(zlib.decompress(body))
+                self._sample_bytes += len(self._samples[-1])
+                if self._sample_bytes >= DICT_TRAIN_BYTES:
+                    break
+
+    def put(self, key, method, url, status, headers, content, elapsed, recorded_at=None, request_limit=None):
+        """保存一次请求/响应（同一个键只保留最后一次），request_limit 为请求体中的 limit"""
+        with self.lock, self.conn:
+            self.conn.execute(UPSERT_SQL, self._row(key, method, url, status, headers, content, elapsed,
+                                                    recorded_at, request_limit))
+
+    def put_many(self, interactions):
+        """批量保存，interactions 为 put 的参数元组，在一个事务中写入"""
+        with self.lock, self.conn:
+            self.conn.executemany(UPSERT_SQL, [self._row(*item) for item in interactions])
+
+    def _row(self, key, method, url, status, headers, content, elapsed, recorded_at=None, request_limit=None):
+        kept = {k.lower(): v for k, v in headers.items() if k.lower() not in DROPPED_RESPONSE_HEADERS}
+        dict_id = self.dict_id
+        compressor = zlib.compressobj(6, zdict=self.dictionaries[dict_id]) if dict_id else zlib.compressobj(6)
+        body = compressor.compress(content) + compressor.flush()
+        if not dict_id:
+            self._train(content)
+        return (key_id(key), key, method.upper(), url, status,
+                json.dumps(kept, ensure_ascii=False, separators=(',', ':')),
+                body, len(content), dict_id, elapsed, time.time() if recorded_at is None else recorded_at,
+                request_limit)
+
+    def _train(self, content):
+        """还没有字典时收集响应体，累计到 DICT_TRAIN_BYTES 后生成字典（在调用方的事务中写入）"""
+        self._samples.append(content)
+        self._sample_bytes += len(content)
+        if self._sample_bytes < DICT_TRAIN_BYTES:
+            return
+        data = b''.join(self._samples)[-DICT_SIZE:]
+        self.dict_id = self.conn.execute('INSERT INTO dictionaries (data) VALUES (?)', (data,)).lastrowid
+        self.dictionaries[self.dict_id] = data
+        self._samples = []
+
+    def get(self, key):
+        """按键查找录制的响应，没有时返回None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT key, status, headers, body, dictId, elapsed, url, requestLimit FROM interactions '
+                'WHERE id = ?', (key_id(key),)).fetchone()
+        if row is None or row[0] != key:
+            return None
+        _, status, headers, body, dict_id, elapsed, url, request_limit = row
+        if dict_id:
+            content = zlib.decompressobj(zdict=self.dictionaries[dict_id]).decompress(body)
+        else:
+            content = zlib.decompress(body)
+        return CassetteResponse(status, json.loads(headers), content, elapsed, url, request_limit)
+
+    def request_limit(self, key):
+        """录制该请求时请求体中的 limit，没有录制或没有 limit 时返回None"""
+        with self.lock:
+            row = self.conn.execute('SELECT key, requestLimit FROM interactions WHERE id = ?',
+                                    (key_id(key),)).fetchone()
+        return row[1] if row is not None and row[0] == key else None
+
+    def __contains__(self, key):
+        with self.lock:
+            row = self.conn.execute('SELECT key FROM interactions WHERE id = ?', (key_id(key),)).fetchone()
+        return row is not None and row[0] == key
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM interactions').fetchone()[0]
+
+    def stats(self):
+        """按接口路径汇总录制数量、响应体大小和录制耗时"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT method, url, COUNT(*), SUM(bodySize), SUM(LENGTH(body)), SUM(elapsed), '
+                'SUM(status != 200) FROM interactions GROUP BY method, url ORDER BY COUNT(*) DESC').fetchall()
+        endpoints = {}
+        for method, url, count, raw, stored, elapsed, failed in rows:
+            name = f"{method} {urlsplit(url).path}"
+            total = endpoints.setdefault(name, {'count': 0, 'rawBytes': 0, 'storedBytes': 0,
+                                                'elapsed': 0.0, 'failed': 0})
+            total['count'] += count
+            total['rawBytes'] += raw
+            total['storedBytes'] += stored
+            total['elapsed'] += elapsed
+            total['failed'] += failed
+        return endpoints
+
+    def iter_entries(self, grep=None):
+        """按录制时间列出 (key, status, bodySize, elapsed, recordedAt)"""
+        sql = 'SELECT key, status, bodySize, elapsed, recordedAt FROM interactions'
+        params = ()
+        if grep:
+            sql += ' WHERE key LIKE ?'
+            params = (f'%{grep}%',)
+        with self.lock:
+            rows = self.conn.execute(sql + ' ORDER BY recordedAt', params).fetchall()
+        return rows
+
+    def close(self):
+        self.conn.close()
+
+
+class Transport:
+    """
+    抓取脚本的HTTP发送层
+
+    Args:
+        cassette: cassette 文件路径，mode 为 live 时可以为None
+        mode: live / record / replay / replay-timed
+        timing_scale: replay-timed 时等待时间 = 录制耗时 * timing_scale
+    """
+
+    def __init__(self, cassette=None, mode='live', timing_scale=1.0):
+        if mode not in MODES:
+            raise ValueError(f"未知的 cassette 模式: {mode}（可选 {', '.join(MODES)}）")
+        if mode != 'live' and not cassette:
+            raise ValueError(f"cassette 模式 {mode} 需要指定 cassette 文件")
+        if mode in ('replay', 'replay-timed') and not os.path.exists(cassette):
+            raise FileNotFoundError(f"cassette 文件不存在: {cassette}")
+        self.mode = mode
+        self.timing_scale = timing_scale
+        self.cassette = Cassette(cassette) if mode != 'live' else None
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    @property
+    def replaying(self):
+        return self.mode in ('replay', 'replay-timed')
+
+    def request(self, method, url, headers=None, body='', stream=False, timeout=None):
+        """
+        发送请求（参数与 http_req_v2.send_request 相同），GET 的 body 作为查询参数
+
+        Returns:
+            requests.Response 或回放的 CassetteResponse
+        """
+        if method.upper() not in ('GET', 'POST'):
+            raise Exception(f"暂不支持的方法: {method}")
+        if self.replaying:
+            return self._replay(method, url, body)
+
+        import requests
+
+        start = time.perf_counter()
+        if method.upper() == 'POST':
+            resp = requests.post(url, headers=headers, data=(body or '').encode('utf-8'), stream=stream,
+                                 timeout=timeout)
+        else:
+            resp = requests.get(url, headers=headers, params=body, stream=stream, timeout=timeout)
+        if self.mode == 'live':
+            return resp
+
+        # 录制：读完整个响应体后保存，返回同样内容的回放响应（stream=True 时也能按块读取）
+        try:
+            content = resp.content
+        finally:
+            resp.close()
+        elapsed = time.perf_counter() - start
+        request_limit = body_limit(body)
+        self.cassette.put(request_key(method, url, body), method, url, resp.status_code,
+                          dict(resp.headers), content, elapsed, request_limit=request_limit)
+        self.recorded += 1
+        return CassetteResponse(resp.status_code, {k.lower(): v for k, v in resp.headers.items()}, content,
+                                elapsed, url, request_limit)
+
+    def _replay(self, method, url, body):
+        key = request_key(method, url, body)
+        resp = self.cassette.get(key)
+        if resp is None:
+            self.misses += 1
+            raise CassetteMiss(f"cassette 中没有该请求: {key}")
+        self.hits += 1
+        if self.mode == 'replay-timed' and resp.elapsed_seconds > 0:
+            time.sleep(resp.elapsed_seconds * self.timing_scale)
+        return resp
+
+    def recorded_limit(self, method, url, body):
+        """
+        回放时该请求录制时使用的 limit（body 中的 limit 不参与查找），不是回放、没有录制该请求
+        或录制时没有保存 limit 时返回None。分页抓取回放时应按这个limit请求和判断是否最后一页
+        """
+        if not self.replaying:
+            return None
+        return self.cassette.request_limit(request_key(method, url, body))
+
+    def summary(self):
+        """本次运行的录制/回放统计，live 模式返回None"""
+        if self.mode == 'live':
+            return None
+        if self.replaying:
+            return f"cassette 回放: 命中 {self.hits} 次，未命中 {self.misses} 次（{self.cassette.path}）"
+        return f"cassette 录制: {self.recorded} 个请求（{self.cassette.path}，共 {len(self.cassette)} 条）"
+
+    def close(self):
+        if self.cassette is not None:
+            self.cassette.close()
+
+
+def transport_from_env(environ=None):
+    """按 ORDERMGMT_CASSETTE / ORDERMGMT_CASSETTE_MODE 创建 Transport，未设置时直接发送请求"""
+    environ = os.environ if environ is None else environ
+    path = environ.get(CASSETTE_ENV)
+    if not path:
+        return Transport()
+    return Transport(path, environ.get(MODE_ENV) or DEFAULT_MODE)
+
+
+_default_transport = None
+
+
+def default_transport():
+    """进程内共用的 Transport（首次调用时按环境变量创建）"""
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = transport_from_env()
+    return _default_transport
+
+
+def _format_size(size_bytes):
+    return f"{size_bytes / 1024 / 1024:.2f} MB" if size_bytes >= 1024 * 1024 else f"{size_bytes / 1024:.1f} KB"
+
+
+def show_stats(path):
+    """打印 cassette 中各接口的录制情况"""
+    cassette = Cassette(path)
+    try:
+        endpoints = cassette.stats()
+    finally:
+        cassette.close()
+    if not endpoints:
+        print(f"📭 {path} 中没有录制的请求")
+        return
+    print(f"📼 {path}（文件 {_format_size(os.path.getsize(path))}）")
+    for name, total in endpoints.items():
+        ratio = total['storedBytes'] / total['rawBytes'] if total['rawBytes'] else 0
+        print(f"  {name}: {total['count']} 个请求（非200: {total['failed']}），"
+              f"响应 {_format_size(total['rawBytes'])} -> 压缩后 {_format_size(total['storedBytes'])}"
+              f"（{ratio:.0%}），录制耗时合计 {total['elapsed']:.1f} 秒")
+
+
+def list_entries(path, grep=None, limit=50):
+    """打印录制的请求"""
+    cassette = Cassette(path)
+    try:
+        rows = cassette.iter_entries(grep)
+    finally:
+        cassette.close()
+    for key, status, size, elapsed, recorded_at in rows[:limit]:
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(recorded_at))
+        print(f"{when}  {status}  {size:>8} B  {elapsed * 1000:7.1f} ms  {key}")
+    if len(rows) > limit:
+        print(f"... 共 {len(rows)} 条，只显示前 {limit} 条")
+
+
+def run_benchmark(entries, lookups, seed=7):
+    """
+    基准测试：录制 entries 个快递查询响应，测量按请求查找的吞吐
+
+    查找时和回放一样从 (method, url, body) 计算键，分别测量只查索引、命中后解压响应体和未命中
+    """
+    from sample_data import generate_express_results
+
+    url = 'https://api.example.com/order/express/query'
+    order_ids = [str(875568108466915159 + i * 7) for i in range(entries)]
+    bodies = [json.dumps({'orderId': order_id, 'source': 'ORDER_DETAIL'}, separators=(',', ':'))
+              for order_id in order_ids]
+    headers = {'content-type': 'application/json;charset=UTF-8'}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench_cassette.db')
+        cassette = Cassette(path)
+        raw_bytes = 0
+        start = time.perf_counter()
+        batch = []
+        for body, result in zip(bodies, generate_express_results(order_ids, seed)):
+            content = json.dumps({'code': '0', 'message': '', 'data': [result]}, ensure_ascii=False).encode()
+            raw_bytes += len(content)
+            batch.append((request_key('POST', url, body), 'POST', url, 200, headers, content, 0.35))
+            if len(batch) >= 5000:
+                cassette.put_many(batch)
+                batch = []
+        if batch:
+            cassette.put_many(batch)
+        record_seconds = time.perf_counter() - start
+        cassette.close()
+        file_bytes = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp))
+        print(f"📼 录制 {entries} 个响应: {record_seconds:.2f} 秒（{entries / record_seconds:,.0f} 个/秒），"
+              f"响应体 {_format_size(raw_bytes)}，cassette {_format_size(file_bytes)}")
+
+        rng = random.Random(seed)
+        sample = [bodies[rng.randrange(entries)] for _ in range(lookups)]
+        missing = [json.dumps({'orderId': str(i), 'source': 'ORDER_DETAIL'}) for i in range(lookups)]
+        transport = Transport(path, 'replay')
+        cassette = transport.cassette
+
+        start = time.perf_counter()
+        found = sum(request_key('POST', url, body) in cassette for body in sample)
+        index_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parsed = 0
+        for body in sample:
+            parsed += len(transport.request('POST', url, headers, body).json()['data'])
+        replay_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        missed = 0
+        for body in missing:
+            try:
+                transport.request('POST', url, headers, body)
+            except CassetteMiss:
+                missed += 1
+        miss_seconds = time.perf_counter() - start
+        transport.close()
+
+    print(f"🔍 {lookups} 次随机查找（{entries} 条）:")
+    print(f"  只查索引:          {lookups / index_seconds:>10,.0f} 次/秒（命中 {found}）")
+    print(f"  回放（解压+JSON）: {lookups / replay_seconds:>10,.0f} 次/秒（{parsed} 条轨迹，"
+          f"单次 {replay_seconds / lookups * 1e6:.0f} µs）")
+    print(f"  未命中:            {lookups / miss_seconds:>10,.0f} 次/秒（{missed} 次 CassetteMiss）")
+    print(f"  对照：录制时每个请求 350 ms，回放同样的 {lookups} 个请求在线需要 {lookups * 0.35 / 60:.0f} 分钟，"
+          f"回放用时 {replay_seconds:.1f} 秒")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP 请求录制/回放（cassette）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stats_parser = subparsers.add_parser('stats', help='按接口汇总录制的请求')
+    stats_parser.add_argument('cassette', help='cassette 文件')
+
+    list_parser = subparsers.add_parser('list', help='列出录制的请求')
+    list_parser.add_argument('cassette', help='cassette 文件')
+    list_parser.add_argument('--grep', help='只显示键中包含该字符串的请求（如 orderId 或 lastId）')
+    list_parser.add_argument('--limit', type=int, default=50, help='最多显示的条数')
+
+    bench_parser = subparsers.add_parser('bench', help='cassette 查找吞吐基准测试')
+    bench_parser.add_argument('--entries', type=int, default=100000, help='录制的请求数')
+    bench_parser.add_argument('--lookups', type=int, default=100000, help='随机查找次数')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        run_benchmark(args.entries, args.lookups)
+        return
+    if not os.path.exists(args.cassette):
+        print(f"❌ cassette 文件不存在: {args.cassette}")
+        sys.exit(1)
+    if args.command == 'stats':
+        show_stats(args.cassette)
+    else:
+        list_entries(args.cassette, args.grep, args.limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+商品图片本地缓存
+订单查看页面的每个商品卡片都直接从平台CDN加载原尺寸的 cover/whiteBgPng 图片。
+本模块从订单数据中收集图片地址，每个地址只下载一次，按内容哈希保存（不同地址的相同图片只存一份），
+并生成小尺寸缩略图；build_viewer_data.py --image-cache 把分片中的图片地址改为本地缓存：
+
+    image_cache/
+        index.json                      地址 -> 内容哈希、大小、缩略图
+        objects/ab/ab12....png          原图，文件名为内容的sha256
+        thumbs/ab/ab12...-160.jpg       缩略图（需要安装Pillow）
+
+再次运行只下载新出现的地址（以及上次失败的地址）
+
+    python image_cache.py fetch optimized_orders.json
+    python image_cache.py demo        用本地模拟图片服务器检查
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_CACHE_DIR = 'image_cache'
+INDEX_FILE = 'index.json'
+DEFAULT_THUMB_SIZE = 160
+DEFAULT_CONCURRENCY = 8
+
+# 商品中的图片字段，与 main.js createProductItem 一致
+IMAGE_FIELDS = ('cover', 'whiteBgPng')
+
+# 下载多少张图片后保存一次索引，中途退出时已下载的图片下次不用重新下载
+INDEX_SAVE_EVERY = 200
+
+_MAGIC_EXTENSIONS = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+
+
+def _image_extension(data, url):
+    """按文件头判断图片格式，无法判断时使用地址中的扩展名"""
+    for magic, extension in _MAGIC_EXTENSIONS:
+        if data.startswith(magic):
+            return extension
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    extension = os.path.splitext(urllib.parse.urlparse(url).path)[1].lower()
+    return extension if extension and len(extension) <= 5 else '.bin'
+
+
+def make_thumbnail(data, size=DEFAULT_THUMB_SIZE):
+    """
+    生成缩略图（最长边不超过 size），返回 (数据, 扩展名)
+
+    未安装Pillow或图片无法解析时返回 (None, None)
+    """
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                # 保留透明背景（whiteBgPng）
+                image.save(output, format='PNG', optimize=True)
+                return output.getvalue(), '.png'
+            image.convert('RGB').save(output, format='JPEG', quality=80, optimize=True)
+            return output.getvalue(), '.jpg'
+    except Exception:
+        return None, None
+
+
+def collect_image_urls(orders, catalog=None):
+    """
+    订单中商品图片的地址
+
+    Returns:
+        {地址: 引用次数}，引用次数即不缓存时查看全部订单要请求的次数
+    """
+    counts = {}
+    for order in orders:
+        products = order.get('products', [])
+        if catalog is not None:
+            products = catalog.resolve_products(products)
+        for product in products:
+            for field in IMAGE_FIELDS:
+                url = product.get(field)
+                if url and url.startswith(('http://', 'https://')):
+                    counts[url] = counts.get(url, 0) + 1
+    return counts
+
+
+def load_order_image_urls(path):
+    """读取订单文件或分区目录中的图片地址（规范化数据从商品目录取商品信息）"""
+    from order_partitions import catalog_orders_file, load_orders
+    from product_catalog import ProductCatalog, catalog_path_for
+
+    catalog = ProductCatalog(catalog_path_for(catalog_orders_file(path)))
+    return collect_image_urls(load_orders(path, verbose=False), catalog)
+
+
+class ImageCache:
+    """内容寻址的图片缓存目录"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, thumb_size=DEFAULT_THUMB_SIZE):
+        self.directory = directory
+        self.thumb_size = thumb_size
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.entries = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        self._lock = threading.Lock()
+
+    def save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            data = json.dumps(self.entries, ensure_ascii=False, indent=1)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.index_path)
+
+    def cached(self, url):
+        entry = self.entries.get(url)
+        return entry is not None and 'hash' in entry
+
+    def _store(self, relative_path, data):
+        """写入缓存文件，同名文件（相同内容）已存在时跳过，返回是否新写入"""
+        path = os.path.join(self.directory, relative_path)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return True
+
+    def add(self, url, data):
+        """
+        保存一张下载的图片，返回是否为已有内容（其他地址下载过同样的图片）
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        extension = _image_extension(data, url)
+        object_path = f'objects/{digest[:2]}/{digest}{extension}'
+        is_new = self._store(object_path, data)
+
+        entry = {'hash': digest, 'file': object_path, 'bytes': len(data), 'fetchedAt': int(time.time())}
+        thumb_path = f'thumbs/{digest[:2]}/{digest}-{self.thumb_size}'
+        existing = [path for path in (thumb_path + '.jpg', thumb_path + '.png')
+                    if os.path.exists(os.path.join(self.directory, path))]
+        if existing:
+            entry['thumb'] = existing[0]
+            entry['thumbBytes'] = os.path.getsize(os.path.join(self.directory, existing[0]))
+        else:
+            thumb, thumb_extension = make_thumbnail(data, self.thumb_size)
+            if thumb is not None and len(thumb) < len(data):
+                self._store(thumb_path + thumb_extension, thumb)
+                entry['thumb'] = thumb_path + thumb_extension
+                entry['thumbBytes'] = len(thumb)
+        with self._lock:
+            self.entries[url] = entry
+        return not is_new
+
+    def fail(self, url, error):
+        with self._lock:
+            self.entries[url] = {'error': str(error)[:200], 'failedAt': int(time.time())}
+
+    def fetch(self, urls, concurrency=DEFAULT_CONCURRENCY, timeout=30, verbose=True):
+        """
+        下载还没有缓存的地址（上次失败的地址会重试），最多 concurrency 个同时下载
+
+        Returns:
+            统计字典: unique/hits/downloaded/duplicates/failed/downloaded_bytes/seconds
+        """
+        urls = list(dict.fromkeys(urls))
+        missing = [url for url in urls if not self.cached(url)]
+        stats = {
+            'unique': len(urls), 'hits': len(urls) - len(missing), 'downloaded': 0,
+            'duplicates': 0, 'failed': 0, 'downloaded_bytes': 0, 'seconds': 0.0,
+        }
+        if not missing:
+            return stats
+
+        def download(url):
+            try:
+                request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0 order-viewer-image-cache'})
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    data = response.read()
+                return url, data, None
+            except (OSError, ValueError) as e:
+                return url, None, e
+
+        # 分批提交，内存中最多保留 concurrency * 4 张已下载的图片
+        batch_size = concurrency * 4
+        batches = (missing[start:start + batch_size] for start in range(0, len(missing), batch_size))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for url, data, error in (result for batch in batches for result in executor.map(download, batch)):
+                if error is not None:
+                    self.fail(url, error)
+                    stats['failed'] += 1
+                    continue
+                if self.add(url, data):
+                    stats['duplicates'] += 1
+                stats['downloaded'] += 1
+                stats['downloaded_bytes'] += len(data)
+                if stats['downloaded'] % INDEX_SAVE_EVERY == 0:
+                    self.save_index()
+                    if verbose:
+                        print(f"   已下载 {stats['downloaded']}/{len(missing)} 张")
+        stats['seconds'] = time.perf_counter() - start
+        self.save_index()
+        return stats
+
+    def local_paths(self, url, base=DEFAULT_CACHE_DIR):
+        """
+        地址对应的本地路径 (原图, 缩略图)，base 为页面中访问缓存目录的路径；
+        没有缓存时返回 (None, None)，没有缩略图时缩略图为原图
+        """
+        entry = self.entries.get(url)
+        if entry is None or 'hash' not in entry:
+            return None, None
+        original = f"{base}/{entry['file']}"
+        return original, f"{base}/{entry['thumb']}" if 'thumb' in entry else original
+
+    def rewrite_product(self, product, base=DEFAULT_CACHE_DIR):
+        """
+        把商品的图片地址改为本地缓存（返回新的字典）
+
+        cover/whiteBgPng 改为本地原图，thumb 为卡片显示用的缩略图；没有缓存的地址保持不变
+        """
+        rewritten = dict(product)
+        for field in IMAGE_FIELDS:
+            original, thumb = self.local_paths(product.get(field), base)
+            if original is None:
+                continue
+            rewritten[field] = original
+            rewritten.setdefault('thumb', thumb)
+        return rewritten
+
+    def report(self, url_counts):
+        """
+        节省的流量：查看全部订单时每个商品卡片都加载一次图片
+
+        Returns:
+            (直接加载CDN原图的字节数, 使用本地缩略图的字节数, 按内容去重节省的存储字节数)
+        """
+        cdn_bytes = 0
+        local_bytes = 0
+        for url, count in url_counts.items():
+            entry = self.entries.get(url)
+            if entry is None or 'hash' not in entry:
+                continue
+            cdn_bytes += entry['bytes'] * count
+            local_bytes += entry.get('thumbBytes', entry['bytes']) * count
+        stored = {}
+        total = 0
+        for entry in self.entries.values():
+            if 'hash' in entry:
+                stored[entry['hash']] = entry['bytes']
+                total += entry['bytes']
+        return cdn_bytes, local_bytes, total - sum(stored.values())
+
+
+def _format_size(size_bytes):
+    return f"{size_bytes / 1024:.1f}KB" if size_bytes < 1024 * 1024 else f"{size_bytes / 1024 / 1024:.1f}MB"
+
+
+def print_fetch_stats(stats):
+    hit_rate = stats['hits'] / stats['unique'] * 100 if stats['unique'] else 100.0
+    print(f"📊 图片地址 {stats['unique']} 个: 已缓存 {stats['hits']} 个（命中率 {hit_rate:.1f}%），"
+          f"下载 {stats['downloaded']} 个, 失败 {stats['failed']} 个")
+    if stats['downloaded']:
+        print(f"   下载 {_format_size(stats['downloaded_bytes'])}, 用时 {stats['seconds']:.1f} 秒, "
+              f"其中 {stats['duplicates']} 张与已有图片内容相同（只保存一份）")
+
+
+def print_report(cache, url_counts):
+    cdn_bytes, local_bytes, dedup_bytes = cache.report(url_counts)
+    references = sum(url_counts.values())
+    cached = sum(count for url, count in url_counts.items() if cache.cached(url))
+    print(f"💾 商品卡片图片 {references} 处，其中 {cached} 处可以使用本地缓存")
+    if cdn_bytes and local_bytes < cdn_bytes:
+        print(f"   查看全部订单: CDN原图 {_format_size(cdn_bytes)} -> 本地缩略图 {_format_size(local_bytes)}"
+              f"（节省 {(1 - local_bytes / cdn_bytes) * 100:.1f}%）")
+    elif cdn_bytes:
+        print(f"   查看全部订单: 不再从CDN下载 {_format_size(cdn_bytes)}，改为加载本地原图")
+    print(f"   按内容去重节省存储 {_format_size(dedup_bytes)}")
+    if Image is None:
+        print("ℹ️ 未安装Pillow，没有生成缩略图，页面使用本地原图 (pip install Pillow)")
+
+
+# ---------------------------------------------------------------------------
+# 本地模拟图片服务器
+# ---------------------------------------------------------------------------
+
+def _png(width, height, seed):
+    """生成一张PNG：色块背景加上随机噪点，压缩后的大小接近真实商品图"""
+    rng = random.Random(seed)
+    color = bytes(rng.randrange(256) for _ in range(3))
+    rows = []
+    for _ in range(height):
+        row = bytearray(color * width)
+        # Random.randbytes 需要 Python 3.9+，与它等价的写法（同样的种子生成同样的字节）
+        noise = rng.getrandbits(8 * (width // 2)).to_bytes(width // 2, 'little')
+        row[:len(noise)] = noise
+        rows.append(b'\x00' + bytes(row))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(b''.join(rows), 6)) + chunk(b'IEND', b''))
+
+
+def start_mock_image_server(latency=0.02, port=0, size=400):
+    """
+    本地模拟CDN：/product/{编号}/cover.png 和 /product/{编号}/white.png 返回按编号生成的PNG
+
+    编号为3的倍数的商品 cover 和 white 是同一张图（测试内容去重）；编号以 99 结尾的商品返回404。
+    server.requests 记录每个路径被请求的次数
+
+    Returns:
+        (server, 地址前缀)，地址前缀替换 https://cdn.example.com 即可
+    """
+    images = {}
+    lock = threading.Lock()
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            with lock:
+                server.requests[self.path] = server.requests.get(self.path, 0) + 1
+            parts = self.path.strip('/').split('/')
+            if len(parts) != 3 or parts[0] != 'product' or parts[2] not in ('cover.png', 'white.png') \
+                    or parts[1].endswith('99'):
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            index = int(parts[1])
+            variant = 0 if parts[2] == 'cover.png' or index % 3 == 0 else 1
+            with lock:
+                if (index, variant) not in images:
+                    images[(index, variant)] = _png(size, size, index * 2 + variant)
+                body = images[(index, variant)]
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockHandler)
+    server.daemon_threads = True
+    server.requests = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def _demo_orders(count, seed, base_url, new_products=False):
+    """模拟订单，图片指向模拟CDN；new_products 时编号为10的倍数的商品换成新商品（新的图片地址）"""
+    from sample_data import generate_orders
+
+    orders = list(generate_orders(count, seed=seed))
+    for order in orders:
+        for product in order['products']:
+            for field in IMAGE_FIELDS:
+                url = product[field].replace('https://cdn.example.com', base_url)
+                number = url.split('/')[-2]
+                if new_products and int(number) % 10 == 0:
+                    url = url.replace(f'/{number}/', f'/{int(number) + 1000:05d}/')
+                product[field] = url
+    return orders
+
+
+def run_demo(order_count, concurrency):
+    """模拟CDN上跑两次抓取：第一次全部下载，新增订单后只下载新地址"""
+    server, base_url = start_mock_image_server()
+    tmp_dir = tempfile.mkdtemp(prefix='image_cache_demo_')
+    checks = []
+    try:
+        cache = ImageCache(os.path.join(tmp_dir, DEFAULT_CACHE_DIR))
+        orders = _demo_orders(order_count, 42, base_url)
+        url_counts = collect_image_urls(orders)
+        print(f"🚀 第一次: {len(orders)} 个订单")
+        stats = cache.fetch(url_counts, concurrency)
+        print_fetch_stats(stats)
+        checks.append(all(count == 1 for count in server.requests.values()))
+
+        # 新的一批订单大多引用已有商品，少数是新商品；404的地址在第二次会重试
+        orders += _demo_orders(order_count // 2, 43, base_url, new_products=True)
+        url_counts = collect_image_urls(orders)
+        before = sum(server.requests.values())
+        print(f"\n🚀 第二次: 新增订单后共 {len(orders)} 个")
+        stats = cache.fetch(url_counts, concurrency)
+        print_fetch_stats(stats)
+        retried = sum(1 for url, entry in cache.entries.items() if 'error' in entry)
+        checks.append(sum(server.requests.values()) - before == stats['downloaded'] + stats['failed'])
+        print()
+        print_report(cache, url_counts)
+
+        sample = next(product for order in orders for product in order['products']
+                      if cache.cached(product['cover']))
+        rewritten = cache.rewrite_product(sample)
+        print(f"\n🔗 引用改写示例: {sample['cover']}\n   -> cover {rewritten['cover']}\n   -> thumb {rewritten['thumb']}")
+        checks.append(os.path.exists(os.path.join(tmp_dir, rewritten['cover'])))
+        print(f"\n   {'✅' if checks[0] else '❌'} 每个地址只请求一次")
+        print(f"   {'✅' if checks[1] else '❌'} 第二次只请求未缓存的地址（含 {retried} 个仍然失败的404地址）")
+        print(f"   {'✅' if checks[2] else '❌'} 改写后的路径指向缓存文件")
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir)
+    return all(checks)
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='商品图片本地缓存')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='缓存目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fetch_parser = subparsers.add_parser('fetch', help='下载订单中还没有缓存的图片')
+    fetch_parser.add_argument('json_file', nargs='?', default='optimized_orders.json', help='订单文件或分区目录')
+    fetch_parser.add_argument('-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='同时下载的图片数')
+    fetch_parser.add_argument('--thumb-size', type=int, default=DEFAULT_THUMB_SIZE, help='缩略图最长边像素')
+    fetch_parser.add_argument('--timeout', type=int, default=30)
+
+    stats_parser = subparsers.add_parser('stats', help='缓存命中率和节省的流量')
+    stats_parser.add_argument('json_file', nargs='?', default='optimized_orders.json', help='订单文件或分区目录')
+
+    mock_parser = subparsers.add_parser('mock', help='启动本地模拟图片服务器')
+    mock_parser.add_argument('--port', type=int, default=8792)
+    mock_parser.add_argument('--latency', type=float, default=0.02)
+
+    demo_parser = subparsers.add_parser('demo', help='用本地模拟图片服务器检查下载和增量更新')
+    demo_parser.add_argument('--orders', type=int, default=3000)
+    demo_parser.add_argument('-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+
+    args = parser.parse_args(argv)
+
+    if args.command in ('fetch', 'stats'):
+        from order_partitions import resolve_orders_path
+
+        json_file = resolve_orders_path(args.json_file)
+        if not os.path.exists(json_file):
+            print(f"❌ 错误: 找不到文件 {json_file}")
+            return
+        url_counts = load_order_image_urls(json_file)
+        if args.command == 'fetch':
+            cache = ImageCache(args.cache_dir, args.thumb_size)
+            stats = cache.fetch(url_counts, args.concurrency, args.timeout)
+            print_fetch_stats(stats)
+        else:
+            cache = ImageCache(args.cache_dir)
+            cached = sum(1 for url in url_counts if cache.cached(url))
+            print(f"📊 图片地址 {len(url_counts)} 个, 已缓存 {cached} 个"
+                  f"（命中率 {cached / len(url_counts) * 100 if url_counts else 100:.1f}%）")
+        print_report(cache, url_counts)
+    elif args.command == 'mock':
+        server, base_url = start_mock_image_server(args.latency, args.port)
+        print(f"🚀 模拟图片服务器: {base_url}/product/00001/cover.png （Ctrl+C 停止）")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == 'demo':
+        ok = run_demo(args.orders, args.concurrency)
+        print(f"\n{'✅ 全部通过' if ok else '❌ 有检查未通过'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物流推送接收服务
+快递查询结果中 subscribeStatus 为 SubscribeStatus_Success 的单号会由快递方推送轨迹更新，
+本服务接收推送（webhook回调），写入订单库的logistics表（轨迹追加到traces表），并把这些订单标记为无需轮询。
+logistics.go 只需要查询 `order_store.py status --status 待买家收货 --poll-only` 输出的订单
+
+推送格式与快递查询接口返回的 data 相同，每条记录附带 orderId:
+    POST /express/push
+    {"data": [{"orderId": "...", "expressNo": "...", "subscribeStatus": "SubscribeStatus_Success",
+               "traces": [{"traceState": "...", "traceTime": "...", ...}], ...}]}
+"""
+
+import argparse
+import json
+import os
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from order_store import (DEFAULT_DB_FILE, SHIPPED_STATUS, SUBSCRIBE_SUCCESS, open_store, upsert_pushed_groups,
+                         upsert_pushed_traces, logistics_targets)
+
+PUSH_PATH = '/express/push'
+STATS_PATH = '/stats'
+
+# 校验推送来源的请求头
+TOKEN_HEADER = 'X-Push-Token'
+
+
+def validate_update(update):
+    """
+    检查一条推送记录的格式，返回错误信息，格式正确时返回None
+
+    格式错误的记录如果进入合并提交的事务，会让同一事务中其他请求的推送一起失败，所以在入队前拒绝
+    """
+    if not isinstance(update, dict):
+        return '记录不是对象'
+    for field in ('orderId', 'expressNo', 'companyName', 'companyCode', 'subscribeStatus'):
+        if update.get(field) is not None and not isinstance(update[field], str):
+            return f'{field} 不是字符串'
+    traces = update.get('traces')
+    if traces is not None:
+        if not isinstance(traces, list):
+            return 'traces 不是数组'
+        if not all(isinstance(trace, dict) for trace in traces):
+            return 'traces 中有不是对象的轨迹'
+    return None
+
+
+class PushIngestor:
+    """
+    推送写入线程
+
+    所有请求共用一个SQLite连接，把同时到达的推送合并成一个事务提交（group commit），
+    请求在数据提交后才返回成功。合并的事务失败时逐个请求重新写入，一个请求的错误不影响其他请求
+    """
+
+    def __init__(self, db_file, max_batch=500):
+        self.db_file = db_file
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self.received = 0
+        self.ingested = 0
+        self.batches = 0
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, updates, timeout=30):
+        """提交一组更新并等待写入完成，返回写入的记录数"""
+        done = threading.Event()
+        result = {'count': 0, 'error': None}
+        self._queue.put((updates, done, result))
+        if not done.wait(timeout):
+            raise TimeoutError('写入超时')
+        if result['error']:
+            raise RuntimeError(result['error'])
+        return result['count']
+
+    def _run(self):
+        conn = open_store(self.db_file)
+        while True:
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                break
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            try:
+                counts = upsert_pushed_groups(conn, [item_updates for item_updates, _, _ in batch])
+                errors = [None] * len(batch)
+            except Exception:
+                # 逐个请求重试，找出出错的那个
+                counts = []
+                errors = []
+                for item_updates, _, _ in batch:
+                    try:
+                        counts.append(upsert_pushed_traces(conn, item_updates))
+                        errors.append(None)
+                    except Exception as e:
+                        counts.append(0)
+                        errors.append(str(e))
+
+            self.received += sum(len(item_updates) for item_updates, _, _ in batch)
+            self.ingested += sum(counts)
+            self.batches += 1
+            # 一个事务内的多个请求按各自实际写入的记录数返回（没有orderId、也关联不到订单的记录不计）
+            for (item_updates, done, result), count, error in zip(batch, counts, errors):
+                result['count'] = count
+                result['error'] = error
+                done.set()
+        conn.close()
+
+    def stats(self):
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return {
+            'received': self.received,
+            'ingested': self.ingested,
+            'batches': self.batches,
+            'uptimeSeconds': round(elapsed, 1),
+            'ingestPerSecond': round(self.ingested / elapsed, 1),
+        }
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def make_handler(ingestor, token=None):
+    """创建请求处理类"""
+
+    class PushHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == STATS_PATH:
+                self._send_json(200, ingestor.stats())
+            else:
+                self._send_json(404, {'code': '404', 'message': 'not found'})
+
+        def do_POST(self):
+            if self.path != PUSH_PATH:
+                self._send_json(404, {'code': '404', 'message': 'not found'})
+                return
+            if token and self.headers.get(TOKEN_HEADER) != token:
+                self._send_json(401, {'code': '401', 'message': 'invalid token'})
+                return
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except (ValueError, json.JSONDecodeError):
+                self._send_json(400, {'code': '400', 'message': 'invalid json'})
+                return
+
+            # 兼容 {"data": [...]}、单条记录和记录列表三种格式；不是对象的记录由 validate_update 拒绝
+            if isinstance(payload, dict) and isinstance(payload.get('data'), list):
+                updates = payload['data']
+            elif isinstance(payload, list):
+                updates = payload
+            else:
+                updates = [payload]
+            for index, update in enumerate(updates):
+                error = validate_update(update)
+                if error:
+                    self._send_json(400, {'code': '400', 'message': f'第 {index + 1} 条记录: {error}'})
+                    return
+
+            try:
+                count = ingestor.submit(updates)
+            except Exception as e:
+                self._send_json(500, {'code': '500', 'message': str(e)})
+                return
+            self._send_json(200, {'code': '0', 'message': '', 'accepted': count})
+
+        def log_message(self, format, *args):
+            # 推送量大时不逐条打印访问日志
+            pass
+
+    return PushHandler
+
+
+def start_server(db_file, host='127.0.0.1', port=8787, token=None):
+    """启动推送接收服务（后台线程），返回 (server, ingestor)"""
+    ingestor = PushIngestor(db_file)
+    server = ThreadingHTTPServer((host, port), make_handler(ingestor, token))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, ingestor
+
+
+def make_push_update(order_id, index, rng):
+    """模拟快递方推送的一条轨迹更新"""
+    collect_time = 1750149373 + index * 37
+    traces = [{
+        'traceState': 'TraceState_Collect',
+        'traceTime': str(collect_time),
+        'traceContext': '您的快件已揽收',
+        'traceType': 'ACCEPT',
+        'status': 'EXPRESS_STATUS_DEFAULT',
+        'statusEx': '',
+    }]
+    if rng.random() < 0.5:
+        traces.append({
+            'traceState': 'TraceState_Transport',
+            'traceTime': str(collect_time + 36000),
+            'traceContext': '您的快件已到达转运中心',
+            'traceType': 'TRANSPORT',
+            'status': 'EXPRESS_STATUS_DEFAULT',
+            'statusEx': '',
+        })
+    return {
+        'orderId': order_id,
+        'companyCode': 'yuantong',
+        'expressNo': f'YT{2556966040057 + index}',
+        'subscribeStatus': SUBSCRIBE_SUCCESS,
+        'traces': traces,
+        'isArrived': False,
+        'companyName': '圆通速递',
+        'remark': '',
+    }
+
+
+def publish(url, order_ids, batch_size=1, concurrency=16, token=None, seed=42):
+    """
+    本地模拟推送方：把订单的轨迹更新推送到接收服务
+
+    Returns:
+        (推送的记录数, 耗时秒数)
+    """
+    rng = random.Random(seed)
+    updates = [make_push_update(order_id, i, rng) for i, order_id in enumerate(order_ids)]
+    batches = [updates[i:i + batch_size] for i in range(0, len(updates), batch_size)]
+
+    def send(batch):
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({'data': batch}, ensure_ascii=False).encode('utf-8'),
+            headers={'Content-Type': 'application/json', **({TOKEN_HEADER: token} if token else {})},
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=30) as resp:
+            return json.loads(resp.read()).get('accepted', 0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        accepted = sum(executor.map(send, batches))
+    return accepted, time.perf_counter() - start
+
+
+def run_benchmark(order_count, subscribed_ratio, batch_size, concurrency):
+    """
+    用模拟订单和本地推送方测试接收吞吐量，以及订阅后需要轮询的订单数变化
+    """
+    from sample_data import generate_orders
+    from order_store import upsert_orders
+
+    tmp_dir = tempfile.mkdtemp(prefix='push_bench_')
+    db_file = os.path.join(tmp_dir, 'orders.db')
+    try:
+        conn = open_store(db_file)
+        upsert_orders(conn, generate_orders(order_count))
+        targets_before = logistics_targets(conn, SHIPPED_STATUS)
+        conn.close()
+
+        subscribed = targets_before[:int(len(targets_before) * subscribed_ratio)]
+        server, ingestor = start_server(db_file, port=0)
+        url = f'http://127.0.0.1:{server.server_address[1]}{PUSH_PATH}'
+        try:
+            accepted, elapsed = publish(url, subscribed, batch_size, concurrency)
+            stats = ingestor.stats()
+        finally:
+            server.shutdown()
+            ingestor.close()
+
+        conn = open_store(db_file)
+        targets_after = logistics_targets(conn, SHIPPED_STATUS)
+        conn.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    print(f"\n📊 推送接收: {accepted} 条更新, 每个请求 {batch_size} 条, 并发 {concurrency}")
+    print(f"   吞吐量: {accepted / elapsed:,.0f} 条/秒 ({elapsed:.2f} 秒, {stats['batches']} 个写入事务)")
+    print(f"   需要轮询的待收货订单: {len(targets_before)} -> {len(targets_after)}")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='物流推送接收服务')
+    parser.add_argument('--db', default=DEFAULT_DB_FILE, help='订单库文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = subparsers.add_parser('serve', help='启动推送接收服务')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8787)
+    serve_parser.add_argument('--token', default=os.environ.get('PUSH_TOKEN'), help=f'校验 {TOKEN_HEADER} 请求头')
+
+    publish_parser = subparsers.add_parser('publish', help='模拟推送方，推送订单库中待收货订单的轨迹')
+    publish_parser.add_argument('--url', default=f'http://127.0.0.1:8787{PUSH_PATH}')
+    publish_parser.add_argument('--limit', type=int, default=1000)
+    publish_parser.add_argument('--batch-size', type=int, default=1)
+    publish_parser.add_argument('--concurrency', type=int, default=16)
+    publish_parser.add_argument('--token', default=os.environ.get('PUSH_TOKEN'))
+
+    bench_parser = subparsers.add_parser('bench', help='推送接收吞吐量测试')
+    bench_parser.add_argument('--orders', type=int, default=50000)
+    bench_parser.add_argument('--subscribed', type=float, default=0.9, help='已订阅推送的待收货订单比例')
+    bench_parser.add_argument('--batch-size', type=int, default=1)
+    bench_parser.add_argument('--concurrency', type=int, default=16)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server, ingestor = start_server(args.db, args.host, args.port, args.token)
+        print(f"🚀 推送接收服务已启动: http://{args.host}:{args.port}{PUSH_PATH}")
+        print(f"📊 统计信息: http://{args.host}:{args.port}{STATS_PATH}")
+        try:
+            while True:
+                time.sleep(60)
+                print(f"📊 {ingestor.stats()}")
+        except KeyboardInterrupt:
+            print("\n正在停止服务...")
+        finally:
+            server.shutdown()
+            ingestor.close()
+    elif args.command == 'publish':
+        conn = open_store(args.db)
+        order_ids = logistics_targets(conn, SHIPPED_STATUS)[:args.limit]
+        conn.close()
+        accepted, elapsed = publish(args.url, order_ids, args.batch_size, args.concurrency, args.token)
+        print(f"✅ 推送 {accepted} 条更新，耗时 {elapsed:.2f} 秒 ({accepted / max(elapsed, 1e-9):,.0f} 条/秒)")
+    elif args.command == 'bench':
+        run_benchmark(args.orders, args.subscribed, args.batch_size, args.concurrency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物流查询调度
+签名有效期和接口限流决定了每轮能发出的查询数，不再对全部"待买家收货"订单平均查询，
+而是按下单时长、距上次成功查询的时间、是否已有快递单号和最新轨迹状态给订单打分，
+每轮只查询分数最高的 budget 个订单。plan 命令生成按优先级排序的 status_info.json，
+logistics.go 不需要修改
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import random
+import time
+
+from order_store import (
+    DEFAULT_DB_FILE, SHIPPED_STATUS, DELIVERED_TRACE_STATE, open_store,
+)
+
+# 距上次查询超过这个小时数后不再继续加分，避免很久没查的订单长期压住其他订单
+MAX_STALENESS_HOURS = 72
+
+# 下单时长按天加分的上限：在途越久越接近签收，状态变化的可能越大
+MAX_AGE_DAYS = 10
+
+# 各轨迹状态下一次查询发现变化的相对可能性
+STATE_WEIGHTS = {
+    'TraceState_Collect': 0.8,
+    'TraceState_Transport': 1.0,
+    'TraceState_Delivering': 1.5,
+}
+DEFAULT_STATE_WEIGHT = 1.0
+
+# 还没有快递单号的订单：多数是刚下单未发货，查询大多没有结果
+NO_EXPRESS_WEIGHT = 0.5
+
+
+def priority_score(now, created_at, last_lookup_at, updated_at, express_no, last_trace_state, is_arrived):
+    """
+    订单的查询优先级，0表示不需要查询（已签收）
+
+    已有快递单号时按距上次成功查询的时间计算；没有单号时按距上次尝试查询的时间计算，
+    避免查不到结果的订单每轮都排在最前面
+    """
+    if is_arrived or last_trace_state == DELIVERED_TRACE_STATE:
+        return 0.0
+
+    if express_no:
+        weight = STATE_WEIGHTS.get(last_trace_state, DEFAULT_STATE_WEIGHT)
+        last_checked = last_lookup_at
+    else:
+        weight = NO_EXPRESS_WEIGHT
+        last_checked = updated_at
+    staleness = min((now - last_checked) / 3600, MAX_STALENESS_HOURS) if last_checked else MAX_STALENESS_HOURS
+    age_days = min(max(now - (created_at or now), 0) / 86400, MAX_AGE_DAYS)
+    return weight * staleness * (1 + age_days / MAX_AGE_DAYS)
+
+
+def select_lookups(rows, budget, now=None):
+    """
+    从候选订单中选出本轮要查询的订单
+
+    Args:
+        rows: (orderId, createdAt, lastLookupAt, updatedAt, expressNo, lastTraceState, isArrived) 序列
+        budget: 本轮最多发出的查询数，None表示不限
+
+    Returns:
+        按优先级降序排列的 (分数, orderId) 列表
+    """
+    now = now or int(time.time())
+    scored = (
+        (priority_score(now, *row[1:]), row[0])
+        for row in rows
+    )
+    scored = [item for item in scored if item[0] > 0]
+    if budget is None or budget >= len(scored):
+        return sorted(scored, reverse=True)
+    return heapq.nlargest(budget, scored)
+
+
+def candidate_rows(conn, status_name=SHIPPED_STATUS):
+    """需要轮询物流的订单及其最近一次查询的结果（已订阅推送的订单不在其中）"""
+    return conn.execute(
+        """
+        SELECT o.orderId, o.createdAt, l.lastLookupAt, l.updatedAt, l.expressNo,
+               IFNULL(l.lastTraceState, ''), IFNULL(l.isArrived, 0)
+        FROM orders o
+        LEFT JOIN logistics l ON l.orderId = o.orderId
+        WHERE o.statusName = ? AND IFNULL(l.needsPolling, 1) = 1
+        """,
+        (status_name,),
+    ).fetchall()
+
+
+def write_plan(conn, budget, output_file='status_info.json', now=None):
+    """按优先级生成本轮的status_info.json，格式与 order_store.py status 相同"""
+    rows = candidate_rows(conn)
+    selected = select_lookups(rows, budget, now)
+    output_data = {
+        "total_orders": len(selected),
+        "status_statistics": {SHIPPED_STATUS: len(selected)},
+        "orders": [{'orderId': order_id, 'statusName': SHIPPED_STATUS} for _, order_id in selected],
+    }
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    return len(rows), selected
+
+
+# ---------------------------------------------------------------------------
+# 调度效果模拟
+# ---------------------------------------------------------------------------
+
+class _Shipment:
+    """模拟中的一个订单：真实轨迹和最近一次查询得到的结果"""
+
+    __slots__ = ('order_id', 'created_at', 'express_no', 'collect_time', 'trace_times', 'trace_states',
+                 'sign_time', 'known_express', 'known_state', 'known_arrived', 'last_lookup_at', 'updated_at',
+                 'detected_sign_at')
+
+    def __init__(self, item, created_at):
+        self.order_id = item['orderId']
+        self.created_at = created_at
+        self.express_no = item['expressNo']
+        traces = sorted((int(trace['traceTime']), trace['traceState']) for trace in item['traces'])
+        self.trace_times = [trace_time for trace_time, _ in traces]
+        self.trace_states = [state for _, state in traces]
+        self.collect_time = self.trace_times[0]
+        self.sign_time = self.trace_times[-1] if self.trace_states[-1] == DELIVERED_TRACE_STATE else None
+        self.known_express = ''
+        self.known_state = ''
+        self.known_arrived = 0
+        self.last_lookup_at = None
+        self.updated_at = None
+        self.detected_sign_at = None
+
+    def true_state(self, now):
+        index = bisect.bisect_right(self.trace_times, now)
+        return self.trace_states[index - 1] if index else ''
+
+    def lookup(self, now):
+        """模拟一次查询，返回是否发现了新信息"""
+        self.updated_at = now
+        if now < self.collect_time:
+            return False
+        state = self.true_state(now)
+        changed = state != self.known_state or not self.known_express
+        self.known_express = self.express_no
+        self.known_state = state
+        self.known_arrived = 1 if state == DELIVERED_TRACE_STATE else 0
+        self.last_lookup_at = now
+        if self.known_arrived and self.detected_sign_at is None:
+            self.detected_sign_at = now
+        return changed
+
+    def row(self):
+        return (self.order_id, self.created_at, self.last_lookup_at, self.updated_at,
+                self.known_express, self.known_state, self.known_arrived)
+
+
+def _make_shipments(order_count, start, end, seed):
+    """生成模拟订单，真实轨迹截止到模拟结束"""
+    from sample_data import generate_express_results
+
+    rng = random.Random(seed)
+    shipments = []
+    order_ids = [f'8755681{index:011d}' for index in range(order_count)]
+    for item in generate_express_results(order_ids, seed=seed, now=end):
+        # 下单后1~48小时揽收，揽收前查不到快递单号
+        created_at = int(item['traces'][0]['traceTime']) - rng.randint(3600, 48 * 3600)
+        shipments.append(_Shipment(item, created_at))
+    # 模拟开始前一天做过一次全量查询
+    for shipment in shipments:
+        shipment.lookup(start - 86400)
+    return shipments
+
+
+def simulate(strategy, order_count, runs, interval_hours, budget, seed=42):
+    """
+    按小时逐轮模拟一种查询策略
+
+    strategy:
+        flat-all     每轮查询全部订单（当前 logistics.go 的做法）
+        flat-budget  每轮按 status_info.json 的顺序轮流查询 budget 个订单
+        priority     每轮查询优先级最高的 budget 个订单
+
+    Returns:
+        统计字典
+    """
+    interval = int(interval_hours * 3600)
+    start = 1750000000
+    end = start + runs * interval
+    shipments = _make_shipments(order_count, start, end, seed)
+    by_id = {s.order_id: s for s in shipments}
+    # 只统计模拟开始前一天还未签收的订单，已签收的不会再变化
+    active = [s for s in shipments if not s.known_arrived]
+
+    requests = 0
+    changes = 0
+    fresh_samples = []
+    cursor = 0
+    for run in range(runs):
+        now = start + run * interval
+        if run:
+            fresh = sum(1 for s in active if s.known_state == s.true_state(now))
+            fresh_samples.append(fresh / len(active))
+
+        if strategy == 'flat-all':
+            targets = shipments
+        elif strategy == 'flat-budget':
+            targets = [shipments[(cursor + i) % len(shipments)] for i in range(min(budget, len(shipments)))]
+            cursor = (cursor + budget) % len(shipments)
+        else:
+            targets = [by_id[order_id] for _, order_id in select_lookups((s.row() for s in shipments), budget, now)]
+
+        for shipment in targets:
+            requests += 1
+            if shipment.lookup(now):
+                changes += 1
+
+    signed = [s for s in active if s.sign_time and s.sign_time <= end - interval]
+    detected = [s for s in signed if s.detected_sign_at is not None]
+    lag_hours = [(s.detected_sign_at - s.sign_time) / 3600 for s in detected]
+    return {
+        'strategy': strategy,
+        'requests': requests,
+        'changes': changes,
+        'freshness': sum(fresh_samples) / len(fresh_samples) if fresh_samples else 1.0,
+        'active': len(active),
+        'signed': len(signed),
+        'detected': len(detected),
+        'sign_lag_hours': sum(lag_hours) / len(lag_hours) if lag_hours else 0.0,
+    }
+
+
+def run_simulation(order_count, runs, interval_hours, budget):
+    """对比平均分配和优先级调度的新鲜度"""
+    results = [
+        simulate('flat-all', order_count, runs, interval_hours, budget),
+        simulate('flat-budget', order_count, runs, interval_hours, budget),
+        simulate('priority', order_count, runs, interval_hours, budget),
+    ]
+    print(f"\n📊 {order_count} 个待收货订单, {runs} 轮 × 每 {interval_hours:g} 小时, 每轮预算 {budget} 次查询")
+    print(f"   (新鲜度: 每轮查询前已知状态与真实状态一致的在途订单比例, 共 {results[0]['active']} 个在途订单)")
+    for result in results:
+        per_thousand = result['changes'] / max(result['requests'], 1) * 1000
+        print(f"   {result['strategy']:<12} 请求 {result['requests']:>8,}  新鲜度 {result['freshness'] * 100:5.1f}%  "
+              f"每千次请求发现变化 {per_thousand:6.1f}  "
+              f"签收发现 {result['detected']}/{result['signed']}, 平均延迟 {result['sign_lag_hours']:.1f} 小时")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='物流查询调度')
+    parser.add_argument('--db', default=DEFAULT_DB_FILE, help='订单库文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help='按优先级生成本轮的status_info.json')
+    plan_parser.add_argument('--budget', type=int, default=2000, help='本轮最多查询的订单数')
+    plan_parser.add_argument('-o', '--output', default='status_info.json')
+
+    simulate_parser = subparsers.add_parser('simulate', help='模拟对比平均分配和优先级调度')
+    simulate_parser.add_argument('--orders', type=int, default=5000)
+    simulate_parser.add_argument('--runs', type=int, default=72)
+    simulate_parser.add_argument('--interval', type=float, default=1, help='每轮间隔小时数')
+    simulate_parser.add_argument('--budget', type=int, default=500)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'plan':
+        conn = open_store(args.db)
+        try:
+            candidate_count, selected = write_plan(conn, args.budget, args.output)
+        finally:
+            conn.close()
+        print(f"候选订单 {candidate_count} 个，本轮查询 {len(selected)} 个")
+        if selected:
+            print(f"优先级范围: {selected[0][0]:.1f} ~ {selected[-1][0]:.1f}")
+        print(f"结果已保存到: {args.output}")
+    elif args.command == 'simulate':
+        run_simulation(args.orders, args.runs, args.interval, args.budget)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,20 @@ let ordersData = [];
 let filteredOrders = [];
 let currentDisplayPage = 1;
 const ordersPerPage = 30;
+// 规范化数据的商品目录（product_catalog.json），只在订单引用商品时加载
+let productCatalog = {};
+
+// 分片模式：build_viewer_data.py 生成的清单存在时，只加载当前过滤条件需要的分片
+const viewerDataDir = 'viewer_data';
+let manifest = null;
+let searchIndex = null;
+const shardCache = new Map();
+// 分片模式下当前过滤条件对应的分片；没有搜索词时 filteredOrders 为 null，数量和金额直接取自清单
+let filteredShards = [];
+// 每次过滤或翻页递增；异步加载完成时序号已变，说明有更新的请求，丢弃这次的结果
+let renderSeq = 0;
+// 首屏渲染耗时（从页面开始加载算起，毫秒），渲染后输出到控制台
+let firstRenderMs = null;
 
 // DOM 元素
 const ordersList = document.getElementById('ordersList');
@@ -49,12 +63,26 @@ function debounce(func, wait) {
 async function loadOrdersData() {
     try {
         showLoading(true);
+        
+        // 优先使用分片数据，首屏只需要清单和前几个分片
+        manifest = await loadManifest();
+        if (manifest) {
+            populateFilterOptionsFromManifest();
+            await applyShardFilters();
+            return;
+        }
+        
         const response = await fetch('optimized_orders.json');
         const data = await response.json();
         
         // 解析优化后的数据结构
         ordersData = data;
         
+        // 规范化数据中商品只保留引用，需要商品目录才能显示
+        if (ordersData.some(order => (order.products || []).some(product => product.ref))) {
+            productCatalog = await loadProductCatalog();
+        }
+        
         console.log('加载的订单数据:', ordersData);
         
         populateFilterOptions();
@@ -71,6 +99,188 @@ async function loadOrdersData() {
     }
 }
 
+// 加载商品目录
+async function loadProductCatalog() {
+    try {
+        const response = await fetch('product_catalog.json');
+        return await response.json();
+    } catch (error) {
+        console.error('加载商品目录失败:', error);
+        return {};
+    }
+}
+
+// 还原商品引用，渲染时才合并，只处理当前页显示的商品
+function resolveProduct(product) {
+    if (!product.ref) {
+        return product;
+    }
+    return { ...(productCatalog[product.ref] || {}), price: product.price, amount: product.amount };
+}
+
+// 加载分片清单，不存在时返回 null 并回退到整份 optimized_orders.json
+async function loadManifest() {
+    try {
+        const response = await fetch(`${viewerDataDir}/manifest.json`, { cache: 'no-cache' });
+        if (!response.ok) {
+            return null;
+        }
+        const data = await response.json();
+        // 分片表为紧凑数组 [抓取页, 状态序号, 订单数, 金额, 内容哈希]，展开为对象
+        data.shards = data.shards.map(([page, statusIndex, orders, amount, hash], id) => {
+            const status = data.statuses[statusIndex];
+            return {
+                id, page, orders, amount,
+                statusName: status.name,
+                file: `shards/${status.dir}/p${page}.${hash}.json`
+            };
+        });
+        data.pages = [...new Set(data.shards.map(shard => shard.page))];
+        return data;
+    } catch (error) {
+        return null;
+    }
+}
+
+// 加载单个分片（文件名带内容哈希，可长期缓存）；加载失败时从缓存中移除，下次重新请求
+async function loadShard(shard) {
+    if (!shardCache.has(shard.id)) {
+        const promise = fetch(`${viewerDataDir}/${shard.file}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`加载分片 ${shard.file} 失败: HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => data.orders.map((order, i) => ({ page: shard.page, seq: data.seq[i], order })))
+            .catch(error => {
+                shardCache.delete(shard.id);
+                throw error;
+            });
+        shardCache.set(shard.id, promise);
+    }
+    return shardCache.get(shard.id);
+}
+
+// 加载一组分片并按 (抓取页, 原始位置) 合并，与 loadShardRange 按抓取页累计偏移的顺序一致；
+// 多次抓取合并的数据中抓取页会重复出现，只按原始位置排序时同一抓取页的订单不一定连续
+async function loadOrdersFromShards(shards) {
+    const entries = (await Promise.all(shards.map(loadShard))).flat();
+    entries.sort((a, b) => a.page - b.page || a.seq - b.seq);
+    return entries.map(entry => entry.order);
+}
+
+// 加载搜索索引: [订单号, 买家, 卖家, 分片id]
+async function loadSearchIndex() {
+    if (!searchIndex) {
+        const response = await fetch(`${viewerDataDir}/${manifest.searchIndex}`);
+        searchIndex = await response.json();
+    }
+    return searchIndex;
+}
+
+// 从清单填充过滤选项
+function populateFilterOptionsFromManifest() {
+    manifest.statuses.forEach(status => {
+        const option = document.createElement('option');
+        option.value = status.name;
+        option.textContent = status.name;
+        statusFilter.appendChild(option);
+    });
+    
+    manifest.pages.forEach(page => {
+        const option = document.createElement('option');
+        option.value = page;
+        option.textContent = `第 ${page} 页`;
+        pageSelect.appendChild(option);
+    });
+}
+
+// 分片模式下应用过滤器
+async function applyShardFilters() {
+    const seq = ++renderSeq;
+    const statusValue = statusFilter.value;
+    const searchValue = searchInput.value.toLowerCase().trim();
+    const pageValue = pageSelect.value;
+    
+    let shards = manifest.shards.filter(shard => {
+        const matchesStatus = !statusValue || shard.statusName === statusValue;
+        const matchesPage = !pageValue || shard.page == pageValue;
+        return matchesStatus && matchesPage;
+    });
+    let orders = null;
+    
+    // 搜索先查索引，只加载有命中订单的分片
+    if (searchValue) {
+        try {
+            const matchedIds = new Set();
+            const matchedShards = new Set();
+            (await loadSearchIndex()).forEach(([orderId, buyer, seller, shardId]) => {
+                if (orderId.toLowerCase().includes(searchValue) ||
+                    buyer.toLowerCase().includes(searchValue) ||
+                    seller.toLowerCase().includes(searchValue)) {
+                    matchedIds.add(orderId);
+                    matchedShards.add(shardId);
+                }
+            });
+            shards = shards.filter(shard => matchedShards.has(shard.id));
+            orders = (await loadOrdersFromShards(shards)).filter(order => matchedIds.has(order.orderInfo?.orderId));
+        } catch (error) {
+            showOrdersError(error, seq);
+            return;
+        }
+        if (seq !== renderSeq) {
+            return;
+        }
+    }
+    
+    // 过滤结果确定后才替换当前状态，旧的请求不会覆盖新的过滤条件
+    filteredShards = shards;
+    filteredOrders = orders;
+    currentDisplayPage = 1;
+    updateStats();
+    updatePagination();
+    await displayOrders(seq);
+}
+
+// 分片模式下取出第 start 到 end 个订单，只加载覆盖这一段的抓取页的分片
+async function loadShardRange(start, end) {
+    let offset = 0;
+    let firstOffset = null;
+    const neededShards = [];
+    // 分片按抓取页排序，同一抓取页的分片需要一起加载才能还原原始顺序
+    for (let i = 0; i < filteredShards.length && offset < end;) {
+        const page = filteredShards[i].page;
+        let j = i;
+        let count = 0;
+        while (j < filteredShards.length && filteredShards[j].page === page) {
+            count += filteredShards[j].orders;
+            j++;
+        }
+        if (offset + count > start) {
+            if (firstOffset === null) {
+                firstOffset = offset;
+            }
+            neededShards.push(...filteredShards.slice(i, j));
+        }
+        offset += count;
+        i = j;
+    }
+    if (firstOffset === null) {
+        return [];
+    }
+    const orders = await loadOrdersFromShards(neededShards);
+    return orders.slice(start - firstOffset, end - firstOffset);
+}
+
+// 当前过滤条件下的订单数
+function getFilteredCount() {
+    if (filteredOrders === null) {
+        return filteredShards.reduce((sum, shard) => sum + shard.orders, 0);
+    }
+    return filteredOrders.length;
+}
+
 // 显示/隐藏加载状态
 function showLoading(show) {
     loading.style.display = show ? 'flex' : 'none';
@@ -99,6 +309,10 @@ function populateFilterOptions() {
 
 // 应用过滤器
 function applyFilters() {
+    if (manifest) {
+        return applyShardFilters();
+    }
+    
     const statusValue = statusFilter.value;
     const searchValue = searchInput.value.toLowerCase().trim();
     const pageValue = pageSelect.value;
@@ -120,31 +334,60 @@ function applyFilters() {
     updatePagination();
 }
 
+// 加载订单失败时在列表中显示错误（已有更新的请求时不显示）
+function showOrdersError(error, seq) {
+    console.error('加载订单失败:', error);
+    if (seq === renderSeq) {
+        ordersList.innerHTML = '<div class="error">订单加载失败，请稍后重试</div>';
+    }
+}
+
 // 更新统计信息
 function updateStats() {
-    const totalOrders = filteredOrders.length;
+    const totalOrders = getFilteredCount();
     const totalPages = Math.max(1, Math.ceil(totalOrders / ordersPerPage));
-    const totalAmount = filteredOrders.reduce((sum, order) => {
-        return sum + (order.orderInfo?.paidPrice || 0);
-    }, 0);
+    const totalAmount = filteredOrders === null ?
+        filteredShards.reduce((sum, shard) => sum + shard.amount, 0) :
+        filteredOrders.reduce((sum, order) => {
+            return sum + (order.orderInfo?.paidPrice || 0);
+        }, 0);
     
     totalOrdersEl.textContent = totalOrders;
     totalPagesEl.textContent = totalPages;
     totalAmountEl.textContent = `¥${totalAmount.toLocaleString()}`;
 }
 
-// 显示订单
-function displayOrders() {
+// 显示订单；seq 为发起这次显示的请求序号，分片加载完成前有更新的请求时不再渲染
+async function displayOrders(seq = ++renderSeq) {
     const startIndex = (currentDisplayPage - 1) * ordersPerPage;
     const endIndex = startIndex + ordersPerPage;
-    const ordersToShow = filteredOrders.slice(startIndex, endIndex);
+    let ordersToShow;
+    try {
+        ordersToShow = filteredOrders === null ?
+            await loadShardRange(startIndex, endIndex) :
+            filteredOrders.slice(startIndex, endIndex);
+    } catch (error) {
+        showOrdersError(error, seq);
+        return;
+    }
+    if (seq !== renderSeq) {
+        return;
+    }
     
     if (ordersToShow.length === 0) {
         ordersList.innerHTML = '<div class="no-orders">没有找到匹配的订单</div>';
-        return;
+    } else {
+        ordersList.innerHTML = ordersToShow.map(order => createOrderCard(order)).join('');
+    }
+    logFirstRender();
+}
+
+// 记录首屏渲染耗时
+function logFirstRender() {
+    if (firstRenderMs === null) {
+        firstRenderMs = performance.now();
+        console.log(`首屏渲染耗时: ${firstRenderMs.toFixed(0)} ms（${manifest ? '分片数据' : '整份 optimized_orders.json'}）`);
     }
-    
-    ordersList.innerHTML = ordersToShow.map(order => createOrderCard(order)).join('');
 }
 
 // 创建订单卡片
@@ -226,7 +469,7 @@ function createProductsSection(products) {
         <div class="products-section">
             <div class="products-title">🛍️ 商品清单 (${products.length})</div>
             <div class="products-list">
-                ${products.map(product => createProductItem(product)).join('')}
+                ${products.map(product => createProductItem(resolveProduct(product))).join('')}
             </div>
         </div>
     `;
@@ -235,11 +478,12 @@ function createProductsSection(products) {
 // 创建商品项
 function createProductItem(product) {
     const specs = product.specValues || [];
-    const imageUrl = product.cover || product.whiteBgPng || '';
+    // build_viewer_data.py --image-cache 生成的分片中 thumb 为本地缩略图
+    const imageUrl = product.thumb || product.cover || product.whiteBgPng || '';
     
     return `
         <div class="product-item">
-            ${imageUrl ? `<img src="${imageUrl}" alt="${product.productName}" class="product-image" onerror="this.style.display='none'">` : ''}
+            ${imageUrl ? `<img src="${imageUrl}" alt="${product.productName}" class="product-image" loading="lazy" decoding="async" onerror="this.style.display='none'">` : ''}
             <div class="product-info">
                 <div class="product-name">${product.productName || '未知商品'}</div>
                 <div class="product-specs">
@@ -271,7 +515,7 @@ function getStatusClass(statusKey) {
 
 // 切换页面
 function changePage(direction) {
-    const totalPages = Math.ceil(filteredOrders.length / ordersPerPage);
+    const totalPages = Math.ceil(getFilteredCount() / ordersPerPage);
     const newPage = currentDisplayPage + direction;
     
     if (newPage >= 1 && newPage <= totalPages) {
@@ -288,7 +532,7 @@ function changePage(direction) {
 
 // 更新分页信息
 function updatePagination() {
-    const totalPages = Math.max(1, Math.ceil(filteredOrders.length / ordersPerPage));
+    const totalPages = Math.max(1, Math.ceil(getFilteredCount() / ordersPerPage));
     
     pageInfo.textContent = `第 ${currentDisplayPage} 页，共 ${totalPages} 页`;
     
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单历史版本
+每次抓取后记录一个版本：第一次和每隔 checkpoint_every 个版本保存全部订单（检查点），
+其余版本只保存与上一版本相比新增、删除的订单和变化的字段（增量）：
+
+    order_history/
+        index.json                  各版本的抓取时间、类型、文件和变化数
+        000001-checkpoint.json.gz   {orderId: 订单}
+        000002-delta.json.gz        {"added": {...}, "removed": [...], "changed": {orderId: [[路径, 新值], [路径]...]}}
+
+查询某一时间的数据时从该时间之前最近的检查点开始依次应用增量，
+最多应用 checkpoint_every - 1 个增量，耗时与历史长度无关
+
+    python order_history.py record optimized_orders.json
+    python order_history.py as-of "2025-06-10" --order 875568108466915159
+"""
+
+import argparse
+import gzip
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+DEFAULT_HISTORY_DIR = 'order_history'
+INDEX_FILE = 'index.json'
+DEFAULT_CHECKPOINT_EVERY = 7
+
+# page 随新订单加入整体后移，每次抓取都会变化，不记录
+IGNORED_FIELDS = ('page',)
+
+
+def _order_key(order):
+    return order.get('orderInfo', {}).get('orderId')
+
+
+def _strip(order):
+    return {key: value for key, value in order.items() if key not in IGNORED_FIELDS}
+
+
+def diff_order(old, new, path=None, ops=None):
+    """
+    两个版本订单之间变化的字段
+
+    Returns:
+        [[路径, 新值], ...]，删除的字段为 [路径]；列表整体替换，不逐项比较
+    """
+    path = path or []
+    ops = [] if ops is None else ops
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                ops.append([path + [key], value])
+            elif old[key] != value:
+                diff_order(old[key], value, path + [key], ops)
+        for key in old:
+            if key not in new:
+                ops.append([path + [key]])
+    else:
+        ops.append([path, new])
+    return ops
+
+
+def apply_ops(order, ops):
+    """把 diff_order 的结果应用到订单上（原地修改）"""
+    for op in ops:
+        *parents, last = op[0]
+        target = order
+        for key in parents:
+            target = target.setdefault(key, {})
+        if len(op) == 1:
+            target.pop(last, None)
+        else:
+            target[last] = op[1]
+    return order
+
+
+def _write_gz_json(path, data):
+    # 一次序列化再压缩，json.dump 逐块写入压缩流慢得多
+    compressed = gzip.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), mtime=0)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(compressed)
+    os.replace(tmp_path, path)
+    return len(compressed)
+
+
+def _read_gz_json(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class OrderHistory:
+    """历史版本目录"""
+
+    def __init__(self, directory=DEFAULT_HISTORY_DIR, checkpoint_every=None):
+        self.directory = directory
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+            if checkpoint_every:
+                self.index['checkpoint_every'] = checkpoint_every
+        else:
+            self.index = {'checkpoint_every': checkpoint_every or DEFAULT_CHECKPOINT_EVERY, 'versions': []}
+        # 最后一个版本的全部订单（独立的副本），连续记录多个版本时不必每次重建
+        self._latest = None
+
+    @property
+    def versions(self):
+        return self.index['versions']
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+
+    def _version_position(self, timestamp):
+        """抓取时间早于 timestamp 的最后一个版本的位置，没有时返回None"""
+        position = None
+        for index, version in enumerate(self.versions):
+            if version['crawledAt'] < timestamp:
+                position = index
+        return position
+
+    def _state_at(self, position):
+        """重建第 position 个版本的全部订单 {orderId: 订单}，返回 (订单, 应用的增量数)"""
+        start = position
+        while self.versions[start]['kind'] != 'checkpoint':
+            start -= 1
+        state = _read_gz_json(os.path.join(self.directory, self.versions[start]['file']))
+        for version in self.versions[start + 1:position + 1]:
+            delta = _read_gz_json(os.path.join(self.directory, version['file']))
+            for order_id in delta['removed']:
+                state.pop(order_id, None)
+            for order_id, ops in delta['changed'].items():
+                apply_ops(state[order_id], ops)
+            state.update(delta['added'])
+        return state, position - start
+
+    def record(self, orders, crawled_at=None, partial=False):
+        """
+        记录一次抓取的结果
+
+        Args:
+            orders: optimized_orders.json 结构的订单列表
+            crawled_at: 抓取时间戳，默认为当前时间；必须晚于已有的最后一个版本
+            partial: 只抓取了部分订单（增量抓取），未出现的订单保持不变而不是记为删除
+
+        Returns:
+            新版本的索引项
+        """
+        crawled_at = int(crawled_at or time.time())
+        if self.versions and crawled_at <= self.versions[-1]['crawledAt']:
+            raise ValueError(f"抓取时间 {crawled_at} 不晚于最后一个版本 {self.versions[-1]['crawledAt']}")
+
+        current = {}
+        for order in orders:
+            order_id = _order_key(order)
+            if order_id:
+                current[order_id] = _strip(order)
+
+        number = len(self.versions) + 1
+        since_checkpoint = 0
+        for version in reversed(self.versions):
+            if version['kind'] == 'checkpoint':
+                break
+            since_checkpoint += 1
+
+        entry = {'version': number, 'crawledAt': crawled_at}
+        if not self.versions or since_checkpoint + 1 >= self.index['checkpoint_every']:
+            if partial and self.versions:
+                previous = self._latest if self._latest is not None else self._state_at(len(self.versions) - 1)[0]
+                previous.update(current)
+                current = previous
+            entry['kind'] = 'checkpoint'
+            entry['file'] = f'{number:06d}-checkpoint.json.gz'
+            entry['orders'] = len(current)
+            os.makedirs(self.directory, exist_ok=True)
+            entry['storedBytes'] = _write_gz_json(os.path.join(self.directory, entry['file']), current)
+            entry['added'] = entry['changed'] = entry['removed'] = None
+        else:
+            previous = self._latest if self._latest is not None else self._state_at(len(self.versions) - 1)[0]
+            added = {order_id: order for order_id, order in current.items() if order_id not in previous}
+            removed = [] if partial else [order_id for order_id in previous if order_id not in current]
+            changed = {}
+            for order_id, order in current.items():
+                old = previous.get(order_id)
+                if old is not None and old != order:
+                    changed[order_id] = diff_order(old, order)
+            if partial:
+                previous.update(current)
+                current = previous
+            entry['kind'] = 'delta'
+            entry['file'] = f'{number:06d}-delta.json.gz'
+            entry['orders'] = len(current)
+            entry['storedBytes'] = _write_gz_json(
+                os.path.join(self.directory, entry['file']),
+                {'added': added, 'removed': removed, 'changed': changed},
+            )
+            entry['added'], entry['changed'], entry['removed'] = len(added), len(changed), len(removed)
+        # 完整保存一份的大小按紧凑JSON计算（indent=2 的 optimized_orders.json 还要大一倍以上）
+        serialized = json.dumps(list(current.values()), ensure_ascii=False, separators=(',', ':'))
+        entry['fullBytes'] = len(serialized.encode('utf-8'))
+        self.versions.append(entry)
+        self._save_index()
+        # 调用方之后可能修改传入的订单，缓存反序列化得到的副本
+        self._latest = {_order_key(order): order for order in json.loads(serialized)}
+        return entry
+
+    def as_of(self, timestamp):
+        """
+        timestamp 之前最后一次抓取时的全部订单
+
+        Returns:
+            (订单列表, 版本索引项)，timestamp 早于第一个版本时返回 ([], None)
+        """
+        position = self._version_position(timestamp)
+        if position is None:
+            return [], None
+        state, _ = self._state_at(position)
+        return list(state.values()), self.versions[position]
+
+    def order_timeline(self, order_id):
+        """
+        一个订单在各版本中的变化
+
+        Returns:
+            [(版本索引项, 事件, 内容)]，事件为 added/changed/removed，
+            added 的内容为订单，changed 的内容为 [[路径, 新值], ...]
+        """
+        timeline = []
+        known = None
+        for version in self.versions:
+            data = _read_gz_json(os.path.join(self.directory, version['file']))
+            if version['kind'] == 'checkpoint':
+                # 检查点不记录变化，与上一版本的订单比较
+                order = data.get(order_id)
+                if order is not None and known is None:
+                    timeline.append((version, 'added', order))
+                elif order is None and known is not None:
+                    timeline.append((version, 'removed', None))
+                elif order is not None and order != known:
+                    timeline.append((version, 'changed', diff_order(known, order)))
+                known = order
+            elif order_id in data['added']:
+                known = data['added'][order_id]
+                timeline.append((version, 'added', known))
+            elif order_id in data['changed']:
+                apply_ops(known, data['changed'][order_id])
+                timeline.append((version, 'changed', data['changed'][order_id]))
+            elif order_id in data['removed']:
+                known = None
+                timeline.append((version, 'removed', None))
+        return timeline
+
+    def storage_report(self):
+        """(版本数, 天数, 历史目录大小, 每个版本都保存一份完整文件的大小)"""
+        if not self.versions:
+            return 0, 0, 0, 0
+        stored = sum(version['storedBytes'] for version in self.versions)
+        full = sum(version['fullBytes'] for version in self.versions)
+        days = max(1, round((self.versions[-1]['crawledAt'] - self.versions[0]['crawledAt']) / 86400) + 1)
+        return len(self.versions), days, stored, full
+
+
+def _format_time(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _format_size(size_bytes):
+    return f"{size_bytes / 1024 / 1024:.2f}MB"
+
+
+def _parse_as_of(value):
+    """as-of 的时间：只写日期时为当天结束，与 --to 相同"""
+    from order_partitions import parse_time_range
+
+    return parse_time_range(None, value)[1]
+
+
+def _parse_crawled_at(value):
+    """record --at 的时间：只写日期时为当天开始"""
+    from order_partitions import parse_time_range
+
+    return parse_time_range(value, None)[0]
+
+
+def print_log(history):
+    print(f"📚 {history.directory}: {len(history.versions)} 个版本, 每 {history.index['checkpoint_every']} 个版本一个检查点")
+    print(f"   {'版本':>6} {'抓取时间':<20} {'类型':<10} {'订单数':>8} {'新增':>6} {'变化':>6} {'删除':>6} {'大小':>10}")
+    for version in history.versions:
+        counts = ['-'] * 3 if version['kind'] == 'checkpoint' else [version['added'], version['changed'], version['removed']]
+        print(f"   {version['version']:>6} {_format_time(version['crawledAt']):<20} {version['kind']:<10} "
+              f"{version['orders']:>8} {counts[0]:>6} {counts[1]:>6} {counts[2]:>6} {_format_size(version['storedBytes']):>10}")
+    versions, days, stored, full = history.storage_report()
+    if versions:
+        print(f"\n💾 {days} 天历史: {_format_size(stored)}（每天 {_format_size(stored / days)}），"
+              f"每次保存完整文件需要 {_format_size(full)}（每天 {_format_size(full / days)}），"
+              f"为其 {stored / full * 100:.1f}%")
+
+
+def _simulate_crawls(base_orders, days, new_per_day, change_rate, seed=7):
+    """模拟每天一次抓取：新增订单，部分订单状态变化"""
+    import random
+
+    from sample_data import STATUSES, START_TIMESTAMP, generate_orders
+
+    rng = random.Random(seed)
+    extra = generate_orders(base_orders + days * new_per_day, seed=seed)
+    orders = [next(extra) for _ in range(base_orders)]
+    for day in range(days):
+        crawled_at = START_TIMESTAMP + (day + 1) * 86400
+        for order in rng.sample(orders, int(len(orders) * change_rate)):
+            name, key = STATUSES[rng.randrange(len(STATUSES))]
+            order['orderInfo']['status'] = {'name': name, 'key': key}
+        for _ in range(new_per_day):
+            order = next(extra)
+            order['orderInfo']['createdAt'] = str(crawled_at - rng.randrange(86400))
+            orders.append(order)
+        for page_index, order in enumerate(reversed(orders)):
+            order['page'] = page_index // 30 + 1
+        yield crawled_at, orders
+
+
+def run_benchmark(base_orders, days, new_per_day, change_rate, intervals):
+    """存储大小和查询耗时：不同检查点间隔 vs 每天保存一份完整的 optimized_orders.json"""
+    print(f"📊 初始 {base_orders} 个订单, {days} 天每天抓取一次, 每天新增 {new_per_day} 个, "
+          f"{change_rate * 100:.0f}% 的订单状态变化")
+
+    # 每天保存完整文件（indent=2，与 optimize_orders.py 相同）及其gzip压缩后的大小，各检查点间隔共用
+    full_bytes = 0
+    full_gz_bytes = 0
+    for _, orders in _simulate_crawls(base_orders, days, new_per_day, change_rate):
+        data = json.dumps(orders, ensure_ascii=False, indent=2).encode('utf-8')
+        full_bytes += len(data)
+        full_gz_bytes += len(gzip.compress(data, mtime=0))
+    print(f"   每天保存完整文件: {_format_size(full_bytes / days)}/天, gzip压缩后 {_format_size(full_gz_bytes / days)}/天")
+    print(f"   {'检查点间隔':>10} {'每天存储':>10} {'占完整文件':>10} {'占gzip':>8} "
+          f"{'查询中位数':>10} {'查询最慢':>10} {'记录/次':>8}")
+
+    tmp_dir = tempfile.mkdtemp(prefix='history_bench_')
+    try:
+        for interval in intervals:
+            history = OrderHistory(os.path.join(tmp_dir, f'every{interval}'), checkpoint_every=interval)
+            expected = {}
+            record_seconds = []
+            for crawled_at, orders in _simulate_crawls(base_orders, days, new_per_day, change_rate):
+                start = time.perf_counter()
+                history.record(orders, crawled_at)
+                record_seconds.append(time.perf_counter() - start)
+                if len(history.versions) % 5 == 1:
+                    expected[crawled_at] = {
+                        order['orderInfo']['orderId']: order['orderInfo']['status']['key'] for order in orders
+                    }
+
+            # 查询用新的实例，不使用记录时缓存的最新版本
+            history = OrderHistory(history.directory)
+            latencies = []
+            correct = True
+            for version in history.versions:
+                start = time.perf_counter()
+                orders, _ = history.as_of(version['crawledAt'] + 1)
+                latencies.append(time.perf_counter() - start)
+                if version['crawledAt'] in expected:
+                    actual = {order['orderInfo']['orderId']: order['orderInfo']['status']['key'] for order in orders}
+                    correct = correct and actual == expected[version['crawledAt']]
+            _, day_count, stored, _ = history.storage_report()
+            print(f"   {interval:>10} {_format_size(stored / day_count):>10} {stored / full_bytes * 100:>9.1f}% "
+                  f"{stored / full_gz_bytes * 100:>7.1f}% "
+                  f"{statistics.median(latencies) * 1000:>8.0f}ms {max(latencies) * 1000:>8.0f}ms "
+                  f"{statistics.median(record_seconds):>7.2f}s {'✅' if correct else '❌ 重建结果不一致'}")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='订单历史版本')
+    parser.add_argument('--dir', default=DEFAULT_HISTORY_DIR, help='历史版本目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='记录一次抓取结果')
+    record_parser.add_argument('input_file', nargs='?', default='optimized_orders.json', help='订单文件或分区目录')
+    record_parser.add_argument('--at', help='抓取时间，默认为当前时间，如 "2025-06-10 08:00:00"')
+    record_parser.add_argument('--partial', action='store_true', help='增量抓取的结果，未出现的订单不记为删除')
+    record_parser.add_argument('--checkpoint-every', type=int, help=f'每隔多少个版本保存一次检查点（默认 {DEFAULT_CHECKPOINT_EVERY}）')
+
+    as_of_parser = subparsers.add_parser('as-of', help='某一时间的订单数据')
+    as_of_parser.add_argument('at', help='时间，只写日期时为当天结束时，如 2025-06-10')
+    as_of_parser.add_argument('--order', help='只看一个订单')
+    as_of_parser.add_argument('-o', '--output', help='写出 optimized_orders.json 结构的文件')
+
+    timeline_parser = subparsers.add_parser('timeline', help='一个订单的变化记录')
+    timeline_parser.add_argument('order_id')
+
+    subparsers.add_parser('log', help='各版本和存储大小')
+
+    bench_parser = subparsers.add_parser('bench', help='存储大小和查询耗时')
+    bench_parser.add_argument('--orders', type=int, default=20000, help='初始订单数')
+    bench_parser.add_argument('--days', type=int, default=30)
+    bench_parser.add_argument('--new-per-day', type=int, default=300)
+    bench_parser.add_argument('--change-rate', type=float, default=0.03, help='每天状态变化的订单比例')
+    bench_parser.add_argument('--intervals', type=int, nargs='+', default=[1, 7, 30], help='要比较的检查点间隔')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        run_benchmark(args.orders, args.days, args.new_per_day, args.change_rate, args.intervals)
+        return
+
+    if args.command == 'record':
+        from order_partitions import load_orders, resolve_orders_path
+
+        input_file = resolve_orders_path(args.input_file)
+        if not os.path.exists(input_file):
+            print(f"❌ 错误: 找不到文件 {input_file}")
+            return
+        history = OrderHistory(args.dir, args.checkpoint_every)
+        try:
+            crawled_at = _parse_crawled_at(args.at) if args.at else None
+            entry = history.record(load_orders(input_file, verbose=False), crawled_at, args.partial)
+        except ValueError as e:
+            print(f"❌ 错误: {e}")
+            return
+        if entry['kind'] == 'checkpoint':
+            print(f"✅ 版本 {entry['version']}（检查点）: {entry['orders']} 个订单, {_format_size(entry['storedBytes'])}")
+        else:
+            print(f"✅ 版本 {entry['version']}: 新增 {entry['added']}, 变化 {entry['changed']}, 删除 {entry['removed']}, "
+                  f"{_format_size(entry['storedBytes'])}（完整文件 {_format_size(entry['fullBytes'])}）")
+        return
+
+    if not os.path.exists(os.path.join(args.dir, INDEX_FILE)):
+        print(f"❌ 错误: {args.dir} 中没有历史版本，请先运行 record")
+        return
+    history = OrderHistory(args.dir)
+
+    if args.command == 'log':
+        print_log(history)
+    elif args.command == 'as-of':
+        try:
+            timestamp = _parse_as_of(args.at)
+        except ValueError as e:
+            print(f"❌ 错误: {e}")
+            return
+        start = time.perf_counter()
+        orders, version = history.as_of(timestamp)
+        elapsed = time.perf_counter() - start
+        if version is None:
+            print(f"⚠️ {args.at} 之前没有抓取记录")
+            return
+        print(f"📅 版本 {version['version']}（{_format_time(version['crawledAt'])} 抓取）: "
+              f"{len(orders)} 个订单, 重建用时 {elapsed * 1000:.0f}ms")
+        if args.order:
+            matched = [order for order in orders if _order_key(order) == args.order]
+            if not matched:
+                print(f"⚠️ 该版本中没有订单 {args.order}")
+                return
+            print(json.dumps(matched[0], ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(orders, f, ensure_ascii=False, indent=2)
+            print(f"📄 已写出: {args.output}")
+    elif args.command == 'timeline':
+        timeline = history.order_timeline(args.order_id)
+        if not timeline:
+            print(f"⚠️ 历史中没有订单 {args.order_id}")
+            return
+        for version, event, content in timeline:
+            print(f"🕒 {_format_time(version['crawledAt'])} 版本 {version['version']}:", end=' ')
+            if event == 'added':
+                print(f"首次出现, 状态 {content['orderInfo'].get('status', {}).get('name', '')}")
+            elif event == 'removed':
+                print("不再出现")
+            else:
+                print('; '.join(
+                    f"{'.'.join(map(str, op[0]))} = {json.dumps(op[1], ensure_ascii=False)}" if len(op) == 2
+                    else f"{'.'.join(map(str, op[0]))} 删除"
+                    for op in content
+                ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单列表接口（load-order-list）的响应流式解析和分页大小自适应
+http_req_v2.py 边接收响应边解析 data.rowList，每解析完一个订单就交给下游（归档缓冲、orderId列表），
+不再同时持有整页原始响应、解析后的整棵树和ID列表；最后一个订单解析完时就能确定下一页的 lastId。
+PageSizeTuner 根据每页耗时和错误调整请求的limit，减少抓取全部历史订单所需的请求数。
+本模块只用标准库，另外提供模拟订单列表接口和基准测试
+"""
+
+import argparse
+import codecs
+import http.client
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api_request import load_request_template, raise_for_signature, read_signature
+from raw_archive import ArchiveWriter, PageSpool
+
+# 每次从响应流读取的字节数
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 自适应分页：limit 的默认上限、每页目标耗时（秒）、退避的下限和同一页最多连续失败次数
+DEFAULT_MAX_LIMIT = 200
+DEFAULT_TARGET_SECONDS = 3.0
+MIN_LIMIT = 10
+MAX_PAGE_RETRIES = 3
+
+ROW_LIST_PATTERN = re.compile(r'"rowList"\s*:\s*\[')
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class RowStreamParser:
+    """
+    增量解析订单列表响应
+
+    feed() 每次传入一段响应字节，返回其中已完整的 rowList 订单；close() 校验响应完整并返回
+    去掉订单后的响应（rowList 为空列表）。响应中没有 rowList（如错误响应）时 close() 返回完整响应
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._searched = 0
+        self._head = None
+        self._tail = None
+        self._expect_row = True
+        self.row_count = 0
+
+    @property
+    def rows_done(self):
+        """rowList 是否已解析完（此时最后一个订单已经交出）"""
+        return self._tail is not None
+
+    def feed(self, data, final=False):
+        self._buffer += self._decoder.decode(data, final)
+        if self._tail is not None:
+            return []
+
+        if self._head is None:
+            # 匹配可能跨两段数据，从上次搜索位置稍往前开始
+            match = ROW_LIST_PATTERN.search(self._buffer, max(self._searched - 64, 0))
+            if match is None:
+                self._searched = len(self._buffer)
+                return []
+            self._head = self._buffer[:match.end() - 1]
+            self._buffer = self._buffer[match.end():]
+
+        rows = []
+        buffer = self._buffer
+        pos = 0
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            char = buffer[pos]
+            if char == ']' and (not self._expect_row or not self.row_count):
+                self._tail = buffer[pos + 1:]
+                self._buffer = ''
+                return rows
+            if char == ',' and not self._expect_row:
+                self._expect_row = True
+                pos += 1
+                continue
+            if not self._expect_row:
+                raise ValueError(f"rowList 格式错误，第 {self.row_count} 个订单之后出现 {buffer[pos:pos + 20]!r}")
+            try:
+                row, end = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 订单还没有接收完整，等下一段数据
+                break
+            rows.append(row)
+            self.row_count += 1
+            self._expect_row = False
+            pos = end
+        self._buffer = buffer[pos:]
+        return rows
+
+    def close(self):
+        self.feed(b'', final=True)
+        if self._head is None:
+            return json.loads(self._buffer)
+        if self._tail is None:
+            raise ValueError(f"响应不完整：已解析 {self.row_count} 个订单，rowList 未结束")
+        return json.loads(self._head + '[]' + self._tail + self._buffer)
+
+    def excerpt(self, size=500):
+        """解析失败时用于提示的未解析内容"""
+        return self._buffer[:size]
+
+
+def row_order_id(row):
+    """rowList 中一个订单的orderId，没有时返回None"""
+    order_info = row.get('orderInfo') if isinstance(row, dict) else None
+    return order_info.get('orderId') if isinstance(order_info, dict) else None
+
+
+def stream_rows(chunks, parser, on_row):
+    """
+    把响应数据块交给解析器，每个订单调用一次 on_row(row)
+
+    Returns:
+        去掉订单后的响应（见 RowStreamParser.close）
+    """
+    for chunk in chunks:
+        for row in parser.feed(chunk):
+            on_row(row)
+    return parser.close()
+
+
+class PageSizeTuner:
+    """
+    根据每页耗时和错误调整请求的limit
+
+    - 返回整页且耗时不到目标的一半时limit翻倍，直到 max_limit 或探测到的服务器上限
+    - 耗时超过目标时减半；超时、连接断开、响应不完整等错误时减半并降低上限，同一页重试
+    - 结束判断：limit 不超过已确认被服务器接受的大小（曾返回过整页）时，返回数量少于limit就是最后一页；
+      更大的limit返回不满一页，可能是服务器把limit截断了，这时以返回的数量作为上限继续请求，
+      下一页为空或不满才结束（最多多发一次请求）
+    """
+
+    def __init__(self, initial_limit, max_limit=DEFAULT_MAX_LIMIT, target_seconds=DEFAULT_TARGET_SECONDS):
+        self.limit = initial_limit
+        # 请求模板中的limit是客户端本来就在用的，视为服务器接受
+        self.accepted = initial_limit
+        self.ceiling = max(max_limit or 0, initial_limit)
+        self.min_limit = min(initial_limit, MIN_LIMIT)
+        self.target_seconds = target_seconds
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.largest_page = 0
+
+    def record_page(self, requested, count, seconds):
+        """
+        记录一页成功的响应
+
+        Returns:
+            是否已是最后一页
+        """
+        self.requests += 1
+        self.consecutive_errors = 0
+        self.largest_page = max(self.largest_page, count)
+        if count >= requested:
+            self.accepted = max(self.accepted, requested)
+            if seconds > self.target_seconds:
+                self.limit = max(self.min_limit, requested // 2)
+            elif seconds * 2 <= self.target_seconds:
+                self.limit = min(requested * 2, self.ceiling)
+            return False
+        if count == 0 or requested <= self.accepted:
+            return True
+        self.ceiling = self.limit = count
+        return False
+
+    def record_error(self, requested):
+        """
+        记录一次失败的请求（超时、连接断开、响应不完整等）
+
+        Returns:
+            是否还应重试这一页
+        """
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_errors += 1
+        self.limit = max(self.min_limit, requested // 2)
+        if requested > self.accepted:
+            # 探测更大的limit时出错：上限退回到减半后的大小，不再向上探测
+            self.ceiling = max(self.accepted, self.limit)
+        return self.consecutive_errors <= MAX_PAGE_RETRIES
+
+
+class OrderListClient:
+    """
+    订单列表请求（标准库实现，供 sync_daemon.py 使用）
+
+    与 http_req_v2.py 相同：读取请求模板，每次请求前重新读取签名文件，替换请求体中的 limit/lastId；
+    响应边接收边解析。url 参数可以把请求发到本地模拟接口
+    """
+
+    def __init__(self, http_file=None, url=None, signature_dir=None, timeout=30):
+        self.method = 'POST'
+        self.url = url
+        self.headers = {'content-type': 'application/json'}
+        self.body = {'limit': 30}
+        self.timeout = timeout
+        self.signature_dir = signature_dir
+
+        if http_file:
+            method, template_url, headers, body = load_request_template(http_file)
+            self.method = method
+            self.headers.update(headers)
+            if body is not None:
+                self.body = body
+            self.url = self.url or template_url
+            self.signature_dir = signature_dir or os.path.dirname(os.path.abspath(http_file))
+        if not self.url:
+            raise ValueError('缺少请求地址: 需要 http_file 或 url')
+
+    @property
+    def initial_limit(self):
+        return int(self.body.get('limit', 30))
+
+    def fetch_page(self, limit, last_id, on_row):
+        """
+        请求一页，每个订单调用一次 on_row(row)；签名失效时抛出 SignatureExpired
+
+        Returns:
+            去掉订单后的响应（见 RowStreamParser.close）
+        """
+        body = dict(self.body, limit=limit)
+        body.pop('lastId', None)
+        if last_id:
+            body['lastId'] = last_id
+        headers = dict(self.headers)
+        if self.signature_dir:
+            headers.update(read_signature(self.signature_dir))
+        request = urllib.request.Request(
+            self.url, data=json.dumps(body, separators=(',', ':')).encode('utf-8'),
+            headers=headers, method=self.method,
+        )
+        try:
+            resp = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            raise_for_signature(e)
+        with resp:
+            chunks = iter(lambda: resp.read(STREAM_CHUNK_SIZE), b'')
+            if resp.headers.get('Content-Encoding') == 'gzip':
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                chunks = (decompressor.decompress(chunk) for chunk in chunks)
+            return stream_rows(chunks, RowStreamParser(), on_row)
+
+
+# ---------------------------------------------------------------------------
+# 本地模拟接口和基准测试
+# ---------------------------------------------------------------------------
+
+def _send_signature_error(handler):
+    body = json.dumps({'errCode': 'SIG.FAIL', 'errMsg': '签名校验失败'}).encode('utf-8')
+    handler.send_response(405)
+    handler.send_header('Content-Type', 'application/json; charset=utf-8')
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+
+def _mock_rows(order_count):
+    from sample_data import generate_raw_pages
+
+    rows = []
+    for page in generate_raw_pages(order_count // 30 + 1):
+        rows.extend(page['response']['data']['rowList'])
+    return rows[:order_count]
+
+
+def start_mock_listing_server(order_count=3000, latency=0.05, bandwidth=10.0, port=0,
+                              max_limit=None, truncate_above=None, slow_requests=(), slow_latency=0.0):
+    """
+    本地模拟订单列表接口：按请求体的 lastId/limit 分页返回模拟订单
+
+    Args:
+        latency: 每个请求开始返回前的等待秒数
+        bandwidth: 返回响应的速度（MB/秒），按块限速发送以模拟网络传输
+        max_limit: 服务器允许的最大limit，超过时不报错、只返回这么多个订单
+        truncate_above: limit 超过这个值时只发送一半响应就断开连接
+        slow_requests: 这些序号（从1开始）的请求额外等待 slow_latency 秒，模拟偶尔变慢的页面
+
+    server.valid_signs 非空时，x-request-sign 不在其中的请求返回签名失效
+
+    Returns:
+        (server, url)
+    """
+    rows = _mock_rows(order_count)
+    index_by_id = {row['orderInfo']['orderId']: index for index, row in enumerate(rows)}
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if server.valid_signs and self.headers.get('x-request-sign') not in server.valid_signs:
+                _send_signature_error(self)
+                return
+            with server.lock:
+                server.request_count += 1
+                request_number = server.request_count
+            limit = int(request.get('limit', 30))
+            truncated = truncate_above is not None and limit > truncate_above
+            if max_limit:
+                limit = min(limit, max_limit)
+            start = index_by_id[request['lastId']] + 1 if request.get('lastId') in index_by_id else 0
+            body = json.dumps({'code': 0, 'message': '', 'data': {'rowList': rows[start:start + limit]}},
+                              ensure_ascii=False).encode('utf-8')
+            time.sleep(latency + (slow_latency if request_number in slow_requests else 0))
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            chunk_seconds = STREAM_CHUNK_SIZE / (bandwidth * 1024 * 1024) if bandwidth else 0
+            end = len(body) // 2 if truncated else len(body)
+            try:
+                for offset in range(0, end, STREAM_CHUNK_SIZE):
+                    self.wfile.write(body[offset:min(offset + STREAM_CHUNK_SIZE, end)])
+                    self.wfile.flush()
+                    if chunk_seconds:
+                        time.sleep(chunk_seconds)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            if truncated:
+                self.close_connection = True
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockHandler)
+    server.daemon_threads = True
+    server.valid_signs = set()
+    server.lock = threading.Lock()
+    server.request_count = 0
+    # 模拟订单状态变化时直接修改其中的订单
+    server.rows = rows
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/order-web/user/v3/load-order-list'
+
+
+def _post(url, limit, last_id):
+    body = {'limit': limit}
+    if last_id:
+        body['lastId'] = last_id
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    return urllib.request.urlopen(request, timeout=60)
+
+
+def _crawl_buffered(url, limit, writer, page_peaks):
+    """原来的做法：读完整页 -> 整体解析 -> 写归档 -> 再遍历rowList提取ID"""
+    order_ids = []
+    last_id = None
+    page = 1
+    while True:
+        if page_peaks is not None:
+            tracemalloc.reset_peak()
+        with _post(url, limit, last_id) as resp:
+            response_json = json.loads(resp.read())
+        writer.write_page({'page': page, 'timestamp': '', 'response': response_json})
+        page_ids = [row['orderInfo']['orderId'] for row in response_json['data']['rowList']]
+        del response_json
+        if page_peaks is not None:
+            page_peaks.append(tracemalloc.get_traced_memory()[1])
+        order_ids.extend(page_ids)
+        if len(page_ids) < limit:
+            return order_ids
+        last_id = page_ids[-1]
+        page += 1
+
+
+def _crawl_streaming(url, limit, writer, page_peaks):
+    """流式解析：订单逐个写入缓冲并提取ID"""
+    order_ids = []
+    last_id = None
+    page = 1
+    while True:
+        if page_peaks is not None:
+            tracemalloc.reset_peak()
+        page_ids = []
+        parser = RowStreamParser()
+        with PageSpool() as spool, _post(url, limit, last_id) as resp:
+            def on_row(row):
+                spool.add_row(row)
+                page_ids.append(row_order_id(row))
+
+            envelope = stream_rows(iter(lambda: resp.read(STREAM_CHUNK_SIZE), b''), parser, on_row)
+            writer.write_spooled_page({'page': page, 'timestamp': '', 'response': envelope}, spool)
+        if page_peaks is not None:
+            page_peaks.append(tracemalloc.get_traced_memory()[1])
+        order_ids.extend(page_ids)
+        if len(page_ids) < limit:
+            return order_ids
+        last_id = page_ids[-1]
+        page += 1
+
+
+def run_benchmark(order_count, limit, latency, bandwidth):
+    """用模拟接口对比整页解析和流式解析的抓取耗时与每页内存峰值"""
+    server, url = start_mock_listing_server(order_count, latency, bandwidth)
+    print(f"📊 {order_count} 个订单, 每页 {limit} 个, 模拟接口延迟 {latency * 1000:.0f} ms, "
+          f"带宽 {bandwidth:g} MB/秒")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = {}
+            for name, crawl in (('整页解析', _crawl_buffered), ('流式解析', _crawl_streaming)):
+                archive_path = os.path.join(tmp_dir, f'{crawl.__name__}.ndjson.gz')
+                with ArchiveWriter(archive_path) as writer:
+                    start = time.perf_counter()
+                    order_ids = crawl(url, limit, writer, None)
+                    elapsed = time.perf_counter() - start
+                    writer.close()
+
+                # 内存单独再跑一遍，tracemalloc 会拖慢解析
+                page_peaks = []
+                tracemalloc.start()
+                try:
+                    with ArchiveWriter(os.path.join(tmp_dir, 'memory.ndjson.gz')) as writer:
+                        crawl(url, limit, writer, page_peaks)
+                        writer.close()
+                finally:
+                    tracemalloc.stop()
+
+                from raw_archive import iter_page_records
+                archived = [row_order_id(row) for record in iter_page_records(archive_path)
+                            for row in record['response']['data']['rowList']]
+                results[name] = archived
+                print(f"   {name}: {elapsed:.2f} 秒 ({len(order_ids) / elapsed:,.0f} 单/秒), "
+                      f"每页内存峰值 {max(page_peaks) / 1024 / 1024:.1f} MB, 归档 {len(archived)} 个订单")
+            same = results['整页解析'] == results['流式解析']
+            print(f"   两种方式归档的订单{'一致 ✅' if same else '不一致 ❌'}")
+    finally:
+        server.shutdown()
+
+
+def _post_via(transport, url, limit, last_id):
+    """经过 http_cassette.Transport 发送（录制或回放），返回响应体"""
+    body = {'limit': limit}
+    if last_id:
+        body['lastId'] = last_id
+    resp = transport.request('POST', url, {'Content-Type': 'application/json'}, json.dumps(body), timeout=60)
+    if resp.status_code != 200:
+        raise ValueError(f"状态码 {resp.status_code}")
+    return resp.content
+
+
+def _crawl_adaptive(url, tuner, transport=None):
+    """
+    按 PageSizeTuner 调整limit抓取全部订单，返回 (orderId列表, 是否完整)
+
+    transport 为 http_cassette.Transport 时经过它录制/回放；回放时与 http_req_v2.crawl 一样按录制时的limit请求
+    """
+    order_ids = []
+    last_id = None
+    while True:
+        requested = tuner.limit
+        if transport is not None and transport.replaying:
+            requested = transport.recorded_limit('POST', url, json.dumps({'lastId': last_id} if last_id else {})) \
+                or requested
+        page_ids = []
+        parser = RowStreamParser()
+        start = time.perf_counter()
+        try:
+            if transport is None:
+                with _post(url, requested, last_id) as resp:
+                    stream_rows(iter(lambda: resp.read(STREAM_CHUNK_SIZE), b''), parser,
+                                lambda row: page_ids.append(row_order_id(row)))
+            else:
+                stream_rows([_post_via(transport, url, requested, last_id)], parser,
+                            lambda row: page_ids.append(row_order_id(row)))
+        except (OSError, http.client.HTTPException, ValueError):
+            if tuner.record_error(requested):
+                continue
+            return order_ids, False
+        order_ids.extend(page_ids)
+        if tuner.record_page(requested, len(page_ids), time.perf_counter() - start):
+            return order_ids, True
+        last_id = page_ids[-1]
+
+
+def run_page_size_benchmark(order_count, initial_limit, max_limit, latency, bandwidth):
+    """对比固定limit和自适应limit抓取全部订单所需的请求数和速度"""
+    scenarios = [
+        ('固定limit', {}, initial_limit),
+        ('自适应', {}, max_limit),
+        ('自适应, 服务器上限200', {'max_limit': 200}, max_limit),
+        ('自适应, 超过300断开', {'truncate_above': 300}, max_limit),
+    ]
+    print(f"📊 {order_count} 个订单, 初始limit {initial_limit}, 自适应上限 {max_limit}, "
+          f"模拟接口延迟 {latency * 1000:.0f} ms, 带宽 {bandwidth:g} MB/秒")
+    expected = [row['orderInfo']['orderId'] for row in _mock_rows(order_count)]
+    for name, server_options, tuner_max in scenarios:
+        server, url = start_mock_listing_server(order_count, latency, bandwidth, **server_options)
+        try:
+            tuner = PageSizeTuner(initial_limit, tuner_max)
+            start = time.perf_counter()
+            order_ids, completed = _crawl_adaptive(url, tuner)
+            elapsed = time.perf_counter() - start
+        finally:
+            server.shutdown()
+        ok = completed and order_ids == expected
+        print(f"   {'✅' if ok else '❌'} {name:<22} 请求 {tuner.requests:>4} 次 (失败 {tuner.errors}), "
+              f"{elapsed:6.2f} 秒, {len(order_ids) / elapsed:7,.0f} 单/秒, 最大一页 {tuner.largest_page} 个")
+
+
+def run_replay_check(order_count, initial_limit, max_limit, latency, target_seconds):
+    """
+    录制一次自适应抓取（其中两页变慢，limit 被减半），再从 cassette 回放，比较两次得到的订单
+
+    回放以磁盘速度返回，PageSizeTuner 会算出与录制时不同的limit；回放必须按录制时的limit判断最后一页
+    """
+    try:
+        import requests  # noqa: F401
+    except ImportError:
+        print("❌ 录制需要 requests（pip install requests）")
+        return
+    from http_cassette import Transport
+
+    server, url = start_mock_listing_server(order_count, latency, 0, slow_requests=(3, 6),
+                                            slow_latency=target_seconds * 2)
+    print(f"📊 {order_count} 个订单, 初始limit {initial_limit}, 上限 {max_limit}, 每页目标 {target_seconds:g} 秒, "
+          f"第3、6个请求变慢")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'replay_check.db')
+            results = {}
+            for mode in ('record', 'replay'):
+                transport = Transport(path, mode)
+                try:
+                    tuner = PageSizeTuner(initial_limit, max_limit, target_seconds)
+                    start = time.perf_counter()
+                    order_ids, completed = _crawl_adaptive(url, tuner, transport)
+                    elapsed = time.perf_counter() - start
+                    print(f"   {mode:<7} {len(order_ids):>6} 个订单, 请求 {tuner.requests} 次, "
+                          f"{'完整' if completed else '未完成'}, {elapsed:.2f} 秒; {transport.summary()}")
+                finally:
+                    transport.close()
+                results[mode] = (order_ids, completed)
+    finally:
+        server.shutdown()
+    expected = [row['orderInfo']['orderId'] for row in _mock_rows(order_count)]
+    ok = results['record'] == results['replay'] == (expected, True)
+    print(f"   {'✅ 回放与录制的订单一致' if ok else '❌ 回放与录制的订单不一致'}")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='订单列表接口工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    mock_parser = subparsers.add_parser('mock', help='启动模拟订单列表接口')
+    mock_parser.add_argument('--orders', type=int, default=3000)
+    mock_parser.add_argument('--latency', type=float, default=0.05, help='每个请求的延迟秒数')
+    mock_parser.add_argument('--bandwidth', type=float, default=10.0, help='响应速度 MB/秒，0表示不限速')
+    mock_parser.add_argument('--port', type=int, default=8780)
+    mock_parser.add_argument('--max-limit', type=int, help='服务器允许的最大limit')
+    mock_parser.add_argument('--truncate-above', type=int, help='limit超过这个值时响应中途断开')
+
+    bench_parser = subparsers.add_parser('bench', help='对比整页解析和流式解析')
+    bench_parser.add_argument('--orders', type=int, default=6000)
+    bench_parser.add_argument('--limit', type=int, default=500, help='每页订单数')
+    bench_parser.add_argument('--latency', type=float, default=0.05)
+    bench_parser.add_argument('--bandwidth', type=float, default=10.0)
+
+    page_size_parser = subparsers.add_parser('bench-page-size', help='对比固定limit和自适应limit')
+    page_size_parser.add_argument('--orders', type=int, default=6000)
+    page_size_parser.add_argument('--limit', type=int, default=30, help='初始limit')
+    page_size_parser.add_argument('--max-limit', type=int, default=500)
+    page_size_parser.add_argument('--latency', type=float, default=0.3)
+    page_size_parser.add_argument('--bandwidth', type=float, default=2.0)
+
+    replay_parser = subparsers.add_parser('check-replay', help='录制一次自适应抓取再回放，检查订单数一致')
+    replay_parser.add_argument('--orders', type=int, default=1000)
+    replay_parser.add_argument('--limit', type=int, default=30, help='初始limit')
+    replay_parser.add_argument('--max-limit', type=int, default=200)
+    replay_parser.add_argument('--latency', type=float, default=0.02)
+    replay_parser.add_argument('--target-seconds', type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'mock':
+        server, url = start_mock_listing_server(args.orders, args.latency, args.bandwidth, args.port,
+                                                args.max_limit, args.truncate_above)
+        print(f"🚀 模拟订单列表接口: {url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("\n正在停止服务...")
+        finally:
+            server.shutdown()
+    elif args.command == 'bench':
+        run_benchmark(args.orders, args.limit, args.latency, args.bandwidth)
+    elif args.command == 'bench-page-size':
+        run_page_size_benchmark(args.orders, args.limit, args.max_limit, args.latency, args.bandwidth)
+    elif args.command == 'check-replay':
+        run_replay_check(args.orders, args.limit, args.max_limit, args.latency, args.target_seconds)
+
+
+if __name__ == '__main__':
+    main()
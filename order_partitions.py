@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按下单时间分区的订单数据
+optimize_orders.py --partition month 把订单按 createdAt 写入目录中的多个文件：
+
+    optimized_orders/
+        manifest.json      各分区的文件名、订单数、最早/最晚下单时间
+        2025-05.json       与 optimized_orders.json 相同的订单列表
+        2025-06.json
+        product_catalog.json   （--normalize 时，所有分区共用）
+
+export_to_excel.py 和 extract_status.py 指定 --from/--to 时只打开时间范围有交集的分区，
+一周的导出只读一两个文件，耗时不随历史数据增长
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MANIFEST_FILE = 'manifest.json'
+
+# 分区粒度 -> 分区名格式（按本地时间，与导出的下单日期一致）
+PARTITION_FORMATS = {
+    'day': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
+
+# createdAt 缺失或无法解析的订单
+UNKNOWN_PARTITION = 'unknown'
+
+# --from/--to 可用的时间格式及只写到这一级时 --to 包含的范围
+TIME_FORMATS = (
+    ('%Y-%m-%d %H:%M:%S', timedelta(seconds=1)),
+    ('%Y-%m-%d %H:%M', timedelta(minutes=1)),
+    ('%Y-%m-%d', timedelta(days=1)),
+)
+
+
+def order_created_at(order):
+    """订单的下单时间戳，无法解析时返回None"""
+    try:
+        return int(order['orderInfo']['createdAt'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _partition_key(order, time_format):
+    created_at = order_created_at(order)
+    if created_at is None:
+        return UNKNOWN_PARTITION
+    try:
+        return datetime.fromtimestamp(created_at).strftime(time_format)
+    except (OverflowError, OSError, ValueError):
+        return UNKNOWN_PARTITION
+
+
+def _parse_time(value, end):
+    value = value.strip()
+    for time_format, span in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        return int((parsed + span if end else parsed).timestamp())
+    try:
+        # 只写到月份: 2025-06
+        parsed = datetime.strptime(value, '%Y-%m')
+    except ValueError:
+        raise ValueError(f"无法识别的时间 {value!r}，请使用 2025-06-01 或 2025-06-01 08:00:00") from None
+    if end:
+        parsed = (parsed + timedelta(days=32)).replace(day=1)
+    return int(parsed.timestamp())
+
+
+def parse_time_range(date_from=None, date_to=None):
+    """
+    把 --from/--to 转换为时间戳区间 [start, end)
+
+    --to 只写日期时包含当天全天，只写月份时包含整月；未指定的一端为None
+    """
+    start = _parse_time(date_from, end=False) if date_from else None
+    end = _parse_time(date_to, end=True) if date_to else None
+    if start is not None and end is not None and start >= end:
+        raise ValueError(f"时间范围为空: {date_from} ~ {date_to}")
+    return start, end
+
+
+def in_range(created_at, start, end):
+    """下单时间是否在 [start, end) 内；不限时间时包括无法解析时间的订单"""
+    if start is None and end is None:
+        return True
+    if created_at is None:
+        return False
+    return (start is None or created_at >= start) and (end is None or created_at < end)
+
+
+def manifest_path(path):
+    """分区目录（或直接指定的manifest.json）对应的manifest文件路径"""
+    if os.path.basename(path) == MANIFEST_FILE:
+        return path
+    return os.path.join(path, MANIFEST_FILE)
+
+
+def is_partitioned(path):
+    """path 是否为分区目录"""
+    return os.path.isfile(manifest_path(path))
+
+
+def resolve_orders_path(path):
+    """
+    默认的 optimized_orders.json 不存在、但同名分区目录（optimized_orders/）存在时使用分区目录，
+    其他情况原样返回
+    """
+    if not os.path.exists(path) and path.endswith('.json') and is_partitioned(path[:-len('.json')]):
+        return path[:-len('.json')]
+    return path
+
+
+def partition_dir_for(output_file):
+    """optimize 的输出文件名对应的分区目录: optimized_orders.json -> optimized_orders"""
+    return output_file[:-len('.json')] if output_file.endswith('.json') else output_file
+
+
+def load_manifest(path):
+    with open(manifest_path(path), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_partitions(orders, output_dir, granularity='month', normalize=False, indent=2):
+    """
+    按下单时间把订单写入分区目录，最后写manifest
+
+    目录中上一次写入、这次已不存在的分区文件会被删除，其他文件不动
+
+    Returns:
+        manifest 字典；normalize 时另外写入共用的 product_catalog.json
+    """
+    time_format = PARTITION_FORMATS[granularity]
+    os.makedirs(output_dir, exist_ok=True)
+    previous_files = set()
+    if is_partitioned(output_dir):
+        previous_files = {entry['file'] for entry in load_manifest(output_dir)['partitions']}
+
+    catalog = None
+    if normalize:
+        from product_catalog import normalize_orders
+
+        orders, catalog = normalize_orders(orders)
+
+    partitions = {}
+    for order in orders:
+        partitions.setdefault(_partition_key(order, time_format), []).append(order)
+
+    entries = []
+    for key in sorted(partitions):
+        partition_orders = partitions[key]
+        file_name = f'{key}.json'
+        with open(os.path.join(output_dir, file_name), 'w', encoding='utf-8') as f:
+            json.dump(partition_orders, f, ensure_ascii=False, indent=indent)
+        timestamps = [order_created_at(order) for order in partition_orders]
+        timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+        entries.append({
+            'key': key,
+            'file': file_name,
+            'count': len(partition_orders),
+            'minCreatedAt': min(timestamps) if timestamps else None,
+            'maxCreatedAt': max(timestamps) if timestamps else None,
+        })
+
+    if catalog is not None:
+        from product_catalog import DEFAULT_CATALOG_FILE
+
+        with open(os.path.join(output_dir, DEFAULT_CATALOG_FILE), 'w', encoding='utf-8') as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=indent)
+
+    manifest = {
+        'granularity': granularity,
+        'normalized': bool(normalize),
+        'total_orders': sum(entry['count'] for entry in entries),
+        'generated_at': int(time.time()),
+        'partitions': entries,
+    }
+    # manifest 写入临时文件后替换，读取方不会读到写了一半的manifest
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(output_dir))
+
+    for stale in previous_files - {entry['file'] for entry in entries}:
+        stale_path = os.path.join(output_dir, stale)
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+    if catalog is not None:
+        manifest['product_count'] = len(catalog)
+    return manifest
+
+
+def select_partitions(manifest, start=None, end=None):
+    """与时间范围 [start, end) 有交集的分区"""
+    selected = []
+    for entry in manifest['partitions']:
+        if start is None and end is None:
+            selected.append(entry)
+        elif entry['minCreatedAt'] is None:
+            continue
+        elif (start is None or entry['maxCreatedAt'] >= start) and (end is None or entry['minCreatedAt'] < end):
+            selected.append(entry)
+    return selected
+
+
+def load_orders(path, date_from=None, date_to=None, verbose=True):
+    """
+    读取订单列表，可以是 optimized_orders.json 或分区目录
+
+    分区目录只打开时间范围有交集的分区；单个文件全部读取后按时间过滤。
+    date_from/date_to 为 --from/--to 的原始字符串，格式见 parse_time_range
+    """
+    start, end = parse_time_range(date_from, date_to)
+    path = resolve_orders_path(path)
+
+    if not is_partitioned(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            orders = json.load(f)
+        if start is None and end is None:
+            return orders
+        return [order for order in orders if in_range(order_created_at(order), start, end)]
+
+    manifest = load_manifest(path)
+    selected = select_partitions(manifest, start, end)
+    if verbose:
+        print(f"📂 按时间分区读取: 打开 {len(selected)}/{len(manifest['partitions'])} 个分区"
+              f"（{sum(entry['count'] for entry in selected)}/{manifest['total_orders']} 个订单）")
+    directory = os.path.dirname(manifest_path(path))
+    orders = []
+    for entry in selected:
+        with open(os.path.join(directory, entry['file']), 'r', encoding='utf-8') as f:
+            partition_orders = json.load(f)
+        # 分区完全落在范围内时不需要逐个检查（不限时间时才会选中 unknown 分区）
+        if (start is None or (entry['minCreatedAt'] or 0) >= start) and (end is None or entry['maxCreatedAt'] < end):
+            orders.extend(partition_orders)
+        else:
+            orders.extend(order for order in partition_orders if in_range(order_created_at(order), start, end))
+    return orders
+
+
+def iter_json_array(path, chunk_size=1024 * 1024):
+    """
+    逐个返回JSON数组文件中的元素，只在内存中保留正在解析的一段，用于读取很大的订单文件
+
+    Raises:
+        ValueError: 文件不是JSON数组或内容不完整
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    expect_item = True
+    count = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                    pos += 1
+                if pos >= len(buffer):
+                    break
+                if not started:
+                    if buffer[pos] != '[':
+                        raise ValueError(f"{path} 不是JSON数组")
+                    started = True
+                    pos += 1
+                    continue
+                char = buffer[pos]
+                if char == ']' and (not expect_item or not count):
+                    return
+                if char == ',' and not expect_item:
+                    expect_item = True
+                    pos += 1
+                    continue
+                if not expect_item:
+                    raise ValueError(f"{path} 格式错误: {buffer[pos:pos + 20]!r}")
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # 元素还没有读完整，读下一段
+                    if not chunk:
+                        raise ValueError(f"{path} 内容不完整")
+                    break
+                yield item
+                count += 1
+                expect_item = False
+                pos = end
+            if not chunk:
+                raise ValueError(f"{path} 内容不完整，数组未结束")
+
+
+def order_files(path, start=None, end=None, verbose=True):
+    """
+    需要读取的订单文件：单个文件时就是它本身，分区目录时是与 [start, end) 有交集的分区文件
+    （start/end 为 parse_time_range 返回的时间戳，文件中的订单仍需按时间过滤）
+    """
+    path = resolve_orders_path(path)
+    if not is_partitioned(path):
+        return [path]
+    manifest = load_manifest(path)
+    selected = select_partitions(manifest, start, end)
+    if verbose:
+        print(f"📂 按时间分区读取: 打开 {len(selected)}/{len(manifest['partitions'])} 个分区"
+              f"（{sum(entry['count'] for entry in selected)}/{manifest['total_orders']} 个订单）")
+    directory = os.path.dirname(manifest_path(path))
+    return [os.path.join(directory, entry['file']) for entry in selected]
+
+
+def iter_orders(path, date_from=None, date_to=None, verbose=True):
+    """
+    与 load_orders 相同，但逐个返回订单：单个文件边读边解析，分区目录逐个分区读取，内存不随订单数增长
+    """
+    start, end = parse_time_range(date_from, date_to)
+    for file_path in order_files(path, start, end, verbose):
+        for order in iter_json_array(file_path):
+            if (start is None and end is None) or in_range(order_created_at(order), start, end):
+                yield order
+
+
+def catalog_orders_file(path):
+    """商品目录按订单文件所在目录查找；分区目录的商品目录在目录内部"""
+    path = resolve_orders_path(path)
+    return manifest_path(path) if is_partitioned(path) else path
+
+
+def show_manifest(path):
+    manifest = load_manifest(path)
+    print(f"📂 {path}: 按{'天' if manifest['granularity'] == 'day' else '月'}分区, "
+          f"{len(manifest['partitions'])} 个分区, {manifest['total_orders']} 个订单")
+    directory = os.path.dirname(manifest_path(path))
+    for entry in manifest['partitions']:
+        first = datetime.fromtimestamp(entry['minCreatedAt']).strftime('%Y-%m-%d %H:%M') if entry['minCreatedAt'] else '-'
+        last = datetime.fromtimestamp(entry['maxCreatedAt']).strftime('%Y-%m-%d %H:%M') if entry['maxCreatedAt'] else '-'
+        size = os.path.getsize(os.path.join(directory, entry['file']))
+        print(f"   {entry['key']:<12} {entry['count']:>7} 个订单  {first} ~ {last}  {size / 1024 / 1024:.1f}MB")
+
+
+def _history_orders(months, per_day):
+    """模拟 months 个月、每天 per_day 个订单的历史数据，最后一个订单在 2025-01-01 之后 months 个月"""
+    from sample_data import START_TIMESTAMP, generate_orders
+
+    count = int(months * 30 * per_day)
+    spacing = 86400 / per_day
+    orders = []
+    for index, order in enumerate(generate_orders(count)):
+        order['orderInfo']['createdAt'] = str(START_TIMESTAMP + int(index * spacing))
+        orders.append(order)
+    return orders
+
+
+def run_benchmark(month_counts, per_day, granularity):
+    """历史数据增长时，读取最近一周订单的耗时：单个文件 vs 分区目录"""
+    print(f"📊 每天 {per_day} 个订单，按{'天' if granularity == 'day' else '月'}分区，读取最后一周（导出/状态统计的读取部分）")
+    print(f"   {'历史':>6} {'订单数':>8} {'单文件':>9} {'分区':>9} {'打开分区':>9}")
+    tmp_dir = tempfile.mkdtemp(prefix='partition_bench_')
+    try:
+        for months in month_counts:
+            orders = _history_orders(months, per_day)
+            single_file = os.path.join(tmp_dir, f'{months}.json')
+            with open(single_file, 'w', encoding='utf-8') as f:
+                json.dump(orders, f, ensure_ascii=False, indent=2)
+            partition_dir = os.path.join(tmp_dir, f'{months}')
+            manifest = write_partitions(orders, partition_dir, granularity)
+
+            last = datetime.fromtimestamp(order_created_at(orders[-1]))
+            date_to = last.strftime('%Y-%m-%d')
+            date_from = (last - timedelta(days=6)).strftime('%Y-%m-%d')
+            del orders
+
+            start = time.perf_counter()
+            single = load_orders(single_file, date_from, date_to, verbose=False)
+            single_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            partitioned = load_orders(partition_dir, date_from, date_to, verbose=False)
+            partition_seconds = time.perf_counter() - start
+            opened = len(select_partitions(manifest, *parse_time_range(date_from, date_to)))
+
+            same = [o['orderInfo']['orderId'] for o in single] == [o['orderInfo']['orderId'] for o in partitioned]
+            print(f"   {months:>4}月 {manifest['total_orders']:>8} {single_seconds:>8.2f}s {partition_seconds:>8.3f}s "
+                  f"{opened:>4}/{len(manifest['partitions']):<4} {'✅' if same else '❌ 结果不一致'} ({len(single)} 个订单)")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='按下单时间分区的订单数据')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show_parser = subparsers.add_parser('show', help='查看分区目录的manifest')
+    show_parser.add_argument('directory', nargs='?', default='optimized_orders')
+
+    split_parser = subparsers.add_parser('split', help='把已有的 optimized_orders.json 写成分区目录')
+    split_parser.add_argument('input_file', nargs='?', default='optimized_orders.json')
+    split_parser.add_argument('-o', '--output-dir', help='默认为输入文件名去掉 .json')
+    split_parser.add_argument('--partition', choices=list(PARTITION_FORMATS), default='month')
+
+    bench_parser = subparsers.add_parser('bench', help='历史数据增长时一周订单的读取耗时')
+    bench_parser.add_argument('--months', type=int, nargs='+', default=[3, 12, 24])
+    bench_parser.add_argument('--per-day', type=int, default=300)
+    bench_parser.add_argument('--partition', choices=list(PARTITION_FORMATS), default='month')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'show':
+        if not is_partitioned(args.directory):
+            print(f"❌ 错误: {args.directory} 不是分区目录（找不到 {MANIFEST_FILE}）")
+            return
+        show_manifest(args.directory)
+    elif args.command == 'split':
+        if not os.path.exists(args.input_file):
+            print(f"❌ 错误: 找不到文件 {args.input_file}")
+            return
+        output_dir = args.output_dir or partition_dir_for(args.input_file)
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            orders = json.load(f)
+        if any('ref' in product for order in orders[:100] for product in order.get('products', [])):
+            print("❌ 错误: 输入是规范化的订单文件，请用 optimize_orders.py --partition --normalize 重新生成")
+            return
+        write_partitions(orders, output_dir, args.partition)
+        show_manifest(output_dir)
+    elif args.command == 'bench':
+        run_benchmark(args.months, args.per_day, args.partition)
+
+
+if __name__ == '__main__':
+    main()
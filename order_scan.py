@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+只读取订单号/状态的快速扫描
+exact_orderid.py 和 extract_status.py 只需要每个订单 orderInfo 中的几个字段，
+完整解析时大部分时间花在商品、规格数组上。这里按三级处理：
+
+1. 要取的字段正好是 orderInfo 开头的几个键（optimize_orders.py 输出的顺序是 orderId, status, createdAt）、
+   值是字符串/数字或不含嵌套的对象时，直接用正则在字节上提取，不解码整个文档，只解析取到的值
+2. 否则逐个找到 "orderInfo" 对象，只用 json 解析这个对象（几百字节），跳过 products 等其他部分
+3. 前两级的结果都要通过校验：提取的订单数必须等于 "orderInfo" 在文档中出现的次数，
+   对象必须能解析；不通过时进入下一级，最后完整解析整个文档
+
+JSON字符串中的引号一定是转义的，"orderInfo": 这样的字节序列只会是对象的键，不会出现在字符串值中。
+支持的文档结构：订单列表（optimized_orders.json 及分区文件）、接口响应 {"data": {"rowList": [...]}}
+以及 http_req_v2.py 保存的分页记录列表 [{"response": {"data": {"rowList": [...]}}}]
+
+    python order_scan.py bench --size-mb 22
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+import tempfile
+import time
+
+# 1级：字段值可以是没有转义字符的字符串、数字、true/false/null 或不含嵌套的对象
+LEADING_VALUE = rb'("[^"\\]*"|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null|\{[^{}]*\})'
+
+# 2级：orderInfo 对象的开始位置（解码后的文本）
+ORDER_INFO_PATTERN = re.compile(r'"orderInfo"\s*:\s*(?=\{)')
+
+ORDER_INFO_KEY = b'"orderInfo"'
+
+
+class ScanError(ValueError):
+    """快速扫描的结果未通过校验，需要完整解析"""
+
+
+def _as_bytes(data):
+    return data.encode('utf-8') if isinstance(data, str) else data
+
+
+def _as_text(data):
+    return data.decode('utf-8') if isinstance(data, (bytes, bytearray)) else data
+
+
+def iter_document_rows(document):
+    """完整解析后的文档中的订单（支持的结构见模块说明）"""
+    if isinstance(document, dict):
+        data = document.get('data')
+        if isinstance(data, dict) and isinstance(data.get('rowList'), list):
+            yield from data['rowList']
+        elif isinstance(document.get('response'), dict):
+            yield from iter_document_rows(document['response'])
+        return
+    if isinstance(document, list):
+        for item in document:
+            if isinstance(item, dict) and 'orderInfo' in item:
+                yield item
+            elif isinstance(item, dict):
+                yield from iter_document_rows(item)
+
+
+def _pick(order_info, field):
+    """按 a.b 路径取 orderInfo 中的字段，没有时返回None"""
+    value = order_info
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def order_ids_from_document(document):
+    """完整解析后的文档中的全部orderId"""
+    order_ids = []
+    for row in iter_document_rows(document):
+        order_info = row.get('orderInfo') if isinstance(row, dict) else None
+        if isinstance(order_info, dict) and 'orderId' in order_info:
+            order_ids.append(order_info['orderId'])
+    return order_ids
+
+
+@functools.lru_cache(maxsize=16)
+def _leading_pattern(keys):
+    """orderInfo 以 keys 依次开头时匹配的正则，每个键的值一个分组"""
+    parts = [rb'"orderInfo"\s*:\s*\{\s*']
+    for index, key in enumerate(keys):
+        if index:
+            parts.append(rb'\s*,\s*')
+        parts.append(b'"' + re.escape(key.encode('utf-8')) + rb'"\s*:\s*' + LEADING_VALUE)
+    return re.compile(b''.join(parts))
+
+
+def _leading_value(raw):
+    if raw[:1] == b'"':
+        return raw[1:-1].decode('utf-8')
+    return json.loads(raw)
+
+
+def _scan_leading(data, keys):
+    """1级：正则直接提取 orderInfo 开头的键，数量与 "orderInfo" 出现次数不一致时抛出 ScanError"""
+    pattern = _leading_pattern(keys)
+    if len(keys) == 1:
+        order_infos = [{keys[0]: _leading_value(raw)} for raw in pattern.findall(data)]
+    else:
+        order_infos = [dict(zip(keys, map(_leading_value, values))) for values in pattern.findall(data)]
+    expected = data.count(ORDER_INFO_KEY)
+    if len(order_infos) != expected:
+        raise ScanError(f"orderInfo 不都以 {', '.join(keys)} 开头（{len(order_infos)}/{expected}）")
+    return order_infos
+
+
+def _scan_order_infos(text):
+    """2级：逐个解析 orderInfo 对象"""
+    decoder = json.JSONDecoder()
+    order_infos = []
+    for match in ORDER_INFO_PATTERN.finditer(text):
+        try:
+            order_info, _ = decoder.raw_decode(text, match.end())
+        except json.JSONDecodeError as e:
+            raise ScanError(f"orderInfo 解析失败: {e}") from e
+        order_infos.append(order_info)
+    expected = text.count('"orderInfo"')
+    if len(order_infos) != expected:
+        raise ScanError(f"\"orderInfo\" 不都是对象（{len(order_infos)}/{expected}）")
+    return order_infos
+
+
+def scan_order_infos(data, keys, stats=None):
+    """
+    每个订单的 orderInfo（1级只包含 keys，2级和完整解析时是整个 orderInfo）
+
+    Args:
+        data: 文档的 bytes 或 str
+        keys: 需要的 orderInfo 顶层键，如 ('orderId', 'status', 'createdAt')
+        stats: 传入字典时累计各级处理的文档数 fast / partial / full
+
+    Raises:
+        ValueError: 完整解析也失败（文档不是合法JSON）
+    """
+    stats = stats if stats is not None else {}
+    try:
+        order_infos = _scan_leading(_as_bytes(data), tuple(keys))
+        stats['fast'] = stats.get('fast', 0) + 1
+        return order_infos
+    except (ScanError, ValueError):
+        pass
+    text = _as_text(data)
+    try:
+        order_infos = _scan_order_infos(text)
+        stats['partial'] = stats.get('partial', 0) + 1
+        return order_infos
+    except ScanError:
+        pass
+    stats['full'] = stats.get('full', 0) + 1
+    return [row.get('orderInfo') for row in iter_document_rows(json.loads(text)) if isinstance(row, dict)]
+
+
+def scan_order_ids(data, stats=None):
+    """提取文档中全部订单的orderId（按文档中的顺序），参数同 scan_order_infos"""
+    return [info['orderId'] for info in scan_order_infos(data, ('orderId',), stats)
+            if isinstance(info, dict) and 'orderId' in info]
+
+
+def scan_order_fields(data, fields, stats=None):
+    """
+    提取文档中每个订单 orderInfo 的指定字段
+
+    Args:
+        data: 文档的 bytes 或 str
+        fields: orderInfo 中的字段路径，如 ('orderId', 'status', 'createdAt')、'status.name'
+        stats: 同 scan_order_infos
+
+    Returns:
+        [(字段值, ...)]，每个订单一个元组，缺少的字段为None
+    """
+    keys = tuple(dict.fromkeys(field.split('.', 1)[0] for field in fields))
+    return [tuple(_pick(info, field) for field in fields)
+            for info in scan_order_infos(data, keys, stats) if isinstance(info, dict)]
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _timed(func, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_benchmark(size_mb):
+    """
+    生成约 size_mb 的 optimized_orders.json（indent=2）和接口分页记录文件，对比 json.load 与快速扫描
+    """
+    from sample_data import generate_orders, generate_raw_pages
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 按样本估算达到目标大小需要的订单数
+        sample = list(generate_orders(200))
+        per_order = len(json.dumps(sample, ensure_ascii=False, indent=2).encode('utf-8')) / len(sample)
+        order_count = int(size_mb * 1024 * 1024 / per_order)
+
+        optimized_file = os.path.join(tmp, 'optimized_orders.json')
+        with open(optimized_file, 'w', encoding='utf-8') as f:
+            json.dump(list(generate_orders(order_count)), f, ensure_ascii=False, indent=2)
+        pages_file = os.path.join(tmp, 'http_req_v2_pages.json')
+        with open(pages_file, 'w', encoding='utf-8') as f:
+            json.dump(list(generate_raw_pages(max(order_count // 30, 1))), f, ensure_ascii=False)
+        # orderId 不是第一个键时走2级
+        shuffled_file = os.path.join(tmp, 'reordered.json')
+        with open(optimized_file, 'r', encoding='utf-8') as f:
+            orders = json.load(f)
+        for order in orders:
+            info = order['orderInfo']
+            order['orderInfo'] = dict([('status', info['status'])] + list(info.items()))
+        with open(shuffled_file, 'w', encoding='utf-8') as f:
+            json.dump(orders, f, ensure_ascii=False, indent=2)
+        del orders
+
+        for label, path in (('optimized_orders.json', optimized_file), ('分页记录', pages_file),
+                            ('orderId 不在首位', shuffled_file)):
+            size = os.path.getsize(path) / 1024 / 1024
+            data = read_file(path)
+
+            def full_ids():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return order_ids_from_document(json.load(f))
+
+            def full_status():
+                with open(path, 'r', encoding='utf-8') as f:
+                    rows = iter_document_rows(json.load(f))
+                    return [(row['orderInfo'].get('orderId'), row['orderInfo'].get('status'),
+                             row['orderInfo'].get('createdAt')) for row in rows]
+
+            stats = {}
+            full_seconds, expected_ids = _timed(full_ids)
+            scan_seconds, order_ids = _timed(lambda: scan_order_ids(read_file(path), stats))
+            status_full_seconds, expected_fields = _timed(full_status)
+            status_scan_seconds, fields = _timed(
+                lambda: scan_order_fields(read_file(path), ('orderId', 'status', 'createdAt')))
+            path_used = '1级正则' if stats.get('fast') else ('2级逐个orderInfo' if stats.get('partial') else '完整解析')
+            print(f"📄 {label}: {size:.1f} MB，{len(expected_ids)} 个订单")
+            print(f"  orderId:            json.load {full_seconds * 1000:7.0f} ms  扫描 {scan_seconds * 1000:7.0f} ms"
+                  f"  {full_seconds / scan_seconds:5.1f}x  （{path_used}，结果{'一致' if order_ids == expected_ids else '不一致!'}）")
+            print(f"  orderId+状态+时间:  json.load {status_full_seconds * 1000:7.0f} ms  扫描 "
+                  f"{status_scan_seconds * 1000:7.0f} ms  {status_full_seconds / status_scan_seconds:5.1f}x  "
+                  f"（结果{'一致' if fields == expected_fields else '不一致!'}）")
+            del data
+
+        # 校验失败时回退到完整解析：orderId 带转义字符
+        tricky = json.dumps({'data': {'rowList': [{'orderInfo': {'orderId': 'a"b'}}, {'orderInfo': {'orderId': '2'}}]}})
+        stats = {}
+        assert scan_order_ids(tricky, stats) == ['a"b', '2'] and stats == {'partial': 1}
+        print("✅ 转义字符、字段顺序不同的文档回退到逐个解析，结果与 json.load 一致")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='订单号/状态快速扫描')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ids_parser = subparsers.add_parser('ids', help='输出文件中的全部orderId')
+    ids_parser.add_argument('json_file')
+
+    bench_parser = subparsers.add_parser('bench', help='与 json.load 对比耗时')
+    bench_parser.add_argument('--size-mb', type=float, default=22, help='生成的测试文件大小')
+
+    args = parser.parse_args(argv)
+    if args.command == 'bench':
+        run_benchmark(args.size_mb)
+        return
+    if not os.path.exists(args.json_file):
+        print(f"❌ 找不到文件 {args.json_file}")
+        return
+    for order_id in scan_order_ids(read_file(args.json_file)):
+        print(order_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,621 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单流式统计（可合并的概要数据结构）
+一次遍历订单流、只用固定大小的内存，回答“本月有多少不同的买家”“按件数排名前50的商品”
+“各状态 paidPrice 的 p90”这类问题，不需要把 optimized_orders.json 读进 pandas：
+
+- 不同买家数: HyperLogLog（2^14 个寄存器，16 KB）
+- 商品件数排名: Misra-Gries 频繁项（最多 2k 个计数器，与 Space-Saving 同类）
+- paidPrice 分位数: KLL（按状态各一个，k=200）
+
+每次抓取按下单月份把订单分桶，各桶的状态保存为 order_sketches/<抓取时间>.json.gz。
+查询时每个月份取最近一次抓取的桶（同一批订单不会重复计数），再把所选月份的桶合并，
+合并后的结果与一次性扫描全部订单的误差保证相同，不需要重新读取订单：
+
+    python order_sketches.py build optimized_orders.json
+    python order_sketches.py report --from 2025-06 --to 2025-06 --top 50
+
+误差保证：
+- HyperLogLog: 相对标准误差 1.04/sqrt(2^14) = 0.81%，约95%的情况误差在 ±1.6% 以内；
+  不同值少于 2.5*2^14 时改用线性计数，误差更小
+- 频繁项: 每个商品的件数落在 [下界, 下界 + offset] 内，offset <= 总件数/(k+1)；
+  件数超过 总件数/(k+1) 的商品一定在结果中
+- KLL: 归一化的排名误差约 1.65%（k=200，99%置信，DataSketches 给出的数值），
+  即估计的 p90 在真实数据中的排名落在 88.35% ~ 91.65% 之间；最小值、最大值精确
+基准测试（python order_sketches.py bench）与精确计算对比实测误差
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+from order_partitions import (
+    UNKNOWN_PARTITION, catalog_orders_file, iter_orders, order_created_at, resolve_orders_path,
+)
+from product_catalog import ProductCatalog, catalog_path_for
+
+DEFAULT_SKETCH_DIR = 'order_sketches'
+
+# HyperLogLog 寄存器数 2^HLL_PRECISION
+HLL_PRECISION = 14
+
+# 频繁项保留的商品数 k（计数器最多 2k 个）
+DEFAULT_TOP_K = 1000
+
+# KLL 顶层压缩器的容量
+DEFAULT_KLL_K = 200
+
+# 桶按下单月份划分（本地时间，与导出的下单日期一致）
+BUCKET_FORMAT = '%Y-%m'
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """不同值计数，合并为逐寄存器取最大值"""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m) if registers is None else registers
+        self._rest_bits = 64 - precision
+        self._rest_mask = (1 << self._rest_bits) - 1
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> self._rest_bits
+        rank = self._rest_bits - (h & self._rest_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"HyperLogLog 精度不同，无法合并: {self.precision} != {other.precision}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # 基数较小时用线性计数
+            return m * math.log(m / zeros)
+        return estimate
+
+    def relative_error(self):
+        """相对标准误差"""
+        return 1.04 / math.sqrt(self.m)
+
+    def to_dict(self):
+        return {'precision': self.precision,
+                'registers': base64.b64encode(zlib.compress(bytes(self.registers))).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['precision'], bytearray(zlib.decompress(base64.b64decode(data['registers']))))
+
+
+class FrequentItems:
+    """
+    Misra-Gries 频繁项（带权重），计数器超过 2k 个时减去第 k+1 大的计数并删掉不再为正的计数器
+
+    count 是真实值的下界，真实值不超过 count + offset，offset 即累计减去的量
+    """
+
+    def __init__(self, k=DEFAULT_TOP_K, counters=None, offset=0, total=0):
+        self.k = k
+        self.counters = counters or {}
+        self.offset = offset
+        self.total = total
+
+    def add(self, item, weight=1):
+        self.total += weight
+        self.counters[item] = self.counters.get(item, 0) + weight
+        if len(self.counters) > 2 * self.k:
+            self._purge()
+
+    def _purge(self):
+        values = sorted(self.counters.values(), reverse=True)
+        cut = values[self.k]
+        self.offset += cut
+        self.counters = {item: count - cut for item, count in self.counters.items() if count > cut}
+
+    def merge(self, other):
+        for item, count in other.counters.items():
+            self.counters[item] = self.counters.get(item, 0) + count
+        self.offset += other.offset
+        self.total += other.total
+        self.k = max(self.k, other.k)
+        if len(self.counters) > 2 * self.k:
+            self._purge()
+        return self
+
+    def top(self, n):
+        """前 n 个商品 [(商品, 下界, 上界)]"""
+        items = sorted(self.counters.items(), key=lambda item: (-item[1], item[0]))[:n]
+        return [(item, count, count + self.offset) for item, count in items]
+
+    def max_error(self):
+        """计数误差的上界"""
+        return self.offset
+
+    def to_dict(self):
+        return {'k': self.k, 'counters': self.counters, 'offset': self.offset, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['k'], dict(data['counters']), data['offset'], data['total'])
+
+
+class KllSketch:
+    """
+    KLL 分位数（Karnin-Lang-Liberty）
+
+    第 h 层的每个值代表 2^h 个原始值；某层满了就排序后隔一个保留一个（随机从第0或第1个开始）升到上一层。
+    越低的层容量越小（顶层 k，每往下一层乘 2/3），总大小约 3k
+    """
+
+    def __init__(self, k=DEFAULT_KLL_K):
+        self.k = k
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.levels = [[]]
+        self._size = 0
+        self._max_size = self._capacity_sum()
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _capacity_sum(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.n += 1
+        self._size += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        while self._size >= self._max_size:
+            for level, items in enumerate(self.levels):
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                    self._max_size = self._capacity_sum()
+                items.sort()
+                # 个数为奇数时最小的值留在本层
+                keep = items[:len(items) % 2]
+                promoted = items[len(keep) + random.getrandbits(1)::2]
+                self.levels[level + 1].extend(promoted)
+                self.levels[level] = keep
+                self._size = sum(map(len, self.levels))
+                break
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        self._size = sum(map(len, self.levels))
+        self._max_size = self._capacity_sum()
+        self._compress()
+        return self
+
+    def quantiles(self, fractions):
+        """各分位点的估计值（0 和 1 返回精确的最小、最大值）"""
+        if not self.n:
+            return [None for _ in fractions]
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for fraction in fractions:
+            if fraction <= 0:
+                results.append(self.min)
+                continue
+            if fraction >= 1:
+                results.append(self.max)
+                continue
+            target = fraction * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    results.append(value)
+                    break
+            else:
+                results.append(self.max)
+        return results
+
+    def to_dict(self):
+        return {'k': self.k, 'n': self.n, 'min': self.min, 'max': self.max, 'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.n, sketch.min, sketch.max = data['n'], data['min'], data['max']
+        sketch.levels = [list(items) for items in data['levels']] or [[]]
+        sketch._size = sum(map(len, sketch.levels))
+        sketch._max_size = sketch._capacity_sum()
+        return sketch
+
+
+class OrderSketch:
+    """一个桶（一个月份）的订单概要：订单数、不同买家、商品件数、各状态的 paidPrice 分布"""
+
+    def __init__(self, orders=0, buyers=None, products=None, paid_price=None):
+        self.orders = orders
+        self.buyers = buyers or HyperLogLog()
+        self.products = products or FrequentItems()
+        self.paid_price = paid_price or {}
+
+    def add_order(self, order, catalog):
+        order_info = order.get('orderInfo', {})
+        self.orders += 1
+        buyer = order_info.get('buyer') or {}
+        buyer_key = buyer.get('phone') or buyer.get('name')
+        if buyer_key:
+            self.buyers.add(str(buyer_key))
+        for product in catalog.resolve_products(order.get('products', [])):
+            name = product.get('productName')
+            if name:
+                self.products.add(name, product.get('amount', 1) or 0)
+        status = (order_info.get('status') or {}).get('name') or ''
+        sketch = self.paid_price.get(status)
+        if sketch is None:
+            sketch = self.paid_price[status] = KllSketch()
+        sketch.add(order_info.get('paidPrice') or 0)
+
+    def merge(self, other):
+        self.orders += other.orders
+        self.buyers.merge(other.buyers)
+        self.products.merge(other.products)
+        for status, sketch in other.paid_price.items():
+            if status in self.paid_price:
+                self.paid_price[status].merge(sketch)
+            else:
+                self.paid_price[status] = KllSketch.from_dict(sketch.to_dict())
+        return self
+
+    def to_dict(self):
+        return {
+            'orders': self.orders,
+            'buyers': self.buyers.to_dict(),
+            'products': self.products.to_dict(),
+            'paidPrice': {status: sketch.to_dict() for status, sketch in self.paid_price.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['orders'], HyperLogLog.from_dict(data['buyers']), FrequentItems.from_dict(data['products']),
+                   {status: KllSketch.from_dict(sketch) for status, sketch in data['paidPrice'].items()})
+
+
+def bucket_key(order):
+    created_at = order_created_at(order)
+    if created_at is None:
+        return UNKNOWN_PARTITION
+    return datetime.fromtimestamp(created_at).strftime(BUCKET_FORMAT)
+
+
+def sketch_orders(orders, catalog=None):
+    """
+    一次遍历订单，按下单月份分桶计算概要
+
+    Args:
+        orders: 订单的可迭代对象（可以是 order_partitions.iter_orders 的生成器）
+        catalog: 规范化数据的商品目录，None时商品必须是完整的
+
+    Returns:
+        {月份: OrderSketch}
+    """
+    catalog = catalog or ProductCatalog('')
+    buckets = {}
+    for order in orders:
+        key = bucket_key(order)
+        sketch = buckets.get(key)
+        if sketch is None:
+            sketch = buckets[key] = OrderSketch()
+        sketch.add_order(order, catalog)
+    return buckets
+
+
+def save_state(directory, buckets, crawled_at=None, source=None):
+    """把一次抓取的各桶状态写入 directory/<抓取时间>.json.gz，返回文件路径"""
+    crawled_at = crawled_at or datetime.now()
+    os.makedirs(directory, exist_ok=True)
+    state = {
+        'crawledAt': crawled_at.isoformat(timespec='seconds'),
+        'source': source,
+        'buckets': {key: sketch.to_dict() for key, sketch in sorted(buckets.items())},
+    }
+    path = os.path.join(directory, crawled_at.strftime('%Y%m%d_%H%M%S') + '.json.gz')
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(gzip.compress(json.dumps(state, ensure_ascii=False, separators=(',', ':')).encode('utf-8')))
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_states(directory):
+    """按抓取时间排列的状态文件"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.json.gz'))
+
+
+def load_state(path):
+    with open(path, 'rb') as f:
+        return json.loads(gzip.decompress(f.read()))
+
+
+def latest_buckets(directory, month_from=None, month_to=None):
+    """
+    每个月份取最近一次抓取的桶
+
+    Returns:
+        {月份: (OrderSketch, 抓取时间)}
+    """
+    selected = {}
+    for path in list_states(directory):
+        state = load_state(path)
+        for key, data in state['buckets'].items():
+            if key != UNKNOWN_PARTITION and ((month_from and key < month_from) or (month_to and key > month_to)):
+                continue
+            if key == UNKNOWN_PARTITION and (month_from or month_to):
+                continue
+            selected[key] = (data, state['crawledAt'])
+    return {key: (OrderSketch.from_dict(data), crawled_at) for key, (data, crawled_at) in selected.items()}
+
+
+def merge_buckets(buckets):
+    merged = OrderSketch()
+    for sketch in buckets:
+        merged.merge(sketch)
+    return merged
+
+
+def _parse_month(value):
+    if not value:
+        return None
+    for fmt in ('%Y-%m', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt).strftime(BUCKET_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的月份: {value}（格式 2025-06）")
+
+
+def print_report(sketch, top=50, quantiles=DEFAULT_QUANTILES):
+    """打印合并后的统计结果和误差范围"""
+    buyers = sketch.buyers.count()
+    error = sketch.buyers.relative_error()
+    print(f"📦 订单数: {sketch.orders}")
+    print(f"👥 不同买家: 约 {buyers:,.0f}（±{2 * error:.1%}，约95%置信）")
+
+    products = sketch.products
+    print(f"🏆 件数前 {top} 的商品（共 {products.total} 件，每个商品的件数误差不超过 {products.max_error()}）:")
+    for rank, (name, low, high) in enumerate(products.top(top), 1):
+        count = f"{low}" if low == high else f"{low} ~ {high}"
+        print(f"  {rank:>3}. {name}  {count} 件")
+
+    print("💰 paidPrice 分位数（排名误差约 ±1.65%）:")
+    header = '  '.join(f"p{fraction * 100:g}".rjust(8) for fraction in quantiles)
+    print(f"  {'状态':<10}{'订单数':>8}  {header}{'最大值':>10}")
+    for status, kll in sorted(sketch.paid_price.items(), key=lambda item: -item[1].n):
+        values = '  '.join(f"{value:>8g}" for value in kll.quantiles(quantiles))
+        print(f"  {status or '（无）':<10}{kll.n:>8}  {values}{kll.max:>10g}")
+
+
+def report(directory, month_from=None, month_to=None, top=50, quantiles=DEFAULT_QUANTILES):
+    buckets = latest_buckets(directory, month_from, month_to)
+    if not buckets:
+        print(f"📭 {directory} 中没有所选月份的统计，先运行 build")
+        return
+    print(f"🧮 合并 {len(buckets)} 个月份的统计: {', '.join(sorted(buckets))}")
+    sources = sorted({crawled_at for _, crawled_at in buckets.values()})
+    print(f"   来自 {len(sources)} 次抓取（最近 {sources[-1]}）")
+    print_report(merge_buckets(sketch for sketch, _ in buckets.values()), top, quantiles)
+
+
+def build(orders_path, directory=DEFAULT_SKETCH_DIR, crawled_at=None):
+    """扫描订单文件或分区目录，保存本次抓取的统计状态"""
+    orders_path = resolve_orders_path(orders_path)
+    catalog = ProductCatalog(catalog_path_for(catalog_orders_file(orders_path)))
+    start = time.perf_counter()
+    buckets = sketch_orders(iter_orders(orders_path), catalog)
+    path = save_state(directory, buckets, crawled_at, source=orders_path)
+    total = sum(sketch.orders for sketch in buckets.values())
+    print(f"🧮 {total} 个订单 -> {len(buckets)} 个月份的统计，耗时 {time.perf_counter() - start:.1f} 秒")
+    print(f"💾 已保存 {path}（{os.path.getsize(path) / 1024:.1f} KB）")
+    return path
+
+
+def _rank_error(sorted_values, estimate, fraction):
+    """估计值在真实数据中的排名区间与目标分位点的距离（有重复值时取区间内最近的点）"""
+    import bisect
+
+    n = len(sorted_values)
+    low = bisect.bisect_left(sorted_values, estimate) / n
+    high = bisect.bisect_right(sorted_values, estimate) / n
+    if low <= fraction <= high:
+        return 0.0
+    return min(abs(fraction - low), abs(fraction - high))
+
+
+def run_benchmark(order_count, parts, top, top_k=DEFAULT_TOP_K):
+    """
+    与精确计算对比：精确的不同买家数、商品件数排名、各状态 paidPrice 分位数
+
+    订单分成 parts 份分别计算后合并，检查合并后的误差；安装了pandas时同时对比 pandas 的耗时。
+    模拟数据只有 sample_data.PRODUCT_COUNT 种商品，top_k 小于它时才能看到频繁项的误差
+    """
+    # resource 只在POSIX系统上有，只在基准测试中导入
+    import resource
+    from collections import Counter
+    from sample_data import generate_orders
+
+    with tempfile.TemporaryDirectory() as tmp:
+        orders_file = os.path.join(tmp, 'optimized_orders.json')
+        with open(orders_file, 'w', encoding='utf-8') as f:
+            f.write('[')
+            for index, order in enumerate(generate_orders(order_count)):
+                f.write(',\n' if index else '\n')
+                f.write(json.dumps(order, ensure_ascii=False))
+            f.write('\n]')
+        print(f"📦 {order_count} 个订单，文件 {os.path.getsize(orders_file) / 1024 / 1024:.1f} MB")
+
+        # 概要：分成 parts 份分别计算（模拟多次抓取/多个分区），再合并
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        part_size = -(-order_count // parts)
+        part_sketches = [OrderSketch(products=FrequentItems(top_k)) for _ in range(parts)]
+        catalog = ProductCatalog('')
+        for index, order in enumerate(iter_orders(orders_file, verbose=False)):
+            part_sketches[index // part_size].add_order(order, catalog)
+        sketch_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        merged = merge_buckets(OrderSketch.from_dict(json.loads(json.dumps(part.to_dict()))) for part in part_sketches)
+        merge_seconds = time.perf_counter() - start
+        state_bytes = sum(len(gzip.compress(json.dumps(part.to_dict()).encode())) for part in part_sketches)
+        sketch_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+        # 精确计算：读入全部订单
+        start = time.perf_counter()
+        from order_partitions import load_orders
+        orders = load_orders(orders_file, verbose=False)
+        buyers = set()
+        units = Counter()
+        prices = {}
+        for order in orders:
+            info = order['orderInfo']
+            buyers.add(info['buyer'].get('phone') or info['buyer'].get('name'))
+            for product in order['products']:
+                units[product['productName']] += product['amount']
+            prices.setdefault(info['status']['name'], []).append(info['paidPrice'])
+        for values in prices.values():
+            values.sort()
+        exact_seconds = time.perf_counter() - start
+        exact_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+        pandas_seconds = None
+        try:
+            import pandas as pd
+        except ImportError:
+            pd = None
+        if pd is not None:
+            start = time.perf_counter()
+            rows = pd.json_normalize(orders, record_path='products', meta=[
+                ['orderInfo', 'buyer', 'phone'], ['orderInfo', 'status', 'name'], ['orderInfo', 'paidPrice']])
+            rows['orderInfo.buyer.phone'].nunique()
+            rows.groupby('productName')['amount'].sum().nlargest(top)
+            order_frame = pd.json_normalize(orders)
+            order_frame.groupby('orderInfo.status.name')['orderInfo.paidPrice'].quantile(list(DEFAULT_QUANTILES))
+            pandas_seconds = time.perf_counter() - start
+        del orders
+
+    print(f"⏱️ 概要: 一次遍历 {sketch_seconds:.1f} 秒（{order_count / sketch_seconds:,.0f} 单/秒），"
+          f"{parts} 份合并 {merge_seconds * 1000:.0f} ms，保存的状态共 {state_bytes / 1024:.0f} KB，"
+          f"内存增长约 {sketch_rss / 1024:.0f} MB")
+    print(f"⏱️ 精确: 读入全部订单并计算 {exact_seconds:.1f} 秒，内存增长约 {exact_rss / 1024:.0f} MB"
+          + (f"；pandas {pandas_seconds:.1f} 秒" if pandas_seconds is not None else "（未安装pandas，对照为纯Python精确计算）"))
+
+    estimate = merged.buyers.count()
+    print(f"👥 不同买家: 精确 {len(buyers)}，估计 {estimate:,.0f}，误差 {estimate / len(buyers) - 1:+.2%}"
+          f"（标准误差 {merged.buyers.relative_error():.2%}）")
+
+    exact_top = units.most_common(top)
+    sketch_top = merged.products.top(top)
+    overlap = len({name for name, _ in exact_top} & {name for name, _, _ in sketch_top})
+    worst = max(units[name] - low for name, low, _ in sketch_top)
+    within = all(low <= units[name] <= high for name, low, high in sketch_top)
+    print(f"🏆 前 {top} 商品: 与精确结果重合 {overlap}/{top}，件数最大低估 {worst}，"
+          f"误差上界 {merged.products.max_error()}（总件数 {merged.products.total}），全部落在区间内: {within}")
+
+    worst_rank = 0.0
+    for status, values in prices.items():
+        for fraction, value in zip(DEFAULT_QUANTILES, merged.paid_price[status].quantiles(DEFAULT_QUANTILES)):
+            worst_rank = max(worst_rank, _rank_error(values, value, fraction))
+    print(f"💰 paidPrice 分位数: {len(prices)} 个状态 × {len(DEFAULT_QUANTILES)} 个分位点，"
+          f"最大排名误差 {worst_rank:.2%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='订单流式统计（HyperLogLog / 频繁项 / KLL）')
+    parser.add_argument('--dir', default=DEFAULT_SKETCH_DIR, help='统计状态目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='扫描订单，保存本次抓取的统计状态')
+    build_parser.add_argument('orders_file', nargs='?', default='optimized_orders.json',
+                              help='optimized_orders.json 或分区目录')
+    build_parser.add_argument('--at', help='抓取时间（默认当前时间），如 2025-06-17T08:30:00')
+
+    report_parser = subparsers.add_parser('report', help='合并各月份的统计并输出')
+    report_parser.add_argument('--from', dest='month_from', help='起始月份，如 2025-06')
+    report_parser.add_argument('--to', dest='month_to', help='结束月份（含），如 2025-06')
+    report_parser.add_argument('--top', type=int, default=50, help='商品排名数量')
+    report_parser.add_argument('--quantiles', type=float, nargs='+', default=list(DEFAULT_QUANTILES),
+                               help='paidPrice 分位点，如 0.5 0.9 0.99')
+
+    subparsers.add_parser('log', help='列出保存的统计状态')
+
+    bench_parser = subparsers.add_parser('bench', help='与精确计算对比误差、耗时和内存')
+    bench_parser.add_argument('--orders', type=int, default=200000)
+    bench_parser.add_argument('--parts', type=int, default=4, help='分成几份分别计算后合并')
+    bench_parser.add_argument('--top', type=int, default=50)
+    bench_parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='频繁项的 k')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        if not os.path.exists(resolve_orders_path(args.orders_file)):
+            print(f"❌ 找不到文件 {args.orders_file}")
+            return
+        build(args.orders_file, args.dir, datetime.fromisoformat(args.at) if args.at else None)
+    elif args.command == 'report':
+        try:
+            month_from, month_to = _parse_month(args.month_from), _parse_month(args.month_to)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        report(args.dir, month_from, month_to, args.top, args.quantiles)
+    elif args.command == 'log':
+        for path in list_states(args.dir):
+            state = load_state(path)
+            orders = sum(bucket['orders'] for bucket in state['buckets'].values())
+            print(f"{state['crawledAt']}  {len(state['buckets']):>3} 个月份  {orders:>8} 个订单  "
+                  f"{os.path.getsize(path) / 1024:8.1f} KB  {state.get('source') or ''}")
+    else:
+        run_benchmark(args.orders, args.parts, args.top, args.top_k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,796 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite订单库
+把optimize_orders.py输出的订单和logistics.go的物流结果写入嵌入式SQLite数据库，
+按orderId增量更新，状态统计、物流目标筛选和导出都改为走索引的查询。
+快递轨迹逐条追加到traces表（按 快递单号+时间+轨迹状态 去重，只增不改），
+停滞件和各快递公司揽收到签收时长等查询不需要再请求接口
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+DEFAULT_DB_FILE = 'orders.db'
+
+# 需要查询物流的订单状态
+SHIPPED_STATUS = '待买家收货'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    orderId TEXT NOT NULL UNIQUE,
+    page INTEGER,
+    statusName TEXT,
+    statusKey TEXT,
+    createdAt INTEGER,
+    buyerName TEXT,
+    buyerPhone TEXT,
+    sellerName TEXT,
+    receiver TEXT,
+    address TEXT,
+    orderPrice REAL,
+    paidPrice REAL,
+    expressPrice REAL,
+    updatedAt INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(statusName);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(createdAt);
+CREATE INDEX IF NOT EXISTS idx_orders_seller ON orders(sellerName);
+
+CREATE TABLE IF NOT EXISTS products (
+    orderId TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    productName TEXT,
+    cover TEXT,
+    whiteBgPng TEXT,
+    price REAL,
+    amount INTEGER,
+    description TEXT,
+    specValues TEXT,
+    PRIMARY KEY (orderId, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS logistics (
+    orderId TEXT PRIMARY KEY,
+    expressNo TEXT,
+    companyName TEXT,
+    updatedAt INTEGER
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_logistics_express ON logistics(expressNo);
+
+CREATE TABLE IF NOT EXISTS traces (
+    expressNo TEXT NOT NULL,
+    traceTime INTEGER NOT NULL,
+    traceState TEXT NOT NULL,
+    orderId TEXT,
+    companyName TEXT,
+    traceType TEXT,
+    traceContext TEXT,
+    insertedAt INTEGER,
+    PRIMARY KEY (expressNo, traceTime, traceState)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_traces_time ON traces(traceTime);
+CREATE INDEX IF NOT EXISTS idx_traces_state ON traces(traceState, expressNo, traceTime, companyName);
+"""
+
+# 推送订阅和查询调度相关的物流字段（logistics_push.py、logistics_scheduler.py 使用），旧数据库打开时自动补列
+LOGISTICS_PUSH_COLUMNS = [
+    ('companyCode', 'TEXT'),
+    ('subscribeStatus', 'TEXT'),
+    ('isArrived', 'INTEGER DEFAULT 0'),
+    ('lastTraceState', 'TEXT'),
+    ('lastTraceTime', 'INTEGER'),
+    ('pushedAt', 'INTEGER'),
+    ('needsPolling', 'INTEGER DEFAULT 1'),
+    ('lastLookupAt', 'INTEGER'),
+]
+
+# 已成功订阅推送的快递状态
+SUBSCRIBE_SUCCESS = 'SubscribeStatus_Success'
+
+# 揽收和签收的轨迹状态，用于统计揽收到签收的时长
+COLLECT_TRACE_STATE = 'TraceState_Collect'
+DELIVERED_TRACE_STATE = 'TraceState_Sign'
+
+ORDER_UPSERT_SQL = """
+INSERT INTO orders (orderId, page, statusName, statusKey, createdAt, buyerName, buyerPhone,
+                    sellerName, receiver, address, orderPrice, paidPrice, expressPrice, updatedAt)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(orderId) DO UPDATE SET
+    page = excluded.page,
+    statusName = excluded.statusName,
+    statusKey = excluded.statusKey,
+    createdAt = excluded.createdAt,
+    buyerName = excluded.buyerName,
+    buyerPhone = excluded.buyerPhone,
+    sellerName = excluded.sellerName,
+    receiver = excluded.receiver,
+    address = excluded.address,
+    orderPrice = excluded.orderPrice,
+    paidPrice = excluded.paidPrice,
+    expressPrice = excluded.expressPrice,
+    updatedAt = excluded.updatedAt
+"""
+
+# pushedAt 为空表示主动查询的结果，不改变推送时间和轮询标记；从未收到推送的订单始终需要轮询
+LOGISTICS_EXPRESS_UPSERT_SQL = """
+INSERT INTO logistics (orderId, expressNo, companyName, companyCode, subscribeStatus, isArrived,
+                       lastTraceState, lastTraceTime, pushedAt, needsPolling, lastLookupAt, updatedAt)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(orderId) DO UPDATE SET
+    expressNo = IFNULL(NULLIF(excluded.expressNo, ''), logistics.expressNo),
+    companyName = IFNULL(NULLIF(excluded.companyName, ''), logistics.companyName),
+    companyCode = IFNULL(NULLIF(excluded.companyCode, ''), logistics.companyCode),
+    subscribeStatus = IFNULL(NULLIF(excluded.subscribeStatus, ''), logistics.subscribeStatus),
+    isArrived = MAX(excluded.isArrived, IFNULL(logistics.isArrived, 0)),
+    lastTraceState = CASE WHEN excluded.lastTraceTime >= IFNULL(logistics.lastTraceTime, 0)
+                          THEN excluded.lastTraceState ELSE logistics.lastTraceState END,
+    lastTraceTime = MAX(excluded.lastTraceTime, IFNULL(logistics.lastTraceTime, 0)),
+    pushedAt = IFNULL(excluded.pushedAt, logistics.pushedAt),
+    needsPolling = CASE WHEN IFNULL(excluded.pushedAt, logistics.pushedAt) IS NULL THEN 1
+                        WHEN excluded.pushedAt IS NULL THEN logistics.needsPolling
+                        ELSE excluded.needsPolling END,
+    lastLookupAt = IFNULL(excluded.lastLookupAt, logistics.lastLookupAt),
+    updatedAt = excluded.updatedAt
+"""
+
+TRACE_INSERT_SQL = """
+INSERT OR IGNORE INTO traces (expressNo, traceTime, traceState, orderId, companyName,
+                              traceType, traceContext, insertedAt)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def open_store(db_file=DEFAULT_DB_FILE):
+    """
+    打开（必要时创建）订单库
+
+    Returns:
+        sqlite3连接
+    """
+    conn = sqlite3.connect(db_file, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.executescript(SCHEMA)
+    _migrate_logistics(conn)
+    _create_fts_table(conn)
+    return conn
+
+
+def _migrate_logistics(conn):
+    """为旧数据库的logistics表补充推送订阅字段"""
+    with conn:
+        # 多个进程同时打开新数据库时，先拿到写锁再检查已有的列
+        conn.execute('BEGIN IMMEDIATE')
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(logistics)')}
+        for column, column_type in LOGISTICS_PUSH_COLUMNS:
+            if column not in existing:
+                conn.execute(f'ALTER TABLE logistics ADD COLUMN {column} {column_type}')
+        # 停滞件查询按最新轨迹时间筛选
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_logistics_trace_time ON logistics(lastTraceTime)')
+
+
+def _create_fts_table(conn):
+    """创建FTS5全文索引表，trigram分词可以直接按子串搜索中文"""
+    for tokenize in ("tokenize='trigram'", "tokenize='unicode61'"):
+        try:
+            conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5('
+                f'buyer, seller, receiver, address, products, {tokenize})'
+            )
+            return
+        except sqlite3.OperationalError:
+            continue
+    print("⚠️ 当前SQLite不支持FTS5，全文搜索不可用")
+
+
+def fts_tokenizer(conn):
+    """
+    这个数据库中 orders_fts 使用的分词器（'trigram' / 'unicode61'），没有全文索引表时返回None
+
+    按数据库中的建表语句判断，不同连接（不同数据库、不同版本的SQLite创建的表）互不影响
+    """
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'orders_fts'").fetchone()
+    if row is None:
+        return None
+    return 'trigram' if 'trigram' in row[0] else 'unicode61'
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def upsert_orders(conn, orders):
+    """
+    按orderId批量写入或更新订单（optimized_orders.json中的订单结构）
+
+    单个订单状态变化时只更新对应的行，不再需要重写整个文件
+
+    Returns:
+        写入的订单数
+    """
+    now = int(time.time())
+    count = 0
+    fts_enabled = fts_tokenizer(conn) is not None
+    with conn:
+        for order in orders:
+            order_info = order.get('orderInfo', {})
+            order_id = order_info.get('orderId')
+            if not order_id:
+                continue
+
+            buyer = order_info.get('buyer', {})
+            seller = order_info.get('seller', {})
+            status = order_info.get('status', {})
+            products = order.get('products', [])
+
+            conn.execute(ORDER_UPSERT_SQL, (
+                order_id,
+                order.get('page'),
+                status.get('name', ''),
+                status.get('key', ''),
+                _to_int(order_info.get('createdAt')),
+                buyer.get('name', ''),
+                buyer.get('phone', ''),
+                seller.get('name', ''),
+                order_info.get('receiver', ''),
+                order_info.get('address', ''),
+                order_info.get('orderPrice', 0),
+                order_info.get('paidPrice', 0),
+                order_info.get('expressPrice', 0),
+                now,
+            ))
+
+            # 商品列表整体替换，避免残留旧商品
+            conn.execute('DELETE FROM products WHERE orderId = ?', (order_id,))
+            conn.executemany(
+                'INSERT INTO products (orderId, seq, productName, cover, whiteBgPng, price, amount, '
+                'description, specValues) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        order_id,
+                        seq,
+                        product.get('productName', ''),
+                        product.get('cover', ''),
+                        product.get('whiteBgPng', ''),
+                        product.get('price', 0),
+                        product.get('amount', 1),
+                        product.get('description', ''),
+                        json.dumps(product.get('specValues', []), ensure_ascii=False, separators=(',', ':')),
+                    )
+                    for seq, product in enumerate(products)
+                ],
+            )
+
+            if fts_enabled:
+                # 不使用RETURNING（需要SQLite 3.35+），DO UPDATE时lastrowid也不可靠，按orderId查回id
+                row_id = conn.execute('SELECT id FROM orders WHERE orderId = ?', (order_id,)).fetchone()[0]
+                conn.execute('DELETE FROM orders_fts WHERE rowid = ?', (row_id,))
+                conn.execute(
+                    'INSERT INTO orders_fts (rowid, buyer, seller, receiver, address, products) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        row_id,
+                        buyer.get('name', ''),
+                        seller.get('name', ''),
+                        order_info.get('receiver', ''),
+                        order_info.get('address', ''),
+                        ' '.join(p.get('productName', '') for p in products),
+                    ),
+                )
+            count += 1
+    return count
+
+
+def _trace_rows(item, order_id, now):
+    """快递查询结果中的轨迹转换为traces表的行，缺少时间或状态的轨迹跳过"""
+    express_no = item.get('expressNo', '')
+    rows = []
+    for trace in item.get('traces') or []:
+        trace_time = _to_int(trace.get('traceTime'))
+        trace_state = trace.get('traceState', '')
+        if not express_no or not trace_time or not trace_state:
+            continue
+        rows.append((
+            express_no,
+            trace_time,
+            trace_state,
+            order_id,
+            item.get('companyName', ''),
+            trace.get('traceType', ''),
+            trace.get('traceContext', ''),
+            now,
+        ))
+    return rows
+
+
+def _express_rows(conn, item, now, pushed):
+    """
+    单条快递查询结果对应的 (logistics表的行, traces表的行列表)，没有orderId且按快递单号也找不到时返回 (None, [])
+    """
+    order_id = item.get('orderId')
+    if not order_id and item.get('expressNo'):
+        found = conn.execute(
+            'SELECT orderId FROM logistics WHERE expressNo = ? LIMIT 1', (item['expressNo'],)
+        ).fetchone()
+        order_id = found[0] if found else None
+    if not order_id:
+        return None, []
+
+    # 轨迹按时间取最新一条
+    traces = item.get('traces') or []
+    latest = max(traces, key=lambda trace: _to_int(trace.get('traceTime')), default={})
+    subscribe_status = item.get('subscribeStatus', '')
+    is_arrived = 1 if item.get('isArrived') else 0
+    # 只有收到过推送才停止轮询，主动查询到订阅成功并不代表推送已经送达
+    needs_polling = 0 if pushed and (subscribe_status == SUBSCRIBE_SUCCESS or is_arrived) else 1
+
+    row = (
+        order_id,
+        item.get('expressNo', ''),
+        item.get('companyName', ''),
+        item.get('companyCode', ''),
+        subscribe_status,
+        is_arrived,
+        latest.get('traceState', ''),
+        _to_int(latest.get('traceTime')),
+        now if pushed else None,
+        needs_polling,
+        # 查到快递单号才算一次成功的查询
+        now if item.get('expressNo') else None,
+        now,
+    )
+    return row, _trace_rows(item, order_id, now)
+
+
+def upsert_express_results(conn, results, pushed=False):
+    """
+    写入快递查询结果（快递查询接口 data 中单条记录的结构，附带 orderId）
+
+    logistics表按orderId保存最新状态，轨迹逐条追加到traces表，重复的轨迹被忽略。
+    pushed为True表示快递方推送的更新：订阅成功或已签收的订单标记为无需轮询。
+    没有orderId时按快递单号关联已有记录
+
+    Returns:
+        写入的记录数
+    """
+    return upsert_express_groups(conn, [results], pushed)[0]
+
+
+def upsert_express_groups(conn, groups, pushed=False):
+    """
+    在一个事务中写入多组快递查询结果（如同时到达的多个推送请求），返回每组写入的记录数
+
+    每组中没有orderId、按快递单号也关联不到订单的记录不写入，也不计数
+    """
+    now = int(time.time())
+    rows = []
+    trace_rows = []
+    counts = []
+    for results in groups:
+        count = 0
+        for item in results:
+            row, item_trace_rows = _express_rows(conn, item, now, pushed)
+            if row is None:
+                continue
+            rows.append(row)
+            trace_rows.extend(item_trace_rows)
+            count += 1
+        counts.append(count)
+    with conn:
+        conn.executemany(LOGISTICS_EXPRESS_UPSERT_SQL, rows)
+        conn.executemany(TRACE_INSERT_SQL, trace_rows)
+    return counts
+
+
+def upsert_logistics(conn, results):
+    """按orderId写入或更新物流信息（logistics_results.json中results的结构，带traces时一并保存）"""
+    return upsert_express_results(conn, results)
+
+
+def upsert_pushed_traces(conn, updates):
+    """写入快递推送的物流更新"""
+    return upsert_express_results(conn, updates, pushed=True)
+
+
+def upsert_pushed_groups(conn, groups):
+    """在一个事务中写入多个推送请求的物流更新，返回每个请求写入的记录数"""
+    return upsert_express_groups(conn, groups, pushed=True)
+
+
+def ingest_optimized_file(conn, json_file, batch_size=5000):
+    """读取optimized_orders.json并分批写入订单库，规范化格式的商品引用会先还原"""
+    from product_catalog import ProductCatalog, catalog_path_for
+
+    with open(json_file, 'r', encoding='utf-8') as f:
+        orders_data = json.load(f)
+
+    catalog = ProductCatalog(catalog_path_for(json_file))
+    for order in orders_data:
+        order['products'] = catalog.resolve_products(order.get('products', []))
+
+    total = 0
+    for start in range(0, len(orders_data), batch_size):
+        total += upsert_orders(conn, orders_data[start:start + batch_size])
+        print(f"已写入 {total}/{len(orders_data)} 条订单...")
+    return total
+
+
+def ingest_logistics_file(conn, json_file):
+    """读取logistics_results.json并写入订单库"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        logistics_json = json.load(f)
+    return upsert_logistics(conn, logistics_json.get('results', []))
+
+
+def status_statistics(conn):
+    """按状态统计订单数量（走idx_orders_status索引）"""
+    return dict(conn.execute(
+        'SELECT statusName, COUNT(*) FROM orders GROUP BY statusName ORDER BY COUNT(*) DESC'
+    ).fetchall())
+
+
+def iter_status_info(conn, status_name=None, poll_only=False):
+    """
+    逐条返回订单号和状态，可只返回某一状态的订单
+
+    poll_only为True时跳过已订阅推送、无需轮询的订单
+    """
+    sql = 'SELECT o.orderId, o.statusName FROM orders o'
+    conditions = []
+    params = []
+    if poll_only:
+        sql += ' LEFT JOIN logistics l ON l.orderId = o.orderId'
+        conditions.append('IFNULL(l.needsPolling, 1) = 1')
+    if status_name:
+        conditions.append('o.statusName = ?')
+        params.append(status_name)
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    cursor = conn.execute(sql + ' ORDER BY o.id', params)
+    for order_id, name in cursor:
+        yield {'orderId': order_id, 'statusName': name}
+
+
+def logistics_targets(conn, status_name=SHIPPED_STATUS, poll_only=True):
+    """需要查询物流的订单号列表，默认不包含已订阅推送的订单"""
+    return [row['orderId'] for row in iter_status_info(conn, status_name, poll_only)]
+
+
+def write_status_info(conn, output_file='status_info.json', status_name=None, poll_only=False):
+    """生成与extract_status.py相同格式的status_info.json，供logistics.go读取"""
+    status_info = list(iter_status_info(conn, status_name, poll_only))
+    if status_name or poll_only:
+        status_count = {}
+        for row in status_info:
+            status_count[row['statusName']] = status_count.get(row['statusName'], 0) + 1
+    else:
+        status_count = status_statistics(conn)
+
+    output_data = {
+        "total_orders": len(status_info),
+        "status_statistics": status_count,
+        "orders": status_info
+    }
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, ensure_ascii=False, indent=2)
+    return output_data
+
+
+def iter_export_rows(conn, status_name=None):
+    """
+    按商品逐行返回导出数据，列与export_to_excel.py一致
+
+    createdAt保持时间戳，由调用方格式化
+    """
+    sql = """
+        SELECT o.orderId, o.createdAt, o.statusName,
+               IFNULL(l.expressNo, ''), IFNULL(l.companyName, ''),
+               p.productName, p.amount, p.price
+        FROM orders o
+        JOIN products p ON p.orderId = o.orderId
+        LEFT JOIN logistics l ON l.orderId = o.orderId
+    """
+    params = ()
+    if status_name:
+        sql += ' WHERE o.statusName = ?'
+        params = (status_name,)
+    sql += ' ORDER BY o.id, p.seq'
+
+    for order_id, created_at, status, express_no, company_name, product_name, amount, price in conn.execute(sql, params):
+        yield {
+            '订单编号': order_id,
+            '下单日期': created_at,
+            '状态': status,
+            '快递单号': express_no,
+            '快递公司': company_name,
+            '商品名称': product_name,
+            '数量': amount,
+            '单价': price,
+            '金额': price * amount
+        }
+
+
+def search_orders(conn, keyword, limit=50):
+    """
+    按买家、卖家、收货人、地址、商品名称全文搜索订单
+
+    只有trigram分词能按子串匹配中文，少于3个字的关键词也无法走索引，这些情况退化为LIKE查询；
+    unicode61 分词把连续的中文当作一个词，子串MATCH不到（如“朝阳区”搜不到“北京市朝阳区建国路”）
+    """
+    if len(keyword) >= 3 and fts_tokenizer(conn) == 'trigram':
+        phrase = '"' + keyword.replace('"', '""') + '"'
+        cursor = conn.execute(
+            'SELECT o.orderId, o.statusName, o.buyerName, o.sellerName, o.address '
+            'FROM orders_fts f JOIN orders o ON o.id = f.rowid '
+            'WHERE orders_fts MATCH ? LIMIT ?',
+            (phrase, limit),
+        )
+    else:
+        pattern = f'%{keyword}%'
+        cursor = conn.execute(
+            'SELECT orderId, statusName, buyerName, sellerName, address FROM orders '
+            'WHERE buyerName LIKE ? OR sellerName LIKE ? OR receiver LIKE ? OR address LIKE ? '
+            'OR orderId IN (SELECT orderId FROM products WHERE productName LIKE ?) LIMIT ?',
+            (pattern, pattern, pattern, pattern, pattern, limit),
+        )
+    return [
+        {'orderId': row[0], 'statusName': row[1], 'buyer': row[2], 'seller': row[3], 'address': row[4]}
+        for row in cursor
+    ]
+
+
+def iter_traces(conn, express_no):
+    """按时间顺序返回一个快递单号的全部轨迹"""
+    cursor = conn.execute(
+        'SELECT traceTime, traceState, traceType, traceContext FROM traces '
+        'WHERE expressNo = ? ORDER BY traceTime',
+        (express_no,),
+    )
+    for trace_time, trace_state, trace_type, trace_context in cursor:
+        yield {'traceTime': trace_time, 'traceState': trace_state, 'traceType': trace_type, 'traceContext': trace_context}
+
+
+def stalled_shipments(conn, hours=72, now=None):
+    """
+    超过指定小时数没有新轨迹、且未签收的快递
+
+    按logistics表中维护的最新轨迹时间筛选（走idx_logistics_trace_time索引），
+    还没有任何轨迹的订单不在结果中
+    """
+    now = now or int(time.time())
+    cursor = conn.execute(
+        'SELECT orderId, expressNo, companyName, lastTraceState, lastTraceTime FROM logistics '
+        'WHERE lastTraceTime > 0 AND lastTraceTime < ? '
+        'AND IFNULL(isArrived, 0) = 0 AND IFNULL(lastTraceState, \'\') != ? '
+        'ORDER BY lastTraceTime',
+        (now - int(hours * 3600), DELIVERED_TRACE_STATE),
+    )
+    return [
+        {
+            'orderId': order_id,
+            'expressNo': express_no,
+            'companyName': company_name,
+            'lastTraceState': last_state,
+            'lastTraceTime': last_time,
+            'stalledHours': round((now - last_time) / 3600, 1),
+        }
+        for order_id, express_no, company_name, last_state, last_time in cursor
+    ]
+
+
+def delivery_time_by_company(conn, since=None):
+    """
+    各快递公司从揽收到签收的时长（小时）
+
+    揽收和签收各取最早的一条轨迹，只查idx_traces_state覆盖索引，不读取轨迹正文
+
+    Args:
+        since: 只统计揽收时间不早于该时间戳的快递
+
+    Returns:
+        {快递公司: {'count': 快递数, 'median': 中位数, 'p90': 90分位}}，按快递数降序
+    """
+    # statistics 导入较慢，命令行启动时不加载
+    import statistics
+
+    cursor = conn.execute(
+        """
+        SELECT c.companyName, d.traceTime - c.traceTime
+        FROM (SELECT expressNo, MIN(traceTime) AS traceTime, MAX(companyName) AS companyName
+              FROM traces WHERE traceState = ? GROUP BY expressNo) c
+        JOIN (SELECT expressNo, MIN(traceTime) AS traceTime
+              FROM traces WHERE traceState = ? GROUP BY expressNo) d ON d.expressNo = c.expressNo
+        WHERE d.traceTime >= c.traceTime AND c.traceTime >= ?
+        """,
+        (COLLECT_TRACE_STATE, DELIVERED_TRACE_STATE, since or 0),
+    )
+    durations = {}
+    for company_name, seconds in cursor:
+        durations.setdefault(company_name or '未知', []).append(seconds / 3600)
+
+    result = {}
+    for company_name, hours in sorted(durations.items(), key=lambda item: -len(item[1])):
+        hours.sort()
+        result[company_name] = {
+            'count': len(hours),
+            'median': round(statistics.median(hours), 1),
+            'p90': round(hours[min(len(hours) - 1, int(len(hours) * 0.9))], 1),
+        }
+    return result
+
+
+def run_benchmark(order_count, batch_size=5000):
+    """
+    写入速度和查询延迟基准测试
+
+    使用sample_data生成模拟订单写入临时数据库，然后统计常用查询的耗时
+    """
+    tmp_dir = tempfile.mkdtemp(prefix='orders_bench_')
+    try:
+        _benchmark_store(os.path.join(tmp_dir, 'orders.db'), order_count, batch_size)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def _benchmark_store(db_file, order_count, batch_size):
+    """在db_file（新建的空库）上执行 run_benchmark 的各项测试"""
+    from sample_data import generate_orders, generate_express_results
+
+    conn = open_store(db_file)
+
+    print(f"📥 写入 {order_count} 条模拟订单...")
+    start = time.perf_counter()
+    batch = []
+    written = 0
+    for order in generate_orders(order_count):
+        batch.append(order)
+        if len(batch) >= batch_size:
+            written += upsert_orders(conn, batch)
+            batch = []
+    if batch:
+        written += upsert_orders(conn, batch)
+    ingest_seconds = time.perf_counter() - start
+    print(f"   写入速度: {written / ingest_seconds:,.0f} 条/秒 (共 {ingest_seconds:.1f} 秒)")
+
+    # 待收货订单的快递结果，写入两次模拟重复查询，轨迹按唯一键去重
+    shipped_ids = logistics_targets(conn)
+    now = conn.execute('SELECT MAX(createdAt) FROM orders').fetchone()[0] + 30 * 86400
+    express_results = list(generate_express_results(shipped_ids, now=now))
+    start = time.perf_counter()
+    for _ in range(2):
+        for offset in range(0, len(express_results), batch_size):
+            upsert_express_results(conn, express_results[offset:offset + batch_size])
+    trace_seconds = time.perf_counter() - start
+    trace_count = conn.execute('SELECT COUNT(*) FROM traces').fetchone()[0]
+    fetched_count = sum(len(item['traces']) for item in express_results) * 2
+    print(f"   快递结果: {len(express_results)} 个快递写入两次 {trace_seconds:.1f} 秒, "
+          f"收到 {fetched_count} 条轨迹, 去重后保存 {trace_count} 条")
+
+    # 单个订单状态变化
+    sample_id = conn.execute('SELECT orderId FROM orders WHERE id = ?', (written // 2,)).fetchone()[0]
+    sample_order = {
+        'orderInfo': {'orderId': sample_id, 'status': {'name': '交易成功', 'key': 'TRADE_SUCCESS'}},
+        'products': [],
+    }
+
+    queries = [
+        ('单订单状态更新', lambda: upsert_orders(conn, [sample_order])),
+        ('状态统计', lambda: status_statistics(conn)),
+        ('物流目标筛选', lambda: logistics_targets(conn)),
+        ('按卖家筛选', lambda: conn.execute(
+            'SELECT COUNT(*) FROM orders WHERE sellerName = ?', ('潮玩小铺',)).fetchone()),
+        ('按下单时间范围', lambda: conn.execute(
+            'SELECT COUNT(*) FROM orders WHERE createdAt BETWEEN ? AND ?',
+            (1735660800, 1735660800 + 7 * 86400)).fetchone()),
+        ('全文搜索', lambda: search_orders(conn, '兰州市皋兰县', limit=50)),
+        ('导出一个状态', lambda: sum(1 for _ in iter_export_rows(conn, SHIPPED_STATUS))),
+        ('单个快递轨迹', lambda: list(iter_traces(conn, express_results[len(express_results) // 2]['expressNo']))),
+        ('72小时无新轨迹', lambda: stalled_shipments(conn, 72, now)),
+        ('各快递公司揽收到签收时长', lambda: delivery_time_by_company(conn)),
+    ]
+
+    print(f"\n⏱️ 查询延迟 ({written} 条订单):")
+    for name, query in queries:
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            query()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"   {name}: 中位数 {timings[len(timings) // 2] * 1000:.2f} ms")
+
+    conn.close()
+    print(f"\n📏 数据库大小: {os.path.getsize(db_file) / 1024 / 1024:.1f}MB")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='SQLite订单库')
+    parser.add_argument('--db', default=DEFAULT_DB_FILE, help='数据库文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='导入optimized_orders.json')
+    ingest_parser.add_argument('json_file', nargs='?', default='optimized_orders.json')
+
+    logistics_parser = subparsers.add_parser('ingest-logistics', help='导入logistics_results.json')
+    logistics_parser.add_argument('json_file', nargs='?', default='logistics_results.json')
+
+    status_parser = subparsers.add_parser('status', help='生成status_info.json')
+    status_parser.add_argument('-o', '--output', default='status_info.json')
+    status_parser.add_argument('--status', help='只输出某一状态的订单，如 待买家收货')
+    status_parser.add_argument('--poll-only', action='store_true', help='跳过已订阅推送、无需轮询的订单')
+
+    search_parser = subparsers.add_parser('search', help='全文搜索订单')
+    search_parser.add_argument('keyword')
+    search_parser.add_argument('--limit', type=int, default=50)
+
+    stalled_parser = subparsers.add_parser('stalled', help='超过指定小时数没有新轨迹的未签收快递')
+    stalled_parser.add_argument('--hours', type=float, default=72)
+    stalled_parser.add_argument('--limit', type=int, default=50)
+
+    subparsers.add_parser('delivery-times', help='各快递公司揽收到签收的时长')
+
+    traces_parser = subparsers.add_parser('traces', help='查看一个快递单号的全部轨迹')
+    traces_parser.add_argument('express_no')
+
+    bench_parser = subparsers.add_parser('bench', help='写入和查询基准测试')
+    bench_parser.add_argument('--orders', type=int, default=1000000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'bench':
+        run_benchmark(args.orders)
+        return
+
+    if args.command in ('ingest', 'ingest-logistics') and not os.path.exists(args.json_file):
+        print(f"❌ 错误: 找不到文件 {args.json_file}")
+        return
+
+    conn = open_store(args.db)
+    try:
+        if args.command == 'ingest':
+            total = ingest_optimized_file(conn, args.json_file)
+            print(f"✅ 共导入 {total} 条订单到 {args.db}")
+        elif args.command == 'ingest-logistics':
+            total = ingest_logistics_file(conn, args.json_file)
+            print(f"✅ 共导入 {total} 条物流信息到 {args.db}")
+        elif args.command == 'status':
+            output_data = write_status_info(conn, args.output, args.status, args.poll_only)
+            print(f"总订单数: {output_data['total_orders']}")
+            print(f"结果已保存到: {args.output}")
+            print("\n=== 状态统计 ===")
+            for status_name, count in output_data['status_statistics'].items():
+                print(f"{status_name}: {count} 个订单")
+        elif args.command == 'search':
+            for row in search_orders(conn, args.keyword, args.limit):
+                print(f"{row['orderId']}  {row['statusName']}  {row['buyer']}  {row['seller']}  {row['address']}")
+        elif args.command == 'stalled':
+            rows = stalled_shipments(conn, args.hours)
+            print(f"共 {len(rows)} 个快递超过 {args.hours:g} 小时没有新轨迹")
+            for row in rows[:args.limit]:
+                print(f"{row['orderId']}  {row['companyName']}  {row['expressNo']}  "
+                      f"{row['lastTraceState']}  已停滞 {row['stalledHours']} 小时")
+        elif args.command == 'delivery-times':
+            print("=== 揽收到签收时长（小时） ===")
+            for company_name, summary in delivery_time_by_company(conn).items():
+                print(f"{company_name}: {summary['count']} 个快递, 中位数 {summary['median']}, 90分位 {summary['p90']}")
+        elif args.command == 'traces':
+            for trace in iter_traces(conn, args.express_no):
+                trace_time = time.strftime('%Y-%m-%d %H:%M', time.localtime(trace['traceTime']))
+                print(f"{trace_time}  {trace['traceState']}  {trace['traceContext']}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
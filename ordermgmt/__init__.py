@@ -0,0 +1,8 @@
+"""
+订单管理工具集
+
+统一入口见 ordermgmt.cli；各子命令在执行时才导入对应模块和依赖（pandas、requests等），
+`ordermgmt --help` 和轻量子命令不受重依赖的启动时间影响
+"""
+
+__version__ = '0.1.0'
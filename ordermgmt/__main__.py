@@ -0,0 +1,3 @@
+from ordermgmt.cli import main
+
+main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ordermgmt 统一命令行入口
+
+    ordermgmt crawl      分页抓取订单（demo/demo2/http_req_v2.py）
+    ordermgmt merge      合并抓取结果（merge_result.py）
+    ordermgmt optimize   精简订单数据（optimize_orders.py）
+    ordermgmt status     生成status_info.json（extract_status.py 或订单库）
+    ordermgmt logistics  物流查询调度、任务队列、推送接收和轨迹查询
+    ordermgmt export     导出Excel（export_to_excel.py）
+    ordermgmt store      SQLite订单库（order_store.py）
+    ordermgmt history    订单历史版本（order_history.py）
+    ordermgmt sketch     流式统计：不同买家、商品排名、价格分位数（order_sketches.py）
+    ordermgmt images     商品图片本地缓存（image_cache.py）
+    ordermgmt sync       同步守护进程（sync_daemon.py）
+    ordermgmt cassette   HTTP请求录制/回放（http_cassette.py）
+    ordermgmt serve      本地查看订单页面
+
+本模块只导入标准库的argparse/os/sys，各子命令的模块和依赖在执行时才导入。
+文件路径都可以通过参数指定，默认值与原脚本相同（相对于当前目录）。
+任一子命令前加 --profile 即记录该阶段的性能数据（见 ordermgmt/profiling.py）
+"""
+
+import argparse
+import os
+import sys
+
+# 仓库根目录：公共模块和各脚本所在位置（以 pip install -e . 安装或直接在仓库中运行）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# logistics 子命令的动作 -> (模块, 模块命令行中的子命令)
+LOGISTICS_ACTIONS = {
+    'plan': ('logistics_scheduler', 'plan'),
+    'simulate': ('logistics_scheduler', 'simulate'),
+    'enqueue': ('work_queue', 'enqueue'),
+    'work': ('work_queue', 'work'),
+    'queue-stats': ('work_queue', 'stats'),
+    'mock': ('work_queue', 'mock'),
+    'push': ('logistics_push', 'serve'),
+    'ingest': ('order_store', 'ingest-logistics'),
+    'stalled': ('order_store', 'stalled'),
+    'delivery-times': ('order_store', 'delivery-times'),
+    'traces': ('order_store', 'traces'),
+}
+
+# 参数原样转交给模块自己的命令行解析
+FORWARDED_COMMANDS = ('logistics', 'export', 'store', 'history', 'sketch', 'images', 'sync', 'cassette')
+
+
+def _import_module(name):
+    """导入仓库根目录下的公共模块"""
+    import importlib
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return importlib.import_module(name)
+
+
+def _load_script(relative_path):
+    """按文件路径加载仓库中的脚本（脚本所在目录不是Python包）"""
+    import importlib.util
+
+    path = os.path.join(REPO_ROOT, relative_path)
+    if not os.path.exists(path):
+        print(f"❌ 错误: 找不到脚本 {path}，请在仓库目录中以 pip install -e . 安装")
+        sys.exit(1)
+    name = 'ordermgmt_' + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def cmd_crawl(args, extra):
+    module = _load_script('demo/demo2/http_req_v2.py')
+    transport = None
+    if args.cassette:
+        transport = _import_module('http_cassette').Transport(args.cassette, args.cassette_mode)
+    module.crawl(args.http_file, args.output_dir, args.resume, args.signature_dir, args.progress_file,
+                 args.max_limit, args.target_seconds, transport)
+
+
+def cmd_merge(args, extra):
+    module = _load_script('demo/demo2/raw_result/merge_result.py')
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    module.merge_json_files(workers, args.directory, args.output)
+
+
+def cmd_optimize(args, extra):
+    module = _load_script('demo/demo2/raw_result/optimize_orders.py')
+    module.optimize_orders_json(args.input_file, args.output, normalize=args.normalize, partition=args.partition,
+                                history_dir=args.history, sketch_dir=args.sketches, db_file=args.db,
+                                key_info_file=args.key_info)
+
+
+def cmd_status(args, extra):
+    if not args.db:
+        if args.status or args.poll_only:
+            print("❌ 错误: --status 和 --poll-only 需要配合 --db 使用")
+            sys.exit(1)
+        module = _load_script('demo/demo2/raw_result/extract_status.py')
+        module.extract_status_info(args.input_file, args.output, args.date_from, args.date_to)
+        return
+    if args.date_from or args.date_to:
+        print("❌ 错误: --from/--to 只用于JSON文件或分区目录，不能配合 --db 使用")
+        sys.exit(1)
+
+    order_store = _import_module('order_store')
+    order_store.main(['--db', args.db, 'status', '-o', args.output]
+                     + (['--status', args.status] if args.status else [])
+                     + (['--poll-only'] if args.poll_only else []))
+
+
+def cmd_logistics(args, extra):
+    if args.action is None:
+        args.subparser.print_help()
+        return
+    module_name, action = LOGISTICS_ACTIONS[args.action]
+    argv = []
+    if args.db and module_name != 'work_queue':
+        argv += ['--db', args.db]
+    if args.queue and module_name == 'work_queue':
+        argv += ['--queue', args.queue]
+    _import_module(module_name).main(argv + [action] + extra)
+
+
+def cmd_export(args, extra):
+    _import_module('export_to_excel').main(extra)
+
+
+def cmd_store(args, extra):
+    _import_module('order_store').main(extra)
+
+
+def cmd_history(args, extra):
+    _import_module('order_history').main(extra)
+
+
+def cmd_sketch(args, extra):
+    _import_module('order_sketches').main(extra)
+
+
+def cmd_images(args, extra):
+    _import_module('image_cache').main(extra)
+
+
+def cmd_sync(args, extra):
+    _import_module('sync_daemon').main(extra)
+
+
+def cmd_cassette(args, extra):
+    _import_module('http_cassette').main(extra)
+
+
+def cmd_serve(args, extra):
+    import io
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    directory = os.path.abspath(args.directory)
+
+    class ViewerHandler(SimpleHTTPRequestHandler):
+        """静态文件服务；build_viewer_data.py 生成了 .gz 预压缩文件时直接返回压缩版本"""
+
+        def __init__(self, *handler_args, **handler_kwargs):
+            super().__init__(*handler_args, directory=directory, **handler_kwargs)
+
+        def send_head(self):
+            path = self.translate_path(self.path)
+            if ('gzip' in self.headers.get('Accept-Encoding', '')
+                    and os.path.isfile(path) and os.path.isfile(path + '.gz')):
+                with open(path + '.gz', 'rb') as f:
+                    data = f.read()
+                self.send_response(200)
+                self.send_header('Content-Type', self.guess_type(path))
+                self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                return io.BytesIO(data)
+            return super().send_head()
+
+        def log_message(self, format, *log_args):
+            if not args.quiet:
+                super().log_message(format, *log_args)
+
+    server = ThreadingHTTPServer((args.host, args.port), ViewerHandler)
+    print(f"🚀 订单查看页面: http://{args.host}:{args.port}/index.html （目录 {directory}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n正在停止服务...")
+    finally:
+        server.server_close()
+
+
+def build_parser():
+    """构建命令行解析器（不导入任何子命令模块）"""
+    parser = argparse.ArgumentParser(prog='ordermgmt', description='订单管理工具')
+    profile_group = parser.add_argument_group('性能分析', '写在子命令之前，例如: ordermgmt --profile export')
+    profile_group.add_argument('--profile', action='store_true',
+                               help='用cProfile记录本次运行，写出 .pstats 和 .collapsed 文件并打印热点函数')
+    profile_group.add_argument('--profile-dir', default='profiles', help='性能数据目录（默认 profiles）')
+    profile_group.add_argument('--profile-top', type=int, default=20, help='打印的热点函数个数')
+    profile_group.add_argument('--sampler', choices=('builtin', 'py-spy', 'none'), default='builtin',
+                               help='调用栈采样器，py-spy 需要另外安装')
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    crawl_parser = subparsers.add_parser('crawl', help='分页抓取订单列表')
+    crawl_parser.add_argument('--http-file', default='http_req_think.hcy', help='请求模板')
+    crawl_parser.add_argument('-o', '--output-dir', default='raw_result', help='抓取结果归档目录')
+    crawl_parser.add_argument('--signature-dir', default='.', help='x-request-timestamp.txt / x-request-sign.txt 所在目录')
+    crawl_parser.add_argument('--progress-file', default='order_progress.json')
+    crawl_parser.add_argument('--max-limit', type=int, default=200,
+                              help='每页limit自动调整的上限，0表示固定使用请求模板中的limit')
+    crawl_parser.add_argument('--target-seconds', type=float, default=3.0, help='每页的目标耗时，超过时缩小limit')
+    crawl_parser.add_argument('--cassette', help='录制/回放请求的cassette文件（见 http_cassette.py）')
+    crawl_parser.add_argument('--cassette-mode', choices=['record', 'replay', 'replay-timed'], default='replay',
+                              help='record 录制，replay 以本地速度回放，replay-timed 按录制时的耗时回放')
+    mode = crawl_parser.add_mutually_exclusive_group()
+    mode.add_argument('--resume', dest='resume', action='store_true', default=None, help='从上次断点继续')
+    mode.add_argument('--restart', dest='resume', action='store_false', help='从头开始')
+    crawl_parser.set_defaults(func=cmd_crawl)
+
+    merge_parser = subparsers.add_parser('merge', help='合并抓取结果为merged_orders.json')
+    merge_parser.add_argument('directory', nargs='?', default='.', help='运行文件所在目录')
+    merge_parser.add_argument('-o', '--output', default='merged_orders.json')
+    merge_parser.add_argument('-w', '--workers', type=int, default=1, help='并行解析的进程数，0表示使用全部CPU核心')
+    merge_parser.set_defaults(func=cmd_merge)
+
+    optimize_parser = subparsers.add_parser('optimize', help='精简订单数据为optimized_orders.json')
+    optimize_parser.add_argument('input_file', nargs='?', default='merged_orders.json')
+    optimize_parser.add_argument('-o', '--output', default='optimized_orders.json')
+    optimize_parser.add_argument('--normalize', action='store_true', help='商品信息单独写入product_catalog.json')
+    optimize_parser.add_argument('--partition', choices=('day', 'month'),
+                                 help='按下单时间分区写入目录（optimized_orders.json -> optimized_orders/）')
+    optimize_parser.add_argument('--history', help='同时记录为历史版本的目录（order_history.py），如 order_history')
+    optimize_parser.add_argument('--sketches', help='同时保存统计状态的目录（order_sketches.py），如 order_sketches')
+    optimize_parser.add_argument('--db', help='同时写入的SQLite订单库（order_store.py），如 orders.db')
+    optimize_parser.add_argument('--key-info', help='同时输出订单关键信息（同extract_info.py），如 extracted_orders.json')
+    optimize_parser.set_defaults(func=cmd_optimize)
+
+    status_parser = subparsers.add_parser('status', help='生成status_info.json')
+    status_parser.add_argument('input_file', nargs='?', default='optimized_orders.json', help='订单文件或分区目录')
+    status_parser.add_argument('--from', dest='date_from', help='下单时间起点，如 2025-06-01')
+    status_parser.add_argument('--to', dest='date_to', help='下单时间终点（含当天），如 2025-06-07')
+    status_parser.add_argument('-o', '--output', default='status_info.json')
+    status_parser.add_argument('--db', help='从SQLite订单库生成')
+    status_parser.add_argument('--status', help='只输出某一状态的订单（需要--db）')
+    status_parser.add_argument('--poll-only', action='store_true', help='跳过已订阅推送的订单（需要--db）')
+    status_parser.set_defaults(func=cmd_status)
+
+    logistics_parser = subparsers.add_parser(
+        'logistics', add_help=False, help='物流查询调度、任务队列、推送接收和轨迹查询',
+        description='其余参数转交给对应模块，例如: ordermgmt logistics plan --budget 2000',
+    )
+    logistics_parser.add_argument('action', nargs='?', choices=list(LOGISTICS_ACTIONS))
+    logistics_parser.add_argument('--db', help='订单库文件路径')
+    logistics_parser.add_argument('--queue', help='任务队列文件路径或地址')
+    logistics_parser.set_defaults(func=cmd_logistics, subparser=logistics_parser)
+
+    export_parser = subparsers.add_parser('export', add_help=False, help='导出Excel（参数同 export_to_excel.py）')
+    export_parser.set_defaults(func=cmd_export)
+
+    store_parser = subparsers.add_parser('store', add_help=False, help='SQLite订单库（参数同 order_store.py）')
+    store_parser.set_defaults(func=cmd_store)
+
+    history_parser = subparsers.add_parser('history', add_help=False, help='订单历史版本（参数同 order_history.py）')
+    history_parser.set_defaults(func=cmd_history)
+
+    sketch_parser = subparsers.add_parser('sketch', add_help=False,
+                                          help='流式统计：不同买家、商品排名、价格分位数（参数同 order_sketches.py）')
+    sketch_parser.set_defaults(func=cmd_sketch)
+
+    images_parser = subparsers.add_parser('images', add_help=False, help='商品图片本地缓存（参数同 image_cache.py）')
+    images_parser.set_defaults(func=cmd_images)
+
+    sync_parser = subparsers.add_parser('sync', add_help=False, help='同步守护进程（参数同 sync_daemon.py）')
+    sync_parser.set_defaults(func=cmd_sync)
+
+    cassette_parser = subparsers.add_parser('cassette', add_help=False,
+                                            help='HTTP请求录制/回放（参数同 http_cassette.py）')
+    cassette_parser.set_defaults(func=cmd_cassette)
+
+    serve_parser = subparsers.add_parser('serve', help='本地查看订单页面')
+    serve_parser.add_argument('directory', nargs='?', default='.', help='index.html 所在目录')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8000)
+    serve_parser.add_argument('-q', '--quiet', action='store_true', help='不打印访问日志')
+    serve_parser.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    """主函数"""
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command in FORWARDED_COMMANDS:
+        # 转交的模块用 sys.argv[0] 作为帮助信息中的程序名
+        sys.argv[0] = f'ordermgmt {args.command}'
+    elif extra:
+        parser.error(f"无法识别的参数: {' '.join(extra)}")
+
+    if not args.profile:
+        args.func(args, extra)
+        return
+
+    from ordermgmt.profiling import profile_stage
+
+    # 性能数据按阶段命名，例如 export-20250617_083640.pstats、logistics-plan-...
+    stage = args.command
+    if args.command == 'logistics' and args.action:
+        stage += '-' + args.action
+    with profile_stage(stage, args.profile_dir, args.profile_top, args.sampler):
+        args.func(args, extra)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线各阶段的性能分析
+
+    ordermgmt --profile optimize merged_orders.json
+    ordermgmt --profile --sampler py-spy export --db orders.db
+
+每个阶段用cProfile记录，写出 {阶段}-{时间}.pstats；同时用采样器记录调用栈，
+写出同名的 .collapsed 文件（每行 "栈;帧 次数"，可直接交给 flamegraph.pl / speedscope）。
+采样器默认是内置的线程采样（按墙钟时间，网络等待也会计入），安装了 py-spy 时可以改用 py-spy。
+运行结束打印自身耗时最多的函数；历史文件保留在目录中，可以对比两次运行：
+
+    python -m ordermgmt.profiling compare profiles/export-20250617_083640.pstats profiles/export-20250618_091500.pstats
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+DEFAULT_PROFILE_DIR = 'profiles'
+SAMPLERS = ('builtin', 'py-spy', 'none')
+
+
+class StackSampler(threading.Thread):
+    """
+    内置采样器：后台线程定时读取各线程的调用栈并计数
+
+    只用到 sys._current_frames()，不依赖第三方库，也不会和cProfile的钩子冲突
+    """
+
+    def __init__(self, interval=0.005):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, f'thread-{ident}'))
+                self.counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class PySpySampler:
+    """用 py-spy 采样当前进程，直接输出collapsed格式（需要有ptrace权限）"""
+
+    def __init__(self, path, rate=200):
+        self.path = path
+        self.process = subprocess.Popen(
+            ['py-spy', 'record', '--pid', str(os.getpid()), '--format', 'raw', '--rate', str(rate),
+             '--output', path, '--nonblocking'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        # 等py-spy附加到进程上
+        time.sleep(0.2)
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGINT)
+        try:
+            _, stderr = self.process.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            _, stderr = self.process.communicate()
+        if self.process.returncode not in (0, None) and not os.path.exists(self.path):
+            print(f"⚠️ py-spy 采样失败: {stderr.decode('utf-8', 'replace').strip()[-300:]}")
+
+
+def _function_label(func):
+    file_name, line, name = func
+    if file_name == '~':
+        return name
+    return f'{name} ({os.path.basename(file_name)}:{line})'
+
+
+def print_top_functions(stats, top=20, title=None):
+    """按自身耗时打印最热的函数"""
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    total = stats.total_tt or 1e-9
+    print(f"\n🔥 {title or '自身耗时最多的函数'}（共 {total:.2f} 秒）:")
+    print(f"   {'自身ms':>9} {'占比':>6} {'累计ms':>9} {'调用次数':>10}  函数")
+    for func, (_, calls, self_time, cumulative, _) in entries:
+        print(f"   {self_time * 1000:9.1f} {self_time / total * 100:5.1f}% {cumulative * 1000:9.1f} "
+              f"{calls:10d}  {_function_label(func)}")
+
+
+@contextmanager
+def profile_stage(stage, output_dir=DEFAULT_PROFILE_DIR, top=20, sampler='builtin', interval=0.005):
+    """
+    对一个阶段做性能分析，结束时写出 .pstats 和 .collapsed 文件并打印热点函数
+
+    阶段中抛出的异常（包括 SystemExit）照常向外传递，已记录的数据仍会写出
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base_path = os.path.join(output_dir, f"{stage}-{time.strftime('%Y%m%d_%H%M%S')}")
+    collapsed_path = base_path + '.collapsed'
+
+    if sampler == 'py-spy' and shutil.which('py-spy') is None:
+        print("⚠️ 未安装py-spy，改用内置采样器 (pip install py-spy)")
+        sampler = 'builtin'
+    stack_sampler = None
+    if sampler == 'builtin':
+        stack_sampler = StackSampler(interval)
+        stack_sampler.start()
+    elif sampler == 'py-spy':
+        stack_sampler = PySpySampler(collapsed_path)
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        if stack_sampler is not None:
+            stack_sampler.stop()
+            if isinstance(stack_sampler, StackSampler):
+                stack_sampler.write_collapsed(collapsed_path)
+
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(base_path + '.pstats')
+        print_top_functions(stats, top, f"{stage} 自身耗时最多的函数")
+        print(f"\n⏱️ 阶段 {stage} 耗时 {elapsed:.2f} 秒")
+        print(f"📝 性能数据: {base_path}.pstats")
+        if os.path.exists(collapsed_path):
+            print(f"📝 调用栈: {collapsed_path}（flamegraph.pl 或 speedscope 可直接打开）")
+
+
+def compare_profiles(old_file, new_file, top=20):
+    """对比两次运行各函数的自身耗时，按变化量排序"""
+    old_stats = pstats.Stats(old_file).stats
+    new_stats = pstats.Stats(new_file).stats
+    rows = []
+    for func in set(old_stats) | set(new_stats):
+        old_time = old_stats[func][2] if func in old_stats else 0.0
+        new_time = new_stats[func][2] if func in new_stats else 0.0
+        rows.append((new_time - old_time, old_time, new_time, func))
+    rows.sort(key=lambda row: abs(row[0]), reverse=True)
+
+    old_total = sum(stat[2] for stat in old_stats.values())
+    new_total = sum(stat[2] for stat in new_stats.values())
+    print(f"总自身耗时: {old_total:.2f} 秒 -> {new_total:.2f} 秒")
+    print(f"   {'旧ms':>9} {'新ms':>9} {'变化ms':>9}  函数")
+    for delta, old_time, new_time, func in rows[:top]:
+        print(f"   {old_time * 1000:9.1f} {new_time * 1000:9.1f} {delta * 1000:+9.1f}  {_function_label(func)}")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='性能分析文件工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show_parser = subparsers.add_parser('show', help='打印一个 .pstats 文件的热点函数')
+    show_parser.add_argument('pstats_file')
+    show_parser.add_argument('--top', type=int, default=20)
+
+    compare_parser = subparsers.add_parser('compare', help='对比两次运行的 .pstats 文件')
+    compare_parser.add_argument('old_file')
+    compare_parser.add_argument('new_file')
+    compare_parser.add_argument('--top', type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'show':
+        print_top_functions(pstats.Stats(args.pstats_file), args.top, os.path.basename(args.pstats_file))
+    elif args.command == 'compare':
+        compare_profiles(args.old_file, args.new_file, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ordermgmt 启动时间基准测试
+
+    python -m ordermgmt.startup_bench [--runs 10]
+
+每个命令在新的解释器中运行多次取中位数（包含解释器本身的启动时间），
+再用 -X importtime 运行一次，统计导入耗时最多的模块，并检查是否导入了重依赖
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 只应在导出、抓取等子命令真正执行时导入的依赖
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'requests', 'urllib3', 'zstandard', 'brotli')
+
+# 冷启动时间目标（毫秒）
+TARGET_MS = 100
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def time_command(args, runs):
+    """新解释器中运行命令，返回耗时中位数（毫秒）"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, env=_env(), stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def import_profile(args):
+    """
+    用 -X importtime 运行一次命令
+
+    Returns:
+        (顶层导入总耗时毫秒, [(累计耗时毫秒, 模块名)] 按耗时降序, 已导入的模块名集合)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, env=_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
+    top_level = []
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # 嵌套导入的模块名带缩进，只累计顶层导入
+        if not name[1:].startswith(' '):
+            top_level.append((int(cumulative) / 1000, name.strip()))
+    top_level.sort(reverse=True)
+    return sum(ms for ms, _ in top_level), top_level, modules
+
+
+def _sample_files(tmp_dir):
+    """生成轻量子命令用的小数据文件"""
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    from sample_data import generate_orders
+
+    orders_file = os.path.join(tmp_dir, 'optimized_orders.json')
+    with open(orders_file, 'w', encoding='utf-8') as f:
+        json.dump(list(generate_orders(300)), f, ensure_ascii=False)
+    return orders_file
+
+
+def run_benchmark(runs):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        orders_file = _sample_files(tmp_dir)
+        db_file = os.path.join(tmp_dir, 'orders.db')
+        cases = [
+            ('python -c pass（解释器本身）', ['-c', 'pass']),
+            ('ordermgmt --help', ['-m', 'ordermgmt', '--help']),
+        ] + [
+            (f'ordermgmt {command} --help', ['-m', 'ordermgmt', command, '--help'])
+            for command in ('crawl', 'merge', 'optimize', 'status', 'logistics', 'export', 'store', 'serve')
+        ] + [
+            ('ordermgmt status (300单)', ['-m', 'ordermgmt', 'status', orders_file,
+                                          '-o', os.path.join(tmp_dir, 'status_info.json')]),
+            ('ordermgmt logistics stalled', ['-m', 'ordermgmt', 'logistics', '--db', db_file, 'stalled']),
+        ]
+
+        print(f"📊 冷启动时间（{runs} 次中位数，目标 < {TARGET_MS} ms）:")
+        all_ok = True
+        for name, args in cases:
+            elapsed = time_command(args, runs)
+            import_ms, _, modules = import_profile(args)
+            heavy = sorted(module for module in modules if module.split('.')[0] in HEAVY_MODULES)
+            ok = elapsed < TARGET_MS and not heavy
+            all_ok = all_ok and ok
+            print(f"   {'✅' if ok else '❌'} {name:<32} {elapsed:6.1f} ms  导入 {import_ms:5.1f} ms"
+                  + (f"  重依赖: {', '.join(heavy)}" if heavy else ''))
+
+        _, top_level, _ = import_profile(['-m', 'ordermgmt', '--help'])
+        print("\n📦 ordermgmt --help 导入耗时最多的模块:")
+        for ms, module in top_level[:8]:
+            print(f"   {ms:6.2f} ms  {module}")
+
+    print(f"\n{'✅ 全部达标' if all_ok else '❌ 有命令超过目标或导入了重依赖'}")
+    return all_ok
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='ordermgmt 启动时间基准测试')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args(argv)
+    sys.exit(0 if run_benchmark(args.runs) else 1)
+
+
+if __name__ == '__main__':
+    main()
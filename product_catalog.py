@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+商品目录（规范化输出）
+同一商品的名称、图片、描述和规格在成千上万个订单里重复出现，
+规范化模式下商品信息只在product_catalog.json中写一次，订单里只保留引用ID、价格和数量
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_CATALOG_FILE = 'product_catalog.json'
+
+# 写入目录的商品字段，price/amount 留在订单里
+CATALOG_FIELDS = ('productName', 'cover', 'whiteBgPng', 'description', 'specValues')
+
+
+def product_ref(product):
+    """根据商品和规格内容计算引用ID，内容相同的商品得到相同的ID"""
+    payload = {field: product.get(field, '') for field in CATALOG_FIELDS}
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def normalize_orders(orders):
+    """
+    把订单中的商品信息拆分到商品目录
+
+    Args:
+        orders: optimized_orders.json 结构的订单列表
+
+    Returns:
+        (规范化后的订单列表, 商品目录字典 {ref: 商品信息})
+    """
+    catalog = {}
+    normalized = []
+
+    for order in orders:
+        products = []
+        for product in order.get('products', []):
+            ref = product_ref(product)
+            if ref not in catalog:
+                catalog[ref] = {field: product.get(field, '') for field in CATALOG_FIELDS}
+            products.append({
+                'ref': ref,
+                'price': product.get('price', 0),
+                'amount': product.get('amount', 1)
+            })
+
+        normalized_order = dict(order)
+        normalized_order['products'] = products
+        normalized.append(normalized_order)
+
+    return normalized, catalog
+
+
+def catalog_path_for(orders_file):
+    """订单文件对应的商品目录路径（同一目录下的product_catalog.json）"""
+    return os.path.join(os.path.dirname(os.path.abspath(orders_file)), DEFAULT_CATALOG_FILE)
+
+
+class ProductCatalog:
+    """
+    延迟加载的商品目录
+
+    只有遇到第一个带ref的商品时才读取目录文件，未规范化的数据不受影响
+    """
+
+    def __init__(self, catalog_file):
+        self.catalog_file = catalog_file
+        self._products = None
+
+    def _load(self):
+        if self._products is None:
+            if os.path.exists(self.catalog_file):
+                with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                    self._products = json.load(f)
+            else:
+                print(f"⚠️ 找不到商品目录 {self.catalog_file}，商品信息将为空")
+                self._products = {}
+        return self._products
+
+    def resolve(self, product):
+        """返回完整的商品信息，未规范化的商品原样返回"""
+        ref = product.get('ref')
+        if ref is None:
+            return product
+        resolved = dict(self._load().get(ref, {}))
+        resolved['price'] = product.get('price', 0)
+        resolved['amount'] = product.get('amount', 1)
+        return resolved
+
+    def resolve_products(self, products):
+        return [self.resolve(product) for product in products]
+
+
+def write_normalized(orders, orders_file, catalog_file=None, indent=2):
+    """写入规范化的订单文件和商品目录，返回商品目录中的商品数"""
+    normalized, catalog = normalize_orders(orders)
+    catalog_file = catalog_file or catalog_path_for(orders_file)
+
+    with open(orders_file, 'w', encoding='utf-8') as f:
+        json.dump(normalized, f, ensure_ascii=False, indent=indent)
+    with open(catalog_file, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, indent=indent)
+    return len(catalog)
+
+
+def _format_size(size_bytes):
+    return f"{size_bytes / 1024 / 1024:.1f}MB"
+
+
+def _timed_load(*files):
+    start = time.perf_counter()
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            json.load(f)
+    return time.perf_counter() - start
+
+
+def run_benchmark(orders, label):
+    """对比完整输出和规范化输出的文件大小与加载时间"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        full_file = os.path.join(tmp_dir, 'optimized_orders.json')
+        normalized_file = os.path.join(tmp_dir, 'optimized_orders.normalized.json')
+        catalog_file = os.path.join(tmp_dir, DEFAULT_CATALOG_FILE)
+
+        with open(full_file, 'w', encoding='utf-8') as f:
+            json.dump(orders, f, ensure_ascii=False, indent=2)
+        product_count = write_normalized(orders, normalized_file, catalog_file)
+
+        full_size = os.path.getsize(full_file)
+        normalized_size = os.path.getsize(normalized_file) + os.path.getsize(catalog_file)
+        full_load = min(_timed_load(full_file) for _ in range(3))
+        normalized_load = min(_timed_load(normalized_file, catalog_file) for _ in range(3))
+
+    print(f"\n📊 {label}: {len(orders)} 个订单, {product_count} 个不同商品")
+    print(f"   完整输出: {_format_size(full_size)}, 加载 {full_load * 1000:.0f} ms")
+    print(f"   规范化输出: {_format_size(normalized_size)}, 加载 {normalized_load * 1000:.0f} ms")
+    print(f"   体积减少: {(1 - normalized_size / full_size) * 100:.1f}%, "
+          f"加载时间减少: {(1 - normalized_load / full_load) * 100:.1f}%")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='商品目录（规范化输出）工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    normalize_parser = subparsers.add_parser('normalize', help='把已有的optimized_orders.json转换为规范化格式')
+    normalize_parser.add_argument('input_file', nargs='?', default='optimized_orders.json')
+    normalize_parser.add_argument('-o', '--output', help='输出文件，默认覆盖输入文件')
+
+    bench_parser = subparsers.add_parser('bench', help='对比完整输出和规范化输出的大小与加载时间')
+    bench_parser.add_argument('input_file', nargs='?', help='使用真实的optimized_orders.json，默认使用模拟数据')
+    bench_parser.add_argument('--orders', type=int, default=100000, help='模拟订单数')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'normalize':
+        if not os.path.exists(args.input_file):
+            print(f"❌ 错误: 找不到文件 {args.input_file}")
+            return
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            orders = json.load(f)
+        if any('ref' in product for order in orders for product in order.get('products', [])):
+            print(f"⚠️ {args.input_file} 已经是规范化格式")
+            return
+        output_file = args.output or args.input_file
+        product_count = write_normalized(orders, output_file)
+        print(f"✅ 已写入 {output_file} 和 {catalog_path_for(output_file)}，共 {product_count} 个不同商品")
+    elif args.command == 'bench':
+        if args.input_file:
+            with open(args.input_file, 'r', encoding='utf-8') as f:
+                orders = json.load(f)
+            run_benchmark(orders, args.input_file)
+        else:
+            from sample_data import generate_orders
+            run_benchmark(list(generate_orders(args.orders)), '模拟数据')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字段投影规则
+用声明式的规则描述"源字段路径 -> 输出字段（默认值）"，编译一次生成专用的提取函数，
+替代各脚本中手写的 .get() 链。同一订单上的多个投影可以编译成一个函数，一次遍历全部输出
+
+规则写法:
+    {
+        'orderId': field('orderId'),                       # 取 src['orderId']，缺失时为 ''
+        'status': {'name': field('status.name')},          # 嵌套输出对象，路径仍相对于当前对象
+        'buyer': nested('buyer', {'name': field('name')}),  # 嵌套输出对象，路径相对于 src['buyer']
+        'products': each('products', PRODUCT_SPEC),        # 列表中每个元素按子规则提取
+    }
+路径中间任何一级不是dict时按空对象处理，最终字段使用默认值；each 的列表元素应为dict
+"""
+
+import argparse
+import time
+
+_EMPTY = {}
+
+# 可以直接写成字面量的默认值，每次调用都会生成新对象（例如 [] 不会在订单之间共享）
+_LITERAL_TYPES = (str, int, float, bool, type(None))
+
+
+class _Field:
+    __slots__ = ('path', 'default')
+
+    def __init__(self, path, default):
+        self.path = path
+        self.default = default
+
+
+class _Nested:
+    __slots__ = ('path', 'spec')
+
+    def __init__(self, path, spec):
+        self.path = path
+        self.spec = spec
+
+
+class _Each:
+    __slots__ = ('path', 'spec')
+
+    def __init__(self, path, spec):
+        self.path = path
+        self.spec = spec
+
+
+def field(path, default=''):
+    """取路径上的字段值，缺失时使用默认值"""
+    return _Field(path, default)
+
+
+def nested(path, spec):
+    """以路径上的对象为根，按子规则生成嵌套输出对象"""
+    return _Nested(path, spec)
+
+
+def each(path, spec):
+    """路径上的列表中每个元素按子规则提取，缺失或不是列表时输出 []"""
+    return _Each(path, spec)
+
+
+def _split(path):
+    return tuple(part for part in path.split('.') if part)
+
+
+class _Compiler:
+    """把规则翻译成Python源码"""
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {'_EMPTY': _EMPTY}
+        self._counter = 0
+        self._containers = {}
+
+    def _new_name(self, prefix):
+        self._counter += 1
+        return f'{prefix}{self._counter}'
+
+    def _container(self, scope, parts):
+        """返回保存 scope[parts...] 对象的局部变量名，同一路径只解析一次"""
+        if not parts:
+            return scope
+        key = (scope, parts)
+        if key not in self._containers:
+            parent = self._container(scope, parts[:-1])
+            name = self._new_name('v')
+            self.lines.append(f'    {name} = {parent}.get({parts[-1]!r})')
+            self.lines.append(f'    if {name}.__class__ is not dict: {name} = _EMPTY')
+            self._containers[key] = name
+        return self._containers[key]
+
+    def _default_expr(self, default):
+        if isinstance(default, _LITERAL_TYPES) or (isinstance(default, (list, dict)) and not default):
+            return repr(default)
+        name = self._new_name('_d')
+        self.namespace[name] = default
+        return name
+
+    def expr(self, scope, spec):
+        """生成规则对应的表达式"""
+        if isinstance(spec, dict):
+            items = ', '.join(f'{key!r}: {self.expr(scope, value)}' for key, value in spec.items())
+            return '{' + items + '}'
+        if isinstance(spec, _Field):
+            parts = _split(spec.path)
+            container = self._container(scope, parts[:-1])
+            return f'{container}.get({parts[-1]!r}, {self._default_expr(spec.default)})'
+        if isinstance(spec, _Nested):
+            return self.expr(self._container(scope, _split(spec.path)), spec.spec)
+        if isinstance(spec, _Each):
+            parts = _split(spec.path)
+            container = self._container(scope, parts[:-1])
+            seq = self._new_name('s')
+            item = self._new_name('x')
+            item_expr = self._item_expr(item, spec.spec)
+            return (f'[{item_expr} for {item} in {seq}] '
+                    f'if ({seq} := {container}.get({parts[-1]!r})).__class__ is list else []')
+        raise TypeError(f"不支持的投影规则: {spec!r}")
+
+    def _item_expr(self, item, spec):
+        """
+        列表元素的表达式：不需要中间变量时直接内联到列表推导式中，
+        否则编译成单独的函数逐个调用
+        """
+        child = _Compiler()
+        child._counter = self._counter
+        expr = child.expr(item, spec)
+        if not child.lines:
+            self._counter = child._counter
+            self.namespace.update(child.namespace)
+            return expr
+        func = self._new_name('_f')
+        self.namespace[func] = compile_projection(spec)
+        return f'{func}({item})'
+
+    def build(self, name, body_expr):
+        source = '\n'.join(
+            [f'def {name}(src):', '    if src.__class__ is not dict: src = _EMPTY']
+            + self.lines
+            + [f'    return {body_expr}']
+        )
+        exec(compile(source, f'<projection {name}>', 'exec'), self.namespace)
+        func = self.namespace[name]
+        func.source = source
+        return func
+
+
+def compile_projection(spec, name='project'):
+    """把一个投影规则编译成提取函数 func(src) -> dict"""
+    compiler = _Compiler()
+    return compiler.build(name, compiler.expr('src', spec))
+
+
+def compile_projections(specs, name='project_many'):
+    """
+    把多个投影规则编译成一个函数，一次遍历同时输出所有投影
+
+    Args:
+        specs: {投影名: 规则}
+
+    Returns:
+        func(src) -> {投影名: 输出}；各投影共用的路径只解析一次
+    """
+    compiler = _Compiler()
+    items = ', '.join(f'{key!r}: {compiler.expr("src", spec)}' for key, spec in specs.items())
+    return compiler.build(name, '{' + items + '}')
+
+
+# ---------------------------------------------------------------------------
+# 各脚本使用的投影规则
+# ---------------------------------------------------------------------------
+
+# optimize_orders.py: 网页展示需要的订单信息（以 orderInfo 为根）
+ORDER_INFO_SPEC = {
+    'orderId': field('orderId'),
+    'status': {
+        'name': field('status.name'),
+        'key': field('status.key'),
+    },
+    'createdAt': field('createdAt'),
+    'buyer': {
+        'name': field('buyer.name'),
+        'phone': field('buyer.phone'),
+    },
+    'seller': {
+        'name': field('seller.name'),
+    },
+    'receiver': field('receiver'),
+    'address': field('address'),
+    'orderPrice': field('orderPrice', 0),
+    'paidPrice': field('paidPrice', 0),
+    'expressPrice': field('expressPrice', 0),
+}
+
+# optimize_orders.py: 网页展示需要的商品信息（以单个商品为根）
+PRODUCT_SPEC = {
+    'productName': field('productName'),
+    'cover': field('cover'),
+    'whiteBgPng': field('whiteBgPng'),
+    'price': field('price', 0),
+    'amount': field('amount', 1),
+    'description': field('description'),
+    'specValues': each('specValues', {
+        'name': field('name'),
+        'value': field('value'),
+        'color': field('color'),
+        'labelColor': field('labelColor'),
+    }),
+}
+
+# optimize_orders.py: 完整的优化后订单（以接口 rowList 中的订单为根，page 由调用方补充）
+OPTIMIZED_ORDER_SPEC = {
+    'orderInfo': nested('orderInfo', ORDER_INFO_SPEC),
+    'products': each('products', PRODUCT_SPEC),
+}
+
+# extract_info.py: 订单关键信息（以接口 rowList 中的订单为根）
+KEY_ORDER_INFO_SPEC = {
+    'orderId': field('orderInfo.orderId'),
+    'status': {
+        'name': field('orderInfo.status.name'),
+        'key': field('orderInfo.status.key'),
+    },
+    'orderType': {
+        'name': field('orderInfo.orderType.name'),
+        'key': field('orderInfo.orderType.key'),
+    },
+    'createdAt': field('orderInfo.createdAt'),
+    'paidAt': field('orderInfo.paidAt'),
+    'deliverPattern': {
+        'name': field('orderInfo.deliverPattern.name'),
+        'key': field('orderInfo.deliverPattern.key'),
+    },
+    'buyer': nested('orderInfo.buyer', {
+        'id': field('id'),
+        'name': field('name'),
+        'phone': field('phone'),
+    }),
+    'seller': nested('orderInfo.seller', {
+        'id': field('id'),
+        'name': field('name'),
+        'phone': field('phone'),
+    }),
+    'receiver': nested('orderInfo', {
+        'name': field('receiver'),
+        'phone': field('receiverPhone'),
+        'address': field('address'),
+        'province': field('receiverProvince'),
+        'city': field('receiverCity'),
+        'district': field('receiverDistrict'),
+    }),
+    'pricing': nested('orderInfo', {
+        'orderPrice': field('orderPrice', 0),
+        'expressPrice': field('expressPrice', 0),
+        'paidPrice': field('paidPrice', 0),
+        'originalPrice': field('orderOriginalPrice', 0),
+        'afterDiscountPrice': field('afterDiscountPrice', 0),
+    }),
+    'products': each('products', {
+        'productId': field('productId'),
+        'productName': field('productName'),
+        'unitPrice': field('uintPrice', 0),
+        'amount': field('amount', 0),
+        'totalPrice': field('price', 0),
+        'description': field('description'),
+        'specValues': field('specValues', []),
+    }),
+    'availableActions': each('activeActions', {
+        'action': field('action'),
+        'actionName': field('actionName'),
+    }),
+    'productNum': field('productNum', '0'),
+    'relatedId': field('orderInfo.relatedId'),
+    'relatedType': field('orderInfo.relatedType'),
+    'expiredAt': field('orderInfo.expiredAt', '0'),
+}
+
+
+# ---------------------------------------------------------------------------
+# 改用投影规则之前手写的提取函数，只用于基准测试对比
+# ---------------------------------------------------------------------------
+
+def _handwritten_optimized_order(order):
+    """原 optimize_orders.py 的 extract_order_info + extract_products_info"""
+    order_info = order.get('orderInfo', {})
+    buyer = order_info.get('buyer', {})
+    seller = order_info.get('seller', {})
+    status = order_info.get('status', {})
+    products = []
+    for product in order.get('products', []):
+        specs = []
+        for spec in product.get('specValues', []):
+            specs.append({
+                'name': spec.get('name', ''),
+                'value': spec.get('value', ''),
+                'color': spec.get('color', ''),
+                'labelColor': spec.get('labelColor', ''),
+            })
+        products.append({
+            'productName': product.get('productName', ''),
+            'cover': product.get('cover', ''),
+            'whiteBgPng': product.get('whiteBgPng', ''),
+            'price': product.get('price', 0),
+            'amount': product.get('amount', 1),
+            'description': product.get('description', ''),
+            'specValues': specs,
+        })
+    return {
+        'orderInfo': {
+            'orderId': order_info.get('orderId', ''),
+            'status': {'name': status.get('name', ''), 'key': status.get('key', '')},
+            'createdAt': order_info.get('createdAt', ''),
+            'buyer': {'name': buyer.get('name', ''), 'phone': buyer.get('phone', '')},
+            'seller': {'name': seller.get('name', '')},
+            'receiver': order_info.get('receiver', ''),
+            'address': order_info.get('address', ''),
+            'orderPrice': order_info.get('orderPrice', 0),
+            'paidPrice': order_info.get('paidPrice', 0),
+            'expressPrice': order_info.get('expressPrice', 0),
+        },
+        'products': products,
+    }
+
+
+def _handwritten_key_order_info(order_data):
+    """原 extract_info.py 的 extract_key_order_info"""
+    order_info = order_data.get('orderInfo', {})
+    buyer = order_info.get('buyer', {})
+    seller = order_info.get('seller', {})
+    return {
+        'orderId': order_info.get('orderId', ''),
+        'status': {
+            'name': order_info.get('status', {}).get('name', ''),
+            'key': order_info.get('status', {}).get('key', ''),
+        },
+        'orderType': {
+            'name': order_info.get('orderType', {}).get('name', ''),
+            'key': order_info.get('orderType', {}).get('key', ''),
+        },
+        'createdAt': order_info.get('createdAt', ''),
+        'paidAt': order_info.get('paidAt', ''),
+        'deliverPattern': {
+            'name': order_info.get('deliverPattern', {}).get('name', ''),
+            'key': order_info.get('deliverPattern', {}).get('key', ''),
+        },
+        'buyer': {'id': buyer.get('id', ''), 'name': buyer.get('name', ''), 'phone': buyer.get('phone', '')},
+        'seller': {'id': seller.get('id', ''), 'name': seller.get('name', ''), 'phone': seller.get('phone', '')},
+        'receiver': {
+            'name': order_info.get('receiver', ''),
+            'phone': order_info.get('receiverPhone', ''),
+            'address': order_info.get('address', ''),
+            'province': order_info.get('receiverProvince', ''),
+            'city': order_info.get('receiverCity', ''),
+            'district': order_info.get('receiverDistrict', ''),
+        },
+        'pricing': {
+            'orderPrice': order_info.get('orderPrice', 0),
+            'expressPrice': order_info.get('expressPrice', 0),
+            'paidPrice': order_info.get('paidPrice', 0),
+            'originalPrice': order_info.get('orderOriginalPrice', 0),
+            'afterDiscountPrice': order_info.get('afterDiscountPrice', 0),
+        },
+        'products': [
+            {
+                'productId': product.get('productId', ''),
+                'productName': product.get('productName', ''),
+                'unitPrice': product.get('uintPrice', 0),
+                'amount': product.get('amount', 0),
+                'totalPrice': product.get('price', 0),
+                'description': product.get('description', ''),
+                'specValues': product.get('specValues', []),
+            }
+            for product in order_data.get('products', [])
+        ],
+        'availableActions': [
+            {'action': action.get('action', ''), 'actionName': action.get('actionName', '')}
+            for action in order_data.get('activeActions', [])
+        ],
+        'productNum': order_data.get('productNum', '0'),
+        'relatedId': order_info.get('relatedId', ''),
+        'relatedType': order_info.get('relatedType', ''),
+        'expiredAt': order_info.get('expiredAt', '0'),
+    }
+
+
+def run_benchmark(order_count, rounds=5):
+    """
+    编译后的提取函数与原手写提取函数的对比，以及两个投影一次遍历与分别遍历的对比
+
+    每种方式交替运行rounds轮取中位数，减少机器负载波动的影响；先检查两种方式的输出一致
+    """
+    from sample_data import generate_raw_pages
+
+    rows = [row for page in generate_raw_pages(order_count // 30 + 1) for row in page['response']['data']['rowList']]
+    rows = rows[:order_count]
+
+    extract_optimized = compile_projection(OPTIMIZED_ORDER_SPEC, 'extract_optimized')
+    extract_key = compile_projection(KEY_ORDER_INFO_SPEC, 'extract_key')
+    extract_both = compile_projections({'optimized': OPTIMIZED_ORDER_SPEC, 'key': KEY_ORDER_INFO_SPEC})
+
+    for row in rows:
+        if (extract_optimized(row) != _handwritten_optimized_order(row)
+                or extract_key(row) != _handwritten_key_order_info(row)):
+            print(f"❌ 编译后的提取结果与手写函数不一致: {row.get('orderInfo', {}).get('orderId')}")
+            return
+
+    def timed(func):
+        start = time.perf_counter()
+        for row in rows:
+            func(row)
+        return time.perf_counter() - start
+
+    candidates = [
+        ('优化订单 手写', _handwritten_optimized_order),
+        ('优化订单 投影', extract_optimized),
+        ('关键信息 手写', _handwritten_key_order_info),
+        ('关键信息 投影', extract_key),
+        ('两个投影一次遍历', extract_both),
+    ]
+    timings = {name: [] for name, _ in candidates}
+    for _ in range(rounds):
+        for name, func in candidates:
+            timings[name].append(timed(func))
+    medians = {name: sorted(values)[len(values) // 2] for name, values in timings.items()}
+
+    print(f"\n📊 {len(rows)} 个订单（{rounds} 轮中位数，输出已核对一致）:")
+    for name, _ in candidates:
+        seconds = medians[name]
+        print(f"   {name}: {seconds * 1000:.0f} ms ({len(rows) / seconds:,.0f} 单/秒)")
+    for label in ('优化订单', '关键信息'):
+        ratio = medians[f'{label} 手写'] / medians[f'{label} 投影']
+        print(f"   {label}: 投影耗时为手写的 {1 / ratio:.2f} 倍")
+    separate = medians['优化订单 投影'] + medians['关键信息 投影']
+    print(f"   两个投影分别遍历: {separate * 1000:.0f} ms, 一次遍历: {medians['两个投影一次遍历'] * 1000:.0f} ms")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='字段投影规则工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show_parser = subparsers.add_parser('show', help='打印投影规则编译后的源码')
+    show_parser.add_argument('spec', choices=['order_info', 'product', 'optimized_order', 'key_order_info'])
+
+    bench_parser = subparsers.add_parser('bench', help='提取函数基准测试')
+    bench_parser.add_argument('--orders', type=int, default=100000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'show':
+        spec = {
+            'order_info': ORDER_INFO_SPEC,
+            'product': PRODUCT_SPEC,
+            'optimized_order': OPTIMIZED_ORDER_SPEC,
+            'key_order_info': KEY_ORDER_INFO_SPEC,
+        }[args.spec]
+        print(compile_projection(spec, f'extract_{args.spec}').source)
+    elif args.command == 'bench':
+        run_benchmark(args.orders)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始响应压缩归档
+http_req_v2.py 每页响应写成一行JSON（NDJSON），用zstd压缩（未安装zstandard时用gzip），
+merge_result.py 逐行流式读取，compact 命令把历史运行合并成一个去重后的归档
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+RUN_FILE_PREFIX = 'http_req_v2_'
+
+# 兼容旧的 pretty-printed JSON 运行文件
+LEGACY_SUFFIX = '.json'
+
+# write_spooled_page 序列化时 rowList 的占位值（序列化后是唯一的 "\u0000rowList\u0000"）
+ROW_LIST_PLACEHOLDER = '\x00rowList\x00'
+
+
+def archive_suffix():
+    """当前环境下新归档使用的扩展名"""
+    return '.ndjson.zst' if zstandard is not None else '.ndjson.gz'
+
+
+def _open_text(path, mode):
+    """按扩展名打开（压缩的）文本文件，mode 为 'rt' 或 'wt'"""
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"读取 {path} 需要安装zstandard: pip install zstandard")
+        return zstandard.open(path, mode, cctx=zstandard.ZstdCompressor(level=10), encoding='utf-8')
+    if path.endswith('.gz'):
+        if mode == 'wt':
+            return gzip.open(path, mode, compresslevel=6, encoding='utf-8')
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode[0], encoding='utf-8')
+
+
+class ArchiveWriter:
+    """
+    逐页追加写入的归档
+
+    每条记录独占一行，最后一行是summary；中途异常退出时已写入的页不会丢失
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = _open_text(path, 'wt')
+        self.page_count = 0
+
+    def write_page(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self._file.write('\n')
+        self.page_count += 1
+
+    def write_spooled_page(self, record, spool):
+        """
+        写入一页，rowList 取自 spool 中逐条缓冲的订单（record 中的 rowList 会被忽略）
+
+        record 中没有 response.data 时按 write_page 写入
+        """
+        response = record.get('response')
+        if not isinstance(response, dict) or not isinstance(response.get('data'), dict):
+            self.write_page(record)
+            return
+        record = dict(record)
+        record['response'] = dict(response)
+        record['response']['data'] = dict(response['data'])
+        record['response']['data']['rowList'] = ROW_LIST_PLACEHOLDER
+        head, tail = json.dumps(record, ensure_ascii=False, separators=(',', ':')).split(
+            json.dumps(ROW_LIST_PLACEHOLDER), 1)
+        self._file.write(head)
+        self._file.write('[')
+        spool.copy_to(self._file)
+        self._file.write(']')
+        self._file.write(tail)
+        self._file.write('\n')
+        self.page_count += 1
+
+    def close(self, summary=None):
+        """写入summary（可选）并关闭；已关闭时不做任何事"""
+        if self._file.closed:
+            return
+        if summary is not None:
+            self._file.write(json.dumps({'summary': summary}, ensure_ascii=False, separators=(',', ':')))
+            self._file.write('\n')
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PageSpool:
+    """
+    一页 rowList 的临时缓冲，订单逐条序列化写入（超过 max_size 后落到临时文件）
+
+    整页解析完成后再由 ArchiveWriter.write_spooled_page 写入归档，
+    中途失败的页不会在归档中留下半行
+    """
+
+    def __init__(self, max_size=4 * 1024 * 1024):
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+', encoding='utf-8')
+        self.row_count = 0
+
+    def add_row(self, row):
+        if self.row_count:
+            self._file.write(',')
+        self._file.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+        self.row_count += 1
+
+    def copy_to(self, target):
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, target)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def new_run_path(directory='raw_result', timestamp=None):
+    """新一次运行的归档路径，如 raw_result/http_req_v2_20250617_083640.ndjson.zst"""
+    timestamp = timestamp or time.strftime('%Y%m%d_%H%M%S')
+    return os.path.join(directory, f'{RUN_FILE_PREFIX}{timestamp}{archive_suffix()}')
+
+
+def list_run_files(directory='.'):
+    """
+    列出目录下所有运行文件（旧JSON和新归档），按文件名即时间顺序排序
+
+    未安装zstandard时也列出 .ndjson.zst，读取时报错提示安装，而不是合并时悄悄漏掉这些订单
+    """
+    patterns = [f'{RUN_FILE_PREFIX}*{LEGACY_SUFFIX}', f'{RUN_FILE_PREFIX}*.ndjson', f'{RUN_FILE_PREFIX}*.ndjson.gz',
+                f'{RUN_FILE_PREFIX}*.ndjson.zst']
+    files = set()
+    for pattern in patterns:
+        files.update(glob.glob(os.path.join(directory, pattern)))
+    return sorted(files, key=lambda path: os.path.basename(path))
+
+
+def iter_page_records(path):
+    """
+    流式读取运行文件中的分页记录
+
+    新归档逐行读取，内存只保留当前一页；旧的JSON文件只能整体加载
+    """
+    if path.endswith(LEGACY_SUFFIX):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        responses = data.get('responses') if isinstance(data, dict) else None
+        if not isinstance(responses, list):
+            raise ValueError(f"{path} 中没有找到有效的responses数组")
+        yield from responses
+        return
+
+    with _open_text(path, 'rt') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'summary' in record:
+                continue
+            yield record
+
+
+def _row_order_id(row):
+    order_info = row.get('orderInfo') if isinstance(row, dict) else None
+    return order_info.get('orderId') if isinstance(order_info, dict) else None
+
+
+def _row_list(record):
+    response = record.get('response')
+    if isinstance(response, dict) and isinstance(response.get('data'), dict):
+        row_list = response['data'].get('rowList')
+        if isinstance(row_list, list):
+            return row_list
+    return None
+
+
+def compact_runs(directory='raw_result', keep_latest=1):
+    """
+    把历史运行合并成一个去重后的归档
+
+    同一个orderId只保留最新一次运行中的数据；没有订单的重复页被丢弃。
+    两遍流式扫描：第一遍只记录每个orderId最后出现的位置，第二遍按位置过滤写出，
+    内存占用只和订单ID数量有关
+
+    Args:
+        directory: 运行文件所在目录
+        keep_latest: 保留最近几次运行不合并
+
+    Returns:
+        (合并后的归档路径, 被合并的文件列表)，没有可合并的文件时返回 (None, [])
+    """
+    run_files = list_run_files(directory)
+    if keep_latest > 0:
+        run_files = run_files[:-keep_latest]
+    if len(run_files) < 2:
+        return None, []
+
+    # 第一遍：orderId -> 最后出现的 (文件序号, 记录序号)
+    last_seen = {}
+    for file_index, path in enumerate(run_files):
+        for record_index, record in enumerate(iter_page_records(path)):
+            for row in _row_list(record) or []:
+                order_id = _row_order_id(row)
+                if order_id:
+                    last_seen[order_id] = (file_index, record_index)
+
+    # 合并后的文件名沿用最后一个被合并运行的时间戳，保证排序位置不变
+    last_name = os.path.basename(run_files[-1])
+    timestamp = last_name[len(RUN_FILE_PREFIX):].split('.')[0].replace('_compacted', '')
+    output_path = new_run_path(directory, f'{timestamp}_compacted')
+
+    # 第二遍：写出每个orderId的最新数据
+    fd, tmp_path = tempfile.mkstemp(suffix=archive_suffix(), dir=directory)
+    os.close(fd)
+    order_count = 0
+    try:
+        with ArchiveWriter(tmp_path) as writer:
+            for file_index, path in enumerate(run_files):
+                for record_index, record in enumerate(iter_page_records(path)):
+                    row_list = _row_list(record)
+                    if row_list is None:
+                        continue
+                    kept_rows = [
+                        row for row in row_list
+                        if last_seen.get(_row_order_id(row)) == (file_index, record_index)
+                    ]
+                    if not kept_rows:
+                        continue
+                    compacted = {key: value for key, value in record.items() if key != 'response'}
+                    compacted['response'] = dict(record['response'])
+                    compacted['response']['data'] = dict(record['response']['data'])
+                    compacted['response']['data']['rowList'] = kept_rows
+                    writer.write_page(compacted)
+                    order_count += len(kept_rows)
+            writer.close({
+                'compacted_from': [os.path.basename(path) for path in run_files],
+                'total_pages': writer.page_count,
+                'total_order_ids': order_count,
+            })
+    except BaseException:
+        # 合并失败时删除临时文件，被合并的运行文件保持不变
+        os.remove(tmp_path)
+        raise
+
+    os.replace(tmp_path, output_path)
+    for path in run_files:
+        if os.path.abspath(path) != os.path.abspath(output_path):
+            os.remove(path)
+    return output_path, run_files
+
+
+def _format_size(size_bytes):
+    return f"{size_bytes / 1024 / 1024:.1f}MB"
+
+
+def run_benchmark(page_count, runs):
+    """对比旧JSON运行文件和压缩归档的体积与合并读取时间"""
+    from sample_data import generate_raw_pages
+
+    pages = list(generate_raw_pages(page_count))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_dir = os.path.join(tmp_dir, 'legacy')
+        archive_dir = os.path.join(tmp_dir, 'archive')
+        os.makedirs(legacy_dir)
+        os.makedirs(archive_dir)
+
+        # 模拟多次运行重复抓取相同的数据
+        for run in range(runs):
+            timestamp = f'20250617_{run:06d}'
+            with open(os.path.join(legacy_dir, f'{RUN_FILE_PREFIX}{timestamp}.json'), 'w', encoding='utf-8') as f:
+                json.dump({'summary': {'total_pages': len(pages)}, 'responses': pages}, f, ensure_ascii=False, indent=2)
+            with ArchiveWriter(new_run_path(archive_dir, timestamp)) as writer:
+                for record in pages:
+                    writer.write_page(record)
+                writer.close({'total_pages': len(pages)})
+
+        def dir_size(directory):
+            return sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, '*')))
+
+        def timed_read(directory):
+            start = time.perf_counter()
+            order_ids = set()
+            for path in list_run_files(directory):
+                for record in iter_page_records(path):
+                    for row in _row_list(record) or []:
+                        order_ids.add(_row_order_id(row))
+            return time.perf_counter() - start, len(order_ids)
+
+        legacy_size = dir_size(legacy_dir)
+        archive_size = dir_size(archive_dir)
+        legacy_time, legacy_orders = timed_read(legacy_dir)
+        archive_time, archive_orders = timed_read(archive_dir)
+
+        start = time.perf_counter()
+        compact_runs(archive_dir, keep_latest=0)
+        compact_time = time.perf_counter() - start
+        compacted_size = dir_size(archive_dir)
+        compacted_time, compacted_orders = timed_read(archive_dir)
+
+    print(f"\n📊 {runs} 次运行 × {page_count} 页 (归档格式 {archive_suffix()})")
+    print(f"   旧JSON: {_format_size(legacy_size)}, 合并读取 {legacy_time:.2f} 秒, {legacy_orders} 个订单")
+    print(f"   压缩归档: {_format_size(archive_size)} (压缩比 {legacy_size / archive_size:.1f}x), "
+          f"合并读取 {archive_time:.2f} 秒, {archive_orders} 个订单")
+    print(f"   compact后: {_format_size(compacted_size)} (压缩比 {legacy_size / compacted_size:.1f}x), "
+          f"合并读取 {compacted_time:.2f} 秒, {compacted_orders} 个订单, compact耗时 {compact_time:.2f} 秒")
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='原始响应压缩归档工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    compact_parser = subparsers.add_parser('compact', help='把历史运行合并成一个去重后的归档')
+    compact_parser.add_argument('directory', nargs='?', default='raw_result')
+    compact_parser.add_argument('--keep-latest', type=int, default=1, help='保留最近几次运行不合并')
+
+    bench_parser = subparsers.add_parser('bench', help='对比旧JSON和压缩归档的体积与读取时间')
+    bench_parser.add_argument('--pages', type=int, default=300)
+    bench_parser.add_argument('--runs', type=int, default=5)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compact':
+        output_path, run_files = compact_runs(args.directory, args.keep_latest)
+        if output_path is None:
+            print("没有需要合并的运行文件")
+            return
+        print(f"✅ 已将 {len(run_files)} 个运行文件合并到 {output_path}")
+    elif args.command == 'bench':
+        run_benchmark(args.pages, args.runs)
+
+
+if __name__ == '__main__':
+    main()
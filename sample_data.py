@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用的模拟订单数据
+按照 optimized_orders.json 的结构生成订单，供各工具的 bench 命令使用
+"""
+
+import random
+
+STATUSES = [
+    ('待卖家发货', 'WAIT_SELLER_SEND_GOODS'),
+    ('待买家收货', 'WAIT_BUYER_CONFIRM_GOODS'),
+    ('交易成功', 'TRADE_SUCCESS'),
+    ('交易关闭', 'TRADE_CLOSED'),
+    ('退款中', 'REFUND'),
+]
+
+SELLERS = ['潮玩小铺', '盲盒驿站', '手办仓库', '谷子屋', '卡牌研究所', '周边杂货店']
+CITIES = ['甘肃省兰州市皋兰县', '浙江省杭州市西湖区', '广东省深圳市南山区', '四川省成都市武侯区', '北京市朝阳区']
+SURNAMES = '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨'
+
+# (快递公司, companyCode, 单号前缀, 平均揽收到签收小时数)
+COURIERS = [
+    ('圆通速递', 'yuantong', 'YT', 60),
+    ('中通快递', 'zhongtong', 'ZT', 54),
+    ('顺丰速运', 'shunfeng', 'SF', 30),
+    ('韵达快递', 'yunda', 'YD', 66),
+]
+
+# 商品目录规模远小于订单数，与真实数据中商品大量重复的情况一致
+PRODUCT_COUNT = 400
+
+START_TIMESTAMP = 1735660800  # 2025-01-01
+
+
+def _make_product(index):
+    """生成第index个商品的固定信息"""
+    return {
+        'productName': f'限定款手办 第{index}弹',
+        'cover': f'https://cdn.example.com/product/{index:05d}/cover.png',
+        'whiteBgPng': f'https://cdn.example.com/product/{index:05d}/white.png',
+        'description': f'官方正品，第{index}弹系列随机款',
+        'specValues': [
+            {'name': '款式', 'value': f'款式{index % 12}', 'color': '#333333', 'labelColor': '#F2F2F2'},
+            {'name': '规格', 'value': '单盒', 'color': '#666666', 'labelColor': '#FFFFFF'},
+        ],
+    }
+
+
+def generate_orders(count, seed=42, start_page=1, page_size=30):
+    """
+    逐个生成模拟订单（生成器）
+
+    Args:
+        count: 订单数量
+        seed: 随机种子，保证多次运行结果一致
+        start_page: 起始页码
+        page_size: 每页订单数，用于计算page字段
+    """
+    rng = random.Random(seed)
+    catalog = [_make_product(i) for i in range(PRODUCT_COUNT)]
+
+    for i in range(count):
+        status_name, status_key = STATUSES[rng.randrange(len(STATUSES))]
+        created_at = START_TIMESTAMP + i * 60 + rng.randrange(60)
+        buyer_name = rng.choice(SURNAMES) + rng.choice(SURNAMES) + str(rng.randrange(1000))
+
+        products = []
+        for _ in range(rng.randint(1, 3)):
+            base = catalog[rng.randrange(PRODUCT_COUNT)]
+            product = dict(base)
+            product['specValues'] = [dict(spec) for spec in base['specValues']]
+            product['price'] = rng.randint(10, 500)
+            product['amount'] = rng.randint(1, 5)
+            products.append(product)
+
+        order_price = sum(p['price'] * p['amount'] for p in products)
+        express_price = rng.choice([0, 6, 8, 10])
+
+        yield {
+            'page': start_page + i // page_size,
+            'orderInfo': {
+                'orderId': str(875568108466915159 + i * 7919),
+                'status': {'name': status_name, 'key': status_key},
+                'createdAt': str(created_at),
+                'buyer': {'name': buyer_name, 'phone': f'1{rng.randrange(3, 9)}{rng.randrange(10 ** 9):09d}'},
+                'seller': {'name': rng.choice(SELLERS)},
+                'receiver': buyer_name,
+                'address': f'{rng.choice(CITIES)}幸福路{rng.randrange(1, 300)}号',
+                'orderPrice': order_price,
+                'paidPrice': order_price + express_price,
+                'expressPrice': express_price,
+            },
+            'products': products,
+        }
+
+
+def generate_raw_pages(page_count, page_size=30, seed=42):
+    """
+    生成模拟的原始分页响应（http_req_v2.py 保存的 responses 结构）
+
+    原始订单比优化后的订单多出操作按钮、类型等字段，更接近接口真实返回
+    """
+    orders = generate_orders(page_count * page_size, seed=seed, page_size=page_size)
+    for page in range(1, page_count + 1):
+        row_list = []
+        for _ in range(page_size):
+            order = next(orders)
+            order_info = dict(order['orderInfo'])
+            order_info.update({
+                'orderType': {'name': '普通订单', 'key': 'NORMAL'},
+                'deliverPattern': {'name': '快递', 'key': 'EXPRESS'},
+                'paidAt': order_info['createdAt'],
+                'receiverPhone': order_info['buyer']['phone'],
+                'expiredAt': '0',
+            })
+            row_list.append({
+                'orderInfo': order_info,
+                'products': order['products'],
+                'activeActions': [
+                    {'action': 'VIEW_EXPRESS', 'actionName': '查看物流'},
+                    {'action': 'CONTACT_BUYER', 'actionName': '联系买家'},
+                ],
+                'productNum': str(len(order['products'])),
+            })
+        yield {
+            'page': page,
+            'timestamp': f'2025-06-17T08:{page // 60 % 60:02d}:{page % 60:02d}',
+            'response': {'code': 0, 'message': '', 'data': {'rowList': row_list}},
+        }
+
+
+def generate_express_results(order_ids, seed=42, now=None):
+    """
+    生成模拟的快递查询结果（快递查询接口 data 中单条记录的结构，附带 orderId）
+
+    每个快递有揽收、若干条运输中和（大部分）签收轨迹，少量快递停在运输途中
+    """
+    rng = random.Random(seed)
+    now = now or START_TIMESTAMP + 180 * 86400
+    for index, order_id in enumerate(order_ids):
+        company_name, company_code, prefix, mean_hours = COURIERS[rng.randrange(len(COURIERS))]
+        collect_time = now - rng.randint(6 * 3600, 20 * 86400)
+        traces = [{
+            'traceState': 'TraceState_Collect',
+            'traceTime': str(collect_time),
+            'traceContext': f'您的快件在【{rng.choice(CITIES)}】已揽收',
+            'traceType': 'ACCEPT',
+            'status': 'EXPRESS_STATUS_DEFAULT',
+            'statusEx': '',
+        }]
+        total_seconds = int(max(rng.gauss(mean_hours, mean_hours / 4), 6) * 3600)
+        stalled = rng.random() < 0.05
+        transport_count = rng.randint(2, 5)
+        for step in range(1, transport_count + 1):
+            trace_time = collect_time + total_seconds * step // (transport_count + 1)
+            if trace_time > now or (stalled and step > 1):
+                break
+            traces.append({
+                'traceState': 'TraceState_Transport',
+                'traceTime': str(trace_time),
+                'traceContext': f'您的快件已到达【{rng.choice(CITIES)}转运中心】',
+                'traceType': 'TRANSPORT',
+                'status': 'EXPRESS_STATUS_DEFAULT',
+                'statusEx': '',
+            })
+        is_arrived = not stalled and collect_time + total_seconds <= now
+        if is_arrived:
+            traces.append({
+                'traceState': 'TraceState_Sign',
+                'traceTime': str(collect_time + total_seconds),
+                'traceContext': '您的快件已签收',
+                'traceType': 'SIGN',
+                'status': 'EXPRESS_STATUS_DEFAULT',
+                'statusEx': '',
+            })
+        yield {
+            'orderId': order_id,
+            'companyCode': company_code,
+            'expressNo': f'{prefix}{2556966040057 + index}',
+            'subscribeStatus': '',
+            'traces': traces,
+            'isArrived': is_arrived,
+            'companyName': company_name,
+            'remark': '',
+        }
@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+订单同步守护进程
+把 抓取 → 入库 → 物流查询 → 导出 作为依赖图上的阶段持续运行，每个阶段只处理上游变化的部分：
+
+    crawl      每隔 interval 秒从最新订单开始抓取，连续 stop_after 页都没有新订单或状态变化时结束本轮，
+               每 full_every 轮抓取一次全部订单；只把新增和状态变化的订单交给下游
+    ingest     订单投影为精简结构（同 optimize_orders.py）写入订单库；
+               新变为"待买家收货"的订单立即交给物流阶段，不等本轮抓取结束
+    logistics  新发货订单加入任务队列（work_queue.py）并查询；每隔 logistics_interval 秒
+               按优先级（logistics_scheduler.py）补查在途订单
+    export     订单库有变化、且 debounce 秒内没有新变化后从订单库重新导出Excel，多次变化合并为一次导出
+
+阶段之间是有界队列，下游处理不过来时上游阻塞（背压）。签名失效时对应阶段暂停，
+签名文件更新后自动继续，其他阶段不受影响。
+
+    python sync_daemon.py run --http-file demo/demo2/http_req_think.hcy \\
+        --express-http-file utils/load-experss-info/http_req_express.hcy
+    curl http://127.0.0.1:8790/status          各阶段状态、积压和延迟
+    curl -X POST http://127.0.0.1:8790/sync    立即开始一轮抓取
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import signal
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api_request import SignatureExpired, signature_mtime
+from order_listing import DEFAULT_MAX_LIMIT, DEFAULT_TARGET_SECONDS, OrderListClient, PageSizeTuner, row_order_id
+from order_store import DEFAULT_DB_FILE, SHIPPED_STATUS, open_store, upsert_orders
+from projection import OPTIMIZED_ORDER_SPEC, compile_projection
+
+DEFAULT_STATUS_PORT = 8790
+
+# 阶段之间最多积压的批次数，超过时上游阻塞
+STAGE_QUEUE_SIZE = 8
+
+# 签名失效后检查签名文件是否更新的间隔秒数
+SIGNATURE_POLL_SECONDS = 2
+
+# 阶段出错后重试前的等待秒数
+ERROR_BACKOFF_SECONDS = 10
+
+_project_order = compile_projection(OPTIMIZED_ORDER_SPEC, 'project_order')
+
+
+def _select_in(conn, sql, ids, chunk_size=500):
+    """ids 分批代入 IN (...) 查询，合并返回的行"""
+    rows = []
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows.extend(conn.execute(sql.format(','.join('?' * len(chunk))), chunk).fetchall())
+    return rows
+
+
+class Stage(threading.Thread):
+    """
+    守护进程中的一个阶段
+
+    inbox 为有界队列，元素是 (入队时间, 数据)；send 在下游积压满时等待，形成背压
+    """
+
+    def __init__(self, name, stop_event, inbox_size=STAGE_QUEUE_SIZE):
+        super().__init__(name=f'stage-{name}', daemon=True)
+        self.stage_name = name
+        self.stop_event = stop_event
+        self.inbox = queue.Queue(inbox_size) if inbox_size else None
+        self.state = 'starting'
+        self.paused_reason = None
+        self.processed = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_success_at = None
+        self.blocked_seconds = 0.0
+        self._working_since = None
+
+    def send(self, stage, item):
+        """交给下游阶段，下游积压满时等待；停止时放弃"""
+        start = time.monotonic()
+        previous_state = self.state
+        while not self.stop_event.is_set():
+            try:
+                stage.inbox.put((time.time(), item), timeout=0.5)
+                break
+            except queue.Full:
+                self.state = 'blocked'
+        self.state = previous_state
+        self.blocked_seconds += time.monotonic() - start
+
+    def take(self, timeout=1.0):
+        """取出一项及其后已经积压的全部项（合并处理），超时返回空列表"""
+        try:
+            items = [self.inbox.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                items.append(self.inbox.get_nowait())
+            except queue.Empty:
+                return items
+
+    def begin(self, since):
+        self.state = 'running'
+        self._working_since = since
+
+    def done(self, count):
+        self.processed += count
+        self.last_success_at = time.time()
+        self._working_since = None
+        self.state = 'idle'
+
+    def record_error(self, error):
+        self.errors += 1
+        self.last_error = f'{type(error).__name__}: {error}'
+        self._working_since = None
+        self.state = 'error'
+        print(f"⚠️ [{self.stage_name}] {self.last_error}")
+        self.stop_event.wait(ERROR_BACKOFF_SECONDS)
+
+    def wait_for_signature(self, signature_dir):
+        """签名失效：暂停到签名文件更新，返回是否继续（守护进程停止时返回False）"""
+        self.state = 'paused'
+        self.paused_reason = f'签名失效，等待更新 {os.path.abspath(signature_dir)} 下的签名文件'
+        print(f"⏸️ [{self.stage_name}] {self.paused_reason}")
+        mtime = signature_mtime(signature_dir)
+        while not self.stop_event.wait(SIGNATURE_POLL_SECONDS):
+            if signature_mtime(signature_dir) != mtime:
+                self.paused_reason = None
+                self.state = 'running'
+                print(f"▶️ [{self.stage_name}] 签名已更新，继续")
+                return True
+        return False
+
+    def lag_seconds(self):
+        """最早一项未处理完的上游数据已等待的秒数"""
+        oldest = self._working_since
+        if self.inbox is not None:
+            with self.inbox.mutex:
+                if self.inbox.queue:
+                    queued = self.inbox.queue[0][0]
+                    oldest = queued if oldest is None else min(oldest, queued)
+        return round(time.time() - oldest, 1) if oldest else 0.0
+
+    def status(self):
+        return {
+            'state': self.state,
+            'paused_reason': self.paused_reason,
+            'backlog': self.inbox.qsize() if self.inbox is not None else 0,
+            'lag_seconds': self.lag_seconds(),
+            'processed': self.processed,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'last_success_at': self.last_success_at,
+            'blocked_seconds': round(self.blocked_seconds, 1),
+        }
+
+    def run(self):
+        self.state = 'idle'
+        self.loop()
+        self.state = 'stopped'
+
+    def loop(self):
+        raise NotImplementedError
+
+
+class CrawlStage(Stage):
+    """增量抓取订单列表"""
+
+    def __init__(self, stop_event, client, db_file, interval, full_every, stop_after,
+                 max_limit=DEFAULT_MAX_LIMIT, target_seconds=DEFAULT_TARGET_SECONDS):
+        super().__init__('crawl', stop_event, inbox_size=0)
+        self.client = client
+        self.db_file = db_file
+        self.interval = interval
+        self.full_every = full_every
+        self.stop_after = stop_after
+        self.max_limit = max_limit
+        self.target_seconds = target_seconds
+        self.ingest = None
+        self.trigger = threading.Event()
+        self.cycles = 0
+        self.last_cycle = None
+        self.next_run_at = None
+
+    def loop(self):
+        while not self.stop_event.is_set():
+            self.trigger.clear()
+            try:
+                self.sync_once()
+            except Exception as e:
+                self.record_error(e)
+            self.next_run_at = time.time() + self.interval
+            while not self.stop_event.is_set() and time.time() < self.next_run_at:
+                if self.trigger.wait(0.5):
+                    break
+            self.next_run_at = None
+
+    def changed_orders(self, conn, orders):
+        """新订单和状态变化的订单"""
+        known = dict(_select_in(conn, 'SELECT orderId, statusKey FROM orders WHERE orderId IN ({})',
+                                [order['orderInfo']['orderId'] for order in orders]))
+        return [order for order in orders if known.get(order['orderInfo']['orderId']) != order['orderInfo']['status']['key']]
+
+    def sync_once(self):
+        conn = open_store(self.db_file)
+        try:
+            empty = conn.execute('SELECT 1 FROM orders LIMIT 1').fetchone() is None
+            full = empty or (self.full_every and self.cycles % self.full_every == 0)
+            tuner = PageSizeTuner(self.client.initial_limit, self.max_limit, self.target_seconds)
+            cycle = {'started_at': time.time(), 'full': bool(full), 'pages': 0, 'orders': 0, 'changed': 0}
+            self.last_cycle = cycle
+            self.begin(cycle['started_at'])
+            last_id = None
+            unchanged_pages = 0
+            while not self.stop_event.is_set():
+                requested = tuner.limit
+                rows = []
+                page_start = time.perf_counter()
+                try:
+                    self.client.fetch_page(requested, last_id, rows.append)
+                except SignatureExpired:
+                    if not self.wait_for_signature(self.client.signature_dir):
+                        return
+                    continue
+                except (OSError, http.client.HTTPException, ValueError):
+                    if tuner.record_error(requested):
+                        continue
+                    raise
+
+                cycle['pages'] += 1
+                cycle['orders'] += len(rows)
+                orders = []
+                for row in rows:
+                    order = _project_order(row)
+                    if order['orderInfo']['orderId']:
+                        order['page'] = cycle['pages']
+                        orders.append(order)
+                changed = self.changed_orders(conn, orders) if orders else []
+                if changed:
+                    cycle['changed'] += len(changed)
+                    self.send(self.ingest, changed)
+                unchanged_pages = 0 if changed else unchanged_pages + 1
+
+                if tuner.record_page(requested, len(rows), time.perf_counter() - page_start):
+                    break
+                if not full and unchanged_pages >= self.stop_after:
+                    break
+                last_id = row_order_id(rows[-1])
+            cycle['requests'] = tuner.requests
+            cycle['seconds'] = round(time.time() - cycle['started_at'], 1)
+            self.cycles += 1
+            self.done(cycle['orders'])
+            print(f"🔄 [crawl] 第 {self.cycles} 轮{'（全量）' if full else ''}: {cycle['pages']} 页, "
+                  f"{cycle['orders']} 个订单, 其中新增或变化 {cycle['changed']} 个, 用时 {cycle['seconds']} 秒")
+        finally:
+            conn.close()
+
+    def status(self):
+        status = super().status()
+        status.update({'cycles': self.cycles, 'last_cycle': self.last_cycle, 'next_run_at': self.next_run_at})
+        return status
+
+
+class IngestStage(Stage):
+    """变化的订单写入订单库，新发货的订单交给物流阶段"""
+
+    def __init__(self, stop_event, db_file):
+        super().__init__('ingest', stop_event)
+        self.db_file = db_file
+        self.logistics = None
+        self.export = None
+
+    def loop(self):
+        conn = open_store(self.db_file)
+        try:
+            while not self.stop_event.is_set():
+                items = self.take()
+                if not items:
+                    continue
+                self.begin(items[0][0])
+                try:
+                    orders = [order for _, batch in items for order in batch]
+                    previous = dict(_select_in(
+                        conn, 'SELECT orderId, statusName FROM orders WHERE orderId IN ({})',
+                        [order['orderInfo']['orderId'] for order in orders],
+                    ))
+                    upsert_orders(conn, orders)
+                except Exception as e:
+                    self.record_error(e)
+                    continue
+                shipped = [
+                    order['orderInfo']['orderId'] for order in orders
+                    if order['orderInfo']['status']['name'] == SHIPPED_STATUS
+                    and previous.get(order['orderInfo']['orderId']) != SHIPPED_STATUS
+                ]
+                if shipped and self.logistics is not None:
+                    self.send(self.logistics, shipped)
+                if self.export is not None:
+                    self.send(self.export, len(orders))
+                self.done(len(orders))
+        finally:
+            conn.close()
+
+
+class LogisticsStage(Stage):
+    """新发货订单和定期补查的在途订单通过任务队列查询物流"""
+
+    def __init__(self, stop_event, queue_url, db_file, client_options, signature_dir,
+                 refresh_interval, budget, batch_size, concurrency):
+        super().__init__('logistics', stop_event)
+        self.queue_url = queue_url
+        self.db_file = db_file
+        self.client_options = client_options
+        self.signature_dir = signature_dir
+        self.refresh_interval = refresh_interval
+        self.budget = budget
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.export = None
+        self.queue_stats = {}
+
+    def _refresh_targets(self):
+        from logistics_scheduler import candidate_rows, select_lookups
+
+        conn = open_store(self.db_file)
+        try:
+            return [order_id for _, order_id in select_lookups(candidate_rows(conn), self.budget)]
+        finally:
+            conn.close()
+
+    def loop(self):
+        from work_queue import open_queue, run_worker
+
+        work_queue = open_queue(self.queue_url)
+        next_refresh = time.time() + self.refresh_interval if self.refresh_interval else None
+        try:
+            while not self.stop_event.is_set():
+                items = self.take()
+                try:
+                    order_ids = [order_id for _, batch in items for order_id in batch]
+                    if order_ids:
+                        work_queue.enqueue(order_ids, reset=True)
+                    if next_refresh and time.time() >= next_refresh:
+                        work_queue.enqueue(self._refresh_targets(), reset=True)
+                        next_refresh = time.time() + self.refresh_interval
+                    self.queue_stats = work_queue.stats()
+                    if not (self.queue_stats['pending'] or self.queue_stats['expired']):
+                        continue
+
+                    self.begin(items[0][0] if items else time.time())
+                    done_count, failed_count = run_worker(
+                        self.queue_url, self.db_file, self.client_options, self.batch_size, self.concurrency,
+                        worker_id='sync-daemon', quiet=True, stop_event=self.stop_event,
+                    )
+                    self.errors += failed_count
+                    self.queue_stats = work_queue.stats()
+                except SignatureExpired:
+                    self.wait_for_signature(self.signature_dir)
+                    continue
+                except Exception as e:
+                    self.record_error(e)
+                    continue
+                if done_count and self.export is not None:
+                    self.send(self.export, done_count)
+                self.done(done_count)
+        finally:
+            work_queue.close()
+
+    def status(self):
+        status = super().status()
+        status['queue'] = self.queue_stats
+        return status
+
+
+class ExportStage(Stage):
+    """订单库变化后重新导出Excel，debounce 秒内的多次变化合并为一次"""
+
+    def __init__(self, stop_event, db_file, output_file, debounce):
+        super().__init__('export', stop_event)
+        self.db_file = db_file
+        self.output_file = output_file
+        self.debounce = debounce
+        self.dirty_since = None
+
+    def export(self):
+        from export_to_excel import export_store_to_excel
+
+        self.begin(self.dirty_since)
+        try:
+            export_store_to_excel(self.db_file, self.output_file, raise_errors=True)
+        except ImportError as e:
+            self.errors += 1
+            self.last_error = f'导出需要pandas和openpyxl: {e}'
+            self.state = 'disabled'
+            print(f"⚠️ [export] {self.last_error}，本次运行不再导出")
+            return
+        except Exception as e:
+            self.record_error(e)
+            return
+        self.dirty_since = None
+        self.done(1)
+
+    def loop(self):
+        last_change = None
+        while not self.stop_event.is_set():
+            items = self.take()
+            if self.state == 'disabled':
+                continue
+            if items:
+                self.dirty_since = self.dirty_since or items[0][0]
+                last_change = time.time()
+            if self.dirty_since and time.time() - last_change >= self.debounce:
+                self.export()
+        if self.dirty_since and self.state != 'disabled':
+            self.export()
+
+    def lag_seconds(self):
+        return round(time.time() - self.dirty_since, 1) if self.dirty_since else 0.0
+
+
+class SyncDaemon:
+    """组装各阶段并提供状态接口"""
+
+    def __init__(self, crawl, ingest, logistics=None, export=None):
+        self.stop_event = crawl.stop_event
+        self.crawl = crawl
+        self.stages = [stage for stage in (crawl, ingest, logistics, export) if stage is not None]
+        crawl.ingest = ingest
+        ingest.logistics = logistics
+        ingest.export = export
+        if logistics is not None:
+            logistics.export = export
+        self.started_at = None
+        self.server = None
+
+    def status(self):
+        return {
+            'started_at': self.started_at,
+            'stages': {stage.stage_name: stage.status() for stage in self.stages},
+        }
+
+    def start(self, port=DEFAULT_STATUS_PORT, host='127.0.0.1'):
+        self.started_at = time.time()
+        for stage in reversed(self.stages):
+            stage.start()
+        if port is not None:
+            self.server = ThreadingHTTPServer((host, port), _status_handler(self))
+            self.server.daemon_threads = True
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self, timeout=60):
+        """停止抓取，各阶段处理完当前批次后退出；导出阶段退出前导出最后一次变化"""
+        self.stop_event.set()
+        for stage in self.stages:
+            stage.join(timeout)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+def _status_handler(daemon):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def _send_json(self, code, data):
+            body = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.split('?')[0] in ('/', '/status'):
+                self._send_json(200, daemon.status())
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path == '/sync':
+                daemon.crawl.trigger.set()
+                self._send_json(200, {'triggered': True})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StatusHandler
+
+
+def build_daemon(args, list_client_options, express_client_options):
+    stop_event = threading.Event()
+    client = OrderListClient(**list_client_options)
+    crawl = CrawlStage(stop_event, client, args.db, args.interval, args.full_every, args.stop_after,
+                       args.max_limit, args.target_seconds)
+    ingest = IngestStage(stop_event, args.db)
+    logistics = None
+    if express_client_options is not None:
+        signature_dir = express_client_options.get('signature_dir') or os.path.dirname(
+            os.path.abspath(express_client_options.get('http_file') or '.'))
+        logistics = LogisticsStage(stop_event, args.queue, args.db, express_client_options, signature_dir,
+                                   args.logistics_interval, args.budget, args.batch_size, args.concurrency)
+    export = ExportStage(stop_event, args.db, args.export, args.debounce) if args.export else None
+    return SyncDaemon(crawl, ingest, logistics, export)
+
+
+# ---------------------------------------------------------------------------
+# 本地模拟接口演示
+# ---------------------------------------------------------------------------
+
+def _get_status(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/status', timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+def _wait_until(condition, timeout, interval=0.2):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def _write_signature(directory, value):
+    for file_name in ('x-request-timestamp.txt', 'x-request-sign.txt'):
+        with open(os.path.join(directory, file_name), 'w', encoding='utf-8') as f:
+            f.write(value)
+
+
+def run_demo(order_count, port):
+    """
+    用本地模拟的订单列表和快递接口跑一遍守护进程，检查：
+    全量同步、物流在抓取结束前开始、签名失效暂停和恢复、状态变化的增量同步
+    """
+    from order_listing import start_mock_listing_server
+    from work_queue import start_mock_express_server
+
+    list_server, list_url = start_mock_listing_server(order_count, latency=0.05, bandwidth=0)
+    express_server, express_url = start_mock_express_server(latency=0.01)
+    list_server.valid_signs = express_server.valid_signs = {'sign-1'}
+    checks = []
+
+    def check(name, ok):
+        checks.append(ok)
+        print(f"   {'✅' if ok else '❌'} {name}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write_signature(tmp_dir, 'sign-1')
+        args = argparse.Namespace(
+            db=os.path.join(tmp_dir, 'orders.db'), queue=os.path.join(tmp_dir, 'queue.db'),
+            interval=3600, full_every=0, stop_after=2, max_limit=100, target_seconds=DEFAULT_TARGET_SECONDS,
+            logistics_interval=0, budget=0, batch_size=20, concurrency=4, export=None, debounce=1,
+        )
+        daemon = build_daemon(
+            args,
+            {'url': list_url, 'signature_dir': tmp_dir},
+            {'url': express_url, 'signature_dir': tmp_dir},
+        ).start(port)
+        expected_shipped = sum(1 for row in list_server.rows
+                               if row['orderInfo']['status']['name'] == SHIPPED_STATUS)
+        try:
+            print(f"📊 {order_count} 个订单（{expected_shipped} 个待买家收货），状态接口 http://127.0.0.1:{port}/status")
+
+            # 物流阶段应在抓取本轮结束前就开始处理
+            overlapped = _wait_until(lambda: daemon.crawl.cycles == 0 and daemon.stages[2].processed > 0, 30, 0.05)
+            check("第一批新发货订单在抓取结束前开始查询物流", overlapped)
+
+            # 签名失效：暂停后更新签名文件自动继续
+            list_server.valid_signs.clear()
+            list_server.valid_signs.add('sign-2')
+            express_server.valid_signs.clear()
+            express_server.valid_signs.add('sign-2')
+            paused = _wait_until(lambda: _get_status(port)['stages']['crawl']['state'] == 'paused', 30)
+            status = _get_status(port)
+            check(f"签名失效后抓取暂停: {status['stages']['crawl']['paused_reason']}", paused)
+            time.sleep(1.1)
+            _write_signature(tmp_dir, 'sign-2')
+            synced = _wait_until(lambda: daemon.crawl.cycles >= 1, 60)
+            check("更新签名后继续并完成全量同步", synced)
+
+            def logistics_done():
+                conn = open_store(args.db)
+                try:
+                    return conn.execute('SELECT COUNT(*) FROM logistics').fetchone()[0] >= expected_shipped
+                finally:
+                    conn.close()
+            check("全部待买家收货订单都已查询物流", _wait_until(logistics_done, 120))
+            status = _get_status(port)
+            print("   状态接口:")
+            for name, stage in status['stages'].items():
+                print(f"      {name:<10} {stage['state']:<8} 已处理 {stage['processed']:>5}  积压 {stage['backlog']}  "
+                      f"延迟 {stage['lag_seconds']:>5} 秒  背压等待 {stage['blocked_seconds']} 秒")
+
+            # 最新的几个订单状态变化，下一轮只抓到连续 stop_after 页没有变化为止
+            changed = [row for row in list_server.rows[:20] if row['orderInfo']['status']['key'] != 'TRADE_CLOSED'][:5]
+            for row in changed:
+                row['orderInfo']['status'] = {'name': '交易关闭', 'key': 'TRADE_CLOSED'}
+            urllib.request.urlopen(urllib.request.Request(f'http://127.0.0.1:{port}/sync', method='POST'), timeout=5)
+            _wait_until(lambda: daemon.crawl.cycles >= 2, 30)
+            cycle = daemon.crawl.last_cycle
+            check(f"增量同步: {cycle['pages']} 页 {cycle.get('requests')} 次请求, 变化 {cycle['changed']} 个订单",
+                  cycle['changed'] == len(changed) and cycle['pages'] <= 3)
+        finally:
+            daemon.stop()
+            list_server.shutdown()
+            express_server.shutdown()
+    print(f"\n{'✅ 全部通过' if all(checks) else '❌ 有检查未通过'}")
+    return all(checks)
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='订单同步守护进程')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='启动守护进程')
+    run_parser.add_argument('--db', default=DEFAULT_DB_FILE, help='订单库文件路径')
+    run_parser.add_argument('--queue', default='lookup_queue.db', help='物流查询任务队列')
+    run_parser.add_argument('--http-file', default='http_req_think.hcy', help='订单列表请求模板')
+    run_parser.add_argument('--url', help='覆盖订单列表请求地址，例如本地模拟接口')
+    run_parser.add_argument('--express-http-file', default='http_req_express.hcy', help='快递查询请求模板')
+    run_parser.add_argument('--express-url', help='覆盖快递查询请求地址')
+    run_parser.add_argument('--no-logistics', action='store_true', help='不查询物流')
+    run_parser.add_argument('--interval', type=int, default=600, help='两轮抓取的间隔秒数')
+    run_parser.add_argument('--full-every', type=int, default=12, help='每隔多少轮抓取一次全部订单，0表示只在订单库为空时')
+    run_parser.add_argument('--stop-after', type=int, default=3, help='连续多少页没有变化时结束本轮增量抓取')
+    run_parser.add_argument('--max-limit', type=int, default=DEFAULT_MAX_LIMIT)
+    run_parser.add_argument('--target-seconds', type=float, default=DEFAULT_TARGET_SECONDS)
+    run_parser.add_argument('--logistics-interval', type=int, default=3600, help='补查在途订单的间隔秒数，0表示不补查')
+    run_parser.add_argument('--budget', type=int, default=2000, help='每次补查的订单数')
+    run_parser.add_argument('--batch-size', type=int, default=50)
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--export', default='订单数据导出.xlsx', help='导出的Excel文件，空字符串表示不导出')
+    run_parser.add_argument('--debounce', type=int, default=30, help='订单库多少秒没有新变化后导出')
+    run_parser.add_argument('--port', type=int, default=DEFAULT_STATUS_PORT, help='状态接口端口')
+
+    status_parser = subparsers.add_parser('status', help='查看运行中守护进程的状态')
+    status_parser.add_argument('--port', type=int, default=DEFAULT_STATUS_PORT)
+
+    demo_parser = subparsers.add_parser('demo', help='用本地模拟接口检查守护进程')
+    demo_parser.add_argument('--orders', type=int, default=1500)
+    demo_parser.add_argument('--port', type=int, default=8791)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        list_options = {'url': args.url}
+        if os.path.exists(args.http_file):
+            list_options['http_file'] = args.http_file
+        elif not args.url:
+            print(f"❌ 错误: 找不到请求模板 {args.http_file}")
+            return
+        express_options = None
+        if not args.no_logistics:
+            express_options = {'url': args.express_url}
+            if os.path.exists(args.express_http_file):
+                express_options['http_file'] = args.express_http_file
+            elif not args.express_url:
+                print(f"❌ 错误: 找不到快递查询请求模板 {args.express_http_file}（不查询物流请加 --no-logistics）")
+                return
+
+        daemon = build_daemon(args, list_options, express_options)
+        stopping = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.set())
+        daemon.start(args.port)
+        print(f"🚀 同步守护进程已启动，状态: http://127.0.0.1:{args.port}/status")
+        stopping.wait()
+        print("\n正在停止，等待各阶段处理完当前批次...")
+        daemon.stop()
+        print("✅ 已停止")
+    elif args.command == 'status':
+        try:
+            status = _get_status(args.port)
+        except OSError as e:
+            print(f"❌ 无法连接守护进程状态接口（端口 {args.port}）: {e}")
+            return
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+    elif args.command == 'demo':
+        run_demo(args.orders, args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,21 @@
 import json
+import os
+import sys
+
+# 仓库根目录下的公共模块（order_scan.py）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from order_scan import read_file, scan_order_ids
 
 def extract_order_ids(json_file_path):
     """
     从JSON文件中提取所有的orderId
+    只扫描 orderInfo 中的 orderId，不完整解析整个文件（格式不符合预期时 order_scan 自动回退到完整解析）
     """
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        order_ids = []
-        
-        # 使用JSON解析提取orderId
-        if 'data' in data and 'rowList' in data['data']:
-            for row in data['data']['rowList']:
-                if 'orderInfo' in row and 'orderId' in row['orderInfo']:
-                    order_ids.append(row['orderInfo']['orderId'])
-        
-        return order_ids
+        return scan_order_ids(read_file(json_file_path))
     
     except Exception as e:
         print(f"提取orderId时出错: {e}")
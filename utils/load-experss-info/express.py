@@ -1,41 +1,16 @@
 # 简单的快递信息获取脚本
-import requests
+import os
+import sys
 import json
 
-def parse_http_file(file_path):
-    """解析HTTP请求文件"""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.read().splitlines()
+# 仓库根目录下的公共模块（api_request.py、order_store.py 等）
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
-    # 解析请求行
-    request_line = lines[0]
-    method, path, _ = request_line.split()
-    headers = {}
-    host = None
-    body = ''
-    is_body = False
-    
-    for line in lines[1:]:
-        if line.strip() == '':
-            is_body = True
-            continue
-        if not is_body:
-            if ':' in line:
-                k, v = line.split(':', 1)
-                k = k.strip()
-                v = v.strip()
-                if k.lower() == 'host':
-                    host = v
-                headers[k] = v
-        else:
-            body += line.strip()
-    
-    if not host:
-        raise ValueError('host 头缺失')
-    
-    scheme = 'https' if host.startswith('api.') or host.endswith(':443') else 'http'
-    url = f"{scheme}://{host}{path}"
-    return method, url, headers, body
+from api_request import parse_http_file
+from http_cassette import CassetteMiss, default_transport
+from order_store import DEFAULT_DB_FILE, open_store, upsert_express_results
 
 def load_signature_files():
     """读取签名文件"""
@@ -49,8 +24,19 @@ def load_signature_files():
         print(f"签名文件未找到: {e}")
         return None, None
 
-def send_request(http_file_path, order_id):
-    """发送HTTP请求获取快递信息"""
+def save_express_result(order_id, response_json, db_file=DEFAULT_DB_FILE):
+    """把快递状态和全部轨迹写入订单库，重复查询到的轨迹会被去重"""
+    data = response_json.get('data') if isinstance(response_json, dict) else None
+    if not isinstance(data, list) or not data:
+        return 0
+    conn = open_store(db_file)
+    try:
+        return upsert_express_results(conn, [dict(item, orderId=order_id) for item in data if isinstance(item, dict)])
+    finally:
+        conn.close()
+
+def send_request(http_file_path, order_id, db_file=DEFAULT_DB_FILE):
+    """发送HTTP请求获取快递信息，结果同时保存到订单库"""
     # print("=== 快递信息获取工具 ===")
     # print(f"HTTP文件: {http_file_path}")
     # print(f"订单ID: {order_id}")
@@ -75,23 +61,34 @@ def send_request(http_file_path, order_id):
         print(f"解析HTTP文件失败: {e}")
         return
     
-    # 读取签名信息
-    timestamp, sign = load_signature_files()
-    if not timestamp or not sign:
-        print("无法读取签名文件")
-        return
-    
-    # 更新签名信息
-    headers['x-request-timestamp'] = timestamp
-    headers['x-request-sign'] = sign
+    # 读取签名信息（回放 cassette 时签名不参与匹配，可以没有签名文件）
+    transport = default_transport()
+    if not transport.replaying:
+        timestamp, sign = load_signature_files()
+        if not timestamp or not sign:
+            print("无法读取签名文件")
+            return
+        
+        # 更新签名信息
+        headers['x-request-timestamp'] = timestamp
+        headers['x-request-sign'] = sign
     headers.pop('content-length', None)  # 去掉content-length
     
-    # 发送POST请求
-    resp = requests.post(url, headers=headers, data=body.encode('utf-8'))
+    # 发送POST请求（设置 ORDERMGMT_CASSETTE 时录制或回放，见 http_cassette.py）
+    try:
+        resp = transport.request('POST', url, headers, body)
+    except CassetteMiss as e:
+        print(f"回放失败: {e}")
+        return
     
     # 直接输出原始响应
     print(resp.text)
 
+    try:
+        save_express_result(order_id, resp.json(), db_file)
+    except ValueError:
+        print("响应不是有效的JSON格式，未保存轨迹")
+
 if __name__ == "__main__":
     # 设置HTTP文件路径和订单ID
     http_file = "http_req_express.hcy"
@@ -31,21 +31,61 @@ type HTTPRequest struct {
 	Body    string
 }
 
+// 轨迹时间：接口可能返回字符串或数字（时间戳），两种都接受，统一按字符串保存
+// （order_store.py 的 _to_int 两种都能解析）；null 时为空字符串
+type TraceTime string
+
+func (t *TraceTime) UnmarshalJSON(data []byte) error {
+	if bytes.Equal(data, []byte("null")) {
+		*t = ""
+		return nil
+	}
+	if len(data) > 0 && data[0] == '"' {
+		var value string
+		if err := json.Unmarshal(data, &value); err != nil {
+			return err
+		}
+		*t = TraceTime(value)
+		return nil
+	}
+	var number json.Number
+	if err := json.Unmarshal(data, &number); err != nil {
+		return err
+	}
+	*t = TraceTime(number.String())
+	return nil
+}
+
+// 物流轨迹
+type Trace struct {
+	TraceState   string    `json:"traceState"`
+	TraceTime    TraceTime `json:"traceTime"`
+	TraceContext string    `json:"traceContext"`
+	TraceType    string    `json:"traceType"`
+}
+
 // 响应结构
 type ExpressResponse struct {
 	Code string `json:"code"`
 	Data []struct {
-		CompanyCode string `json:"companyCode"`
-		ExpressNo   string `json:"expressNo"`
-		CompanyName string `json:"companyName"`
+		CompanyCode     string  `json:"companyCode"`
+		ExpressNo       string  `json:"expressNo"`
+		CompanyName     string  `json:"companyName"`
+		SubscribeStatus string  `json:"subscribeStatus"`
+		IsArrived       bool    `json:"isArrived"`
+		Traces          []Trace `json:"traces"`
 	} `json:"data"`
 }
 
-// 结果结构
+// 结果结构，保留全部轨迹，由 order_store.py ingest-logistics 写入轨迹库
 type LogisticsResult struct {
-	OrderId     string `json:"orderId"`
-	ExpressNo   string `json:"expressNo"`
-	CompanyName string `json:"companyName"`
+	OrderId         string  `json:"orderId"`
+	ExpressNo       string  `json:"expressNo"`
+	CompanyName     string  `json:"companyName"`
+	CompanyCode     string  `json:"companyCode,omitempty"`
+	SubscribeStatus string  `json:"subscribeStatus,omitempty"`
+	IsArrived       bool    `json:"isArrived,omitempty"`
+	Traces          []Trace `json:"traces,omitempty"`
 }
 
 // 读取状态信息文件
@@ -158,9 +198,13 @@ func queryExpress(orderId string, httpReq *HTTPRequest, timestamp, sign string)
 	if len(expressResp.Data) > 0 {
 		express := expressResp.Data[0]
 		return &LogisticsResult{
-			OrderId:     orderId,
-			ExpressNo:   express.ExpressNo,
-			CompanyName: express.CompanyName,
+			OrderId:         orderId,
+			ExpressNo:       express.ExpressNo,
+			CompanyName:     express.CompanyName,
+			CompanyCode:     express.CompanyCode,
+			SubscribeStatus: express.SubscribeStatus,
+			IsArrived:       express.IsArrived,
+			Traces:          express.Traces,
 		}
 	}
 
@@ -0,0 +1,706 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+物流查询任务队列
+把要查询的订单号写入持久化队列，任意数量的worker进程按批领取（带租约），
+查询结果逐批写入订单库。worker崩溃时租约到期后由其他worker接手，不会丢失已完成的结果。
+
+队列默认保存在SQLite文件中（同一台机器上的多个进程共享）；跨机器部署时实现 QueueBackend
+并用 register_backend 注册，例如 register_backend('redis', RedisQueueBackend)，
+worker通过 --queue redis://... 使用
+
+    python work_queue.py enqueue status_info.json
+    python work_queue.py work --http-file utils/load-experss-info/http_req_express.hcy
+    python work_queue.py stats
+    python work_queue.py demo     用本地模拟接口检查租约接手、不重复领取和签名更新
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api_request import SignatureExpired, load_request_template, raise_for_signature, read_signature
+from order_store import DEFAULT_DB_FILE, open_store, upsert_express_results
+
+DEFAULT_QUEUE = 'lookup_queue.db'
+
+# 租约时长（秒）：worker在租约内没有完成也没有续约，任务会被其他worker重新领取
+DEFAULT_LEASE_SECONDS = 60
+
+# 同一个任务最多尝试的次数（包括租约过期被重新领取）
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class QueueBackend:
+    """
+    队列后端接口
+
+    任务以orderId为唯一键，状态为 pending / leased / done / failed
+    """
+
+    def enqueue(self, order_ids, reset=False):
+        """加入任务，已存在的任务不重复加入；reset为True时把已完成或失败的任务重新置为pending"""
+        raise NotImplementedError
+
+    def claim(self, worker_id, batch_size, lease_seconds):
+        """领取一批pending或租约已过期的任务，返回orderId列表"""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id, order_ids, lease_seconds):
+        """延长仍由该worker持有的任务的租约，返回续约的任务数"""
+        raise NotImplementedError
+
+    def complete(self, worker_id, order_ids):
+        """标记任务完成"""
+        raise NotImplementedError
+
+    def fail(self, worker_id, order_id, error):
+        """标记一次失败，未超过最大尝试次数时放回队列"""
+        raise NotImplementedError
+
+    def release(self, worker_id, order_ids):
+        """把仍由该worker持有的任务放回队列，撤销领取时增加的尝试次数（如签名失效，不是任务本身的失败）"""
+        raise NotImplementedError
+
+    def stats(self):
+        """各状态的任务数"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteQueueBackend(QueueBackend):
+    """
+    SQLite队列：领取在 BEGIN IMMEDIATE 事务中先查出任务再更新，多个进程同时领取也不会拿到同一个任务
+
+    不用 UPDATE ... RETURNING（需要SQLite 3.35+，Python 3.8 自带的SQLite常常更旧）
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY,
+        orderId TEXT NOT NULL UNIQUE,
+        state TEXT NOT NULL DEFAULT 'pending',
+        leaseOwner TEXT,
+        leaseExpiresAt INTEGER,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lastError TEXT,
+        updatedAt INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(state, leaseExpiresAt);
+    """
+
+    def __init__(self, db_file=DEFAULT_QUEUE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(db_file, timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+
+    def enqueue(self, order_ids, reset=False):
+        now = int(time.time())
+        rows = [(order_id, now) for order_id in order_ids]
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            before = self.conn.total_changes
+            if reset:
+                self.conn.executemany(
+                    "INSERT INTO tasks (orderId, updatedAt) VALUES (?, ?) "
+                    "ON CONFLICT(orderId) DO UPDATE SET state = 'pending', attempts = 0, leaseOwner = NULL, "
+                    "lastError = NULL, updatedAt = excluded.updatedAt WHERE tasks.state IN ('done', 'failed')",
+                    rows,
+                )
+            else:
+                self.conn.executemany('INSERT OR IGNORE INTO tasks (orderId, updatedAt) VALUES (?, ?)', rows)
+            added = self.conn.total_changes - before
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def claim(self, worker_id, batch_size, lease_seconds):
+        now = int(time.time())
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 租约过期且已用完尝试次数的任务不再领取
+            self.conn.execute(
+                "UPDATE tasks SET state = 'failed', leaseOwner = NULL, lastError = 'lease expired', updatedAt = ? "
+                "WHERE state = 'leased' AND leaseExpiresAt < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            # 写锁已在 BEGIN IMMEDIATE 时拿到，查询和更新之间其他进程不能领取
+            rows = self.conn.execute(
+                "SELECT id, orderId FROM tasks "
+                "WHERE state = 'pending' OR (state = 'leased' AND leaseExpiresAt < ?) ORDER BY id LIMIT ?",
+                (now, batch_size),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE tasks SET state = 'leased', leaseOwner = ?, leaseExpiresAt = ?, "
+                "attempts = attempts + 1, updatedAt = ? WHERE id = ?",
+                [(worker_id, now + lease_seconds, now, row[0]) for row in rows],
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return [row[1] for row in rows]
+
+    def heartbeat(self, worker_id, order_ids, lease_seconds):
+        if not order_ids:
+            return 0
+        now = int(time.time())
+        placeholders = ','.join('?' * len(order_ids))
+        cursor = self.conn.execute(
+            f"UPDATE tasks SET leaseExpiresAt = ?, updatedAt = ? "
+            f"WHERE state = 'leased' AND leaseOwner = ? AND orderId IN ({placeholders})",
+            (now + lease_seconds, now, worker_id, *order_ids),
+        )
+        return cursor.rowcount
+
+    def complete(self, worker_id, order_ids):
+        # 租约已被其他worker接手的任务也标记完成，结果按orderId覆盖写入，重复查询没有副作用
+        now = int(time.time())
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.executemany(
+                "UPDATE tasks SET state = 'done', leaseOwner = NULL, lastError = NULL, updatedAt = ? "
+                "WHERE orderId = ? AND state != 'done'",
+                [(now, order_id) for order_id in order_ids],
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+    def fail(self, worker_id, order_id, error):
+        self.conn.execute(
+            "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "leaseOwner = NULL, lastError = ?, updatedAt = ? WHERE orderId = ? AND leaseOwner = ?",
+            (self.max_attempts, str(error)[:500], int(time.time()), order_id, worker_id),
+        )
+
+    def release(self, worker_id, order_ids):
+        if not order_ids:
+            return
+        placeholders = ','.join('?' * len(order_ids))
+        self.conn.execute(
+            f"UPDATE tasks SET state = 'pending', attempts = MAX(attempts - 1, 0), leaseOwner = NULL, "
+            f"updatedAt = ? WHERE state = 'leased' AND leaseOwner = ? AND orderId IN ({placeholders})",
+            (int(time.time()), worker_id, *order_ids),
+        )
+
+    def stats(self):
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(self.conn.execute('SELECT state, COUNT(*) FROM tasks GROUP BY state')))
+        counts['expired'] = self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE state = 'leased' AND leaseExpiresAt < ?", (int(time.time()),)
+        ).fetchone()[0]
+        counts['retried'] = self.conn.execute('SELECT COUNT(*) FROM tasks WHERE attempts > 1').fetchone()[0]
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+
+BACKENDS = {'sqlite': SQLiteQueueBackend}
+
+
+def register_backend(scheme, backend_class):
+    """注册队列后端，open_queue 按 scheme://... 选择"""
+    BACKENDS[scheme] = backend_class
+
+
+def open_queue(url=DEFAULT_QUEUE, **kwargs):
+    """打开队列，url 为文件路径（SQLite）或 scheme://地址"""
+    if '://' not in url:
+        return SQLiteQueueBackend(url, **kwargs)
+    scheme, location = url.split('://', 1)
+    if scheme not in BACKENDS:
+        raise ValueError(f"未知的队列后端: {scheme}")
+    return BACKENDS[scheme](location, **kwargs)
+
+
+class ExpressClient:
+    """
+    快递查询请求
+
+    与 express.py / logistics.go 相同：读取 http_req_express.hcy 请求模板，每次请求前重新读取签名文件，
+    替换请求体中的orderId后发送；url 参数可以把请求发到本地模拟接口
+    """
+
+    def __init__(self, http_file=None, url=None, signature_dir=None, timeout=30):
+        self.method = 'POST'
+        self.url = url
+        self.headers = {'content-type': 'application/json'}
+        self.body = {'orderId': ''}
+        self.timeout = timeout
+        self.signature_dir = signature_dir
+
+        if http_file:
+            method, template_url, headers, body = load_request_template(http_file)
+            self.method = method
+            self.headers.update(headers)
+            if body is not None:
+                self.body = body
+            self.url = self.url or template_url
+            self.signature_dir = signature_dir or os.path.dirname(os.path.abspath(http_file))
+        if not self.url:
+            raise ValueError('缺少请求地址: 需要 http_file 或 url')
+
+    def query(self, order_id):
+        """
+        查询一个订单的快递信息，签名失效时抛出 SignatureExpired
+
+        Returns:
+            快递结果（接口 data 第一条记录，附带 orderId）；没有快递信息时只有 orderId
+        """
+        body = dict(self.body, orderId=order_id)
+        headers = dict(self.headers)
+        if self.signature_dir:
+            headers.update(read_signature(self.signature_dir))
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(body, separators=(',', ':')).encode('utf-8'),
+            headers=headers,
+            method=self.method,
+        )
+        try:
+            resp = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            raise_for_signature(e)
+        with resp:
+            data = resp.read()
+            if resp.headers.get('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+        payload = json.loads(data)
+        if str(payload.get('code')) != '0':
+            raise RuntimeError(f"接口返回错误: {payload.get('code')} {payload.get('message', '')}")
+        items = payload.get('data') or []
+        if items and isinstance(items[0], dict):
+            return dict(items[0], orderId=order_id)
+        return {'orderId': order_id}
+
+
+def run_worker(queue_url, db_file, client_options, batch_size=50, concurrency=8,
+               lease_seconds=DEFAULT_LEASE_SECONDS, worker_id=None, follow=False, quiet=False, stop_event=None):
+    """
+    worker主循环：领取一批任务，并发查询，结果写入订单库后标记完成
+
+    查询期间后台线程每 lease_seconds/3 秒续约一次；队列为空时退出（follow为True时继续等待）。
+    签名失效时写入本批已完成的结果、把未完成的任务放回队列（不计尝试次数）后抛出 SignatureExpired。
+    stop_event 被设置时处理完当前这一批后退出
+
+    Returns:
+        (完成数, 失败数)
+    """
+    worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+    queue = open_queue(queue_url)
+    conn = open_store(db_file)
+    client = ExpressClient(**client_options)
+
+    current = []
+    stop = threading.Event()
+
+    def keep_alive():
+        # 单独的连接续约，避免和主线程共用连接
+        heartbeat_queue = open_queue(queue_url)
+        while not stop.wait(max(lease_seconds / 3, 0.5)):
+            heartbeat_queue.heartbeat(worker_id, list(current), lease_seconds)
+        heartbeat_queue.close()
+
+    heartbeat_thread = threading.Thread(target=keep_alive, daemon=True)
+    heartbeat_thread.start()
+
+    def lookup(order_id):
+        try:
+            return order_id, client.query(order_id), None
+        except Exception as e:
+            return order_id, None, e
+
+    done_count = 0
+    failed_count = 0
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while stop_event is None or not stop_event.is_set():
+                order_ids = queue.claim(worker_id, batch_size, lease_seconds)
+                if not order_ids:
+                    if follow:
+                        time.sleep(1)
+                        continue
+                    break
+                current[:] = order_ids
+
+                results = []
+                expired = None
+                expired_ids = []
+                for order_id, result, error in executor.map(lookup, order_ids):
+                    if error is None:
+                        results.append(result)
+                    elif isinstance(error, SignatureExpired):
+                        # 签名失效不是任务本身的问题：不计入失败次数，稍后立即放回队列
+                        expired = error
+                        expired_ids.append(order_id)
+                    else:
+                        queue.fail(worker_id, order_id, error)
+                        failed_count += 1
+
+                # 先写结果再标记完成：中途崩溃最多重复查询这一批
+                upsert_express_results(conn, results)
+                queue.complete(worker_id, [result['orderId'] for result in results])
+                current[:] = []
+                done_count += len(results)
+                if not quiet:
+                    print(f"[{worker_id}] 已完成 {done_count} 个，失败 {failed_count} 次")
+                if expired is not None:
+                    # 放回队列并撤销这次领取的尝试次数，签名更新后不用等租约过期就能重新领取
+                    queue.release(worker_id, expired_ids)
+                    raise expired
+    finally:
+        stop.set()
+        heartbeat_thread.join()
+        conn.close()
+        queue.close()
+    return done_count, failed_count
+
+
+# ---------------------------------------------------------------------------
+# 本地模拟接口和扩展性测试
+# ---------------------------------------------------------------------------
+
+def start_mock_express_server(latency=0.05, port=0):
+    """
+    本地模拟快递查询接口：每个请求等待latency秒后返回按orderId生成的快递信息
+
+    server.valid_signs 非空时，x-request-sign 不在其中的请求返回签名失效；
+    server.request_counts 记录每个orderId被成功查询的次数
+
+    Returns:
+        (server, url)
+    """
+    from sample_data import generate_express_results
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            order_id = json.loads(self.rfile.read(length) or b'{}').get('orderId', '')
+            if server.valid_signs and self.headers.get('x-request-sign') not in server.valid_signs:
+                body = json.dumps({'errCode': 'SIG.FAIL', 'errMsg': '签名校验失败'}).encode('utf-8')
+                self.send_response(405)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            time.sleep(latency)
+            with server.counts_lock:
+                server.request_counts[order_id] += 1
+            item = next(generate_express_results([order_id], seed=zlib.crc32(order_id.encode('utf-8'))))
+            item.pop('orderId')
+            item['expressNo'] = item['expressNo'][:2] + order_id[-13:]
+            body = json.dumps({'code': '0', 'message': '', 'data': [item]}, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # 崩溃测试中被结束的worker
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockHandler)
+    server.daemon_threads = True
+    server.valid_signs = set()
+    server.request_counts = Counter()
+    server.counts_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/express/user/common/action/get-express'
+
+
+def _remove_db(path):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def _run_workers(worker_count, queue_file, db_file, url, batch_size, concurrency, lease_seconds):
+    """启动worker进程并等待全部结束，返回耗时秒数"""
+    processes = [
+        multiprocessing.Process(
+            target=run_worker,
+            args=(queue_file, db_file, {'url': url}),
+            kwargs={'batch_size': batch_size, 'concurrency': concurrency, 'lease_seconds': lease_seconds,
+                    'worker_id': f'bench-{index}', 'quiet': True},
+        )
+        for index in range(worker_count)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return time.perf_counter() - start
+
+
+def run_benchmark(task_count, worker_counts, latency, batch_size, concurrency):
+    """用本地模拟接口测试吞吐量随worker数的扩展（正确性检查见 run_demo）"""
+    queue_file = 'queue_bench.db'
+    db_file = 'queue_bench_orders.db'
+    server, url = start_mock_express_server(latency)
+    order_ids = [f'8755681{index:011d}' for index in range(task_count)]
+
+    print(f"📊 {task_count} 个任务, 模拟接口延迟 {latency * 1000:.0f} ms, "
+          f"每个worker {concurrency} 并发, 每批 {batch_size} 个")
+    try:
+        baseline = None
+        for worker_count in worker_counts:
+            _remove_db(queue_file)
+            _remove_db(db_file)
+            queue = open_queue(queue_file)
+            queue.enqueue(order_ids)
+            queue.close()
+
+            elapsed = _run_workers(worker_count, queue_file, db_file, url, batch_size, concurrency,
+                                   DEFAULT_LEASE_SECONDS)
+            queue = open_queue(queue_file)
+            stats = queue.stats()
+            queue.close()
+            throughput = stats['done'] / elapsed
+            baseline = baseline or throughput / worker_count
+            efficiency = throughput / (baseline * worker_count)
+            print(f"   {worker_count} 个worker: {throughput:,.0f} 单/秒 ({elapsed:.2f} 秒), "
+                  f"完成 {stats['done']}/{task_count}, 线性扩展效率 {efficiency * 100:.0f}%")
+
+    finally:
+        server.shutdown()
+        _remove_db(queue_file)
+        _remove_db(db_file)
+
+
+def _write_signature(directory, value):
+    for file_name in ('x-request-timestamp.txt', 'x-request-sign.txt'):
+        with open(os.path.join(directory, file_name), 'w', encoding='utf-8') as f:
+            f.write(value)
+
+
+def _task_rows(queue_file):
+    """{orderId: (state, attempts, leaseOwner)}"""
+    conn = sqlite3.connect(queue_file)
+    try:
+        return {row[0]: row[1:] for row in conn.execute('SELECT orderId, state, attempts, leaseOwner FROM tasks')}
+    finally:
+        conn.close()
+
+
+def run_demo(task_count=400, worker_count=4, latency=0.01):
+    """
+    用本地模拟快递接口检查队列的正确性：
+    多个worker并发时每个任务只被领取、查询一次；worker崩溃后租约过期的任务由其他worker接手；
+    签名文件更新后同一个 ExpressClient 使用新签名
+    """
+    server, url = start_mock_express_server(latency)
+    server.valid_signs.add('sign-1')
+    order_ids = [f'8755681{index:011d}' for index in range(task_count)]
+    checks = []
+
+    def check(name, ok):
+        checks.append(ok)
+        print(f"   {'✅' if ok else '❌'} {name}")
+
+    print(f"📊 {task_count} 个任务, {worker_count} 个worker")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _write_signature(tmp_dir, 'sign-1')
+        client_options = {'url': url, 'signature_dir': tmp_dir}
+        db_file = os.path.join(tmp_dir, 'orders.db')
+        try:
+            # 多个worker进程并发领取：接口按orderId计数，每个任务恰好查询一次
+            queue_file = os.path.join(tmp_dir, 'queue.db')
+            queue = open_queue(queue_file)
+            queue.enqueue(order_ids)
+            queue.close()
+            processes = [
+                multiprocessing.Process(
+                    target=run_worker,
+                    args=(queue_file, db_file, client_options),
+                    kwargs={'batch_size': 10, 'concurrency': 4, 'worker_id': f'demo-{index}', 'quiet': True},
+                )
+                for index in range(worker_count)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            tasks = _task_rows(queue_file)
+            done = sum(1 for state, _, _ in tasks.values() if state == 'done')
+            check(f"{worker_count} 个worker并发: 完成 {done}/{task_count}",
+                  done == task_count)
+            repeated = sum(1 for count in server.request_counts.values() if count > 1)
+            check(f"每个任务只领取一次: 接口收到 {sum(server.request_counts.values())} 次查询, 重复 {repeated} 个, "
+                  f"尝试次数大于1的任务 {sum(1 for _, attempts, _ in tasks.values() if attempts > 1)} 个",
+                  repeated == 0 and len(server.request_counts) == task_count
+                  and all(attempts == 1 for _, attempts, _ in tasks.values()))
+
+            # worker领取后被强制结束：租约到期前其他worker拿不到，到期后被接手并完成
+            queue_file = os.path.join(tmp_dir, 'crash_queue.db')
+            crash_ids = order_ids[:40]
+            queue = open_queue(queue_file)
+            queue.enqueue(crash_ids)
+            queue.close()
+            lease_seconds = 2
+            server.request_counts.clear()
+            crashed = multiprocessing.Process(
+                target=run_worker,
+                args=(queue_file, db_file, client_options),
+                kwargs={'batch_size': 10, 'concurrency': 1, 'lease_seconds': lease_seconds,
+                        'worker_id': 'crashed', 'quiet': True},
+            )
+            crashed.start()
+            deadline = time.time() + 10
+            while time.time() < deadline and not any(
+                    owner == 'crashed' for _, _, owner in _task_rows(queue_file).values()):
+                time.sleep(0.01)
+            crashed.terminate()
+            crashed.join()
+            leased = [order_id for order_id, (state, _, owner) in _task_rows(queue_file).items()
+                      if state == 'leased' and owner == 'crashed']
+
+            queue = open_queue(queue_file)
+            early = queue.claim('early', len(crash_ids), lease_seconds)
+            queue.release('early', early)
+            queue.close()
+            check(f"崩溃的worker持有 {len(leased)} 个任务, 租约到期前其他worker领取不到",
+                  bool(leased) and not set(early) & set(leased))
+
+            time.sleep(lease_seconds + 1)
+            run_worker(queue_file, db_file, client_options, batch_size=10, concurrency=4,
+                       lease_seconds=lease_seconds, worker_id='rescuer', quiet=True)
+            tasks = _task_rows(queue_file)
+            rescued = [order_id for order_id in leased if tasks[order_id][0] == 'done' and tasks[order_id][1] == 2]
+            done = sum(1 for state, _, _ in tasks.values() if state == 'done')
+            check(f"租约到期后被接手: 完成 {done}/{len(crash_ids)}, 崩溃时持有的 {len(rescued)}/{len(leased)} 个已重新查询",
+                  done == len(crash_ids) and len(rescued) == len(leased))
+
+            # 签名文件更新后，已创建的客户端不需要重建就能使用新签名
+            client = ExpressClient(**client_options)
+            client.query(order_ids[0])
+            server.valid_signs.clear()
+            server.valid_signs.add('sign-2')
+            try:
+                client.query(order_ids[0])
+                expired = False
+            except SignatureExpired:
+                expired = True
+            _write_signature(tmp_dir, 'sign-2')
+            result = client.query(order_ids[0])
+            check("签名失效后更新签名文件, 同一客户端继续查询", expired and bool(result.get('expressNo')))
+        finally:
+            server.shutdown()
+    print(f"\n{'✅ 全部通过' if all(checks) else '❌ 有检查未通过'}")
+    return all(checks)
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description='物流查询任务队列')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help='队列文件路径或 scheme://地址')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help='从status_info.json加入查询任务')
+    enqueue_parser.add_argument('status_file', nargs='?', default='status_info.json')
+    enqueue_parser.add_argument('--reset', action='store_true', help='已完成或失败的任务重新查询')
+
+    work_parser = subparsers.add_parser('work', help='启动worker')
+    work_parser.add_argument('--db', default=DEFAULT_DB_FILE, help='结果写入的订单库')
+    work_parser.add_argument('--http-file', default='http_req_express.hcy', help='请求模板')
+    work_parser.add_argument('--url', help='覆盖请求地址，例如本地模拟接口')
+    work_parser.add_argument('--batch-size', type=int, default=50)
+    work_parser.add_argument('--concurrency', type=int, default=8)
+    work_parser.add_argument('--lease', type=int, default=DEFAULT_LEASE_SECONDS, help='租约秒数')
+    work_parser.add_argument('--follow', action='store_true', help='队列为空时继续等待新任务')
+
+    subparsers.add_parser('stats', help='各状态的任务数')
+
+    mock_parser = subparsers.add_parser('mock', help='启动本地模拟快递查询接口')
+    mock_parser.add_argument('--port', type=int, default=8788)
+    mock_parser.add_argument('--latency', type=float, default=0.05)
+
+    bench_parser = subparsers.add_parser('bench', help='worker数扩展性测试')
+    bench_parser.add_argument('--tasks', type=int, default=2000)
+    bench_parser.add_argument('--workers', default='1,2,4', help='逗号分隔的worker数')
+    bench_parser.add_argument('--latency', type=float, default=0.05)
+    bench_parser.add_argument('--batch-size', type=int, default=50)
+    bench_parser.add_argument('--concurrency', type=int, default=4)
+
+    demo_parser = subparsers.add_parser('demo', help='用本地模拟接口检查租约接手、不重复领取和签名更新')
+    demo_parser.add_argument('--tasks', type=int, default=400)
+    demo_parser.add_argument('--workers', type=int, default=4)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'enqueue':
+        if not os.path.exists(args.status_file):
+            print(f"❌ 错误: 找不到文件 {args.status_file}")
+            return
+        with open(args.status_file, 'r', encoding='utf-8') as f:
+            order_ids = [order['orderId'] for order in json.load(f).get('orders', []) if order.get('orderId')]
+        queue = open_queue(args.queue)
+        added = queue.enqueue(order_ids, reset=args.reset)
+        print(f"✅ 加入 {added} 个任务（文件中共 {len(order_ids)} 个订单）")
+        print(f"📊 {queue.stats()}")
+        queue.close()
+    elif args.command == 'work':
+        client_options = {'url': args.url}
+        if os.path.exists(args.http_file):
+            client_options['http_file'] = args.http_file
+        elif not args.url:
+            print(f"❌ 错误: 找不到请求模板 {args.http_file}")
+            return
+        try:
+            done_count, failed_count = run_worker(
+                args.queue, args.db, client_options, args.batch_size, args.concurrency, args.lease,
+                follow=args.follow,
+            )
+        except SignatureExpired:
+            print("❌ 签名失效，请更新 x-request-timestamp.txt / x-request-sign.txt 后重新运行")
+            return
+        print(f"✅ 完成 {done_count} 个，失败 {failed_count} 次")
+    elif args.command == 'stats':
+        queue = open_queue(args.queue)
+        print(json.dumps(queue.stats(), ensure_ascii=False))
+        queue.close()
+    elif args.command == 'mock':
+        server, url = start_mock_express_server(args.latency, args.port)
+        print(f"🚀 模拟快递查询接口: {url}")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            server.shutdown()
+    elif args.command == 'bench':
+        run_benchmark(args.tasks, [int(n) for n in args.workers.split(',')], args.latency,
+                      args.batch_size, args.concurrency)
+    elif args.command == 'demo':
+        run_demo(args.tasks, args.workers)
+
+
+if __name__ == '__main__':
+    main()